@@ -0,0 +1,92 @@
+"""
+프롬프트 구성 + 요청 본문 직렬화 벤치마크 (네트워크 불필요)
+
+여러 MB의 첨부자료로 작업 N건(같은 첨부, 키워드만 다름)의 Step 1/Step 2 요청 본문을 만든다.
+- 기존 방식: 문서별 f-string -> 프롬프트 f-string 복사 -> requests의 json= (ensure_ascii=True) 직렬화
+- 새 방식: PromptBuilder(첨부 블록 1회 포맷 + JSON 인코딩 1회 캐시) -> dumps_payload
+
+    python bench_prompt_build.py --mb 4 --jobs 5
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src import prompt_builder as builder_module
+from src.prompt_builder import prompt_builder
+from src.prompt_templates import build_final_prompt, build_meta_prompt
+from src.providers.anthropic_client import AnthropicClient
+from src.util.json_segments import dumps_payload
+
+
+def legacy_format_attachments(attachments, max_chars_per_doc=12000):
+    blocks = []
+    for idx, (path, content) in enumerate(attachments, start=1):
+        snippet = content if len(content) <= max_chars_per_doc else content[:max_chars_per_doc] + "\n...[truncated]"
+        blocks.append(f"[자료 {idx}] {path}\n```\n{snippet}\n```")
+    return "\n\n".join(blocks)
+
+
+def make_attachments(total_mb, docs):
+    line = "오늘은 금오산 근처 맛집 탐방기를 준비했어요! \"진짜\" 맛있더라고요 😊\n"
+    per_doc = int(total_mb * 1024 * 1024 / docs)
+    text = line * (per_doc // len(line.encode("utf-8")) + 1)
+    return [(f"refs/post_{i:04d}.md", f"# 글 {i}\n" + text) for i in range(docs)]
+
+
+def legacy_run(client, attachments, jobs, max_chars):
+    size = 0
+    for j in range(jobs):
+        block = legacy_format_attachments(attachments, max_chars)
+        for messages in (build_meta_prompt(block), build_final_prompt("스타일 가이드", f"키워드{j}", 5, block, "가이드", 1000)):
+            payload = client._payload("claude-test", messages, 4000, 0.7, True)
+            size += len(json.dumps(payload).encode("utf-8"))
+    return size
+
+
+def builder_run(client, attachments, jobs, max_chars):
+    # Start cold: the first job formats and encodes the block, later ones reuse it
+    builder_module._BUILDERS.clear()
+    size = 0
+    for j in range(jobs):
+        prompts = prompt_builder(attachments, max_chars)
+        for messages in (prompts.meta_messages(), prompts.final_messages("스타일 가이드", f"키워드{j}", 5, "가이드", 1000)):
+            payload = client._payload("claude-test", messages, 4000, 0.7, True)
+            size += len(dumps_payload(payload))
+    return size
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="프롬프트 구성/직렬화 벤치마크")
+    parser.add_argument("--mb", type=float, default=4, help="첨부자료 총 크기(MB, 기본값: 4)")
+    parser.add_argument("--docs", type=int, default=40, help="문서 수 (기본값: 40)")
+    parser.add_argument("--jobs", type=int, default=5, help="같은 첨부를 쓰는 작업 수 (기본값: 5)")
+    parser.add_argument("--max-chars", type=int, default=1_000_000, help="문서당 최대 글자수 (기본값: 1000000)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    attachments = make_attachments(args.mb, args.docs)
+    client = AnthropicClient(api_key="bench", base_url="http://127.0.0.1:9")
+    print(f"첨부 {args.docs}개, {sum(len(c.encode('utf-8')) for _, c in attachments) / 1024 / 1024:.1f}MB, 작업 {args.jobs}건 x 2단계")
+
+    legacy_t, legacy_size = best_of(lambda: legacy_run(client, attachments, args.jobs, args.max_chars), args.repeat)
+    new_t, new_size = best_of(lambda: builder_run(client, attachments, args.jobs, args.max_chars), args.repeat)
+    print(f"기존 방식:        {legacy_t * 1000:8.1f}ms, 요청 본문 합계 {legacy_size / 1024 / 1024:7.1f}MB")
+    print(f"PromptBuilder:    {new_t * 1000:8.1f}ms, 요청 본문 합계 {new_size / 1024 / 1024:7.1f}MB")
+    print(f"속도 {legacy_t / new_t:.1f}배, 본문 크기 {new_size / legacy_size:.0%}")
+
+
+if __name__ == "__main__":
+    main()
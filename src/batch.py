@@ -0,0 +1,256 @@
+"""Batch runner: one generation job per line of a JSONL file.
+
+Each line is a JSON object with Job input fields (``keyword``,
+``writing_guide``, ``files``, ``word_count``, ...) or the request format
+``{"request_id", "title", "body"}``, where the title becomes the keyword and
+the body the writing guide. Results go to ``<out_dir>/<request_id>.txt``, or
+with ``--archive`` into one JSONL file (gzip when it ends in ``.gz``) instead
+of thousands of small files. ``--workers N`` spreads the requests over N
+processes (see ``src.worker_pool``).
+
+    python -m src.batch requests.jsonl --archive results.jsonl.gz --concurrency 4
+    python -m src.batch requests.jsonl --archive results.jsonl.gz --workers 4 --rpm 50
+    python -m src.batch requests.jsonl --concurrency 4 --dry-run   # estimate only (src.planner)
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+if not __package__:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import src  # noqa: F401
+    __package__ = "src"
+
+from .jobs import DONE, Job, JobQueue
+from .main import DEFAULT_COMPRESS_TOKENS, STYLE_MODES
+from .providers.singleflight import coalesced_requests
+from .util.env_util import load_env
+from .util.logs import configure as configure_logs, emit, flush as flush_logs
+from .util.output_writer import ResultArchive
+from .util.draft_cache import DraftCache
+from .util.style_cache import StyleCache
+
+# Request keys copied onto the Job as-is
+INPUT_FIELDS = (
+    "keyword", "writing_guide", "keyword_repeat", "word_count", "files", "input_dir", "ref_dir", "ref_top_k",
+    "provider", "model", "step1_provider", "step1_model", "language", "max_tokens", "temperature", "timeout",
+    "compress_tokens", "style_mode", "sections", "priority",
+)
+
+_UNSAFE_RE = re.compile(r"[^\w.-]+")
+
+
+def load_requests(path: str) -> List[Dict[str, Any]]:
+    requests: List[Dict[str, Any]] = []
+    with open(path, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                requests.append(json.loads(line))
+            except ValueError as e:
+                raise ValueError(f"{path}:{lineno}: JSON 형식 오류: {e}") from e
+    return requests
+
+
+def request_id(req: Dict[str, Any], index: int) -> str:
+    return str(req.get("request_id") or req.get("id") or f"{index:05d}")
+
+
+def job_from_request(
+    req: Dict[str, Any], index: int, defaults: Optional[Dict[str, Any]] = None, out_dir: Optional[str] = None
+) -> Job:
+    """Job for one request line; ``defaults`` fill fields the line doesn't set."""
+    values = dict(defaults or {})
+    values.update({k: req[k] for k in INPUT_FIELDS if req.get(k) is not None})
+    values.setdefault("keyword", req.get("title") or "")
+    values.setdefault("writing_guide", req.get("body") or "")
+    if not values["keyword"] or not values["writing_guide"]:
+        raise ValueError(f"요청 {request_id(req, index)}: keyword/title 와 writing_guide/body 가 필요합니다")
+    out_path = None
+    if out_dir:
+        out_path = os.path.join(out_dir, _UNSAFE_RE.sub("_", request_id(req, index)) + ".txt")
+    return Job(out_path=out_path, **values)
+
+
+def result_record(rid: str, job: Job) -> Dict[str, Any]:
+    """Archive record for a finished job."""
+    return {
+        "request_id": rid, "status": job.status, "keyword": job.keyword,
+        "provider": job.provider, "model": job.model, "output": job.output_text() if job.status == DONE else "",
+        "error": job.error, "usage": job.usage, "elapsed": round(job.elapsed, 3),
+    }
+
+
+def run_batch(
+    requests: List[Dict[str, Any]],
+    out_dir: Optional[str] = None,
+    archive_path: Optional[str] = None,
+    concurrency: int = 2,
+    defaults: Optional[Dict[str, Any]] = None,
+    job_timeout: Optional[float] = None,
+    log: Callable[[str], None] = emit,
+    indices: Optional[List[int]] = None,
+    style_cache: Optional[StyleCache] = None,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+    draft_cache: Optional[DraftCache] = None,
+) -> Dict[str, Any]:
+    """Run every request through a JobQueue and return a summary.
+
+    With ``archive_path`` each finished job (done or not) becomes one archive
+    record and no per-job files are written. ``on_result(record)`` sees the
+    same records; ``indices`` are the requests' positions in the original
+    file (for default request ids) when running a partition of it.
+    ``draft_cache`` lets reruns rewrite only what a changed guide affects.
+    """
+    archive = ResultArchive(archive_path) if archive_path else None
+    style_cache = style_cache if style_cache is not None else StyleCache()
+    queue = JobQueue(concurrency=concurrency, style_cache=style_cache, job_timeout=job_timeout, draft_cache=draft_cache)
+    ids: Dict[int, str] = {}
+    summary: Dict[str, Any] = {"total": len(requests), "done": 0, "failed": [], "usage": {}}
+    lock = threading.Lock()
+    t0 = time.perf_counter()
+    coalesced = sum(coalesced_requests().values())
+
+    def on_event(job: Job, event: str) -> None:
+        if event != "finished":
+            return
+        rid = ids.get(job.id, str(job.id))
+        if archive is not None or on_result is not None:
+            record = result_record(rid, job)
+            if archive is not None:
+                archive.add(record)
+            if on_result is not None:
+                on_result(record)
+        with lock:
+            if job.status == DONE:
+                summary["done"] += 1
+            else:
+                summary["failed"].append((rid, job.status, job.error))
+            for k, v in job.usage.items():
+                summary["usage"][k] = summary["usage"].get(k, 0) + v
+            finished = summary["done"] + len(summary["failed"])
+        log(f"[배치] {finished}/{len(requests)} {job.status}: {rid} ({job.elapsed:.1f}s)")
+
+    queue.add_listener(on_event)
+    try:
+        for index, req in zip(indices or range(len(requests)), requests):
+            try:
+                job = job_from_request(req, index, defaults, None if archive else out_dir)
+            except ValueError as e:
+                log(f"[배치] 건너뜀: {e}")
+                summary["failed"].append((request_id(req, index), "invalid", str(e)))
+                if on_result is not None:
+                    on_result({"request_id": request_id(req, index), "status": "invalid", "error": str(e)})
+                continue
+            ids[job.id] = request_id(req, index)
+            queue.submit(job)
+        queue.wait()
+    finally:
+        if archive is not None:
+            archive.close()
+    summary["elapsed"] = time.perf_counter() - t0
+    summary["style_cache"] = {"hits": style_cache.hits, "misses": style_cache.misses}
+    # Calls that waited on an identical request in flight (providers.singleflight)
+    summary["coalesced"] = sum(coalesced_requests().values()) - coalesced
+    if draft_cache is not None:
+        summary["draft_cache"] = {"reused": draft_cache.reused, "rewritten": draft_cache.rewritten}
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="JSONL 요청 파일로 블로그 초안 일괄 생성")
+    parser.add_argument("requests", help="요청 JSONL (한 줄에 한 건: keyword/writing_guide 또는 request_id/title/body)")
+    parser.add_argument("--out-dir", default="batch_out", help="건별 출력 폴더 (기본값: batch_out)")
+    parser.add_argument("--archive", default=None, help="건별 파일 대신 결과를 모을 JSONL 파일 (.gz면 압축)")
+    parser.add_argument("--concurrency", type=int, default=2, help="동시 실행 작업 수 (기본값: 2)")
+    parser.add_argument("--provider", default="anthropic", help="요청에 없을 때 쓸 제공자 (기본값: anthropic)")
+    parser.add_argument("--model", default=None, help="요청에 없을 때 쓸 모델")
+    parser.add_argument("--max-tokens", type=int, default=10000)
+    parser.add_argument("--job-timeout", type=float, default=None, help="작업별 시간 제한(초)")
+    parser.add_argument("--workers", type=int, default=1, help="프로세스 수 (기본값: 1). 프로세스마다 --concurrency 개씩 동시 실행")
+    parser.add_argument("--cache", default=None, help="워커들이 공유할 캐시 DB (기본값: .cache/shared_cache.sqlite)")
+    parser.add_argument("--rpm", type=float, default=None, help="provider별 분당 요청 수 제한 (모든 워커 합산)")
+    parser.add_argument("--tpm", type=float, default=None, help="provider별 분당 입력 토큰 제한 (모든 워커 합산, 추정치)")
+    parser.add_argument("--priority", default=None, help="요청에 없을 때 쓸 스케줄링 클래스 (기본값: batch, GUI는 interactive)")
+    parser.add_argument("--compress", nargs="?", type=int, const=DEFAULT_COMPRESS_TOKENS, default=None, metavar="TOKENS", help=f"요청에 없을 때 첨부자료를 문서당 TOKENS 토큰 이내로 요약 (기본값: {DEFAULT_COMPRESS_TOKENS})")
+    parser.add_argument("--style-mode", choices=STYLE_MODES, default="llm", help="요청에 없을 때 쓸 Step 1 문체 분석 방식 (기본값: llm)")
+    parser.add_argument("--sections", nargs="?", type=int, const=0, default=None, metavar="N", help="요청에 없을 때 긴 글을 개요 + 섹션 N개 동시 작성 (N 생략 시 글자수로 결정)")
+    parser.add_argument("--reuse", action="store_true", help="이전 실행의 초안을 섹션 단위로 재사용해 가이드가 바뀐 섹션만 새로 작성 (--cache DB 사용)")
+    parser.add_argument("--dry-run", action="store_true", help="API 호출 없이 토큰/비용/소요 시간/컨텍스트 초과만 추정")
+    parser.add_argument("--log-file", default=None, help="작업별 맥락과 레벨이 붙은 JSONL 로그 (크기별 교체, 워커마다 파일 하나, 기본값: NB_LOG_FILE)")
+    parser.add_argument("--log-level", default=None, help="이 레벨 이상만 기록 (DEBUG/INFO/WARNING, 기본값: NB_LOG_LEVEL 또는 DEBUG)")
+    args = parser.parse_args()
+
+    load_env()
+    if args.log_file or args.log_level:
+        configure_logs(level=args.log_level, jsonl_path=args.log_file)
+    defaults = {
+        "provider": args.provider, "model": args.model, "max_tokens": args.max_tokens, "compress_tokens": args.compress,
+        "style_mode": args.style_mode, "sections": args.sections, "priority": args.priority,
+    }
+    requests = load_requests(args.requests)
+    if args.dry_run:
+        from .planner import format_plan, plan_batch
+        jobs, invalid = [], []
+        for index, req in enumerate(requests):
+            try:
+                jobs.append((request_id(req, index), job_from_request(req, index, defaults)))
+            except ValueError as e:
+                invalid.append((request_id(req, index), str(e)))
+        summary = plan_batch(jobs, concurrency=args.concurrency * max(1, args.workers), invalid=invalid)
+        for line in format_plan(summary):
+            print(line)
+        return
+    if args.workers > 1:
+        from .worker_pool import format_report, run_parallel
+        summary = run_parallel(
+            requests, workers=args.workers, out_dir=args.out_dir, archive_path=args.archive,
+            concurrency=args.concurrency, defaults=defaults, job_timeout=args.job_timeout,
+            cache_path=args.cache, rpm=args.rpm, tpm=args.tpm, reuse=args.reuse,
+            log_file=args.log_file, log_level=args.log_level,
+        )
+        flush_logs()
+        for line in format_report(summary):
+            print(line)
+    else:
+        if args.rpm or args.tpm:
+            from .providers.ratelimit import RateLimiter, set_rate_limit
+            from .providers.registry import provider_names
+            for name in provider_names():
+                set_rate_limit(name, RateLimiter(name, rpm=args.rpm, tpm=args.tpm))
+        style_cache = draft_cache = None
+        if args.reuse:
+            from .util.disk_cache import DiskCache
+            disk = DiskCache(args.cache)
+            style_cache, draft_cache = StyleCache(disk=disk), DraftCache(disk)
+        summary = run_batch(
+            requests, out_dir=args.out_dir, archive_path=args.archive,
+            concurrency=args.concurrency, defaults=defaults, job_timeout=args.job_timeout,
+            style_cache=style_cache, draft_cache=draft_cache,
+        )
+        flush_logs()
+    usage = summary["usage"]
+    print(
+        f"[배치] 완료 {summary['done']}/{summary['total']}, 실패 {len(summary['failed'])}, "
+        f"{summary['elapsed']:.1f}초, 토큰 입력 {usage.get('input_tokens', 0):,} / 출력 {usage.get('output_tokens', 0):,}"
+        + (f", 동시 중복 요청 합침 {summary['coalesced']}건" if summary.get("coalesced") else "")
+    )
+    if args.rpm or args.tpm:
+        from .providers.ratelimit import format_waits, queue_waits
+        for line in format_waits(queue_waits()):
+            print(line)
+    for rid, status, error in summary["failed"]:
+        print(f"  - {rid}: {status} {error or ''}")
+    if summary["failed"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""Model comparison: the same jobs through ``run()`` on several models.
+
+Each ``--model`` is ``provider:model``, or ``step1/step2`` to pick the
+Step 1 (style analysis) and Step 2 (draft) models separately. Every job of
+the requests file (batch format, see src.batch) runs once per model, one
+run at a time so latencies don't include waiting on each other. The
+models take turns per job: the order rotates by one each job, so the
+first run of a job (cold attachment, extract and reference caches) and a
+slow period of the API don't always land on the same model. Per model the
+table shows:
+
+- time to first token and output tokens/sec of the streamed calls
+- end-to-end seconds per job (both steps, attachments included)
+- cost from the token usage (planner prices)
+- keyword hit rate: drafts with the keyword at least ``keyword_repeat`` times
+- length accuracy: 1 - |characters - word_count| / word_count (jobs with a word_count)
+
+Calls go through a Tape (providers.tape). ``--record`` keeps every call
+and run in a new JSONL file (gzip when it ends in ``.gz``), and ``--replay``
+answers from that file without network access or API keys, so the table
+can be recomputed (e.g. after changing a quality check) offline.
+
+    python -m src.compare requests.jsonl -m anthropic:claude-sonnet-4-5 -m anthropic:claude-haiku-4-5 -m openai:gpt-4o-mini --word-count 1500 --record tape.jsonl.gz
+    python -m src.compare requests.jsonl -m anthropic:claude-haiku-4-5/anthropic:claude-sonnet-4-5 -m anthropic:claude-sonnet-4-5 --limit 5
+    python -m src.compare requests.jsonl -m ... --replay tape.jsonl.gz
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import unicodedata
+from typing import Any, Callable, Dict, List, Optional
+
+if not __package__:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import src  # noqa: F401
+    __package__ = "src"
+
+from .batch import job_from_request, load_requests, request_id
+from .jobs import DONE, FAILED, Job
+from .main import run
+from .planner import model_price
+from .providers.tape import RECORD, REPLAY, Tape, use_tape
+from .util.cancel import CancelToken
+from .util.env_util import load_env
+from .util.logs import emit, flush as flush_logs, get_log
+from .util.output_writer import ResultArchive, read_archive
+
+
+def parse_combo(spec: str, default_provider: str = "anthropic") -> Dict[str, Any]:
+    """``"anthropic:claude-haiku-4-5/openai:gpt-4o-mini"`` -> Job model fields (Step 1 / Step 2)."""
+
+    def one(part: str) -> List[str]:
+        provider, sep, model = part.strip().partition(":")
+        if not sep:
+            provider, model = default_provider, provider
+        if not provider or not model:
+            raise ValueError(f"모델 지정 형식은 provider:model 입니다: {spec}")
+        return [provider, model]
+
+    parts = spec.split("/")
+    if len(parts) > 2:
+        raise ValueError(f"모델은 최대 두 개(Step 1/Step 2)까지 지정할 수 있습니다: {spec}")
+    provider, model = one(parts[-1])
+    step1 = one(parts[0]) if len(parts) == 2 else [None, None]
+    return {"label": spec, "provider": provider, "model": model, "step1_provider": step1[0], "step1_model": step1[1]}
+
+
+def keyword_hits(draft: str, keyword: str) -> int:
+    return draft.count(keyword) if keyword else 0
+
+
+def length_accuracy(draft: str, word_count: Optional[int]) -> Optional[float]:
+    """1.0 on target; the prompt asks for ``word_count`` characters including spaces."""
+    if not word_count:
+        return None
+    return max(0.0, 1.0 - abs(len(draft) - word_count) / word_count)
+
+
+def call_cost(call: Dict[str, Any]) -> Optional[float]:
+    price = model_price(call["provider"], call["model"])
+    if price is None:
+        return None
+    usage = call.get("usage") or {}
+    return (usage.get("input_tokens", 0) * price[0] + usage.get("output_tokens", 0) * price[1]) / 1_000_000
+
+
+def run_job(job: Job, log: Callable[[str], None]) -> str:
+    cancel = CancelToken()
+    if job.timeout:
+        cancel.set_deadline(job.timeout)
+    return run(
+        provider=job.provider,
+        model=job.model,
+        step1_provider=job.step1_provider,
+        step1_model=job.step1_model,
+        keyword=job.keyword,
+        keyword_repeat=job.keyword_repeat,
+        input_dir=job.input_dir,
+        files=job.files,
+        out_path=None,
+        language=job.language,
+        max_tokens=job.max_tokens,
+        temperature=job.temperature,
+        log_callback=log,
+        writing_guide=job.writing_guide,
+        ref_dir=job.ref_dir,
+        ref_top_k=job.ref_top_k,
+        word_count=job.word_count,
+        cancel=cancel,
+        usage=job.usage,
+        compress_tokens=job.compress_tokens,
+        style_mode=job.style_mode,
+        sections=job.sections,
+    )
+
+
+def _replay_keys(providers: List[str]) -> None:
+    """Replayed calls never reach the API, but clients still want a key to be constructed."""
+    from .providers.registry import provider_class
+    for name in providers:
+        cls = provider_class(name)
+        if cls.api_key_required and cls.api_key_env and not os.getenv(cls.api_key_env):
+            os.environ[cls.api_key_env] = "replay"
+
+
+def compare(
+    requests: List[Dict[str, Any]],
+    combos: List[Dict[str, Any]],
+    defaults: Optional[Dict[str, Any]] = None,
+    record_path: Optional[str] = None,
+    replay_path: Optional[str] = None,
+    log: Callable[[str], None] = emit,
+) -> Dict[str, Any]:
+    """Run every request on every combo (see module docstring); returns the runs and one row per combo."""
+    if record_path and replay_path:
+        raise ValueError("--record 와 --replay 는 함께 쓸 수 없습니다")
+    recorded_runs: Dict[tuple, float] = {}
+    archive = None
+    if replay_path:
+        calls = []
+        for record in read_archive(replay_path):
+            if record.get("kind") == "call":
+                calls.append(record)
+            elif record.get("kind") == "run":
+                recorded_runs[(record["combo"], record["request_id"])] = record["seconds"]
+        tape = Tape(REPLAY, calls)
+        _replay_keys(sorted({c[k] for c in combos for k in ("provider", "step1_provider") if c[k]}))
+        log(f"[비교] 녹화 재생: 호출 {len(tape)}건 ({replay_path})")
+    else:
+        if record_path:
+            if os.path.exists(record_path):
+                # Two recordings in one file would replay the older one's answers
+                raise ValueError(f"녹화 파일이 이미 있습니다: {record_path} (새 파일 이름을 쓰세요)")
+            archive = ResultArchive(record_path)
+        tape = Tape(RECORD, sink=(lambda entry: archive.add(dict(entry, kind="call"))) if archive else None)
+
+    runs: List[Dict[str, Any]] = []
+    total = len(requests) * len(combos)
+    try:
+        with use_tape(tape):
+            for index, req in enumerate(requests):
+                rid = request_id(req, index)
+                turn = index % len(combos)
+                for combo in combos[turn:] + combos[:turn]:
+                    job = job_from_request(req, index, defaults)
+                    for field in ("provider", "model", "step1_provider", "step1_model"):
+                        setattr(job, field, combo[field])
+                    first = len(tape.calls)
+                    t0 = time.monotonic()
+                    result: Dict[str, Any] = {"combo": combo["label"], "request_id": rid, "status": DONE, "error": None}
+                    try:
+                        draft = run_job(job, get_log(job=rid, model=combo["label"]))
+                    except Exception as e:
+                        draft = ""
+                        result.update(status=FAILED, error=f"{type(e).__name__}: {e}")
+                    seconds = time.monotonic() - t0
+                    calls = tape.calls[first:]
+                    if replay_path:
+                        seconds = recorded_runs.get((combo["label"], rid), sum(c["seconds"] for c in calls))
+                    elif archive is not None:
+                        archive.add({"kind": "run", "combo": combo["label"], "request_id": rid, "seconds": round(seconds, 4)})
+                    result.update(
+                        seconds=seconds, calls=calls, chars=len(draft), keyword_hits=keyword_hits(draft, job.keyword),
+                        keyword_repeat=job.keyword_repeat, word_count=job.word_count,
+                        length_accuracy=length_accuracy(draft, job.word_count) if draft else None,
+                    )
+                    runs.append(result)
+                    log(
+                        f"[비교] {len(runs)}/{total} {rid} @ {combo['label']}: {result['status']} {seconds:.1f}초"
+                        + (f" ({result['error']})" if result["error"] else "")
+                    )
+    finally:
+        if archive is not None:
+            archive.close()
+    return {"runs": runs, "rows": [summarize(combo["label"], [r for r in runs if r["combo"] == combo["label"]]) for combo in combos]}
+
+
+def _mean(values: List[float]) -> Optional[float]:
+    return sum(values) / len(values) if values else None
+
+
+def summarize(label: str, runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """One table row from a combo's runs."""
+    done = [r for r in runs if r["status"] == DONE]
+    calls = [c for r in runs for c in r["calls"] if not c.get("error")]
+    output_tokens = sum((c.get("usage") or {}).get("output_tokens", 0) for c in calls)
+    generating = sum(max(c["seconds"] - c["ttft"], 0.0) for c in calls)
+    costs = [call_cost(c) for r in runs for c in r["calls"]]
+    accuracies = [r["length_accuracy"] for r in done if r["length_accuracy"] is not None]
+    return {
+        "model": label,
+        "runs": len(runs),
+        "failed": len(runs) - len(done),
+        "calls": len(calls),
+        "ttft": _mean([c["ttft"] for c in calls]),
+        "tokens_per_sec": output_tokens / generating if generating > 0 else None,
+        "seconds": _mean([r["seconds"] for r in done]),
+        "cost": sum(c for c in costs if c is not None),
+        "unpriced": any(c is None for c in costs),
+        "keyword_hit_rate": _mean([float(r["keyword_hits"] >= r["keyword_repeat"]) for r in done]),
+        "length_accuracy": _mean(accuracies),
+    }
+
+
+def _width(text: str) -> int:
+    return sum(2 if unicodedata.east_asian_width(ch) in "WF" else 1 for ch in text)
+
+
+def _pad(text: str, width: int, left: bool = False) -> str:
+    space = " " * (width - _width(text))
+    return text + space if left else space + text
+
+
+def format_table(summary: Dict[str, Any]) -> List[str]:
+    """Korean comparison table of a ``compare`` summary, one line per model."""
+
+    def num(value: Optional[float], fmt: str) -> str:
+        return "-" if value is None else format(value, fmt)
+
+    def pct(value: Optional[float]) -> str:
+        return "-" if value is None else f"{value * 100:.0f}%"
+
+    header = ["모델", "작업", "실패", "첫 토큰(초)", "토큰/초", "전체(초)", "비용($)", "키워드 적중", "길이 정확도"]
+    table = [header]
+    for row in summary["rows"]:
+        table.append([
+            row["model"], str(row["runs"]), str(row["failed"]), num(row["ttft"], ".2f"), num(row["tokens_per_sec"], ".1f"),
+            num(row["seconds"], ".1f"), f"{row['cost']:.4f}" + ("*" if row["unpriced"] else ""),
+            pct(row["keyword_hit_rate"]), pct(row["length_accuracy"]),
+        ])
+    widths = [max(_width(line[i]) for line in table) for i in range(len(header))]
+    lines = ["  ".join(_pad(cell, widths[i], left=i == 0) for i, cell in enumerate(line)) for line in table]
+    lines.insert(1, "-" * _width(lines[0]))
+    if any(row["unpriced"] for row in summary["rows"]):
+        lines.append("* 가격 정보 없는 모델의 호출은 비용에서 제외")
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="같은 요청들을 여러 모델로 실행해 속도/비용/품질 비교")
+    parser.add_argument("requests", help="요청 JSONL (배치와 같은 형식)")
+    parser.add_argument("--model", "-m", action="append", required=True, metavar="PROVIDER:MODEL", help="비교할 모델 (반복). Step 1/Step 2를 나누려면 provider:model/provider:model")
+    parser.add_argument("--provider", default="anthropic", help="provider를 생략한 --model 의 제공자 (기본값: anthropic)")
+    parser.add_argument("--limit", type=int, default=None, help="앞에서부터 이 건수만 실행")
+    parser.add_argument("--word-count", type=int, default=None, help="요청에 없을 때 쓸 목표 글자수 (길이 정확도 계산에 필요)")
+    parser.add_argument("--max-tokens", type=int, default=10000)
+    parser.add_argument("--job-timeout", type=float, default=None, help="작업별 시간 제한(초)")
+    tape = parser.add_mutually_exclusive_group()
+    tape.add_argument("--record", default=None, metavar="TAPE", help="모든 호출과 결과를 녹화할 JSONL 파일 (.gz면 압축)")
+    tape.add_argument("--replay", default=None, metavar="TAPE", help="녹화 파일로 네트워크 없이 다시 계산")
+    parser.add_argument("--json", default=None, help="실행별 결과와 표를 저장할 JSON 파일")
+    args = parser.parse_args()
+
+    load_env()
+    try:
+        combos = [parse_combo(spec, args.provider) for spec in args.model]
+    except ValueError as e:
+        raise SystemExit(str(e))
+    requests = load_requests(args.requests)[: args.limit]
+    defaults = {"max_tokens": args.max_tokens, "word_count": args.word_count, "timeout": args.job_timeout}
+    try:
+        summary = compare(requests, combos, defaults={k: v for k, v in defaults.items() if v is not None},
+                          record_path=args.record, replay_path=args.replay)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    flush_logs()
+    for line in format_table(summary):
+        print(line)
+    if args.json:
+        for r in summary["runs"]:
+            r["calls"] = [{k: v for k, v in c.items() if k != "text"} for c in r["calls"]]
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,39 @@
 import os
+import queue
 import threading
+import time
+import traceback
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-from typing import List, Set
+from typing import Any, Callable, List, Optional, Set
 
-from dotenv import load_dotenv
-
-# Support both `python -m src.gui` and double-click/`python src/gui.py`
-try:
-    from .main import run as cli_run
-    from .util.env_util import load_env
-except ImportError:
+# Support double-click/`python src/gui.py` as well as `python -m src.gui`
+if not __package__:
     import sys
-    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    from src.main import run as cli_run
-    from src.util.env_util import load_env
-
-
-def walk_files(dirs: List[str]) -> List[str]:
-    files: List[str] = []
-    for d in dirs:
-        for root, _, names in os.walk(d):
-            for n in names:
-                files.append(os.path.join(root, n))
-    return files
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import src  # noqa: F401
+    __package__ = "src"
+
+from .main import DEFAULT_COMPRESS_TOKENS, run as cli_run
+from .jobs import Job, JobQueue, PENDING, RUNNING
+from .providers.health import MONITOR
+from .providers.ratelimit import INTERACTIVE, attach_shared_limits, format_waits, queue_waits, set_default_class
+from .util.env_util import load_env
+from .util.file_loader import walk_files
+from .util.logs import RingBufferHandler, configure as configure_logs, emit
+
+
+# Worker threads never touch widgets; they post callables that the Tk main
+# thread drains every UI_POLL_MS milliseconds.
+UI_POLL_MS = 50
+UI_POLL_BUDGET_S = 0.03
+LISTBOX_BATCH = 500
+# The log widget keeps this many lines; new lines are inserted once per poll
+LOG_VIEW_LINES = 5000
+# The status label only reads the health monitor's cache
+HEALTH_REFRESH_MS = 2000
+# Step 1 style_mode choices (main.STYLE_MODES) as shown in the form
+STYLE_MODE_LABELS = {"llm": "LLM 분석", "profile": "통계 프로필 + LLM", "local": "로컬 분석 (Step 1 생략)"}
 
 
 class BlogDraftGUI(tk.Tk):
@@ -36,9 +46,28 @@ class BlogDraftGUI(tk.Tk):
         # Load .env from project root and CWD (diagnostic-aware)
         info = load_env(verbose=False)
         self.loaded_env_info = info
+        # Requests from this window go ahead of batch work queued on the same rate limits
+        set_default_class(INTERACTIVE)
+        # Log lines from any thread land in a ring buffer that the UI poll drains
+        self._log_view = configure_logs(console=False).add_view(RingBufferHandler(LOG_VIEW_LINES))
 
         self.selected_files: List[str] = []
+        self._selected_set: Set[str] = set()
+        self._ui_queue: "queue.Queue[tuple[Callable[..., Any], tuple]]" = queue.Queue()
+        self._scan_thread: Optional[threading.Thread] = None
+        self._scan_added = 0
+        self.job_queue: Optional[JobQueue] = None
+        self._queue_window: Optional["JobQueueWindow"] = None
+        self._scan_cancel = threading.Event()
         self._build_widgets()
+        self.after(UI_POLL_MS, self._poll_ui_queue)
+
+        # Keep the provider connection warm; probes run on the monitor's thread
+        self.health = MONITOR
+        if self.health.providers is None:
+            self.health.providers = [self.PROVIDER]
+        self.health.start()
+        self.after(HEALTH_REFRESH_MS, self._refresh_health)
 
     # UI
     def _build_widgets(self) -> None:
@@ -84,10 +113,36 @@ class BlogDraftGUI(tk.Tk):
         ttk.Button(btns, text="환경 점검", command=self.check_env).pack(side=tk.LEFT, padx=(12, 0))
         ttk.Button(btns, text="연결 테스트", command=self.ping_provider).pack(side=tk.LEFT, padx=(6, 0))
         ttk.Button(btns, text="짧은 생성 테스트", command=self.quick_chat_test).pack(side=tk.LEFT, padx=(6, 0))
+        self.health_var = tk.StringVar(value="연결 상태: 확인 중...")
+        ttk.Label(btns, textvariable=self.health_var).pack(side=tk.LEFT, padx=(12, 0))
+
+        scan_fr = ttk.Frame(attach_fr)
+        scan_fr.pack(fill=tk.X, padx=6, pady=(0, 2))
+        self.scan_progress = ttk.Progressbar(scan_fr, mode="indeterminate", length=200)
+        self.scan_progress.pack(side=tk.LEFT)
+        self.scan_cancel_btn = ttk.Button(scan_fr, text="스캔 취소", command=self.cancel_scan, state=tk.DISABLED)
+        self.scan_cancel_btn.pack(side=tk.LEFT, padx=(6, 0))
+        self.scan_var = tk.StringVar(value="")
+        ttk.Label(scan_fr, textvariable=self.scan_var).pack(side=tk.LEFT, padx=(8, 0))
 
         self.listbox = tk.Listbox(attach_fr, selectmode=tk.EXTENDED)
         self.listbox.pack(fill=tk.BOTH, expand=True, padx=6, pady=(0, 6))
 
+        # Reference library (auto-selected attachments)
+        ref_fr = ttk.Frame(self)
+        ref_fr.pack(fill=tk.X, padx=10, pady=(6, 0))
+        ttk.Label(ref_fr, text="참고 라이브러리").pack(side=tk.LEFT)
+        self.ref_dir = ttk.Entry(ref_fr)
+        self.ref_dir.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(8, 6))
+        ttk.Button(ref_fr, text="찾아보기", command=self.choose_ref_dir).pack(side=tk.LEFT)
+        ttk.Label(ref_fr, text="자동 첨부 개수").pack(side=tk.LEFT, padx=(12, 6))
+        self.ref_top_k = ttk.Entry(ref_fr, width=6)
+        self.ref_top_k.insert(0, "5")
+        self.ref_top_k.pack(side=tk.LEFT)
+        self.watch_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(ref_fr, text="폴더 감시", variable=self.watch_var).pack(side=tk.LEFT, padx=(12, 0))
+        self._watch = None
+
         # Output Path
         out_fr = ttk.Frame(self)
         out_fr.pack(fill=tk.X, padx=10, pady=6)
@@ -103,6 +158,22 @@ class BlogDraftGUI(tk.Tk):
         self.status_var = tk.StringVar(value="API 키는 환경변수 또는 .env에 설정하세요.")
         ttk.Label(run_fr, textvariable=self.status_var).pack(side=tk.LEFT)
         ttk.Button(run_fr, text="생성 시작", command=self.start_generation).pack(side=tk.RIGHT)
+        ttk.Button(run_fr, text="작업 큐 보기", command=self.show_queue).pack(side=tk.RIGHT, padx=(0, 6))
+        ttk.Button(run_fr, text="큐에 추가", command=self.enqueue_job).pack(side=tk.RIGHT, padx=(0, 6))
+        self.profile_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(run_fr, text="프로파일링", variable=self.profile_var).pack(side=tk.RIGHT, padx=(0, 12))
+        self.compress_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(run_fr, text="첨부 요약", variable=self.compress_var).pack(side=tk.RIGHT, padx=(0, 6))
+        self.long_form_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(run_fr, text="장문 섹션 병렬", variable=self.long_form_var).pack(side=tk.RIGHT, padx=(0, 6))
+        self.reuse_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(run_fr, text="이전 초안 재사용", variable=self.reuse_var).pack(side=tk.RIGHT, padx=(0, 6))
+        self._draft_cache = None
+        self.style_mode_var = tk.StringVar(value=STYLE_MODE_LABELS["llm"])
+        ttk.Combobox(
+            run_fr, textvariable=self.style_mode_var, values=list(STYLE_MODE_LABELS.values()), state="readonly", width=20
+        ).pack(side=tk.RIGHT, padx=(0, 6))
+        ttk.Label(run_fr, text="문체 분석").pack(side=tk.RIGHT, padx=(0, 4))
 
         # Log
         log_fr = ttk.LabelFrame(self, text="로그")
@@ -118,25 +189,103 @@ class BlogDraftGUI(tk.Tk):
         self._add_unique(paths)
 
     def add_folder(self) -> None:
+        if self._scan_thread is not None and self._scan_thread.is_alive():
+            messagebox.showinfo("폴더 추가", "이전 폴더를 스캔하는 중입니다. 완료되거나 취소한 뒤 다시 시도하세요.")
+            return
         d = filedialog.askdirectory(title="첨부할 폴더 선택")
         if not d:
             return
-        files = walk_files([d])
-        self._add_unique(files)
+
+        cancel = threading.Event()
+        self._scan_cancel = cancel
+        self.scan_cancel_btn.configure(state=tk.NORMAL)
+        self.scan_progress.configure(mode="indeterminate", value=0)
+        self.scan_progress.start(15)
+        self.scan_var.set("스캔 중…")
+        self._log(f"[폴더 추가] 스캔 시작: {d}")
+
+        last_post = [0.0]
+
+        def on_progress(count: int) -> None:
+            now = time.perf_counter()
+            if now - last_post[0] >= 0.1:
+                last_post[0] = now
+                self._post(self.scan_var.set, f"스캔 중… {count:,}개 발견")
+
+        def task() -> None:
+            t0 = time.perf_counter()
+            try:
+                paths = walk_files([d], workers=4, cancel=cancel, progress=on_progress)
+                self._post(self._scan_listed, len(paths))
+                for start in range(0, len(paths), LISTBOX_BATCH):
+                    if cancel.is_set():
+                        break
+                    self._post(self._append_files, paths[start:start + LISTBOX_BATCH])
+                self._post(self._scan_finished, d, cancel.is_set(), time.perf_counter() - t0)
+            except Exception as e:
+                self._post(self._log, f"[폴더 추가] 실패: {e}")
+                self._post(self._scan_finished, d, True, time.perf_counter() - t0)
+
+        self._scan_thread = threading.Thread(target=task, daemon=True)
+        self._scan_thread.start()
+
+    def cancel_scan(self) -> None:
+        self._scan_cancel.set()
+        self.scan_var.set("취소하는 중…")
+
+    def _scan_listed(self, total: int) -> None:
+        self.scan_progress.stop()
+        self.scan_progress.configure(mode="determinate", maximum=max(total, 1), value=0)
+        self.scan_var.set(f"목록 추가 중… 0/{total:,}")
+
+    def _append_files(self, batch: List[str]) -> None:
+        """Insert one batch of already-validated file paths (main thread)."""
+        if self._scan_cancel.is_set():
+            return
+        new_paths = [p for p in batch if p not in self._selected_set]
+        self._selected_set.update(new_paths)
+        self.selected_files.extend(new_paths)
+        if new_paths:
+            self.listbox.insert(tk.END, *new_paths)
+        done = float(self.scan_progress["value"]) + len(batch)
+        self.scan_progress.configure(value=done)
+        self.scan_var.set(f"목록 추가 중… {int(done):,}/{int(float(self.scan_progress['maximum'])):,}")
+        self._scan_added += len(new_paths)
+
+    def _scan_finished(self, d: str, cancelled: bool, elapsed: float) -> None:
+        self.scan_progress.stop()
+        self.scan_progress.configure(mode="determinate", value=0)
+        self.scan_cancel_btn.configure(state=tk.DISABLED)
+        added = self._scan_added
+        self._scan_added = 0
+        state = "취소됨" if cancelled else "완료"
+        self.scan_var.set(f"{state}: {added:,}개 추가 ({elapsed:.1f}s)")
+        self._log(f"[폴더 추가] {state}: {d} → 추가된 파일 {added:,}개 ({elapsed:.2f}s)")
 
     def remove_selected(self) -> None:
         sel = list(self.listbox.curselection())
-        sel.sort(reverse=True)
-        for idx in sel:
-            path = self.listbox.get(idx)
-            try:
-                self.selected_files.remove(path)
-            except ValueError:
-                pass
-            self.listbox.delete(idx)
+        if not sel:
+            return
+        for start, end in self._index_ranges(sel):
+            self.listbox.delete(start, end)
+        self.selected_files = list(self.listbox.get(0, tk.END))
+        self._selected_set = set(self.selected_files)
+
+    @staticmethod
+    def _index_ranges(indices: List[int]) -> List[tuple[int, int]]:
+        """Contiguous (start, end) runs, last run first so deletes don't shift."""
+        runs: List[tuple[int, int]] = []
+        for idx in sorted(indices):
+            if runs and idx == runs[-1][1] + 1:
+                runs[-1] = (runs[-1][0], idx)
+            else:
+                runs.append((idx, idx))
+        return runs[::-1]
 
     def clear_all(self) -> None:
+        self._scan_cancel.set()
         self.selected_files.clear()
+        self._selected_set.clear()
         self.listbox.delete(0, tk.END)
 
     def choose_output(self) -> None:
@@ -146,20 +295,55 @@ class BlogDraftGUI(tk.Tk):
             self.out_path.delete(0, tk.END)
             self.out_path.insert(0, path)
 
+    def choose_ref_dir(self) -> None:
+        d = filedialog.askdirectory(title="참고 라이브러리 폴더 선택")
+        if d:
+            self.ref_dir.delete(0, tk.END)
+            self.ref_dir.insert(0, d)
+
     def _add_unique(self, paths: List[str]) -> None:
-        seen: Set[str] = set(self.selected_files)
-        added = 0
+        new_paths: List[str] = []
         for p in paths:
             ap = os.path.abspath(p)
-            if os.path.isfile(ap) and ap not in seen:
-                self.selected_files.append(ap)
-                self.listbox.insert(tk.END, ap)
-                seen.add(ap)
-                added += 1
-        self._log(f"추가된 파일: {added}개")
+            if ap not in self._selected_set and os.path.isfile(ap):
+                new_paths.append(ap)
+                self._selected_set.add(ap)
+        self.selected_files.extend(new_paths)
+        if new_paths:
+            self.listbox.insert(tk.END, *new_paths)
+        self._log(f"추가된 파일: {len(new_paths)}개")
+
+    # Thread-safe UI plumbing
+    def _post(self, fn: Callable[..., Any], *args: Any) -> None:
+        """Schedule ``fn(*args)`` on the Tk main thread. Safe from any thread."""
+        self._ui_queue.put((fn, args))
+
+    def _poll_ui_queue(self) -> None:
+        deadline = time.perf_counter() + UI_POLL_BUDGET_S
+        try:
+            while time.perf_counter() < deadline:
+                fn, args = self._ui_queue.get_nowait()
+                try:
+                    fn(*args)
+                except Exception:
+                    traceback.print_exc()
+        except queue.Empty:
+            pass
+        self._flush_log_view()
+        self.after(UI_POLL_MS, self._poll_ui_queue)
 
     def _log(self, msg: str) -> None:
-        self.log.insert(tk.END, msg + "\n")
+        """Thread-safe: goes through util.logs to the ring buffer (and the JSONL file if set)."""
+        emit(msg)
+
+    def _flush_log_view(self) -> None:
+        lines = self._log_view.drain()
+        if not lines:
+            return
+        self.log.insert(tk.END, "\n".join(lines) + "\n")
+        excess = int(self.log.index("end-1c").split(".")[0]) - 1 - LOG_VIEW_LINES
+        if excess > 0:
+            self.log.delete("1.0", f"{excess + 1}.0")
         self.log.see(tk.END)
 
     def check_env(self) -> None:
@@ -178,33 +362,103 @@ class BlogDraftGUI(tk.Tk):
         self._log("[환경] OPENAI_BASE_URL: " + info.get("OPENAI_BASE_URL", ""))
         self._log("[환경] ANTHROPIC_BASE_URL: " + info.get("ANTHROPIC_BASE_URL", ""))
 
-    def start_generation(self) -> None:
-        # Fixed settings
-        provider = "anthropic"
-        model = "claude-sonnet-4-5"
-        lang = "ko"
-        max_tokens = 10000
-        temperature = 0.9
-
-        # User inputs
-        keyword = self.keyword.get().strip()
-        word_count = self._safe_int(self.word_count.get(), 1000)
-        keyword_repeat = self._safe_int(self.keyword_repeat.get(), 5)
-        out_path = self.out_path.get().strip()
-        writing_guide = self.writing_guide_text.get("1.0", tk.END).strip()
+    # Fixed settings
+    PROVIDER = "anthropic"
+    MODEL = "claude-sonnet-4-5"
+    LANG = "ko"
+    MAX_TOKENS = 10000
+    TEMPERATURE = 0.9
+
+    def _form_inputs(self) -> Optional[dict]:
+        """Validated form values (main thread), or None after warning the user."""
+        inputs = {
+            "keyword": self.keyword.get().strip(),
+            "word_count": self._safe_int(self.word_count.get(), 1000),
+            "keyword_repeat": self._safe_int(self.keyword_repeat.get(), 5),
+            "out_path": self.out_path.get().strip(),
+            "writing_guide": self.writing_guide_text.get("1.0", tk.END).strip(),
+            "ref_dir": self.ref_dir.get().strip() or None,
+            "ref_top_k": self._safe_int(self.ref_top_k.get(), 5),
+            # Snapshot widget-owned state on the main thread
+            "files": list(self.selected_files),
+            "compress_tokens": DEFAULT_COMPRESS_TOKENS if self.compress_var.get() else None,
+            # 0: section count from the target length
+            "sections": 0 if self.long_form_var.get() else None,
+            "style_mode": next(m for m, label in STYLE_MODE_LABELS.items() if label == self.style_mode_var.get()),
+        }
 
         # Validation
-        if not writing_guide:
+        if not inputs["writing_guide"]:
             messagebox.showwarning("입력 필요", "주제 및 가이드를 입력해주세요.")
-            return
+            return None
 
-        if not keyword:
+        if not inputs["keyword"]:
             messagebox.showwarning("입력 필요", "키워드를 입력해주세요.")
-            return
+            return None
 
-        if not out_path:
+        if not inputs["out_path"]:
             messagebox.showwarning("출력 경로", "출력 파일 경로를 지정해주세요.")
+            return None
+        return inputs
+
+    def enqueue_job(self) -> None:
+        inputs = self._form_inputs()
+        if inputs is None:
+            return
+        attach_shared_limits()
+        job = self._ensure_queue().submit(Job(
+            provider=self.PROVIDER,
+            model=self.MODEL,
+            language=self.LANG,
+            max_tokens=self.MAX_TOKENS,
+            temperature=self.TEMPERATURE,
+            **inputs,
+        ))
+        self._log(f"[작업 큐] #{job.id} 추가: {job.keyword} → {job.out_path}")
+        self.show_queue()
+
+    def _on_job_event(self, job: "Job", event: str) -> None:
+        # Called from worker threads; _log is thread-safe
+        if event == "finished":
+            detail = f" ({job.error})" if job.error else ""
+            self._log(f"[작업 큐] #{job.id} {job.status}: {job.out_path} {job.elapsed:.1f}s{detail}")
+
+    def _ensure_queue(self) -> "JobQueue":
+        if self.job_queue is None:
+            self.job_queue = JobQueue(concurrency=2)
+            self.job_queue.add_listener(self._on_job_event)
+        return self.job_queue
+
+    def show_queue(self) -> None:
+        if self._queue_window is None or not self._queue_window.winfo_exists():
+            self._queue_window = JobQueueWindow(self, self._ensure_queue())
+        self._queue_window.deiconify()
+        self._queue_window.lift()
+
+    def start_generation(self) -> None:
+        provider = self.PROVIDER
+        model = self.MODEL
+        lang = self.LANG
+        max_tokens = self.MAX_TOKENS
+        temperature = self.TEMPERATURE
+
+        inputs = self._form_inputs()
+        if inputs is None:
             return
+        keyword = inputs["keyword"]
+        word_count = inputs["word_count"]
+        keyword_repeat = inputs["keyword_repeat"]
+        out_path = inputs["out_path"]
+        writing_guide = inputs["writing_guide"]
+        ref_dir = inputs["ref_dir"]
+        ref_top_k = inputs["ref_top_k"]
+        files = inputs["files"]
+        compress_tokens = inputs["compress_tokens"]
+        style_mode = inputs["style_mode"]
+        sections = inputs["sections"]
+        profile = self.profile_var.get()
+        draft_cache = self._get_draft_cache() if self.reuse_var.get() else None
+        watch_refs = self.watch_var.get()
 
         self.status_var.set("생성 중… 잠시만 기다려주세요")
         btn_state = {}
@@ -217,8 +471,6 @@ class BlogDraftGUI(tk.Tk):
                 pass
 
         def task():
-            import time
-            import traceback
             t0 = time.perf_counter()
 
             try:
@@ -229,50 +481,106 @@ class BlogDraftGUI(tk.Tk):
                 self._log(f"주제 및 가이드: {writing_guide[:100]}..." if len(writing_guide) > 100 else f"주제 및 가이드: {writing_guide}")
 
                 # Expand directories already to file list; pass via patterns to run (works for explicit paths)
-                files = list(self.selected_files)
                 self._log(f"모델: {model}, 언어: {lang}, 첨부파일: {len(files)}개")
 
-                # 첨부 파일 목록 상세 출력
-                for i, f in enumerate(files, 1):
+                # 첨부 파일 목록 상세 출력 (많으면 앞부분만)
+                for i, f in enumerate(files[:20], 1):
                     self._log(f"  파일 {i}: {f}")
+                if len(files) > 20:
+                    self._log(f"  … 외 {len(files) - 20:,}개")
 
                 # Convert empty model string to None
                 final_model = model if model else None
 
-                cli_run(
-                    provider=provider,
-                    model=final_model,
-                    keyword=keyword,
-                    keyword_repeat=keyword_repeat,
-                    input_dir=None,
-                    files=files,
-                    out_path=out_path,
-                    language=lang,
-                    max_tokens=max_tokens,
-                    temperature=temperature,
-                    debug=False,
-                    log_callback=self._log,  # GUI 로그로 직접 출력
-                    writing_guide=writing_guide,
-                )
+                if watch_refs and ref_dir:
+                    self._ensure_watch(ref_dir)
+
+                # A batch running on this host shares its rate limits; queue in the interactive class
+                shared_limits = attach_shared_limits()
+
+                profiler = None
+                if profile:
+                    from .util.profiling import Profiler
+                    profiler = Profiler().start()
+                try:
+                    cli_run(
+                        provider=provider,
+                        model=final_model,
+                        keyword=keyword,
+                        keyword_repeat=keyword_repeat,
+                        input_dir=None,
+                        files=files,
+                        out_path=out_path,
+                        language=lang,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        debug=False,
+                        log_callback=self._log,  # GUI 로그로 직접 출력
+                        writing_guide=writing_guide,
+                        word_count=word_count,
+                        ref_dir=ref_dir,
+                        ref_top_k=ref_top_k,
+                        profiler=profiler,
+                        compress_tokens=compress_tokens,
+                        style_mode=style_mode,
+                        sections=sections,
+                        draft_cache=draft_cache,
+                    )
+                finally:
+                    if profiler is not None:
+                        self._save_profile(profiler, out_path)
+                for line in format_waits(queue_waits()) if shared_limits else []:
+                    self._log(line)
                 t2 = time.perf_counter()
                 self._log(f"[완료] 총 소요 시간: {t2 - t0:.2f}s")
-                self.status_var.set("완료")
-                messagebox.showinfo("완료", f"생성 완료: {out_path}")
+                self._post(self.status_var.set, "완료")
+                self._post(messagebox.showinfo, "완료", f"생성 완료: {out_path}")
             except Exception as e:
                 self._log(f"오류 발생: {type(e).__name__}")
                 self._log(f"오류 메시지: {str(e)}")
                 self._log(f"상세 정보:\n{traceback.format_exc()}")
-                self.status_var.set("오류 발생")
-                messagebox.showerror("오류", str(e))
+                self._post(self.status_var.set, "오류 발생")
+                self._post(messagebox.showerror, "오류", str(e))
             finally:
-                for w, st in btn_state.items():
-                    try:
-                        w.configure(state=st)
-                    except Exception:
-                        pass
+                self._post(self._restore_states, btn_state)
 
         threading.Thread(target=task, daemon=True).start()
 
+    def _save_profile(self, profiler: Any, out_path: str) -> None:
+        profiler.stop()
+        for line in profiler.report():
+            self._log(line)
+        try:
+            for path in profiler.save(os.path.splitext(out_path)[0] + "_profile"):
+                self._log(f"[프로파일] 저장: {path}")
+        except OSError as e:
+            self._log(f"[프로파일] 저장 실패: {e}")
+
+    def _ensure_watch(self, ref_dir: str) -> None:
+        # Later generations find the library listed, extracted and indexed
+        if self._watch is not None and self._watch.ref_dirs == [os.path.abspath(ref_dir)]:
+            return
+        from .util.watch import CorpusWatch
+        if self._watch is not None:
+            self._watch.stop()
+        self._watch = CorpusWatch(ref_dirs=[ref_dir], log=self._log).start()
+
+    def _get_draft_cache(self) -> Any:
+        # One connection to the shared cache DB for the whole session
+        if self._draft_cache is None:
+            from .util.disk_cache import DiskCache
+            from .util.draft_cache import DraftCache
+            self._draft_cache = DraftCache(DiskCache())
+        return self._draft_cache
+
+    @staticmethod
+    def _restore_states(btn_state: dict) -> None:
+        for w, st in btn_state.items():
+            try:
+                w.configure(state=st)
+            except Exception:
+                pass
+
     @staticmethod
     def _safe_int(s: str, default: int) -> int:
         try:
@@ -287,37 +595,141 @@ class BlogDraftGUI(tk.Tk):
         except Exception:
             return default
 
+    def _refresh_health(self) -> None:
+        self.health_var.set("연결 상태: " + self.health.summary(self.PROVIDER))
+        self.after(HEALTH_REFRESH_MS, self._refresh_health)
+
+    def _show_test_result(self, title: str, msg: str, ok: bool) -> None:
+        self._log(f"[{title}] {'결과' if ok else '실패'}: {msg}")
+        if ok:
+            messagebox.showinfo(title, msg)
+        else:
+            messagebox.showerror(title, msg)
+        self.health_var.set("연결 상태: " + self.health.summary(self.PROVIDER))
+
     def ping_provider(self) -> None:
-        self._log("[연결 테스트] Provider=anthropic (claude-sonnet-4-5)")
-        try:
-            try:
-                from .providers.anthropic_client import AnthropicClient  # type: ignore
-            except Exception:
-                import sys
-                sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-                from src.providers.anthropic_client import AnthropicClient  # type: ignore
-            msg = AnthropicClient().ping()
-            self._log("[연결 테스트] 결과: " + msg)
-            messagebox.showinfo("연결 테스트", msg)
-        except Exception as e:
-            self._log("[연결 테스트] 실패: " + str(e))
-            messagebox.showerror("연결 테스트", str(e))
+        self._log(f"[연결 테스트] Provider={self.PROVIDER} ({self.MODEL})")
+
+        def done(status: dict) -> None:
+            msg = f"{self.health.summary(self.PROVIDER)}\n{status['detail']}"
+            self._post(self._show_test_result, "연결 테스트", msg, status["state"] == "ok")
+
+        self.health.check_async(self.PROVIDER, done)
 
     def quick_chat_test(self) -> None:
-        self._log("[짧은 생성 테스트] Provider=anthropic (claude-sonnet-4-5)")
-        try:
+        self._log(f"[짧은 생성 테스트] Provider={self.PROVIDER} ({self.MODEL})")
+
+        def work() -> None:
             try:
-                from .providers.anthropic_client import AnthropicClient  # type: ignore
-            except Exception:
-                import sys
-                sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-                from src.providers.anthropic_client import AnthropicClient  # type: ignore
-            msg = AnthropicClient().quick_chat_test()
-            self._log("[짧은 생성 테스트] 결과: " + msg)
-            messagebox.showinfo("짧은 생성 테스트", msg)
-        except Exception as e:
-            self._log("[짧은 생성 테스트] 실패: " + str(e))
-            messagebox.showerror("짧은 생성 테스트", str(e))
+                from .providers.registry import create_provider
+                msg, ok = create_provider(self.PROVIDER).quick_chat_test(), True
+            except Exception as e:
+                msg, ok = str(e), False
+            self._post(self._show_test_result, "짧은 생성 테스트", msg, ok)
+
+        threading.Thread(target=work, daemon=True, name="quick-chat-test").start()
+
+
+class JobQueueWindow(tk.Toplevel):
+    """Per-job status, elapsed time, token counts and streamed output."""
+
+    REFRESH_MS = 250
+    COLUMNS = (("id", "#", 40), ("keyword", "키워드", 140), ("out", "출력 파일", 220),
+               ("status", "상태", 90), ("elapsed", "경과", 70), ("tokens", "토큰 (입력/출력)", 130))
+
+    def __init__(self, master: tk.Misc, job_queue: "JobQueue") -> None:
+        super().__init__(master)
+        self.title("작업 큐")
+        self.geometry("820x560")
+        self.queue = job_queue
+        self._shown: tuple = (None, 0, 0)  # (job id, step, chars shown)
+        self.protocol("WM_DELETE_WINDOW", self.withdraw)
+
+        ctrl = ttk.Frame(self)
+        ctrl.pack(fill=tk.X, padx=10, pady=8)
+        ttk.Label(ctrl, text="동시 실행").pack(side=tk.LEFT)
+        self.concurrency = tk.StringVar(value=str(job_queue.concurrency))
+        ttk.Spinbox(ctrl, from_=1, to=16, width=4, textvariable=self.concurrency,
+                    command=self._apply_concurrency).pack(side=tk.LEFT, padx=(6, 0))
+        ttk.Button(ctrl, text="완료 항목 정리", command=self._clear_finished).pack(side=tk.RIGHT)
+        ttk.Button(ctrl, text="재시도", command=self._retry).pack(side=tk.RIGHT, padx=(0, 6))
+        ttk.Button(ctrl, text="취소", command=self._cancel).pack(side=tk.RIGHT, padx=(0, 6))
+
+        self.tree = ttk.Treeview(self, columns=[c[0] for c in self.COLUMNS], show="headings", height=8)
+        for cid, label, width in self.COLUMNS:
+            self.tree.heading(cid, text=label)
+            self.tree.column(cid, width=width, anchor=tk.W)
+        self.tree.pack(fill=tk.X, padx=10)
+        self.tree.bind("<<TreeviewSelect>>", lambda _e: self._refresh_output(force=True))
+
+        out_fr = ttk.LabelFrame(self, text="출력 (스트리밍)")
+        out_fr.pack(fill=tk.BOTH, expand=True, padx=10, pady=8)
+        self.output = tk.Text(out_fr, height=12, wrap=tk.WORD)
+        self.output.pack(fill=tk.BOTH, expand=True, padx=6, pady=6)
+
+        self.after(self.REFRESH_MS, self._refresh)
+
+    def _selected_job(self) -> Optional["Job"]:
+        sel = self.tree.selection()
+        return self.queue.get(int(sel[0])) if sel else None
+
+    def _apply_concurrency(self) -> None:
+        self.queue.set_concurrency(BlogDraftGUI._safe_int(self.concurrency.get(), self.queue.concurrency))
+
+    def _cancel(self) -> None:
+        for iid in self.tree.selection():
+            self.queue.cancel(int(iid))
+
+    def _retry(self) -> None:
+        for iid in self.tree.selection():
+            self.queue.retry(int(iid))
+
+    def _clear_finished(self) -> None:
+        self.queue.remove_finished()
+
+    def _refresh(self) -> None:
+        if not self.winfo_exists():
+            return
+        jobs = self.queue.jobs()
+        live = set()
+        for job in jobs:
+            iid = str(job.id)
+            live.add(iid)
+            status = job.status if job.status != RUNNING else f"{job.status} ({job.step}/2)"
+            values = (
+                job.id, job.keyword, job.out_path, status,
+                f"{job.elapsed:.1f}s" if job.status != PENDING else "-",
+                f"{job.usage.get('input_tokens', 0):,}/{job.usage.get('output_tokens', 0):,}",
+            )
+            if self.tree.exists(iid):
+                self.tree.item(iid, values=values)
+            else:
+                self.tree.insert("", tk.END, iid=iid, values=values)
+        for iid in self.tree.get_children():
+            if iid not in live:
+                self.tree.delete(iid)
+        if self._selected_job() is None and jobs and not self.tree.selection():
+            self.tree.selection_set(str(jobs[-1].id))
+        self._refresh_output()
+        self.after(self.REFRESH_MS, self._refresh)
+
+    def _refresh_output(self, force: bool = False) -> None:
+        job = self._selected_job()
+        if job is None:
+            return
+        text = job.output_text()
+        if job.error:
+            text += f"\n\n[{job.status}] {job.error}"
+        shown_id, shown_step, shown_len = self._shown
+        if force or shown_id != job.id or shown_step != job.step or len(text) < shown_len:
+            self.output.delete("1.0", tk.END)
+            self.output.insert(tk.END, text)
+        elif len(text) > shown_len:
+            self.output.insert(tk.END, text[shown_len:])
+        else:
+            return
+        self.output.see(tk.END)
+        self._shown = (job.id, job.step, len(text))
 
 
 def main() -> None:
@@ -0,0 +1,319 @@
+"""Job queue for running several generations concurrently.
+
+Each Job is one ``run()`` call (keyword / guide / output combination). The
+queue starts up to ``concurrency`` jobs at a time on worker threads; jobs
+share the in-process attachment read cache and one StyleCache, so jobs with
+the same attachments only pay for Step 1 once. A provider's
+``max_concurrency`` capability further caps how many of its jobs run at
+once (a local server typically serves one at a time). Listeners get
+``(job, event)`` callbacks from worker threads and must hand them to their
+own UI thread themselves.
+
+Pending jobs start in priority order (``interactive`` before ``batch``),
+oldest first within a class; the class also orders the job's requests in a
+shared rate-limit queue (providers.ratelimit).
+"""
+import itertools
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from .main import run
+from .providers.ratelimit import class_weight, request_class
+from .providers.registry import capabilities
+from .util.cancel import CancelToken, Cancelled, DeadlineExceeded
+from .util.draft_cache import DraftCache
+from .util.logs import get_log
+from .util.style_cache import StyleCache
+
+PENDING = "대기"
+RUNNING = "실행 중"
+DONE = "완료"
+FAILED = "실패"
+CANCELLED = "취소됨"
+
+_job_ids = itertools.count(1)
+
+
+@dataclass
+class Job:
+    keyword: str
+    writing_guide: str
+    # None: no files written (results are collected from the job, e.g. into an archive)
+    out_path: Optional[str]
+    keyword_repeat: int = 5
+    word_count: Optional[int] = None
+    files: List[str] = field(default_factory=list)
+    input_dir: Optional[str] = None
+    ref_dir: Optional[str] = None
+    ref_top_k: int = 5
+    provider: str = "anthropic"
+    model: Optional[str] = None
+    step1_provider: Optional[str] = None
+    step1_model: Optional[str] = None
+    language: str = "ko"
+    max_tokens: int = 10000
+    temperature: float = 0.9
+    # Seconds for both steps together; None uses the queue's job_timeout
+    timeout: Optional[float] = None
+    # Per-attachment token budget for extractive compression (None: first 12,000 characters)
+    compress_tokens: Optional[int] = None
+    # Step 1 input: "llm" (attachments), "profile" (local stylometric profile) or "local" (no Step 1 call)
+    style_mode: str = "llm"
+    # Long-form Step 2: outline plus this many sections written in parallel (0: from word_count)
+    sections: Optional[int] = None
+    # Scheduling class ("interactive", "batch"); None: the process default (providers.ratelimit)
+    priority: Optional[str] = None
+    # input_dir walk options (include/exclude/max_size/workers, see util.file_loader.scan_files)
+    walk_options: Optional[Dict[str, Any]] = None
+
+    id: int = field(default_factory=lambda: next(_job_ids))
+    status: str = PENDING
+    step: int = 0
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    usage: Dict[str, int] = field(default_factory=dict)
+    output: List[str] = field(default_factory=list)
+    logs: List[str] = field(default_factory=list)
+    cancel_token: CancelToken = field(default_factory=CancelToken, repr=False)
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        end = self.finished_at if self.finished_at is not None else time.time()
+        return end - self.started_at
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def output_text(self) -> str:
+        return "".join(self.output)
+
+    def clone(self) -> "Job":
+        """Fresh pending copy with the same inputs (used by retry)."""
+        return Job(
+            keyword=self.keyword, writing_guide=self.writing_guide, out_path=self.out_path,
+            keyword_repeat=self.keyword_repeat, word_count=self.word_count, files=list(self.files),
+            input_dir=self.input_dir, ref_dir=self.ref_dir, ref_top_k=self.ref_top_k,
+            provider=self.provider, model=self.model, step1_provider=self.step1_provider,
+            step1_model=self.step1_model, language=self.language,
+            max_tokens=self.max_tokens, temperature=self.temperature, timeout=self.timeout,
+            compress_tokens=self.compress_tokens, style_mode=self.style_mode, sections=self.sections,
+            priority=self.priority, walk_options=self.walk_options,
+        )
+
+
+JobListener = Callable[[Job, str], None]
+
+
+class JobQueue:
+    def __init__(
+        self,
+        concurrency: int = 2,
+        style_cache: Optional[StyleCache] = None,
+        job_timeout: Optional[float] = None,
+        draft_cache: Optional[DraftCache] = None,
+    ) -> None:
+        self.concurrency = max(1, concurrency)
+        self.style_cache = style_cache if style_cache is not None else StyleCache()
+        # A stuck request would otherwise hold a worker slot indefinitely
+        self.job_timeout = job_timeout
+        # util.draft_cache.DraftCache: reruns rewrite only the sections a guide change affects
+        self.draft_cache = draft_cache
+        self._jobs: Dict[int, Job] = {}
+        self._pending: Deque[int] = deque()
+        self._running = 0
+        self._running_by_provider: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._listeners: List[JobListener] = []
+        self._idle = threading.Condition(self._lock)
+
+    # Listeners
+    def add_listener(self, fn: JobListener) -> None:
+        self._listeners.append(fn)
+
+    def _emit(self, job: Job, event: str) -> None:
+        for fn in list(self._listeners):
+            try:
+                fn(job, event)
+            except Exception:
+                traceback.print_exc()
+
+    # Queue operations
+    def submit(self, job: Job) -> Job:
+        job.cancel_token.priority = job.priority
+        with self._lock:
+            self._jobs[job.id] = job
+            self._pending.append(job.id)
+        self._emit(job, "queued")
+        self._pump()
+        return job
+
+    def jobs(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def get(self, job_id: int) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def set_concurrency(self, n: int) -> None:
+        with self._lock:
+            self.concurrency = max(1, n)
+        self._pump()
+
+    def cancel(self, job_id: int) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return
+            # Decided under the lock: a running job may turn CANCELLED on its worker right after
+            was_pending = job.status == PENDING
+            if was_pending:
+                self._pending.remove(job_id)
+                job.status = CANCELLED
+                job.finished_at = time.time()
+                self._idle.notify_all()
+        if was_pending:
+            self._emit(job, "finished")
+        else:
+            job.cancel_token.cancel()
+
+    def retry(self, job_id: int) -> Optional[Job]:
+        """Re-enqueue a failed or cancelled job as a new job."""
+        job = self.get(job_id)
+        if job is None or job.status not in (FAILED, CANCELLED):
+            return None
+        return self.submit(job.clone())
+
+    def remove_finished(self) -> int:
+        with self._lock:
+            done = [jid for jid, j in self._jobs.items() if j.finished]
+            for jid in done:
+                del self._jobs[jid]
+        return len(done)
+
+    def cancel_all(self) -> None:
+        for job in self.jobs():
+            self.cancel(job.id)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until no job is pending or running."""
+        end = None if timeout is None else time.time() + timeout
+        with self._lock:
+            while self._pending or self._running:
+                remaining = None if end is None else end - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    # Execution
+    @staticmethod
+    def _provider_limit(provider: str) -> Optional[int]:
+        try:
+            return capabilities(provider).max_concurrency
+        except (ValueError, ImportError):
+            # Unknown provider: run() reports it when the job starts
+            return None
+
+    def _pump(self) -> None:
+        started: List[Job] = []
+        with self._lock:
+            # Highest class first, then oldest, skipping jobs whose provider is at its own concurrency limit
+            order = sorted(self._pending, key=lambda jid: -class_weight(request_class(self._jobs[jid].cancel_token)))
+            for job_id in order:
+                if self._running >= self.concurrency:
+                    break
+                job = self._jobs[job_id]
+                limit = self._provider_limit(job.provider)
+                if limit is not None and self._running_by_provider.get(job.provider, 0) >= limit:
+                    continue
+                self._pending.remove(job_id)
+                job.status = RUNNING
+                job.started_at = time.time()
+                self._running += 1
+                self._running_by_provider[job.provider] = self._running_by_provider.get(job.provider, 0) + 1
+                started.append(job)
+        for job in started:
+            threading.Thread(target=self._execute, args=(job,), daemon=True, name=f"job-{job.id}").start()
+            self._emit(job, "started")
+
+    def _execute(self, job: Job) -> None:
+        # Per-job context for the structured log; consoles only show this job's warnings
+        job_log = get_log(job=job.id, keyword=job.keyword, provider=job.provider)
+
+        def log(msg: str) -> None:
+            job.logs.append(msg)
+            job_log(msg)
+            self._emit(job, "log")
+
+        def on_delta(step: int, text: str) -> None:
+            if step != job.step:
+                job.step = step
+                job.output.clear()
+            job.output.append(text)
+            self._emit(job, "delta")
+
+        timeout = job.timeout or self.job_timeout
+        if timeout:
+            job.cancel_token.set_deadline(timeout)
+        try:
+            result = run(
+                provider=job.provider,
+                model=job.model,
+                step1_provider=job.step1_provider,
+                step1_model=job.step1_model,
+                keyword=job.keyword,
+                keyword_repeat=job.keyword_repeat,
+                input_dir=job.input_dir,
+                files=job.files,
+                out_path=job.out_path,
+                language=job.language,
+                max_tokens=job.max_tokens,
+                temperature=job.temperature,
+                log_callback=log,
+                writing_guide=job.writing_guide,
+                ref_dir=job.ref_dir,
+                ref_top_k=job.ref_top_k,
+                walk_options=job.walk_options,
+                word_count=job.word_count,
+                on_delta=on_delta,
+                cancel=job.cancel_token,
+                usage=job.usage,
+                style_cache=self.style_cache,
+                compress_tokens=job.compress_tokens,
+                style_mode=job.style_mode,
+                sections=job.sections,
+                draft_cache=self.draft_cache,
+            )
+            if job.step != 2 or not job.output:
+                job.step = 2
+                job.output[:] = [result]
+            job.status = DONE
+        except DeadlineExceeded as e:
+            job.status = FAILED
+            job.error = str(e)
+        except Cancelled as e:
+            job.status = CANCELLED
+            job.error = str(e)
+        except Exception as e:
+            job.status = FAILED
+            job.error = f"{type(e).__name__}: {e}"
+            job.logs.append(traceback.format_exc())
+        finally:
+            job.cancel_token.clear_deadline()
+            job.finished_at = time.time()
+            with self._lock:
+                self._running -= 1
+                self._running_by_provider[job.provider] -= 1
+                self._idle.notify_all()
+            self._emit(job, "finished")
+            self._pump()
@@ -0,0 +1,183 @@
+"""Long drafts as an outline plus sections written concurrently.
+
+One Step 2 completion of several thousand characters is the slowest part
+of a job: the output tokens come one after another. With ``sections``,
+run() first asks for a short outline and then writes every section in its
+own request at the same time. Wall time becomes one outline call plus the
+longest section, not the whole draft.
+
+Every request starts with the same prefix: style guide, topic guide and
+attachments. Its own instructions follow. Providers with prompt caching
+(Anthropic) mark that prefix cacheable, so the outline call writes the
+cache and the section calls read it. Each section sees the whole outline
+and its neighbours' titles for the transitions. It gets its share of the
+keyword repetitions and of the target length. Only the first section
+writes an opening and only the last one writes the closing. Stitching
+drops greetings repeated inside the post and hashtag lines before the last
+section.
+
+With ``outline`` and ``reuse`` (util.draft_cache) a rerun skips the
+outline call and rewrites only the sections whose guide items changed.
+"""
+import math
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .prompt_templates import outline_instructions, section_instructions
+from .providers.streaming import add_usage
+from .util.draft_cache import guide_items as split_guide, is_hashtag_item
+
+# Sections when no word_count is given; otherwise one per SECTION_CHARS characters
+DEFAULT_SECTIONS = 4
+SECTION_CHARS = 700
+MIN_SECTIONS = 2
+MAX_SECTIONS = 8
+OUTLINE_MAX_TOKENS = 600
+SECTION_MIN_TOKENS = 800
+
+# "1. 소제목 | 내용 | 1, 3", "2) **소제목** - 내용", "## 3. 소제목"
+_OUTLINE_RE = re.compile(r"^\s*(?:#+\s*)?(\d+)\s*[.)]\s*(.+?)\s*$")
+_GREETING_RE = re.compile(r"^\s*(?:안녕하세요|안녕|반갑습니다)")
+_HASHTAG_LINE_RE = re.compile(r"^\s*(?:#[^\s#]+\s*)+$")
+
+
+def section_count(word_count: Optional[int]) -> int:
+    """Sections for a draft of ``word_count`` characters."""
+    if not word_count:
+        return DEFAULT_SECTIONS
+    return max(MIN_SECTIONS, min(MAX_SECTIONS, math.ceil(word_count / SECTION_CHARS)))
+
+
+def distribute(total: int, parts: int) -> List[int]:
+    """``total`` split into ``parts`` near-equal shares, the remainder going to the first ones."""
+    base, extra = divmod(max(0, total), parts)
+    return [base + (1 if i < extra else 0) for i in range(parts)]
+
+
+def parse_outline(text: str, limit: int = MAX_SECTIONS) -> List[Tuple[str, str, List[int]]]:
+    """``(title, points, guide item indices)`` per numbered outline line (indices 0-based)."""
+    outline: List[Tuple[str, str, List[int]]] = []
+    for line in text.splitlines():
+        m = _OUTLINE_RE.match(line)
+        if not m:
+            continue
+        fields = m.group(2).split("|")
+        title, points = fields[0], "|".join(fields[1:2])
+        if len(fields) == 1:
+            title, _, points = title.partition(" - ")
+        items = sorted({int(n) - 1 for n in re.findall(r"\d+", "|".join(fields[2:])) if int(n) > 0})
+        title = title.strip().strip("*\"'[] ")
+        if title:
+            outline.append((title, points.strip(), items))
+    return outline[:limit]
+
+
+def assign_hashtag_items(outline: List[Tuple[str, str, List[int]]], items: List[str]) -> List[Tuple[str, str, List[int]]]:
+    """Outline with unknown item numbers dropped and hashtag items moved to the closing section."""
+    tags = [i for i, item in enumerate(items) if is_hashtag_item(item)]
+    result = []
+    for index, (title, points, indices) in enumerate(outline):
+        indices = [i for i in indices if i < len(items) and i not in tags]
+        if index == len(outline) - 1:
+            indices = sorted(set(indices) | set(tags))
+        result.append((title, points, indices))
+    return result
+
+
+def clean_section(text: str, index: int, count: int) -> str:
+    """Section text without the greetings of later sections and the hashtags of earlier ones."""
+    lines = text.strip().splitlines()
+    if index > 0:
+        lines = [line for line in lines if not _GREETING_RE.match(line)]
+    if index < count - 1:
+        lines = [line for line in lines if not _HASHTAG_LINE_RE.match(line)]
+    return "\n".join(lines).strip()
+
+
+def write_long_form(
+    client: Any,
+    model: str,
+    prompts: Any,
+    style_prompt: str,
+    keyword: str,
+    keyword_repeat: int,
+    writing_guide: Optional[str],
+    word_count: Optional[int],
+    sections: int,
+    max_tokens: int,
+    temperature: float,
+    concurrency: int,
+    cancel: Any = None,
+    usage: Optional[Dict[str, int]] = None,
+    on_delta: Optional[Callable[[str], None]] = None,
+    log: Callable[[str], None] = print,
+    outline: Optional[List[Tuple[str, str, List[int]]]] = None,
+    reuse: Optional[Dict[int, str]] = None,
+) -> Optional[Dict[str, Any]]:
+    """Outline, then sections in parallel; None if no usable outline came back.
+
+    ``prompts`` is the job's PromptBuilder. ``on_delta`` receives each
+    finished section in order, so the streamed text equals the result. A
+    given ``outline`` skips the outline call and sections in ``reuse``
+    (index -> text) are not rewritten. Returns ``{"outline", "sections",
+    "text"}``.
+    """
+    t0 = time.perf_counter()
+    items = split_guide(writing_guide)
+    reuse = reuse or {}
+    if outline is None:
+        wanted = sections or section_count(word_count)
+        outline_text = client.chat(
+            model=model, messages=prompts.longform_messages(
+                style_prompt, writing_guide, outline_instructions(keyword, wanted, word_count, items),
+            ),
+            max_tokens=min(max_tokens, OUTLINE_MAX_TOKENS), temperature=temperature, cancel=cancel, usage=usage,
+        )
+        outline = parse_outline(outline_text)
+        if len(outline) < MIN_SECTIONS:
+            log(f"[경고] 개요를 해석하지 못해 한 번에 작성합니다: {outline_text[:80]!r}")
+            return None
+        outline = assign_hashtag_items(outline, items)
+        log(f"[디버그] 개요 {len(outline)}개 섹션 ({time.perf_counter() - t0:.1f}초): " + " / ".join(e[0] for e in outline))
+    count = len(outline)
+
+    repeats = distribute(keyword_repeat, count)
+    lengths = distribute(word_count, count) if word_count else [None] * count
+    section_tokens = min(max_tokens, max(SECTION_MIN_TOKENS, 2 * max_tokens // count))
+    # Token counts per section, merged afterwards (the threads would race on one dict)
+    section_usage: List[Dict[str, int]] = [{} for _ in range(count)]
+
+    def write(index: int) -> Tuple[str, float]:
+        started = time.perf_counter()
+        own = [items[i] for i in outline[index][2] if i < len(items)]
+        instructions = section_instructions(outline, index, keyword, repeats[index], lengths[index], own)
+        text = client.chat(
+            model=model, messages=prompts.longform_messages(style_prompt, writing_guide, instructions),
+            max_tokens=section_tokens, temperature=temperature, cancel=cancel, usage=section_usage[index],
+        )
+        return clean_section(text, index, count), time.perf_counter() - started
+
+    parts: List[str] = []
+    todo = [i for i in range(count) if i not in reuse]
+    pool = ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(todo) or 1)), thread_name_prefix="section")
+    try:
+        futures = {i: pool.submit(write, i) for i in todo}
+        # In outline order: section i is emitted as soon as it and the ones before it are done
+        for i in range(count):
+            if i in reuse:
+                text = reuse[i]
+                log(f"[디버그] 섹션 {i + 1}/{count} 재사용 ({len(text):,}자)")
+            else:
+                text, seconds = futures[i].result()
+                log(f"[디버그] 섹션 {i + 1}/{count} 완료 ({seconds:.1f}초, {len(text):,}자)")
+            if on_delta is not None:
+                on_delta(("\n\n" if parts else "") + text)
+            parts.append(text)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        for u in section_usage:
+            add_usage(usage, u.get("input_tokens", 0), u.get("output_tokens", 0))
+    log(f"[디버그] 장문 작성 완료: {count}개 섹션 (새로 작성 {len(todo)}개), {time.perf_counter() - t0:.1f}초")
+    return {"outline": [list(e) for e in outline], "sections": parts, "text": "\n\n".join(parts)}
@@ -1,111 +1,358 @@
 import argparse
 import os
-from typing import List
-from dotenv import load_dotenv
-
-# Support both `python -m src.main` and `python src/main.py`
-try:
-    from .util.file_loader import load_attachments, chunk_text
-    from .util.env_util import load_env
-    from .prompt_templates import build_meta_prompt, build_final_prompt, format_attachments
-    from .providers.openai_client import OpenAIClient
-    from .providers.anthropic_client import AnthropicClient
-except ImportError:  # running as a script without package context
-    import sys
-    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    from src.util.file_loader import load_attachments, chunk_text
-    from src.util.env_util import load_env
-    from src.prompt_templates import build_meta_prompt, build_final_prompt, format_attachments
-    from src.providers.openai_client import OpenAIClient
-    from src.providers.anthropic_client import AnthropicClient
-
-
-def run(provider: str, model: str, keyword: str, keyword_repeat: int, input_dir: str | None, files: List[str], out_path: str, language: str, max_tokens: int, temperature: float, debug: bool = False, log_callback=None, writing_guide: str | None = None):
+import sys
+from typing import TYPE_CHECKING, Any, List
+
+# Support `python src/main.py` as well as `python -m src.main`: make the
+# project root importable and run this file as part of the `src` package.
+if not __package__:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import src  # noqa: F401
+    __package__ = "src"
+
+from .util.env_util import load_env
+
+# Everything else is imported where it is used, so `--ping` and other short
+# invocations only pay for the selected provider (and `requests`).
+if TYPE_CHECKING:
+    from .util.draft_cache import DraftCache
+    from .util.style_cache import StyleCache
+
+# Per-attachment token budget of --compress without a value
+DEFAULT_COMPRESS_TOKENS = 2500
+# Step 1 input: attachments (llm), a local stylometric profile (profile), or no Step 1 call at all (local)
+STYLE_MODES = ("llm", "profile", "local")
+
+def default_model(provider: str) -> str:
+    from .providers.registry import default_model as registry_default_model
+    return registry_default_model(provider)
+
+
+def create_client(provider: str) -> Any:
+    """Import and construct only the selected provider's client."""
+    from .providers.registry import create_provider, provider_names
+    if provider not in provider_names():
+        raise SystemExit(f"provider는 {', '.join(provider_names())} 중 하나여야 합니다.")
+    return create_provider(provider)
+
+
+def run(provider: str, model: str, keyword: str, keyword_repeat: int, input_dir: str | None, files: List[str], out_path: str | None, language: str, max_tokens: int, temperature: float, debug: bool = False, log_callback=None, writing_guide: str | None = None, ref_dir: str | None = None, ref_top_k: int = 5, walk_options: dict | None = None, word_count: int | None = None, on_delta=None, cancel=None, usage: dict | None = None, style_cache: "StyleCache | None" = None, step1_provider: str | None = None, step1_model: str | None = None, profiler=None, compress_tokens: int | None = None, style_mode: str = "llm", sections: int | None = None, draft_cache: "DraftCache | None" = None) -> str:
+    """Generate one blog draft (Step 1 style analysis + Step 2 writing).
+
+    For the job queue: ``on_delta(step, text)`` receives streamed text,
+    ``cancel`` (CancelToken) aborts between and during API calls (a deadline
+    set on it bounds both steps together), ``usage``
+    accumulates token counts and ``style_cache`` shares Step 1 results
+    between jobs with identical attachments. ``step1_provider`` /
+    ``step1_model`` run the style analysis elsewhere (default: same as Step 2).
+    ``out_path`` is written atomically; ``None`` writes no files (the batch
+    runner archives results itself). ``profiler`` (util.profiling.Profiler)
+    times each pipeline stage. ``compress_tokens`` replaces the 12,000-character
+    cut of each attachment with its best sentences within that many tokens
+    (util.summarize). ``style_mode`` "profile" sends Step 1 a local
+    stylometric profile of the attachments instead of their text and "local"
+    builds the style guide from that profile without calling a model
+    (util.stylometry). ``sections`` writes Step 2 as an outline plus that
+    many sections in parallel (0: count from ``word_count``; see longform).
+    ``draft_cache`` (util.draft_cache.DraftCache) keeps the draft per section:
+    a rerun that only changes the writing guide rewrites just the sections
+    it affects, and Step 1 comes from the same database.
+    Returns the final draft.
+    """
+    from .util.file_loader import (
+        load_attachments, limit_attachments, dedup_attachments, load_signature_cache, save_signature_cache,
+        summarize_extract_stats,
+    )
+    from .util.env_util import cache_dir
+    from .util.style_cache import style_cache_key
+    from .util.draft_cache import draft_key, guide_items, plan_update
+    from .prompt_builder import prompt_builder
+    from .providers import tape
+    from .providers.health import MONITOR as HEALTH_MONITOR
+    from .providers.registry import capabilities as provider_capabilities
+    from .util.tokens import estimate_tokens
+    from .util.output_writer import AtomicWriter, write_text_atomic
+    from .util.profiling import NULL_PROFILER
+    from .util.logs import emit as emit_log
+
+    prof = profiler or NULL_PROFILER
+    if draft_cache is not None and style_cache is None:
+        from .util.style_cache import StyleCache
+        style_cache = StyleCache(disk=draft_cache.disk)
+    if style_mode not in STYLE_MODES:
+        raise ValueError(f"style_mode는 {', '.join(STYLE_MODES)} 중 하나여야 합니다: {style_mode}")
+
     def log(msg):
-        """로그 출력 - log_callback이 있으면 사용, 없으면 print"""
+        """로그 출력 - log_callback이 있으면 사용, 없으면 util.logs (비동기, 레벨/파일 출력)"""
         if log_callback:
             log_callback(msg)
         else:
-            print(msg)
-
-    env_info = load_env(verbose=debug)
-    if debug:
-        log("[debug] Provider=" + provider)
-        log("[debug] Model=" + (model or "(default)"))
-        log("[debug] Lang=" + language)
-
-    # Load attachments (optional - can be empty)
-    if files:
-        log(f"[디버그] 파일 로딩 시작: {len(files)}개 파일 처리")
-        attachments = load_attachments(input_dir, files)
-        log(f"[디버그] 파일 로딩 완료: {len(attachments)}개 첨부 파일")
-    else:
-        log("[디버그] 첨부 파일 없음 - 프롬프트만으로 생성")
-        attachments = []
-
-    # Concatenate large files naïvely (chunking per file kept for future multi-turn)
-    limited_attachments: list[tuple[str, str]] = []
-    for path, content in attachments:
-        chunks = chunk_text(content, max_chars=12000)
-        # take only first chunk to avoid token overflow in a single call
-        limited_attachments.append((path, chunks[0]))
-
-    # Format attachments for prompts
-    attachments_block = format_attachments(limited_attachments)
-
-    log(f"[디버그] 메시지 구성 완료, 첨부 파일 {len(limited_attachments)}개")
-    log(f"[디버그] Provider={provider}, Model={model or '(기본값 사용)'}")
-
-    # Initialize client
-    if provider == "openai":
-        log("[디버그] OpenAI 클라이언트 초기화")
-        client = OpenAIClient()
-        # Set default model if not provided
-        if not model:
-            model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-            log(f"[디버그] 기본 모델 사용: {model}")
-    elif provider == "anthropic":
-        log("[디버그] Anthropic 클라이언트 초기화")
-        client = AnthropicClient()
+            emit_log(msg)
+
+    def checkpoint():
+        if cancel is not None:
+            cancel.check()
+
+    def stream_to(step):
+        sinks = []
+        if on_delta is not None:
+            sinks.append(lambda text: on_delta(step, text))
+        if step == 2 and writer is not None:
+            sinks.append(writer.write)
+        if not sinks:
+            return None
+
+        def emit(text):
+            for sink in sinks:
+                sink(text)
+        return emit
+
+    # Claim out_path before spending any tokens: a second job pointed at the
+    # same file fails here instead of clobbering the first one's output. Step 2
+    # streams into a temp file that replaces out_path only once complete.
+    writer = AtomicWriter(out_path) if out_path else None
+    try:
+        env_info = load_env(verbose=debug)
+        if debug:
+            log("[debug] Provider=" + provider)
+            log("[debug] Model=" + (model or "(default)"))
+            log("[debug] Lang=" + language)
+
+        # Connect to the provider(s) while attachments load; status is read from
+        # the monitor's cache and never waits on the network. A replayed
+        # recording (providers.tape) sends nothing, so there's nothing to probe
+        replaying = getattr(tape.active(), "mode", None) == tape.REPLAY
+        for name in () if replaying else dict.fromkeys((provider, step1_provider or provider)):
+            HEALTH_MONITOR.warm_up(name)
+            health = HEALTH_MONITOR.status(name)
+            if health["state"] in ("degraded", "down"):
+                log(f"[경고] 최근 연결 상태 {HEALTH_MONITOR.summary(name)}: {health['detail']}")
+            elif debug:
+                log(f"[debug] 연결 상태 {HEALTH_MONITOR.summary(name)}")
+
+        # Auto-select the most relevant past posts from the reference library
+        if ref_dir and ref_top_k > 0:
+            from .util.ref_index import select_references
+            from .util.watch import keeps_index
+            query = "\n".join(part for part in (keyword, writing_guide) if part)
+            with prof.stage("select_references"):
+                # A folder watch (util.watch) already keeps the index current
+                refs = select_references(ref_dir, query, ref_top_k, exclude=files, log=log, refresh=not keeps_index(ref_dir))
+            files = list(files) + refs
+
+        # Load attachments (optional - can be empty)
+        if files:
+            log(f"[디버그] 파일 로딩 시작: {len(files)}개 파일 처리")
+            extract_stats: list = []
+            attachments = load_attachments(input_dir, files, extract_stats, profiler=profiler, **(walk_options or {}))
+            log(f"[디버그] 파일 로딩 완료: {len(attachments)}개 첨부 파일")
+            for name, t in summarize_extract_stats(extract_stats).items():
+                log(
+                    f"[디버그] 텍스트 추출({name}): {t['files']}개, {t['in_bytes'] / 1024:,.0f}KB -> "
+                    f"{t['out_bytes'] / 1024:,.0f}KB ({t['ratio']:.0%}), {t['seconds']:.2f}초"
+                )
+            if debug:
+                for entry in extract_stats:
+                    log(f"[debug]   {entry['extractor']}: {entry['path']} {entry['ratio']:.0%} {entry['seconds'] * 1000:.1f}ms")
+
+            # Drop copies of the same document saved under different names
+            with prof.stage("dedup"):
+                from .util.watch import active as watch_active
+                # A running folder watch loads and persists the signatures itself
+                sig_cache = None if watch_active() else str(cache_dir() / "signatures.json")
+                if sig_cache:
+                    load_signature_cache(sig_cache)
+                attachments, dedup_stats = dedup_attachments(attachments, billed_chars=12000)
+                if sig_cache:
+                    save_signature_cache(sig_cache)
+            if dedup_stats["dropped"]:
+                log(
+                    f"[디버그] 중복 첨부 제거: 동일 {dedup_stats['exact']}개, 유사 {dedup_stats['near']}개 "
+                    f"(약 {dedup_stats['tokens_saved']:,} 토큰 절약)"
+                )
+                if debug:
+                    for dropped, kept, kind in dedup_stats["dropped"]:
+                        log(f"[debug]   {kind}: {dropped} -> {kept}")
+        else:
+            log("[디버그] 첨부 파일 없음 - 프롬프트만으로 생성")
+            attachments = []
+
+        # Concatenate large files naïvely (chunking per file kept for future multi-turn)
+        if compress_tokens and attachments:
+            with prof.stage("compress"):
+                limited_attachments = limit_attachments(attachments, compress_tokens=compress_tokens)
+            before = sum(estimate_tokens(content[:12000]) for _, content in attachments)
+            after = sum(estimate_tokens(content) for _, content in limited_attachments)
+            log(
+                f"[디버그] 첨부 요약: 약 {before:,} -> {after:,} 토큰 "
+                f"(앞부분 12,000자 대비 {before / max(after, 1):.1f}배 압축, 문서당 {compress_tokens:,} 토큰 이내)"
+            )
+        else:
+            limited_attachments = limit_attachments(attachments)
+        with prof.stage("format_attachments"):
+
+            # Format attachments for prompts (shared by both passes and by jobs with the same attachments)
+            prompts = prompt_builder(limited_attachments)
+            attachments_block = prompts.attachments_block
+        checkpoint()
+
+        log(f"[디버그] 메시지 구성 완료, 첨부 파일 {len(limited_attachments)}개")
+
+        # Stylometric profile over the full attachment texts (not the per-document cut)
+        if style_mode != "llm":
+            from .util.stylometry import analyze_style, format_profile, local_style_guide
+            with prof.stage("stylometry"):
+                style_profile = analyze_style(attachments)
+            length = style_profile["sentence_length"]
+            log(
+                f"[디버그] 문체 프로필: 문장 {style_profile['sentences']:,}개, 평균 {length['mean']:.0f}자, "
+                f"존댓말 {style_profile['honorific']:.0%}, 이모티콘 {style_profile['emoji']['per_100_sentences']:.1f}개/100문장"
+            )
+        log(f"[디버그] Provider={provider}, Model={model or '(기본값 사용)'}")
+
+        # Initialize client
+        log(f"[디버그] {provider} 클라이언트 초기화")
+        with prof.stage("create_client"):
+            client = create_client(provider)
         # Set default model if not provided
         if not model:
-            model = os.getenv("ANTHROPIC_MODEL", "claude-sonnet-4-5")
+            model = default_model(provider)
             log(f"[디버그] 기본 모델 사용: {model}")
-    else:
-        raise SystemExit("provider는 'openai' 또는 'anthropic'만 지원합니다.")
 
-    # Step 1: Generate style prompt from attachments (meta-prompt)
-    log("생성 중... (Step 1/2: 문체 분석)")
-    meta_messages = build_meta_prompt(attachments_block)
-    style_prompt = client.chat(model=model, messages=meta_messages, max_tokens=max_tokens, temperature=temperature)
+        if style_mode == "local":
+            # Step 1: style guide from the profile alone, no model call
+            log("Step 1 생략 (로컬 문체 프로필로 스타일 가이드 작성)")
+            style_prompt = local_style_guide(style_profile)
+        else:
+            # Step 1 may run on another (e.g. cheaper, local) provider
+            step1_provider = step1_provider or provider
+            step1_client = client if step1_provider == provider else create_client(step1_provider)
+            if not step1_model:
+                step1_model = model if step1_provider == provider else default_model(step1_provider)
+            if (step1_provider, step1_model) != (provider, model):
+                log(f"[디버그] Step 1 Provider={step1_provider}, Model={step1_model}")
+            if style_mode == "profile":
+                from .prompt_templates import build_profile_meta_prompt
+                meta_messages = build_profile_meta_prompt(format_profile(style_profile))
+                step1_input = meta_messages[1]["content"]
+                # The profile covers the full texts, so key on those
+                key_attachments = attachments
+            else:
+                meta_messages = prompts.meta_messages()
+                step1_input = attachments_block
+                key_attachments = limited_attachments
+            context_tokens = provider_capabilities(step1_provider).context_tokens
+            step1_tokens = estimate_tokens(step1_input) + max_tokens
+            if step1_tokens > context_tokens:
+                log(
+                    f"[경고] Step 1 입력+출력(약 {step1_tokens:,} 토큰)이 {step1_provider} 컨텍스트 "
+                    f"({context_tokens:,} 토큰)를 넘을 수 있습니다"
+                )
+
+            # Step 1: Generate style prompt from attachments (meta-prompt)
+            log("생성 중... (Step 1/2: 문체 분석)" if style_mode == "llm" else "생성 중... (Step 1/2: 문체 분석, 로컬 프로필 기반)")
 
-    # Save Step 1 result (for debugging)
-    base, ext = os.path.splitext(out_path)
-    step1_path = f"{base}_step1_style_prompt{ext}"
-    os.makedirs(os.path.dirname(os.path.abspath(step1_path)) or ".", exist_ok=True)
-    with open(step1_path, "w", encoding="utf-8") as f:
-        f.write(style_prompt)
-    log(f"Step 1 결과 저장: {step1_path}")
+            def analyze_style() -> str:
+                return step1_client.chat(
+                    model=step1_model, messages=meta_messages, max_tokens=max_tokens, temperature=temperature,
+                    on_delta=stream_to(1), cancel=cancel, usage=usage,
+                )
 
-    # Step 2: Generate final blog using style prompt
-    log("생성 중... (Step 2/2: 블로그 작성)")
-    final_messages = build_final_prompt(style_prompt, keyword, keyword_repeat, attachments_block, writing_guide)
-    blog_draft = client.chat(model=model, messages=final_messages, max_tokens=max_tokens, temperature=temperature)
+            with prof.stage("step1_style"):
+                if style_cache is not None:
+                    key = style_cache_key(step1_provider, step1_model, key_attachments, mode=style_mode)
+                    style_prompt, hit = style_cache.get_or_compute(key, analyze_style, cancel=cancel)
+                    if hit:
+                        log("Step 1 결과 재사용 (동일 첨부자료의 문체 분석 캐시)")
+                else:
+                    style_prompt = analyze_style()
+        checkpoint()
 
-    # Save Step 2 result (final output)
-    os.makedirs(os.path.dirname(os.path.abspath(out_path)) or ".", exist_ok=True)
-    with open(out_path, "w", encoding="utf-8") as f:
-        f.write(blog_draft)
+        # Save Step 1 result (for debugging); covered by the out_path claim
+        if out_path:
+            base, ext = os.path.splitext(out_path)
+            step1_path = f"{base}_step1_style_prompt{ext}"
+            with prof.stage("save_step1"):
+                write_text_atomic(step1_path, style_prompt, claim=False)
+            log(f"Step 1 결과 저장: {step1_path}")
 
-    log(f"완료: {out_path}")
+        # Step 2: Generate final blog using style prompt
+        log("생성 중... (Step 2/2: 블로그 작성)")
+        with prof.stage("step2_draft"):
+            blog_draft = None
+            items, record, reuse, outline = guide_items(writing_guide), None, None, None
+            if draft_cache is not None:
+                key = draft_key(
+                    provider, model, style_prompt, prompts.attachments_block, keyword, keyword_repeat, word_count,
+                    sections, language,
+                )
+                record = draft_cache.get(key)
+            if record is not None and record["guide"] == items:
+                log("Step 2 결과 재사용 (가이드와 입력이 이전 실행과 같음)")
+                blog_draft = record["text"]
+                draft_cache.count(len(record["sections"]), 0)
+                emit = stream_to(2)
+                if emit is not None:
+                    emit(blog_draft)
+            elif record is not None and record.get("outline") and sections is not None:
+                rewrite, per_section = plan_update(record, items)
+                outline = [(t, p, own) for (t, p, _), own in zip(record["outline"], per_section)]
+                reuse = {i: text for i, text in enumerate(record["sections"]) if i not in rewrite}
+                log(
+                    f"[디버그] 가이드 변경: 섹션 {len(outline)}개 중 "
+                    + (", ".join(str(i + 1) for i in rewrite) + "번만 다시 작성" if rewrite else "다시 작성할 섹션 없음")
+                )
+            if blog_draft is None and sections is not None:
+                from .longform import write_long_form
+                log("[디버그] 장문 모드: 개요 작성 후 섹션별 동시 작성")
+                result = write_long_form(
+                    client, model, prompts, style_prompt, keyword, keyword_repeat, writing_guide, word_count,
+                    sections, max_tokens, temperature, concurrency=provider_capabilities(provider).max_concurrency,
+                    cancel=cancel, usage=usage, on_delta=stream_to(2), log=log, outline=outline, reuse=reuse,
+                )
+                if result is not None:
+                    blog_draft = result["text"]
+                    record = {"guide": items, "outline": result["outline"], "sections": result["sections"], "text": blog_draft}
+                    if draft_cache is not None:
+                        draft_cache.count(len(reuse or ()), len(result["sections"]) - len(reuse or ()))
+            if blog_draft is None:
+                final_messages = prompts.final_messages(style_prompt, keyword, keyword_repeat, writing_guide, word_count)
+                blog_draft = client.chat(
+                    model=model, messages=final_messages, max_tokens=max_tokens, temperature=temperature,
+                    on_delta=stream_to(2), cancel=cancel, usage=usage,
+                )
+                record = {"guide": items, "outline": None, "sections": [blog_draft], "text": blog_draft}
+                if draft_cache is not None:
+                    draft_cache.count(0, 1)
+            if draft_cache is not None:
+                draft_cache.put(key, record)
+        checkpoint()
+
+        # Save Step 2 result (final output): streamed so far into the temp file
+        if writer is not None:
+            with prof.stage("save_output"):
+                writer.commit(blog_draft)
+            log(f"완료: {out_path}")
+        else:
+            log("완료")
+        return blog_draft
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
 
 
 def main():
+    from .providers.registry import provider_names
+
     parser = argparse.ArgumentParser(description="첨부자료 기반 블로그 초안 생성기 (OpenAI/Claude)")
-    parser.add_argument("--provider", choices=["openai", "anthropic"], required=True, help="사용할 모델 제공자")
+    parser.add_argument("--provider", choices=provider_names(), required=True, help="사용할 모델 제공자 (local: OpenAI 호환 로컬 서버)")
     parser.add_argument("--model", required=False, default=None, help="모델 이름 (미지정 시 기본값)")
-    parser.add_argument("--keyword", "-k", required=True, help="키워드")
+    parser.add_argument("--step1-provider", choices=provider_names(), default=None, help="Step 1(문체 분석)에 쓸 제공자 (기본값: --provider)")
+    parser.add_argument("--step1-model", default=None, help="Step 1(문체 분석)에 쓸 모델")
+    parser.add_argument("--keyword", "-k", default=None, help="키워드 (생성 시 필수)")
     parser.add_argument("--keyword-repeat", type=int, default=5, help="키워드 반복 횟수 (기본값: 5)")
+    parser.add_argument("--word-count", type=int, default=None, help="목표 글자수 (미지정 시 제한 없음)")
     parser.add_argument("--input-dir", "-d", default=None, help="첨부자료 디렉토리 (재귀)" )
     parser.add_argument("files", nargs="*", help="개별 파일 경로 또는 glob 패턴 (다중)")
     parser.add_argument("--out", "-o", default="blog_draft.txt", help="출력 파일 경로")
@@ -113,32 +360,117 @@ def main():
     parser.add_argument("--max-tokens", type=int, default=1600)
     parser.add_argument("--temperature", type=float, default=0.7)
     parser.add_argument("--debug", action="store_true", help="환경/설정 진단 정보 출력")
-    parser.add_argument("--writing-guide", "-g", required=True, help="주제 및 글쓰기 가이드 (톤앤매너, 필수 내용, 해시태그 등)")
+    parser.add_argument("--writing-guide", "-g", default=None, help="주제 및 글쓰기 가이드 (톤앤매너, 필수 내용, 해시태그 등, 생성 시 필수)")
+    parser.add_argument("--ping", action="store_true", help="연결/인증만 확인하고 종료 (모델 목록 API)")
+    parser.add_argument("--quick-chat-test", action="store_true", help="짧은 생성 요청으로 POST 경로/인증을 확인하고 종료")
+    parser.add_argument("--ref-dir", default=None, help="참고자료 라이브러리 폴더 (키워드/가이드와 관련된 글 자동 첨부)")
+    parser.add_argument("--include", action="append", default=None, help="첨부 디렉토리에서 포함할 파일 glob (반복 가능, 예: '*.md')")
+    parser.add_argument("--exclude", action="append", default=None, help=".gitignore 형식 제외 패턴 (반복 가능, 예: 'drafts/')")
+    parser.add_argument("--max-file-mb", type=float, default=50, help="이보다 큰 파일은 건너뜀 (기본값: 50MB)")
+    parser.add_argument("--walk-workers", type=int, default=1, help="디렉토리 병렬 탐색 스레드 수 (기본값: 1)")
+    parser.add_argument("--ref-top-k", type=int, default=5, help="자동 첨부할 참고자료 개수 (기본값: 5)")
+    parser.add_argument("--timeout", type=float, default=None, help="전체 생성 시간 제한(초). 넘기면 진행 중인 요청을 중단")
+    parser.add_argument("--profile", nargs="?", const="", default=None, metavar="PREFIX", help="단계별 시간 측정 + cProfile/flamegraph용 파일 저장 (기본 PREFIX: <출력>_profile)")
+    parser.add_argument("--compress", nargs="?", type=int, const=DEFAULT_COMPRESS_TOKENS, default=None, metavar="TOKENS", help=f"첨부자료를 핵심 문장만 남겨 문서당 TOKENS 토큰 이내로 요약 (기본값: {DEFAULT_COMPRESS_TOKENS})")
+    parser.add_argument("--style-mode", choices=STYLE_MODES, default="llm", help="Step 1 문체 분석 방식: llm(첨부 원문), profile(로컬 통계 프로필만 전송), local(Step 1 생략, 로컬 프로필로 가이드 작성)")
+    parser.add_argument("--reuse", action="store_true", help="이전 초안을 섹션 단위로 보관해, 같은 입력으로 다시 실행하면 가이드가 바뀐 섹션만 새로 작성 (공유 캐시 DB 사용)")
+    parser.add_argument("--sections", nargs="?", type=int, const=0, default=None, metavar="N", help="긴 글: 개요를 먼저 만들고 섹션 N개를 동시에 작성 (N 생략 시 목표 글자수로 결정)")
+    parser.add_argument("--dry-run", action="store_true", help="API 호출 없이 토큰/비용/소요 시간/컨텍스트 초과만 추정")
+    parser.add_argument("--log-file", default=None, help="레벨과 시각이 붙은 JSONL 로그 파일 (크기별 교체, 기본값: NB_LOG_FILE)")
+    parser.add_argument("--log-level", default=None, help="이 레벨 이상만 출력 (DEBUG/INFO/WARNING, 기본값: NB_LOG_LEVEL 또는 DEBUG)")
 
     args = parser.parse_args()
+    if args.log_file or args.log_level:
+        from .util.logs import configure as configure_logs
+        configure_logs(level=args.log_level, jsonl_path=args.log_file)
 
-    # sensible default models
-    model = args.model
-    if not model:
-        if args.provider == "openai":
-            model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-        else:
-            model = os.getenv("ANTHROPIC_MODEL", "claude-sonnet-4-5")
-
-    run(
-        provider=args.provider,
-        model=model,
-        keyword=args.keyword,
-        keyword_repeat=args.keyword_repeat,
-        input_dir=args.input_dir,
-        files=args.files,
-        out_path=args.out,
-        language=args.lang,
-        max_tokens=args.max_tokens,
-        temperature=args.temperature,
-        debug=args.debug,
-        writing_guide=args.writing_guide,
-    )
+    if args.ping or args.quick_chat_test:
+        load_env(verbose=args.debug)
+        client = create_client(args.provider)
+        try:
+            print(client.ping() if args.ping else client.quick_chat_test())
+        except RuntimeError as e:
+            print(str(e))
+            raise SystemExit(1)
+        return
+
+    if not args.keyword or not args.writing_guide:
+        parser.error("생성에는 --keyword/-k 와 --writing-guide/-g 가 필요합니다.")
+
+    walk_options = {
+        "include": args.include,
+        "exclude": args.exclude,
+        "max_size": int(args.max_file_mb * 1024 * 1024),
+        "workers": args.walk_workers,
+    }
+    if args.dry_run:
+        from .jobs import Job
+        from .planner import format_plan, plan_batch
+        job = Job(
+            keyword=args.keyword, writing_guide=args.writing_guide, out_path=None, keyword_repeat=args.keyword_repeat,
+            word_count=args.word_count, files=args.files, input_dir=args.input_dir, ref_dir=args.ref_dir,
+            ref_top_k=args.ref_top_k, provider=args.provider, model=args.model, step1_provider=args.step1_provider,
+            step1_model=args.step1_model, language=args.lang, max_tokens=args.max_tokens, temperature=args.temperature,
+            compress_tokens=args.compress, style_mode=args.style_mode, sections=args.sections, walk_options=walk_options,
+        )
+        for line in format_plan(plan_batch([("dry-run", job)], concurrency=1)):
+            print(line)
+        return
+
+    cancel = None
+    if args.timeout:
+        from .util.cancel import CancelToken
+        cancel = CancelToken()
+        cancel.set_deadline(args.timeout)
+
+    profiler = None
+    if args.profile is not None:
+        from .util.profiling import Profiler
+        profiler = Profiler().start()
+
+    draft_cache = None
+    if args.reuse:
+        from .util.disk_cache import DiskCache
+        from .util.draft_cache import DraftCache
+        draft_cache = DraftCache(DiskCache())
+
+    try:
+        run(
+            provider=args.provider,
+            model=args.model,
+            keyword=args.keyword,
+            keyword_repeat=args.keyword_repeat,
+            input_dir=args.input_dir,
+            files=args.files,
+            out_path=args.out,
+            language=args.lang,
+            max_tokens=args.max_tokens,
+            temperature=args.temperature,
+            debug=args.debug,
+            writing_guide=args.writing_guide,
+            word_count=args.word_count,
+            ref_dir=args.ref_dir,
+            ref_top_k=args.ref_top_k,
+            walk_options=walk_options,
+            cancel=cancel,
+            step1_provider=args.step1_provider,
+            step1_model=args.step1_model,
+            profiler=profiler,
+            compress_tokens=args.compress,
+            style_mode=args.style_mode,
+            sections=args.sections,
+            draft_cache=draft_cache,
+        )
+    finally:
+        from .util.logs import flush as flush_logs
+        flush_logs()
+        if profiler is not None:
+            profiler.stop()
+            for line in profiler.report():
+                print(line)
+            prefix = args.profile or os.path.splitext(args.out)[0] + "_profile"
+            for path in profiler.save(prefix):
+                print(f"[프로파일] 저장: {path}")
 
 
 if __name__ == "__main__":
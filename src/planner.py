@@ -0,0 +1,314 @@
+"""Offline dry-run planner: what a batch would cost before any API call.
+
+For every job it does what ``run()`` does up to the first request — collect
+and extract files, pick references, drop duplicates, cut or compress each
+attachment and build the Step 1 / Step 2 messages — then counts the
+input tokens with the model's tokenizer approximation (util.tokens). Output
+is projected from ``word_count`` (or a typical draft length) and the Step 1
+style guide length, both capped at ``max_tokens``. Jobs with the same
+attachments share one Step 1, as they do through the StyleCache; with
+``style_mode`` "profile" Step 1 reads the local stylometric profile and
+with "local" there is no Step 1 call (the guide is built here as in run()).
+Long-form jobs (``sections``) send the prefix with every outline and
+section request and take one outline plus one section of time. On a
+provider with ``prompt_caching`` the outline call writes that prefix to the
+cache and the section calls read it, priced at CACHE_WRITE_RATE and
+CACHE_READ_RATE of the input price.
+
+Wall time replays the jobs in submission order on ``concurrency`` slots,
+limited per provider by its ``max_concurrency``, each call taking
+FIRST_TOKEN_SECONDS plus its output at the throughput the timeout tracker
+has observed (or its default). Nothing here touches the network.
+"""
+import heapq
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .jobs import Job
+from .util.tokens import estimate_tokens
+
+# Step 1 answers are style guides of roughly this many tokens
+STYLE_PROMPT_TOKENS = 1200
+# Draft length assumed when a job sets no word_count (characters)
+DEFAULT_DRAFT_CHARS = 2500
+# Headings, hashtags and spacing on top of the requested character count
+DRAFT_OVERHEAD = 1.1
+# Chat formatting tokens per message
+MESSAGE_OVERHEAD = 4
+FIRST_TOKEN_SECONDS = 2.0
+# Long-form outline answer per section (one short line each)
+OUTLINE_TOKENS_PER_SECTION = 40
+# Prompt cache pricing relative to input tokens (Anthropic: writes +25%, reads 10%),
+# and the shortest prefix the provider caches at all
+CACHE_WRITE_RATE = 1.25
+CACHE_READ_RATE = 0.1
+CACHE_MIN_TOKENS = 1024
+# Representative draft text for tokens-per-character of Korean output
+_KOREAN_SAMPLE = "주말에 금오산 근처 맛집을 다녀왔어요! 분위기도 좋고 가격도 착해서 추천합니다. #구미맛집 #금오산"
+
+# USD per million (input, output) tokens; longest matching model prefix wins
+PRICES_PER_MTOK: Dict[str, Tuple[float, float]] = {
+    "claude-opus-4-5": (5.0, 25.0),
+    "claude-opus": (15.0, 75.0),
+    "claude-sonnet": (3.0, 15.0),
+    "claude-3-7-sonnet": (3.0, 15.0),
+    "claude-3-5-sonnet": (3.0, 15.0),
+    "claude-haiku": (1.0, 5.0),
+    "claude-3-5-haiku": (0.8, 4.0),
+    "gpt-4o-mini": (0.15, 0.6),
+    "gpt-4o": (2.5, 10.0),
+    "gpt-4.1-nano": (0.1, 0.4),
+    "gpt-4.1-mini": (0.4, 1.6),
+    "gpt-4.1": (2.0, 8.0),
+    "gpt-5-nano": (0.05, 0.4),
+    "gpt-5-mini": (0.25, 2.0),
+    "gpt-5": (1.25, 10.0),
+    "o4-mini": (1.1, 4.4),
+    "o3": (2.0, 8.0),
+}
+
+
+def model_price(provider: str, model: str) -> Optional[Tuple[float, float]]:
+    """(input, output) USD per million tokens, (0, 0) for local servers, None if unknown."""
+    if provider == "local":
+        return (0.0, 0.0)
+    matches = [p for p in PRICES_PER_MTOK if model.startswith(p)]
+    return PRICES_PER_MTOK[max(matches, key=len)] if matches else None
+
+
+class _Counter:
+    """Token counts per model, remembering long texts (attachment blocks repeat across jobs)."""
+
+    def __init__(self) -> None:
+        self._cache: Dict[Tuple[str, str], int] = {}
+
+    def text(self, text: str, model: str) -> int:
+        if len(text) < 2000:
+            return estimate_tokens(text, model)
+        key = (model, text)
+        n = self._cache.get(key)
+        if n is None:
+            n = self._cache[key] = estimate_tokens(text, model)
+        return n
+
+    def messages(self, messages: List[Dict[str, Any]], model: str) -> int:
+        total = 0
+        for m in messages:
+            content = m["content"]
+            # Prompts: count the shared segments once, not the joined copy
+            parts = getattr(content, "parts", None) or (content,)
+            total += MESSAGE_OVERHEAD + sum(self.text(getattr(p, "text", p), model) for p in parts)
+        return total
+
+
+def draft_tokens(word_count: Optional[int], model: str) -> int:
+    chars = (word_count or DEFAULT_DRAFT_CHARS) * DRAFT_OVERHEAD
+    return int(chars * estimate_tokens(_KOREAN_SAMPLE, model) / len(_KOREAN_SAMPLE))
+
+
+def plan_job(job: Job, counter: Optional[_Counter] = None, log: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+    """Tokens and Step 1 cache key of one job, computed like ``run()`` but offline."""
+    from .main import default_model
+    from .prompt_builder import prompt_builder
+    from .providers.registry import capabilities
+    from .util.file_loader import dedup_attachments, limit_attachments, load_attachments
+    from .util.style_cache import style_cache_key
+
+    counter = counter or _Counter()
+    model = job.model or default_model(job.provider)
+    step1_provider = job.step1_provider or job.provider
+    step1_model = job.step1_model or (model if step1_provider == job.provider else default_model(step1_provider))
+
+    files = list(job.files)
+    if job.ref_dir and job.ref_top_k > 0:
+        from .util.ref_index import select_references
+        query = "\n".join(part for part in (job.keyword, job.writing_guide) if part)
+        files += select_references(job.ref_dir, query, job.ref_top_k, exclude=job.files, log=log)
+    attachments = load_attachments(job.input_dir, files, **(job.walk_options or {})) if files else []
+    attachments, _ = dedup_attachments(attachments, billed_chars=12000)
+    limited = limit_attachments(attachments, compress_tokens=job.compress_tokens)
+    prompts = prompt_builder(limited)
+
+    style_key = style_cache_key(step1_provider, step1_model, limited)
+    style_tokens = min(job.max_tokens, STYLE_PROMPT_TOKENS)
+    step1_messages = prompts.meta_messages()
+    if job.style_mode != "llm":
+        from .prompt_templates import build_profile_meta_prompt
+        from .util.stylometry import analyze_style, format_profile, local_style_guide
+        profile = analyze_style(attachments)
+        if job.style_mode == "local":
+            style_key = None
+            style_tokens = estimate_tokens(local_style_guide(profile), model)
+            step1_messages = []
+        else:
+            style_key = style_cache_key(step1_provider, step1_model, attachments, mode="profile")
+            step1_messages = build_profile_meta_prompt(format_profile(profile))
+    step2_output = min(job.max_tokens, draft_tokens(job.word_count, model))
+    step1_input = counter.messages(step1_messages, step1_model)
+    step1_output = min(job.max_tokens, STYLE_PROMPT_TOKENS) if step1_messages else 0
+    # The style guide isn't known yet: count the template and add its projected length
+    final = prompts.final_messages("", job.keyword, job.keyword_repeat, job.writing_guide, job.word_count)
+    step2_input = step2_largest = counter.messages(final, model) + style_tokens
+    sections = outline_tokens = cache_write = cache_read = 0
+    if job.sections is not None:
+        from .longform import OUTLINE_MAX_TOKENS, section_count
+        from .prompt_templates import outline_instructions, section_instructions
+        from .util.draft_cache import guide_items
+        sections = job.sections or section_count(job.word_count)
+        outline = [(f"섹션 {i}", "") for i in range(1, sections + 1)]
+        requests = [outline_instructions(job.keyword, sections, job.word_count, guide_items(job.writing_guide))]
+        requests += [section_instructions(outline, i, job.keyword, 1, job.word_count) for i in range(sections)]
+        inputs = [counter.messages(prompts.longform_messages("", job.writing_guide, r), model) + style_tokens for r in requests]
+        step2_input, step2_largest = sum(inputs), max(inputs)
+        outline_tokens = min(job.max_tokens, OUTLINE_MAX_TOKENS, OUTLINE_TOKENS_PER_SECTION * sections)
+        step2_output += outline_tokens
+        prefix = counter.messages(prompts.longform_messages("", job.writing_guide, ""), model) + style_tokens
+        if capabilities(job.provider).prompt_caching and prefix >= CACHE_MIN_TOKENS:
+            # The outline request writes the prefix, every section request reads it
+            cache_write, cache_read = prefix, prefix * sections
+
+    overflow = []
+    for step, provider, tokens in ((1, step1_provider, step1_input), (2, job.provider, step2_largest)):
+        if not tokens:
+            continue
+        limit = capabilities(provider).context_tokens
+        if tokens + job.max_tokens > limit:
+            overflow.append({"step": step, "tokens": tokens + job.max_tokens, "limit": limit})
+    return {
+        "provider": job.provider, "model": model, "step1_provider": step1_provider, "step1_model": step1_model,
+        # None: no Step 1 call (style_mode "local")
+        "attachments": len(limited), "style_key": style_key,
+        "step1": {"input_tokens": step1_input, "output_tokens": step1_output},
+        # cache_*: parts of input_tokens billed at the prompt cache rates
+        "step2": {"input_tokens": step2_input, "output_tokens": step2_output, "cache_write_tokens": cache_write, "cache_read_tokens": cache_read},
+        "overflow": overflow,
+        # Long-form: sections written in parallel after an outline of outline_tokens
+        "sections": sections, "outline_tokens": outline_tokens,
+    }
+
+
+def _call_seconds(model: str, output_tokens: int) -> float:
+    from .providers.timeouts import DEFAULT_TOKENS_PER_SEC, TRACKER
+    return FIRST_TOKEN_SECONDS + output_tokens / (TRACKER.tokens_per_sec(model) or DEFAULT_TOKENS_PER_SEC)
+
+
+def _simulate(plans: List[Dict[str, Any]], concurrency: int) -> float:
+    """Makespan of the jobs run first-come first-served on ``concurrency`` slots per provider limit."""
+    from .providers.registry import capabilities
+
+    finish_by_provider: Dict[str, List[float]] = {}
+    end = 0.0
+    for plan in plans:
+        lanes = finish_by_provider.setdefault(plan["provider"], [])
+        limit = min(concurrency, capabilities(plan["provider"]).max_concurrency or concurrency)
+        start = heapq.heappop(lanes) if len(lanes) >= limit else 0.0
+        done = start + plan["seconds"]
+        heapq.heappush(lanes, done)
+        end = max(end, done)
+    return end
+
+
+def plan_batch(
+    jobs: List[Tuple[str, Job]],
+    concurrency: int = 2,
+    invalid: Optional[List[Tuple[str, str]]] = None,
+    log: Optional[Callable[[str], None]] = None,
+) -> Dict[str, Any]:
+    """Plan ``(request id, job)`` pairs; returns totals, per-job plans and context overflows."""
+    t0 = time.perf_counter()
+    counter = _Counter()
+    plans: List[Dict[str, Any]] = []
+    failed: List[Tuple[str, str]] = list(invalid or [])
+    seen_styles: set = set()
+    totals = {"input_tokens": 0, "output_tokens": 0, "cache_read_tokens": 0}
+    cost = 0.0
+    unpriced: set = set()
+    for rid, job in jobs:
+        try:
+            plan = plan_job(job, counter, log)
+        except Exception as e:
+            failed.append((rid, f"{type(e).__name__}: {e}"))
+            continue
+        plan["request_id"] = rid
+        # Later jobs with the same attachments reuse the first one's Step 1
+        local = plan["style_key"] is None
+        plan["step1_cached"] = not local and plan["style_key"] in seen_styles
+        if not local:
+            seen_styles.add(plan["style_key"])
+        step2 = plan["step2"]
+        if plan["sections"]:
+            # Outline, then the sections side by side
+            section = (step2["output_tokens"] - plan["outline_tokens"]) / plan["sections"]
+            step2_seconds = _call_seconds(plan["model"], plan["outline_tokens"]) + _call_seconds(plan["model"], section)
+        else:
+            step2_seconds = _call_seconds(plan["model"], step2["output_tokens"])
+        calls = [(step2, plan["provider"], plan["model"], step2_seconds)]
+        if not local and not plan["step1_cached"]:
+            step1 = plan["step1"]
+            calls.append((step1, plan["step1_provider"], plan["step1_model"], _call_seconds(plan["step1_model"], step1["output_tokens"])))
+        plan["seconds"] = 0.0
+        plan["cost"] = 0.0
+        for tokens, provider, model, seconds in calls:
+            written, read = tokens.get("cache_write_tokens", 0), tokens.get("cache_read_tokens", 0)
+            totals["input_tokens"] += tokens["input_tokens"]
+            totals["output_tokens"] += tokens["output_tokens"]
+            totals["cache_read_tokens"] += read
+            plan["seconds"] += seconds
+            price = model_price(provider, model)
+            if price is None:
+                unpriced.add(model)
+                continue
+            billed_input = tokens["input_tokens"] - written - read + written * CACHE_WRITE_RATE + read * CACHE_READ_RATE
+            plan["cost"] += (billed_input * price[0] + tokens["output_tokens"] * price[1]) / 1e6
+        cost += plan["cost"]
+        plans.append(plan)
+    return {
+        "jobs": plans,
+        "failed": failed,
+        "total": len(jobs) + len(invalid or []),
+        "step1_calls": len(seen_styles),
+        "usage": totals,
+        "cost": cost,
+        "unpriced": sorted(unpriced),
+        "concurrency": concurrency,
+        "wall_seconds": _simulate(plans, concurrency),
+        "overflow": [(p["request_id"], p["overflow"]) for p in plans if p["overflow"]],
+        "elapsed": time.perf_counter() - t0,
+    }
+
+
+def _duration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def format_plan(summary: Dict[str, Any], limit: int = 10) -> List[str]:
+    """Korean report of a ``plan_batch`` summary."""
+    plans = summary["jobs"]
+    usage = summary["usage"]
+    lines = [
+        f"[계획] 작업 {summary['total']}건 (계산 {len(plans)}, 오류 {len(summary['failed'])}), "
+        f"Step 1 호출 {summary['step1_calls']}회 (첨부자료 세트별 1회)",
+        f"  예상 토큰: 입력 약 {usage['input_tokens']:,} / 출력 약 {usage['output_tokens']:,}",
+    ]
+    cost = f"  예상 비용: 약 ${summary['cost']:,.2f}"
+    if usage.get("cache_read_tokens"):
+        cost += f" (프롬프트 캐시 읽기 약 {usage['cache_read_tokens']:,} 토큰 할인 반영)"
+    if summary["unpriced"]:
+        cost += f" (가격 정보 없는 모델 제외: {', '.join(summary['unpriced'])})"
+    lines.append(cost)
+    if plans:
+        per_job = sorted(p["seconds"] for p in plans)
+        lines.append(
+            f"  예상 소요: 약 {_duration(summary['wall_seconds'])} (동시 실행 {summary['concurrency']}, "
+            f"작업당 중앙값 {per_job[len(per_job) // 2]:.0f}초)"
+        )
+    if summary["overflow"]:
+        lines.append(f"  [경고] 컨텍스트 초과 가능 {len(summary['overflow'])}건:")
+        for rid, steps in summary["overflow"][:limit]:
+            detail = ", ".join(f"Step {o['step']} 입력+출력 약 {o['tokens']:,} > 한도 {o['limit']:,}" for o in steps)
+            lines.append(f"    - {rid}: {detail} 토큰")
+    for rid, error in summary["failed"][:limit]:
+        lines.append(f"  - {rid}: {error}")
+    lines.append(f"  (추정 {summary['elapsed']:.1f}초, 네트워크 요청 없음)")
+    return lines
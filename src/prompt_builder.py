@@ -0,0 +1,74 @@
+"""Prompt assembly that reuses formatted, JSON-encoded segments.
+
+PromptBuilder formats an attachment set once into a Segment shared by the
+Step 1 and Step 2 messages, and builders are cached per attachment set, so
+both passes of a job and every job with the same attachments reuse one
+block whose JSON encoding is computed once. Messages are equal to
+``build_meta_prompt`` / ``build_final_prompt`` output; providers splice the
+cached fragments into the request body (``util.json_segments.dumps_payload``).
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from .prompt_templates import (
+    META_SYSTEM_PROMPT, META_USER_PREFIX, final_prompt_head, format_attachments, longform_prefix,
+)
+from .util.json_segments import Prompt, Segment
+
+# Attachment sets whose builders are kept (each holds a few copies of its block)
+BUILDER_CACHE_SIZE = 4
+
+META_SYSTEM = Segment(META_SYSTEM_PROMPT)
+META_PREFIX = Segment(META_USER_PREFIX)
+
+_BUILDERS: "OrderedDict[Tuple, PromptBuilder]" = OrderedDict()
+_BUILDERS_LOCK = threading.Lock()
+
+
+class PromptBuilder:
+    def __init__(self, attachments: List[Tuple[str, str]], max_chars_per_doc: int = 12000) -> None:
+        self.block = Segment(format_attachments(attachments, max_chars_per_doc))
+        self._meta: Optional[Tuple[Prompt, Prompt]] = None
+
+    @property
+    def attachments_block(self) -> str:
+        return self.block.text
+
+    def meta_messages(self) -> List[Dict[str, str]]:
+        """Step 1 messages (see ``build_meta_prompt``)."""
+        if self._meta is None:
+            self._meta = (Prompt([META_SYSTEM]), Prompt([META_PREFIX, self.block]))
+        system, user = self._meta
+        return [{"role": "system", "content": system}, {"role": "user", "content": user}]
+
+    def final_messages(
+        self, style_prompt: str, keyword: str, keyword_repeat: int, writing_guide: Optional[str] = None,
+        word_count: Optional[int] = None,
+    ) -> List[Dict[str, str]]:
+        """Step 2 messages (see ``build_final_prompt``)."""
+        head = final_prompt_head(style_prompt, keyword, keyword_repeat, writing_guide, word_count)
+        return [{"role": "user", "content": Prompt([head, self.block, "\n"])}]
+
+    def longform_messages(self, style_prompt: str, writing_guide: Optional[str], instructions: str) -> List[Dict[str, str]]:
+        """Long-form Step 2 messages: a prefix shared by every call (cacheable), then ``instructions``."""
+        head = longform_prefix(style_prompt, writing_guide)
+        return [{"role": "user", "content": Prompt([head, self.block, "\n\n", instructions], cached_parts=3)}]
+
+
+def prompt_builder(attachments: List[Tuple[str, str]], max_chars_per_doc: int = 12000) -> PromptBuilder:
+    """Cached PromptBuilder for ``attachments`` (same paths and contents, same order)."""
+    # str hashes are cached on the object, so re-keying the same attachments is cheap
+    key = (max_chars_per_doc, tuple((path, len(content), hash(content)) for path, content in attachments))
+    with _BUILDERS_LOCK:
+        builder = _BUILDERS.get(key)
+        if builder is not None:
+            _BUILDERS.move_to_end(key)
+            return builder
+    builder = PromptBuilder(attachments, max_chars_per_doc)
+    with _BUILDERS_LOCK:
+        builder = _BUILDERS.setdefault(key, builder)
+        _BUILDERS.move_to_end(key)
+        while len(_BUILDERS) > BUILDER_CACHE_SIZE:
+            _BUILDERS.popitem(last=False)
+    return builder
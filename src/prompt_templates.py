@@ -3,16 +3,22 @@ from typing import List, Tuple
 
 def format_attachments(attachments: List[Tuple[str, str]], max_chars_per_doc: int = 12000) -> str:
     """첨부자료를 마크다운 블록으로 포맷팅"""
-    blocks = []
+    # One join over references to the documents instead of an f-string copy per document
+    parts: List[str] = []
     for idx, (path, content) in enumerate(attachments, start=1):
-        snippet = content if len(content) <= max_chars_per_doc else content[:max_chars_per_doc] + "\n...[truncated]"
-        blocks.append(f"[자료 {idx}] {path}\n```\n{snippet}\n```")
-    return "\n\n".join(blocks)
+        if parts:
+            parts.append("\n\n")
+        parts.append(f"[자료 {idx}] {path}\n```\n")
+        if len(content) <= max_chars_per_doc:
+            parts.append(content)
+        else:
+            parts.append(content[:max_chars_per_doc])
+            parts.append("\n...[truncated]")
+        parts.append("\n```")
+    return "".join(parts)
 
 
-def build_meta_prompt(attachments_block: str) -> list[dict[str, str]]:
-    """Step 1: 첨부문서의 문체를 분석하여 재현 가능한 스타일 가이드 생성"""
-    system_prompt = """당신은 블로그 글의 문체를 정밀하게 분석하고, 동일한 스타일로 글을 작성할 수 있는 스타일 가이드를 생성하는 전문가입니다.
+META_SYSTEM_PROMPT = """당신은 블로그 글의 문체를 정밀하게 분석하고, 동일한 스타일로 글을 작성할 수 있는 스타일 가이드를 생성하는 전문가입니다.
 
 제공된 블로그 글들을 분석하여 다음 요소들을 파악하고, 구체적인 작성 가이드라인을 만들어주세요:
 
@@ -65,34 +71,126 @@ def build_meta_prompt(attachments_block: str) -> list[dict[str, str]]:
 ## 피해야 할 표현
 [이 블로거가 사용하지 않는 표현들]"""
 
+META_USER_PREFIX = "다음 블로그 글들을 분석하여 이 블로거만의 스타일 가이드를 만들어주세요.\n\n"
+
+
+def build_meta_prompt(attachments_block: str) -> list[dict[str, str]]:
+    """Step 1: 첨부문서의 문체를 분석하여 재현 가능한 스타일 가이드 생성"""
     return [
         {
             "role": "system",
-            "content": system_prompt
+            "content": META_SYSTEM_PROMPT
         },
         {
             "role": "user",
-            "content": f"다음 블로그 글들을 분석하여 이 블로거만의 스타일 가이드를 만들어주세요.\n\n{attachments_block}"
+            "content": META_USER_PREFIX + attachments_block
         }
     ]
 
 
-def build_final_prompt(style_prompt: str, keyword: str, keyword_repeat: int, attachments_block: str, writing_guide: str | None = None) -> list[dict[str, str]]:
-    """Step 2: 최종 블로그 생성 프롬프트"""
+PROFILE_USER_PREFIX = (
+    "다음은 한 블로거의 글 전체를 로컬에서 통계 분석한 문체 프로필입니다. "
+    "원문 대신 이 수치와 대표 문장을 근거로 이 블로거만의 스타일 가이드를 만들어주세요.\n\n"
+)
+
 
+def build_profile_meta_prompt(profile_text: str) -> list[dict[str, str]]:
+    """Step 1 (style_mode "profile"): 원문 대신 로컬 문체 프로필로 스타일 가이드 생성"""
+    return [
+        {
+            "role": "system",
+            "content": META_SYSTEM_PROMPT
+        },
+        {
+            "role": "user",
+            "content": PROFILE_USER_PREFIX + profile_text
+        }
+    ]
+
+
+def final_prompt_head(style_prompt: str, keyword: str, keyword_repeat: int, writing_guide: str | None = None, word_count: int | None = None) -> str:
+    """Step 2 user message up to (not including) the attachments block."""
     # 글쓰기 가이드 섹션 (필수)
     guide_section = ""
     if writing_guide:
         guide_section = f"\n[주제 및 작성 가이드]\n{writing_guide}\n"
 
-    user_content = f"""[작성 스타일]
+    # 목표 분량 (선택)
+    length_line = f"공백 포함 약 {word_count}자 분량으로 작성해줘.\n" if word_count else ""
+
+    return f"""[작성 스타일]
 {style_prompt}
 {guide_section}
 위 주제와 가이드에 맞춰 블로그 글을 작성해줘.
-["{keyword}"]는 {keyword_repeat}회 반복해줘.
+{length_line}["{keyword}"]는 {keyword_repeat}회 반복해줘.
 첨부문서 형태소를 분석해서 가장 많이 사용된 단어 10개를 선택해서 적절하게 사용해.
 
 [첨부자료]
-{attachments_block}
 """
-    return [{"role": "user", "content": user_content}]
+
+
+def longform_prefix(style_prompt: str, writing_guide: str | None = None) -> str:
+    """Long-form Step 2 requests: the part shared by the outline and every section, up to the attachments block."""
+    guide_section = f"\n[주제 및 작성 가이드]\n{writing_guide}\n" if writing_guide else ""
+    return f"""[작성 스타일]
+{style_prompt}
+{guide_section}
+[첨부자료]
+"""
+
+
+def outline_instructions(keyword: str, sections: int, word_count: int | None = None, guide_items: list[str] | None = None) -> str:
+    """Long-form: 섹션 개요 요청 (한 줄에 한 섹션, 섹션별로 반영할 가이드 항목 번호 포함)"""
+    length = f"공백 포함 약 {word_count}자 분량의 " if word_count else ""
+    lines = [
+        f"위 스타일과 주제 가이드로 [\"{keyword}\"]에 대한 {length}블로그 글을 쓰기 전에 개요를 잡아줘.",
+        f"글을 {sections}개 섹션으로 나누고, 다른 말 없이 한 줄에 한 섹션씩 아래 형식으로만 답해줘.",
+    ]
+    if guide_items:
+        lines.append("1. 섹션 소제목 | 이 섹션에서 다룰 핵심 내용 한 줄 | 이 섹션에 반영할 가이드 항목 번호 (예: 1, 3)")
+        lines.append("글 전체에 해당하는 가이드 항목은 어느 섹션에도 적지 마.")
+    else:
+        lines.append("1. 섹션 소제목 | 이 섹션에서 다룰 핵심 내용 한 줄")
+    lines.append("첫 섹션은 도입부, 마지막 섹션은 마무리야.")
+    if guide_items:
+        lines.append("")
+        lines.append("[가이드 항목]")
+        lines.extend(f"{i}) {item}" for i, item in enumerate(guide_items, start=1))
+    return "\n".join(lines)
+
+
+def section_instructions(outline: list[tuple], index: int, keyword: str, keyword_repeat: int, word_count: int | None = None, guide_items: list[str] | None = None) -> str:
+    """Long-form: 개요 중 한 섹션만 작성 요청 (``guide_items``: 이 섹션에 반영할 가이드 항목)"""
+    title, points = outline[index][:2]
+    last = len(outline) - 1
+    lines = ["[전체 개요]"] + [f"{i}. {e[0]} | {e[1]}" if e[1] else f"{i}. {e[0]}" for i, e in enumerate(outline, start=1)]
+    lines.append("")
+    lines.append(f"위 개요 중 {index + 1}번 섹션 \"{title}\"만 블로그 글 본문으로 작성해줘." + (f" 다룰 내용: {points}" if points else ""))
+    if index == 0:
+        lines.append("글의 도입부야. 인사와 함께 글을 소개하며 시작해줘.")
+    elif index == last:
+        lines.append("글의 마무리야. 인사말 없이 이어서 쓰고, 전체를 정리한 뒤 해시태그가 필요하면 맨 끝에 넣어줘.")
+    else:
+        lines.append("글의 중간 부분이야. 인사말, 마무리 인사, 해시태그는 넣지 마.")
+    if index > 0:
+        lines.append(f"앞 섹션 \"{outline[index - 1][0]}\"에서 자연스럽게 이어지는 문장으로 시작해줘.")
+    if index < last:
+        lines.append(f"끝부분은 다음 섹션 \"{outline[index + 1][0]}\"으로 넘어가는 흐름을 남겨줘.")
+    if word_count:
+        lines.append(f"이 섹션은 공백 포함 약 {word_count}자 분량으로 작성해줘.")
+    if keyword_repeat > 0:
+        lines.append(f"[\"{keyword}\"]는 이 섹션에서 {keyword_repeat}회 사용해줘.")
+    else:
+        lines.append(f"[\"{keyword}\"]는 이 섹션에서 반복하지 않아도 돼.")
+    if guide_items:
+        lines.append("이 섹션에서 특히 반영할 가이드 항목:")
+        lines.extend(f"- {item}" for item in guide_items)
+    lines.append("첨부문서에서 가장 많이 사용된 단어들을 적절하게 사용해.")
+    lines.append("섹션 소제목 한 줄로 시작하고, 다른 섹션의 내용은 쓰지 마.")
+    return "\n".join(lines)
+
+
+def build_final_prompt(style_prompt: str, keyword: str, keyword_repeat: int, attachments_block: str, writing_guide: str | None = None, word_count: int | None = None) -> list[dict[str, str]]:
+    """Step 2: 최종 블로그 생성 프롬프트"""
+    head = final_prompt_head(style_prompt, keyword, keyword_repeat, writing_guide, word_count)
+    return [{"role": "user", "content": head + attachments_block + "\n"}]
@@ -1,32 +1,57 @@
 import os
+from typing import Any, Dict, List, Optional
+
 import requests
-from typing import List, Dict, Optional
 
+from .base import Capabilities, Provider
+
+
+class AnthropicClient(Provider):
+    name = "anthropic"
+    label = "Anthropic"
+    api_key_env = "ANTHROPIC_API_KEY"
+    base_url_env = "ANTHROPIC_BASE_URL"
+    default_base_url = "https://api.anthropic.com"
+    model_env = "ANTHROPIC_MODEL"
+    fallback_model = "claude-sonnet-4-5"
+    chat_path = "/v1/messages"
+    capabilities = Capabilities(
+        streaming=True, prompt_caching=True, context_tokens=200000, max_concurrency=4,
+    )
 
-class AnthropicClient:
     def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None, api_version: Optional[str] = None):
-        self.api_key = api_key or os.getenv("ANTHROPIC_API_KEY", "")
-        self.base_url = (base_url or os.getenv("ANTHROPIC_BASE_URL") or "https://api.anthropic.com").rstrip("/")
+        super().__init__(api_key, base_url)
         self.api_version = api_version or os.getenv("ANTHROPIC_API_VERSION", "2023-06-01")
-        if not self.api_key:
-            raise ValueError("ANTHROPIC_API_KEY is not set")
 
-    def chat(self, model: str, messages: List[Dict[str, str]], max_tokens: int = 1500, temperature: float = 0.7) -> str:
+    def _headers(self, json_body: bool = True) -> Dict[str, str]:
+        headers = {
+            "x-api-key": self.api_key,
+            "anthropic-version": self.api_version,
+        }
+        if json_body:
+            headers["content-type"] = "application/json"
+        return headers
+
+    def _payload(
+        self, model: str, messages: List[Dict[str, str]], max_tokens: int, temperature: float, stream: bool
+    ) -> Dict[str, Any]:
         # Convert OpenAI-style messages into Anthropic role/content format
         system_texts = [m["content"] for m in messages if m["role"] == "system"]
-        system = "\n\n".join(system_texts) if system_texts else None
+        # A single system message is passed through as-is (keeps its pre-encoded segments)
+        system = system_texts[0] if len(system_texts) == 1 else "\n\n".join(system_texts) or None
         conv = []
         for m in messages:
             if m["role"] in ("user", "assistant"):
-                conv.append({"role": m["role"], "content": m["content"]})
-
-        url = f"{self.base_url}/v1/messages"
-        headers = {
-            "x-api-key": self.api_key,
-            "anthropic-version": self.api_version,
-            "content-type": "application/json",
-        }
-        payload = {
+                content = m["content"]
+                # Shared prefix (e.g. long-form section requests) as a cached content block
+                if getattr(content, "cached_parts", 0):
+                    prefix, rest = content.split_cached()
+                    content = [
+                        {"type": "text", "text": prefix, "cache_control": {"type": "ephemeral"}},
+                        {"type": "text", "text": rest},
+                    ]
+                conv.append({"role": m["role"], "content": content})
+        payload: Dict[str, Any] = {
             "model": model,
             "max_tokens": max_tokens,
             "temperature": temperature,
@@ -34,105 +59,57 @@ class AnthropicClient:
         }
         if system:
             payload["system"] = system
-        try:
-            resp = requests.post(url, headers=headers, json=payload, timeout=(15, 300))
-            resp.raise_for_status()
-        except requests.exceptions.Timeout as e:
-            raise RuntimeError(
-                "Anthropic 요청 시간 초과: 네트워크/방화벽/프록시 설정을 확인하세요 (timeout 15s connect / 300s read)."
-            ) from e
-        except requests.exceptions.ConnectionError as e:
-            raise RuntimeError(
-                f"Anthropic 서버에 연결 실패: base_url={self.base_url}. 인터넷 연결과 프록시(HTTPS_PROXY) 설정을 확인하세요."
-            ) from e
-        except requests.exceptions.HTTPError as e:
-            text = resp.text[:500] if 'resp' in locals() and resp is not None else ''
-            status_code = resp.status_code if 'resp' in locals() else ''
+        if stream:
+            payload["stream"] = True
+        return payload
 
-            # Improved error message for 404 model not found
-            if status_code == 404 and 'not_found_error' in text:
-                raise RuntimeError(
-                    f"Anthropic API 오류 404: 모델을 찾을 수 없습니다.\n"
-                    f"사용 중인 모델: {model}\n"
-                    f"최신 모델명으로 변경하세요:\n"
-                    f"  - claude-sonnet-4-5 (최신 Claude 4.5, 자동 업데이트)\n"
-                    f"  - claude-haiku-4-5 (빠르고 저렴)\n"
-                    f"  - claude-3-7-sonnet-latest (Claude 3.7)\n"
-                    f"  - claude-3-5-sonnet-20241022 (이전 3.5 버전)\n"
-                    f".env 파일에서 ANTHROPIC_MODEL 환경변수를 설정하세요.\n"
-                    f"원본 오류: {text}"
-                ) from e
+    @staticmethod
+    def _input_tokens(u: Dict[str, Any]) -> int:
+        # Cache writes and reads are reported apart from input_tokens; count the whole prompt
+        return sum(int(u.get(k) or 0) for k in ("input_tokens", "cache_creation_input_tokens", "cache_read_input_tokens"))
 
-            raise RuntimeError(f"Anthropic API 오류 {status_code}: {text}") from e
-        data = resp.json()
+    def _parse_response(self, data: Dict[str, Any], call_usage: Dict[str, int]) -> str:
+        u = data.get("usage", {})
+        call_usage["input_tokens"] = self._input_tokens(u)
+        call_usage["output_tokens"] = int(u.get("output_tokens") or 0)
         # Concatenate content blocks
-        parts = data.get("content", [])
         texts = []
-        for p in parts:
+        for p in data.get("content", []):
             if p.get("type") == "text":
                 texts.append(p.get("text", ""))
-        return "".join(texts).strip()
-
-    def ping(self) -> str:
-        """Quick connectivity/auth check. Returns short diagnostic string or raises RuntimeError."""
-        url = f"{self.base_url}/v1/models"
-        headers = {
-            "x-api-key": self.api_key,
-            "anthropic-version": self.api_version,
-        }
-        try:
-            resp = requests.get(url, headers=headers, timeout=(10, 20))
-            if resp.status_code == 200:
-                return "OK: reachable"
-            return f"HTTP {resp.status_code}: {resp.text[:200]}"
-        except requests.exceptions.Timeout as e:
-            raise RuntimeError("Anthropic 연결/응답 시간 초과 (10/20s)") from e
-        except requests.exceptions.ConnectionError as e:
-            raise RuntimeError(f"Anthropic 연결 실패: base_url={self.base_url}") from e
-
-    def quick_chat_test(self) -> str:
-        """Minimal chat POST to verify POST path and auth on Anthropic."""
-        url = f"{self.base_url}/v1/messages"
-        headers = {
-            "x-api-key": self.api_key,
-            "anthropic-version": self.api_version,
-            "content-type": "application/json",
-        }
-        model_name = os.getenv("ANTHROPIC_MODEL", "claude-sonnet-4-5")
-        payload = {
-            "model": model_name,
-            "max_tokens": 10,
-            "temperature": 0,
-            "messages": [
-                {"role": "user", "content": "Reply with: OK"}
-            ],
-        }
-        try:
-            resp = requests.post(url, headers=headers, json=payload, timeout=(10, 30))
-            resp.raise_for_status()
-            data = resp.json()
-            parts = data.get("content", [])
-            text = "".join([p.get("text", "") for p in parts if p.get("type") == "text"]).strip()
-            return f"OK chat: {text[:50]}"
-        except requests.exceptions.Timeout as e:
-            raise RuntimeError("Anthropic chat POST 시간 초과 (10/30s)") from e
-        except requests.exceptions.ConnectionError as e:
-            raise RuntimeError("Anthropic chat POST 연결 실패") from e
-        except requests.exceptions.HTTPError as e:
-            text = resp.text[:500] if 'resp' in locals() and resp is not None else ''
-            status_code = resp.status_code if 'resp' in locals() else ''
+        return "".join(texts)
 
-            # Improved error message for 404 model not found
-            if status_code == 404 and 'not_found_error' in text:
-                return (
-                    f"HTTP 404: 모델을 찾을 수 없습니다.\n"
-                    f"사용 중인 모델: {model_name}\n"
-                    f"최신 모델명으로 변경하세요:\n"
-                    f"  - claude-sonnet-4-5 (최신 Claude 4.5, 자동 업데이트)\n"
-                    f"  - claude-haiku-4-5 (빠르고 저렴)\n"
-                    f"  - claude-3-7-sonnet-latest (Claude 3.7)\n"
-                    f".env 파일에서 ANTHROPIC_MODEL을 설정하세요.\n"
-                    f"원본 오류: {text[:200]}"
-                )
+    def _parse_event(self, event: Dict[str, Any], call_usage: Dict[str, int]) -> Optional[str]:
+        etype = event.get("type")
+        if etype == "content_block_delta":
+            delta = event.get("delta", {})
+            if delta.get("type") == "text_delta":
+                return delta.get("text", "")
+        elif etype == "message_start":
+            u = event.get("message", {}).get("usage", {})
+            call_usage["input_tokens"] = call_usage.get("input_tokens", 0) + self._input_tokens(u)
+            call_usage["output_tokens"] = call_usage.get("output_tokens", 0) + int(u.get("output_tokens") or 0)
+        elif etype == "message_delta":
+            call_usage["output_tokens"] = call_usage.get("output_tokens", 0) + int(
+                event.get("usage", {}).get("output_tokens") or 0
+            )
+        elif etype == "error":
+            raise RuntimeError(f"Anthropic 스트림 오류: {event.get('error')}")
+        return None
 
-            return f"HTTP {status_code}: {text[:200]}"
+    def _http_error(self, resp: requests.Response, model: str) -> RuntimeError:
+        text = resp.text[:500]
+        # Improved error message for 404 model not found
+        if resp.status_code == 404 and "not_found_error" in text:
+            return RuntimeError(
+                f"Anthropic API 오류 404: 모델을 찾을 수 없습니다.\n"
+                f"사용 중인 모델: {model}\n"
+                f"최신 모델명으로 변경하세요:\n"
+                f"  - claude-sonnet-4-5 (최신 Claude 4.5, 자동 업데이트)\n"
+                f"  - claude-haiku-4-5 (빠르고 저렴)\n"
+                f"  - claude-3-7-sonnet-latest (Claude 3.7)\n"
+                f"  - claude-3-5-sonnet-20241022 (이전 3.5 버전)\n"
+                f".env 파일에서 ANTHROPIC_MODEL 환경변수를 설정하세요.\n"
+                f"원본 오류: {text}"
+            )
+        return RuntimeError(f"Anthropic API 오류 {resp.status_code}: {text}")
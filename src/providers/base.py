@@ -0,0 +1,396 @@
+"""Common provider interface.
+
+Every provider talks to one HTTP chat endpoint. Provider implements what
+they share — deadlines, streaming, cancellation, usage accounting, health
+checks and error messages — and subclasses only describe their wire format
+through the ``_headers`` / ``_payload`` / ``_parse_*`` hooks.
+
+Requests go through one pooled ``requests.Session`` per base URL, shared
+by every client instance, so jobs after the first reuse an open
+keep-alive/TLS connection instead of paying the handshake again.
+"""
+import abc
+import os
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import requests
+import urllib3
+
+from . import singleflight, tape
+from .health import MONITOR
+from .streaming import abort_response, add_usage, iter_sse
+from .timeouts import TRACKER, Watchdog, request_timeouts
+from ..util.cancel import CancelToken, Cancelled
+from ..util.json_segments import dumps_payload
+
+
+@dataclass(frozen=True)
+class Capabilities:
+    """What a provider supports; ``run()``, the job queue and the planner read these."""
+
+    streaming: bool = True
+    # A repeated request prefix is billed at a discount (long-form sections; see planner)
+    prompt_caching: bool = False
+    context_tokens: int = 128000
+    max_concurrency: int = 4
+
+
+POOL_MAXSIZE = 16
+_SESSIONS: Dict[str, requests.Session] = {}
+_SESSIONS_LOCK = threading.Lock()
+
+
+def shared_session(base_url: str) -> requests.Session:
+    """Process-wide pooled session for ``base_url``."""
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.get(base_url)
+        if session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=POOL_MAXSIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _SESSIONS[base_url] = session
+        return session
+
+
+QUICK_TEST_MESSAGES = [
+    {"role": "system", "content": "You are a helpful assistant."},
+    {"role": "user", "content": "Reply with: OK"},
+]
+
+
+class Provider(abc.ABC):
+    name = ""
+    label = ""
+    api_key_env = ""
+    api_key_required = True
+    base_url_env = ""
+    default_base_url = ""
+    model_env = ""
+    fallback_model = ""
+    chat_path = ""
+    models_path = "/v1/models"
+    capabilities = Capabilities()
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None) -> None:
+        self.api_key = api_key or os.getenv(self.api_key_env, "")
+        self.base_url = (base_url or os.getenv(self.base_url_env) or self.default_base_url).rstrip("/")
+        if self.api_key_required and not self.api_key:
+            raise ValueError(f"{self.api_key_env} is not set")
+        self.session = shared_session(self.base_url)
+        self._usage: Dict[str, int] = {}
+        self._usage_lock = threading.Lock()
+
+    @classmethod
+    def default_model(cls) -> str:
+        return os.getenv(cls.model_env, cls.fallback_model)
+
+    @classmethod
+    def get_capabilities(cls) -> Capabilities:
+        return cls.capabilities
+
+    # Wire format hooks (a subclass missing one can't be constructed)
+    @abc.abstractmethod
+    def _headers(self, json_body: bool = True) -> Dict[str, str]:
+        ...
+
+    @abc.abstractmethod
+    def _payload(
+        self, model: str, messages: List[Dict[str, str]], max_tokens: int, temperature: float, stream: bool
+    ) -> Dict[str, Any]:
+        ...
+
+    @abc.abstractmethod
+    def _parse_response(self, data: Dict[str, Any], call_usage: Dict[str, int]) -> str:
+        """Text of a non-streaming response; token counts go into ``call_usage``."""
+
+    @abc.abstractmethod
+    def _parse_event(self, event: Dict[str, Any], call_usage: Dict[str, int]) -> Optional[str]:
+        """Text delta carried by one stream event, if any."""
+
+    def _http_error(self, resp: requests.Response, model: str) -> RuntimeError:
+        return RuntimeError(f"{self.label} API 오류 {resp.status_code}: {resp.text[:500]}")
+
+    # Interface
+    def chat(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int = 1500,
+        temperature: float = 0.7,
+        on_delta: Optional[Callable[[str], None]] = None,
+        cancel: Optional[CancelToken] = None,
+        usage: Optional[Dict[str, int]] = None,
+    ) -> str:
+        """Send a chat request and return the text.
+
+        With ``on_delta`` or ``cancel`` the response is streamed (when the
+        provider can): text deltas are passed to ``on_delta`` as they arrive
+        and ``cancel`` aborts the request in flight. Token usage is added to
+        ``usage`` if given. An identical request already in flight on another
+        thread is not sent again; its result is shared (singleflight).
+        """
+        if not singleflight.enabled():
+            return self._chat(model, messages, max_tokens, temperature, on_delta, cancel, usage)
+        key = self._flight_key(model, messages, max_tokens, temperature)
+        while True:
+            flight, leader = singleflight.FLIGHTS.join(key, self.name)
+            if leader:
+                return singleflight.lead(
+                    singleflight.FLIGHTS, key, flight,
+                    lambda: self._chat(model, messages, max_tokens, temperature, on_delta, cancel, usage),
+                )
+            text = singleflight.follow(flight, on_delta, cancel)
+            if text is not None:
+                return text
+
+    async def achat(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int = 1500,
+        temperature: float = 0.7,
+        on_delta: Optional[Callable[[str], None]] = None,
+        cancel: Optional[CancelToken] = None,
+        usage: Optional[Dict[str, int]] = None,
+    ) -> str:
+        """``chat`` for asyncio code.
+
+        A new request runs in the default executor (``on_delta`` is called
+        from that thread); waiting on an identical one in flight, from
+        either path, holds no thread.
+        """
+        import asyncio
+
+        def send() -> str:
+            return self._chat(model, messages, max_tokens, temperature, on_delta, cancel, usage)
+
+        if not singleflight.enabled():
+            return await asyncio.to_thread(send)
+        key = self._flight_key(model, messages, max_tokens, temperature)
+        while True:
+            flight, leader = singleflight.FLIGHTS.join(key, self.name)
+            if leader:
+                return await asyncio.to_thread(singleflight.lead, singleflight.FLIGHTS, key, flight, send)
+            text = await singleflight.afollow(flight, on_delta, cancel)
+            if text is not None:
+                return text
+
+    def _flight_key(self, model: str, messages: List[Dict[str, str]], max_tokens: int, temperature: float) -> str:
+        # The non-streaming body: a streamed and a plain request for the same prompt share one call
+        body = dumps_payload(self._payload(model, messages, max_tokens, temperature, False))
+        return singleflight.request_key(self.name, self.base_url + self.chat_path, self.api_key, body)
+
+    def _chat(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float,
+        on_delta: Optional[Callable[[str], None]],
+        cancel: Optional[CancelToken],
+        usage: Optional[Dict[str, int]],
+    ) -> str:
+        recorder = tape.active()
+        if recorder is None:
+            return self._send(model, messages, max_tokens, temperature, on_delta, cancel, usage)
+        # Comparison harness: record this call's timings, or answer from a recording
+        body = dumps_payload(self._payload(model, messages, max_tokens, temperature, False))
+        return recorder.call(
+            self.name, model, body, on_delta, usage,
+            lambda delta, call_usage: self._send(model, messages, max_tokens, temperature, delta, cancel, call_usage),
+        )
+
+    def _send(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float,
+        on_delta: Optional[Callable[[str], None]],
+        cancel: Optional[CancelToken],
+        usage: Optional[Dict[str, int]],
+    ) -> str:
+        if self.get_capabilities().streaming and (on_delta is not None or cancel is not None):
+            texts: List[str] = []
+            for text in self.stream(model, messages, max_tokens, temperature, cancel=cancel, usage=usage):
+                texts.append(text)
+                if on_delta:
+                    on_delta(text)
+            return "".join(texts).strip()
+        resp, started, _ = self._post(model, messages, max_tokens, temperature, False, cancel)
+        call_usage: Dict[str, int] = {}
+        text = self._parse_response(resp.json(), call_usage).strip()
+        self._record(model, usage, call_usage, started)
+        if cancel:
+            cancel.check()
+        if on_delta and text:
+            on_delta(text)
+        return text
+
+    def stream(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int = 1500,
+        temperature: float = 0.7,
+        cancel: Optional[CancelToken] = None,
+        usage: Optional[Dict[str, int]] = None,
+    ) -> Iterator[str]:
+        """Yield text deltas as they arrive."""
+        resp, started, deadline = self._post(model, messages, max_tokens, temperature, True, cancel)
+        call_usage: Dict[str, int] = {}
+        unregister = cancel.register(lambda: abort_response(resp)) if cancel else None
+        watchdog = Watchdog(max(0.0, started + deadline - time.monotonic()), lambda: abort_response(resp))
+        completed = False
+        try:
+            for event in iter_sse(resp):
+                if cancel:
+                    cancel.check()
+                text = self._parse_event(event, call_usage)
+                if text:
+                    yield text
+            # An abort can also surface as a clean EOF
+            completed = not watchdog.expired and not (cancel and cancel.cancelled)
+        except Cancelled:
+            raise
+        except Exception as e:
+            if cancel and cancel.cancelled:
+                raise cancel.error() from e
+            if watchdog.expired:
+                raise self._stream_timeout(watchdog, cancel) from e
+            # Raw reads surface urllib3's own exceptions, not requests' wrappers
+            if isinstance(e, (requests.exceptions.Timeout, urllib3.exceptions.TimeoutError, socket.timeout)):
+                if cancel and cancel.remaining() == 0:
+                    cancel.wait(1.0)
+                    raise cancel.error() from e
+                raise RuntimeError(f"{self.label} 응답 시간 초과: 응답이 멈춰 요청을 중단했습니다 ({e}).") from e
+            if isinstance(e, (requests.exceptions.RequestException, urllib3.exceptions.HTTPError)):
+                raise RuntimeError(f"{self.label} 응답 수신 중 연결이 끊어졌습니다: {e}") from e
+            raise
+        finally:
+            watchdog.stop()
+            if unregister:
+                unregister()
+            resp.close()
+            self._record(model, usage, call_usage, started if completed else None)
+        if cancel:
+            cancel.check()
+        if watchdog.expired:
+            raise self._stream_timeout(watchdog, cancel)
+
+    def usage(self) -> Dict[str, int]:
+        """Token totals of every call made through this client."""
+        with self._usage_lock:
+            return dict(self._usage)
+
+    def health(self) -> Dict[str, Any]:
+        """``ping()`` as ``{"ok", "latency", "detail"}`` instead of raising."""
+        t0 = time.perf_counter()
+        try:
+            detail = self.ping()
+            ok = detail.startswith("OK")
+        except RuntimeError as e:
+            detail, ok = str(e), False
+        return {"ok": ok, "latency": time.perf_counter() - t0, "detail": detail}
+
+    def ping(self) -> str:
+        """Quick connectivity/auth check. Returns short diagnostic string or raises RuntimeError."""
+        try:
+            resp = self.session.get(self.base_url + self.models_path, headers=self._headers(json_body=False), timeout=(10, 20))
+            if resp.status_code == 200:
+                return "OK: reachable"
+            return f"HTTP {resp.status_code}: {resp.text[:200]}"
+        except requests.exceptions.Timeout as e:
+            raise RuntimeError(f"{self.label} 연결/응답 시간 초과 (10/20s)") from e
+        except requests.exceptions.ConnectionError as e:
+            raise RuntimeError(f"{self.label} 연결 실패: base_url={self.base_url}") from e
+
+    def quick_chat_test(self) -> str:
+        """Minimal chat POST to verify the POST path and auth, with tight timeouts."""
+        model = self.default_model()
+        payload = self._payload(model, QUICK_TEST_MESSAGES, 10, 0, False)
+        try:
+            resp = self.session.post(
+                self.base_url + self.chat_path, headers=self._headers(), data=dumps_payload(payload), timeout=(10, 30)
+            )
+            resp.raise_for_status()
+            text = self._parse_response(resp.json(), {}).strip()
+            return f"OK chat: {text[:50]}"
+        except requests.exceptions.Timeout as e:
+            raise RuntimeError(f"{self.label} chat POST 시간 초과 (10/30s)") from e
+        except requests.exceptions.ConnectionError as e:
+            raise RuntimeError(f"{self.label} chat POST 연결 실패") from e
+        except requests.exceptions.HTTPError:
+            return str(self._http_error(resp, model))
+
+    # Shared plumbing
+    def _post(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float,
+        stream: bool,
+        cancel: Optional[CancelToken],
+    ) -> Tuple[requests.Response, float, float]:
+        # Serialized up front: large prompts carry pre-encoded JSON fragments
+        body = dumps_payload(self._payload(model, messages, max_tokens, temperature, stream))
+        # Shared per-provider budget (batch workers); ~3 UTF-8 bytes per token is a rough upper bound.
+        # Imported here: ratelimit pulls in sqlite3, which --ping and plain clients don't need
+        from .ratelimit import acquire as acquire_rate_limit
+        acquire_rate_limit(self.name, len(body) // 3, cancel)
+        # Deadline from max_tokens and this model's observed speed, capped by the job's time left
+        remaining = cancel.remaining() if cancel else None
+        timeout, deadline = request_timeouts(model, max_tokens, stream, remaining)
+        if cancel:
+            cancel.check()
+        started = time.monotonic()
+        try:
+            resp = self.session.post(
+                self.base_url + self.chat_path, headers=self._headers(), data=body, timeout=timeout, stream=stream
+            )
+            # Only server-side failures count against the endpoint's health
+            MONITOR.record(self.name, resp.status_code < 500 and resp.status_code != 429, time.monotonic() - started)
+            resp.raise_for_status()
+        except requests.exceptions.Timeout as e:
+            if cancel and cancel.remaining() == 0:
+                # The job deadline capped this request; let its timer report it
+                cancel.wait(1.0)
+                raise cancel.error() from e
+            MONITOR.record(self.name, False, time.monotonic() - started, f"timeout: {e}")
+            raise RuntimeError(
+                f"{self.label} 요청 시간 초과: 네트워크/방화벽/프록시 설정을 확인하세요 "
+                f"(timeout {timeout[0]:.0f}s connect / {timeout[1]:.0f}s read, max_tokens={max_tokens})."
+            ) from e
+        except requests.exceptions.ConnectionError as e:
+            MONITOR.record(self.name, False, time.monotonic() - started, f"connection: {e}")
+            raise RuntimeError(
+                f"{self.label} 서버에 연결 실패: base_url={self.base_url}. 인터넷 연결과 프록시(HTTPS_PROXY) 설정을 확인하세요."
+            ) from e
+        except requests.exceptions.HTTPError as e:
+            raise self._http_error(resp, model) from e
+        return resp, started, deadline
+
+    def _record(
+        self, model: str, usage: Optional[Dict[str, int]], call_usage: Dict[str, int], started: Optional[float]
+    ) -> None:
+        """Add one call's tokens to ``usage`` and the client totals; feed the throughput tracker."""
+        input_tokens = call_usage.get("input_tokens", 0)
+        output_tokens = call_usage.get("output_tokens", 0)
+        add_usage(usage, input_tokens, output_tokens)
+        with self._usage_lock:
+            add_usage(self._usage, input_tokens, output_tokens)
+        if started is not None:
+            TRACKER.record(model, output_tokens, time.monotonic() - started)
+
+    def _stream_timeout(self, watchdog: Watchdog, cancel: Optional[CancelToken]) -> RuntimeError:
+        if cancel and cancel.remaining() == 0:
+            # Request deadline was the job's remaining time: report the job deadline
+            cancel.wait(1.0)
+            return cancel.error()
+        return RuntimeError(f"{self.label} 응답 시간 초과: {watchdog.seconds:.0f}초 안에 끝나지 않아 요청을 중단했습니다.")
@@ -0,0 +1,170 @@
+"""Background health checks and connection warm-up for providers.
+
+HealthMonitor keeps, per provider, a rolling window of results from its
+own periodic ``ping()`` probes and from real requests (reported by
+Provider). ``status()`` only reads that cached state, so run() and the GUI
+never block on the network to show it. Probes go through the provider's
+pooled session, which also keeps a TLS connection open for the next job.
+"""
+import statistics
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+OK = "ok"
+DEGRADED = "degraded"
+DOWN = "down"
+UNKNOWN = "unknown"
+UNCONFIGURED = "unconfigured"
+
+STATUS_LABELS = {
+    OK: "정상",
+    DEGRADED: "불안정",
+    DOWN: "장애",
+    UNKNOWN: "확인 전",
+    UNCONFIGURED: "설정 안 됨",
+}
+
+# Error rate above which an endpoint counts as degraded / down
+DEGRADED_ERROR_RATE = 0.2
+DOWN_ERROR_RATE = 0.5
+# Idle pooled connections are usually closed by the server after about a minute
+WARM_TTL = 45.0
+
+
+class HealthMonitor:
+    def __init__(self, providers: Optional[List[str]] = None, interval: float = 60.0, window: int = 20) -> None:
+        self.providers = providers
+        self.interval = interval
+        self.window = window
+        self._samples: Dict[str, Deque[Tuple[float, bool, float]]] = {}
+        self._details: Dict[str, str] = {}
+        self._unconfigured: Dict[str, str] = {}
+        self._warm_at: Dict[str, float] = {}
+        self._warming: set = set()
+        self._clients: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # Recording
+    def record(self, provider: str, ok: bool, latency: float, detail: str = "") -> None:
+        """Add one probe or request result for ``provider``."""
+        now = time.time()
+        with self._lock:
+            samples = self._samples.setdefault(provider, deque(maxlen=self.window))
+            samples.append((now, ok, latency))
+            if detail:
+                self._details[provider] = detail
+            self._unconfigured.pop(provider, None)
+            if ok:
+                self._warm_at[provider] = time.monotonic()
+
+    def status(self, provider: str) -> Dict[str, Any]:
+        """Cached status: state, label, latency_ms (median), error_rate, checked_at, detail."""
+        with self._lock:
+            if provider in self._unconfigured:
+                return {"state": UNCONFIGURED, "label": STATUS_LABELS[UNCONFIGURED], "latency_ms": None,
+                        "error_rate": None, "checked_at": None, "detail": self._unconfigured[provider]}
+            samples = list(self._samples.get(provider, ()))
+            detail = self._details.get(provider, "")
+        if not samples:
+            state, latency_ms, error_rate, checked_at = UNKNOWN, None, None, None
+        else:
+            failures = sum(1 for _, ok, _ in samples if not ok)
+            error_rate = failures / len(samples)
+            ok_latencies = [lat for _, ok, lat in samples if ok]
+            latency_ms = statistics.median(ok_latencies) * 1000 if ok_latencies else None
+            checked_at = samples[-1][0]
+            last_ok = samples[-1][1]
+            if error_rate >= DOWN_ERROR_RATE and not last_ok:
+                state = DOWN
+            elif error_rate > DEGRADED_ERROR_RATE or not last_ok:
+                state = DEGRADED
+            else:
+                state = OK
+        return {"state": state, "label": STATUS_LABELS[state], "latency_ms": latency_ms,
+                "error_rate": error_rate, "checked_at": checked_at, "detail": detail}
+
+    def summary(self, provider: str) -> str:
+        """One-line Korean status for logs and the GUI."""
+        st = self.status(provider)
+        parts = [f"{provider}: {st['label']}"]
+        if st["latency_ms"] is not None:
+            parts.append(f"{st['latency_ms']:.0f}ms")
+        if st["error_rate"]:
+            parts.append(f"오류율 {st['error_rate']:.0%}")
+        return " · ".join(parts)
+
+    # Probing
+    def _client(self, provider: str) -> Any:
+        client = self._clients.get(provider)
+        if client is None:
+            from .registry import create_provider
+            client = self._clients[provider] = create_provider(provider)
+        return client
+
+    def check(self, provider: str) -> Dict[str, Any]:
+        """Probe ``provider`` now (blocking) and return its updated status."""
+        try:
+            client = self._client(provider)
+        except ValueError as e:
+            # Missing API key and the like: nothing to probe
+            with self._lock:
+                self._unconfigured[provider] = str(e)
+            return self.status(provider)
+        result = client.health()
+        self.record(provider, result["ok"], result["latency"], result["detail"])
+        return self.status(provider)
+
+    def check_async(self, provider: str, callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> None:
+        """``check()`` on a daemon thread; ``callback(status)`` runs on that thread."""
+        def work() -> None:
+            st = self.check(provider)
+            if callback:
+                callback(st)
+        threading.Thread(target=work, daemon=True, name=f"health-{provider}").start()
+
+    def warm_up(self, provider: str) -> None:
+        """Open a pooled connection to ``provider`` in the background unless one is fresh."""
+        with self._lock:
+            warm_at = self._warm_at.get(provider)
+            if provider in self._warming or (warm_at is not None and time.monotonic() - warm_at < WARM_TTL):
+                return
+            self._warming.add(provider)
+
+        def done(_status: Dict[str, Any]) -> None:
+            with self._lock:
+                self._warming.discard(provider)
+
+        self.check_async(provider, done)
+
+    # Background loop
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="health-monitor")
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            names = self.providers
+            if names is None:
+                from .registry import provider_names
+                names = provider_names()
+            for name in names:
+                if self._stop.is_set():
+                    return
+                try:
+                    self.check(name)
+                except Exception as e:
+                    self.record(name, False, 0.0, f"{type(e).__name__}: {e}")
+            self._stop.wait(self.interval)
+
+
+MONITOR = HealthMonitor()
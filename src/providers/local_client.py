@@ -0,0 +1,46 @@
+import os
+from typing import Optional
+
+from .base import Capabilities
+from .openai_client import OpenAIClient
+
+
+class LocalClient(OpenAIClient):
+    """Self-hosted server speaking the OpenAI chat completions API.
+
+    Works with vLLM, llama.cpp ``server``, Ollama, LM Studio and the like.
+    Configured through ``LOCAL_LLM_BASE_URL`` / ``LOCAL_LLM_MODEL``; an API
+    key is optional. Context size and concurrency depend on the hardware, so
+    they come from ``LOCAL_LLM_CONTEXT_TOKENS`` / ``LOCAL_LLM_MAX_CONCURRENCY``.
+    """
+
+    name = "local"
+    label = "로컬 LLM"
+    api_key_env = "LOCAL_LLM_API_KEY"
+    api_key_required = False
+    base_url_env = "LOCAL_LLM_BASE_URL"
+    default_base_url = "http://127.0.0.1:8000"
+    model_env = "LOCAL_LLM_MODEL"
+    fallback_model = "local-model"
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
+        super().__init__(api_key, base_url)
+        # OpenAI account headers would leak to the local server
+        self.org_id = None
+        self.project = None
+
+    @classmethod
+    def get_capabilities(cls) -> Capabilities:
+        return Capabilities(
+            streaming=True,
+            prompt_caching=False,
+            context_tokens=_env_int("LOCAL_LLM_CONTEXT_TOKENS", 8192),
+            max_concurrency=_env_int("LOCAL_LLM_MAX_CONCURRENCY", 1),
+        )
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, ""))
+    except ValueError:
+        return default
@@ -1,102 +1,65 @@
 import os
-import requests
-from typing import List, Dict, Optional
+from typing import Any, Dict, List, Optional
 
+from .base import Capabilities, Provider
+
+
+class OpenAIClient(Provider):
+    name = "openai"
+    label = "OpenAI"
+    api_key_env = "OPENAI_API_KEY"
+    base_url_env = "OPENAI_BASE_URL"
+    default_base_url = "https://api.openai.com"
+    model_env = "OPENAI_MODEL"
+    fallback_model = "gpt-4o-mini"
+    chat_path = "/v1/chat/completions"
+    capabilities = Capabilities(
+        streaming=True, prompt_caching=False, context_tokens=128000, max_concurrency=4,
+    )
 
-class OpenAIClient:
     def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
-        self.api_key = api_key or os.getenv("OPENAI_API_KEY", "")
-        self.base_url = (base_url or os.getenv("OPENAI_BASE_URL") or "https://api.openai.com").rstrip("/")
+        super().__init__(api_key, base_url)
         self.org_id = os.getenv("OPENAI_ORG_ID") or os.getenv("OPENAI_ORGANIZATION")
         self.project = os.getenv("OPENAI_PROJECT")
-        if not self.api_key:
-            raise ValueError("OPENAI_API_KEY is not set")
 
-    def chat(self, model: str, messages: List[Dict[str, str]], max_tokens: int = 1500, temperature: float = 0.7) -> str:
-        url = f"{self.base_url}/v1/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
+    def _headers(self, json_body: bool = True) -> Dict[str, str]:
+        headers = {}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        if json_body:
+            headers["Content-Type"] = "application/json"
         if self.org_id:
             headers["OpenAI-Organization"] = self.org_id
         if self.project:
             headers["OpenAI-Project"] = self.project
-        payload = {
+        return headers
+
+    def _payload(
+        self, model: str, messages: List[Dict[str, str]], max_tokens: int, temperature: float, stream: bool
+    ) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {
             "model": model,
             "messages": messages,
             "max_tokens": max_tokens,
             "temperature": temperature,
         }
-        try:
-            # (connect timeout, read timeout)
-            resp = requests.post(url, headers=headers, json=payload, timeout=(15, 120))
-            resp.raise_for_status()
-        except requests.exceptions.Timeout as e:
-            raise RuntimeError(
-                "OpenAI 요청 시간 초과: 네트워크/방화벽/프록시 설정을 확인하세요 (timeout 15s connect / 120s read)."
-            ) from e
-        except requests.exceptions.ConnectionError as e:
-            raise RuntimeError(
-                f"OpenAI 서버에 연결 실패: base_url={self.base_url}. 인터넷 연결과 프록시(HTTPS_PROXY) 설정을 확인하세요."
-            ) from e
-        except requests.exceptions.HTTPError as e:
-            text = resp.text[:500] if 'resp' in locals() and resp is not None else ''
-            raise RuntimeError(f"OpenAI API 오류 {resp.status_code if 'resp' in locals() else ''}: {text}") from e
-        data = resp.json()
-        return data["choices"][0]["message"]["content"].strip()
+        if stream:
+            payload["stream"] = True
+            payload["stream_options"] = {"include_usage": True}
+        return payload
 
-    def ping(self) -> str:
-        """Quick connectivity/auth check. Returns short diagnostic string or raises RuntimeError."""
-        url = f"{self.base_url}/v1/models"
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-        }
-        if self.org_id:
-            headers["OpenAI-Organization"] = self.org_id
-        if self.project:
-            headers["OpenAI-Project"] = self.project
-        try:
-            resp = requests.get(url, headers=headers, timeout=(10, 20))
-            if resp.status_code == 200:
-                return "OK: reachable"
-            return f"HTTP {resp.status_code}: {resp.text[:200]}"
-        except requests.exceptions.Timeout as e:
-            raise RuntimeError("OpenAI 연결/응답 시간 초과 (10/20s)") from e
-        except requests.exceptions.ConnectionError as e:
-            raise RuntimeError(f"OpenAI 연결 실패: base_url={self.base_url}") from e
+    def _parse_response(self, data: Dict[str, Any], call_usage: Dict[str, int]) -> str:
+        u = data.get("usage") or {}
+        call_usage["input_tokens"] = int(u.get("prompt_tokens") or 0)
+        call_usage["output_tokens"] = int(u.get("completion_tokens") or 0)
+        return data["choices"][0]["message"]["content"] or ""
 
-    def quick_chat_test(self) -> str:
-        """Minimal chat completion POST to verify POST path and auth.
-        Uses tight timeouts to fail fast.
-        """
-        url = f"{self.base_url}/v1/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
-        if self.org_id:
-            headers["OpenAI-Organization"] = self.org_id
-        if self.project:
-            headers["OpenAI-Project"] = self.project
-        payload = {
-            "model": os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-            "messages": [
-                {"role": "system", "content": "You are a helpful assistant."},
-                {"role": "user", "content": "Reply with: OK"},
-            ],
-            "max_tokens": 10,
-            "temperature": 0,
-        }
-        try:
-            resp = requests.post(url, headers=headers, json=payload, timeout=(10, 30))
-            resp.raise_for_status()
-            data = resp.json()
-            txt = data["choices"][0]["message"]["content"].strip()
-            return f"OK chat: {txt[:50]}"
-        except requests.exceptions.Timeout as e:
-            raise RuntimeError("OpenAI chat POST 시간 초과 (10/30s)") from e
-        except requests.exceptions.ConnectionError as e:
-            raise RuntimeError("OpenAI chat POST 연결 실패") from e
-        except requests.exceptions.HTTPError as e:
-            return f"HTTP {resp.status_code}: {resp.text[:200]}"
+    def _parse_event(self, event: Dict[str, Any], call_usage: Dict[str, int]) -> Optional[str]:
+        if event.get("error"):
+            raise RuntimeError(f"{self.label} 스트림 오류: {event['error']}")
+        u = event.get("usage")
+        if u:
+            call_usage["input_tokens"] = call_usage.get("input_tokens", 0) + int(u.get("prompt_tokens") or 0)
+            call_usage["output_tokens"] = call_usage.get("output_tokens", 0) + int(u.get("completion_tokens") or 0)
+        texts = [(choice.get("delta") or {}).get("content") or "" for choice in event.get("choices") or []]
+        return "".join(texts) or None
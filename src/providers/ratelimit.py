@@ -0,0 +1,361 @@
+"""Request and token rate limits shared by every process on the host.
+
+Each limit is a token bucket stored in one SQLite row, refilled by elapsed
+wall-clock time and updated inside an immediate transaction. Every batch
+worker (and any other process using the same database) draws from the
+same budget, so N workers together stay under the provider's
+requests-per-minute and input-tokens-per-minute limits.
+
+Requests waiting on a bucket queue up in the same database. Each request
+has a priority class (``interactive`` for the GUI, ``batch`` otherwise)
+and classes share the budget by weight (weighted fair queuing): while both
+wait, an interactive request goes ahead of the batch backlog and gets
+eight requests through for each batch one; while only one class waits it
+gets the whole budget. Within a class the earliest job deadline goes
+first, then arrival order. Wait times are kept per class.
+
+Provider._post calls ``acquire(provider)`` before each request; with no
+limit configured for that provider this is a dict lookup.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..util.env_util import cache_dir
+
+# Sleep at most this long between bucket checks (keeps cancellation responsive)
+MAX_SLEEP = 1.0
+# Seconds between checks while another request is at the head of the queue
+HEAD_POLL = 0.05
+# A waiter not seen for this long belongs to a process that exited
+STALE_WAITER = 10.0
+# Limits published by a batch are picked up by other processes for this long
+SHARED_LIMIT_TTL = 600.0
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+# Relative share of the budget while several classes wait; unknown classes weigh 1
+CLASS_WEIGHTS: Dict[str, float] = {INTERACTIVE: 8.0, BATCH: 1.0}
+
+_default_class = BATCH
+
+
+def set_default_class(priority: str) -> None:
+    """Class of this process's requests whose CancelToken names none (the GUI sets ``interactive``)."""
+    global _default_class
+    _default_class = priority
+
+
+def request_class(cancel: Any = None) -> str:
+    priority = getattr(cancel, "priority", None)
+    return priority or os.getenv("NB_PRIORITY", "").strip() or _default_class
+
+
+def class_weight(priority: str) -> float:
+    return CLASS_WEIGHTS.get(priority, 1.0)
+
+
+def default_limit_path() -> str:
+    return str(cache_dir() / "rate_limits.sqlite")
+
+
+class RateLimiter:
+    """``rpm`` requests and ``tpm`` input tokens per minute for bucket ``name``.
+
+    With ``publish`` (the default) the limits are shared with other processes
+    on the same database and kept fresh while this process takes tokens; a
+    limiter adopted from another process (``attach_shared_limits``) doesn't.
+    """
+
+    def __init__(
+        self, name: str, rpm: Optional[float] = None, tpm: Optional[float] = None, path: Optional[str] = None,
+        publish: bool = True,
+    ) -> None:
+        self.name = name
+        self.rpm = rpm
+        self.tpm = tpm
+        self.path = path or default_limit_path()
+        self.publish = publish
+        self.waited = 0.0
+        self.acquired = 0
+        # Per class: {"requests": n, "seconds": total wait} for requests of this process
+        self.class_waits: Dict[str, Dict[str, float]] = {}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False, isolation_level=None)
+        self.conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS buckets (
+                name TEXT PRIMARY KEY,
+                level REAL NOT NULL,
+                updated REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS waiters (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                bucket TEXT NOT NULL,
+                class TEXT NOT NULL,
+                deadline REAL,
+                enqueued REAL NOT NULL,
+                seen REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS shares (
+                bucket TEXT NOT NULL,
+                class TEXT NOT NULL,
+                vtime REAL NOT NULL,
+                PRIMARY KEY (bucket, class)
+            );
+            CREATE TABLE IF NOT EXISTS waits (
+                bucket TEXT NOT NULL,
+                class TEXT NOT NULL,
+                requests INTEGER NOT NULL,
+                seconds REAL NOT NULL,
+                longest REAL NOT NULL,
+                PRIMARY KEY (bucket, class)
+            );
+            CREATE TABLE IF NOT EXISTS limits (
+                name TEXT PRIMARY KEY,
+                rpm REAL,
+                tpm REAL,
+                updated REAL NOT NULL
+            );
+            """
+        )
+        self._lock = threading.Lock()
+        if publish:
+            # Other processes on this database (e.g. the GUI) adopt these limits
+            self.conn.execute(
+                "INSERT OR REPLACE INTO limits (name, rpm, tpm, updated) VALUES (?, ?, ?, ?)", (name, rpm, tpm, time.time())
+            )
+
+    def _buckets(self, tokens: int) -> List[Tuple[str, float, float]]:
+        """(bucket name, capacity per minute, cost of this request)."""
+        buckets = []
+        if self.rpm:
+            buckets.append((f"{self.name}:requests", float(self.rpm), 1.0))
+        if self.tpm:
+            # A request larger than a whole minute's budget waits for a full bucket
+            buckets.append((f"{self.name}:tokens", float(self.tpm), float(min(tokens, self.tpm))))
+        return buckets
+
+    def _share_cost(self, tokens: int) -> float:
+        """Fraction of a minute's budget this request uses (its charge against the class share)."""
+        cost = 0.0
+        if self.rpm:
+            cost = 1.0 / self.rpm
+        if self.tpm:
+            cost = max(cost, min(tokens, self.tpm) / self.tpm)
+        return cost
+
+    def _enqueue(self, priority: str, deadline: Optional[float]) -> int:
+        now = time.time()
+        with self._lock:
+            cur = self.conn.execute(
+                "INSERT INTO waiters (bucket, class, deadline, enqueued, seen) VALUES (?, ?, ?, ?, ?)",
+                (self.name, priority, deadline, now, now),
+            )
+            return cur.lastrowid
+
+    def _leave(self, ticket: int) -> None:
+        with self._lock:
+            self.conn.execute("DELETE FROM waiters WHERE id = ?", (ticket,))
+
+    def _head(self, now: float) -> Tuple[Optional[int], Dict[str, float]]:
+        """The waiter served next and the class virtual times (``""`` is the system's)."""
+        self.conn.execute("DELETE FROM waiters WHERE bucket = ? AND seen < ?", (self.name, now - STALE_WAITER))
+        rows = self.conn.execute("SELECT id, class, deadline FROM waiters WHERE bucket = ?", (self.name,)).fetchall()
+        vtimes = dict(self.conn.execute("SELECT class, vtime FROM shares WHERE bucket = ?", (self.name,)).fetchall())
+        if not rows:
+            return None, vtimes
+        system = vtimes.get("", 0.0)
+        # Least service per weight first; a class back from idle starts at the system time
+        priority = min(
+            {cls for _, cls, _ in rows}, key=lambda c: (max(vtimes.get(c, 0.0), system), -class_weight(c), c)
+        )
+        head = min(
+            (r for r in rows if r[1] == priority), key=lambda r: (r[2] is None, r[2] or 0.0, r[0])
+        )
+        return head[0], vtimes
+
+    def _try_take(self, tokens: int, ticket: int, priority: str, deadline: Optional[float]) -> float:
+        """Take this request's cost and return 0, or return seconds until it fits."""
+        now = time.time()
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                seen = self.conn.execute("UPDATE waiters SET seen = ? WHERE id = ?", (now, ticket))
+                if seen.rowcount == 0:
+                    # Dropped as stale (this process was suspended); queue again under the same ticket
+                    self.conn.execute(
+                        "INSERT INTO waiters (id, bucket, class, deadline, enqueued, seen) VALUES (?, ?, ?, ?, ?, ?)",
+                        (ticket, self.name, priority, deadline, now, now),
+                    )
+                head, vtimes = self._head(now)
+                levels = []
+                wait = 0.0
+                for name, capacity, cost in self._buckets(tokens):
+                    row = self.conn.execute("SELECT level, updated FROM buckets WHERE name = ?", (name,)).fetchone()
+                    level = capacity if row is None else min(capacity, row[0] + (now - row[1]) * capacity / 60.0)
+                    levels.append((name, level, cost))
+                    if level < cost:
+                        wait = max(wait, (cost - level) * 60.0 / capacity)
+                if head != ticket:
+                    # Not before the bucket could hold this request anyway
+                    wait = max(wait, HEAD_POLL)
+                elif wait == 0.0:
+                    for name, level, cost in levels:
+                        self.conn.execute(
+                            "INSERT OR REPLACE INTO buckets (name, level, updated) VALUES (?, ?, ?)", (name, level - cost, now)
+                        )
+                    start = max(vtimes.get(priority, 0.0), vtimes.get("", 0.0))
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO shares (bucket, class, vtime) VALUES (?, ?, ?)",
+                        [(self.name, priority, start + self._share_cost(tokens) / class_weight(priority)),
+                         (self.name, "", start)],
+                    )
+                    enqueued = self.conn.execute("SELECT enqueued FROM waiters WHERE id = ?", (ticket,)).fetchone()[0]
+                    waited = max(0.0, now - enqueued)
+                    self.conn.execute("DELETE FROM waiters WHERE id = ?", (ticket,))
+                    self.conn.execute(
+                        "INSERT INTO waits (bucket, class, requests, seconds, longest) VALUES (?, ?, 1, ?, ?) "
+                        "ON CONFLICT (bucket, class) DO UPDATE SET requests = requests + 1, "
+                        "seconds = seconds + excluded.seconds, longest = MAX(longest, excluded.longest)",
+                        (self.name, priority, waited, waited),
+                    )
+                    if self.publish:
+                        self.conn.execute("UPDATE limits SET updated = ? WHERE name = ?", (now, self.name))
+                self.conn.execute("COMMIT")
+                return wait
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def acquire(self, tokens: int = 0, cancel: Any = None) -> float:
+        """Block until the request reaches the head of the queue and fits in every bucket; return seconds waited."""
+        priority = request_class(cancel)
+        remaining = cancel.remaining() if cancel is not None else None
+        deadline = None if remaining is None else time.time() + remaining
+        t0 = time.monotonic()
+        ticket = self._enqueue(priority, deadline)
+        try:
+            while True:
+                wait = self._try_take(tokens, ticket, priority, deadline)
+                if wait == 0.0:
+                    break
+                if cancel is not None:
+                    cancel.check()
+                    cancel.wait(min(wait, MAX_SLEEP))
+                else:
+                    time.sleep(min(wait, MAX_SLEEP))
+        except BaseException:
+            self._leave(ticket)
+            raise
+        waited = time.monotonic() - t0
+        with self._lock:
+            self.waited += waited
+            self.acquired += 1
+            stats = self.class_waits.setdefault(priority, {"requests": 0, "seconds": 0.0})
+            stats["requests"] += 1
+            stats["seconds"] += waited
+        return waited
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+
+_LIMITERS: Dict[str, RateLimiter] = {}
+
+
+def set_rate_limit(provider: str, limiter: Optional[RateLimiter]) -> None:
+    """Apply ``limiter`` to every request of ``provider`` in this process (None removes it)."""
+    if limiter is None:
+        _LIMITERS.pop(provider, None)
+    else:
+        _LIMITERS[provider] = limiter
+
+
+def rate_limiter(provider: str) -> Optional[RateLimiter]:
+    return _LIMITERS.get(provider)
+
+
+def acquire(provider: str, tokens: int = 0, cancel: Any = None) -> float:
+    limiter = _LIMITERS.get(provider)
+    if limiter is None:
+        return 0.0
+    return limiter.acquire(tokens, cancel)
+
+
+def attach_shared_limits(path: Optional[str] = None) -> List[str]:
+    """Apply limits a batch on this host published recently; returns the providers now limited.
+
+    A process without limits of its own (the GUI) then queues on the same
+    buckets as the batch workers, in its own class. Limits adopted earlier
+    whose publisher has stopped refreshing them are removed again.
+    """
+    path = path or default_limit_path()
+    if not os.path.exists(path):
+        return []
+    conn = sqlite3.connect(path, timeout=60)
+    try:
+        rows = conn.execute(
+            "SELECT name, rpm, tpm FROM limits WHERE updated >= ?", (time.time() - SHARED_LIMIT_TTL,)
+        ).fetchall()
+    except sqlite3.OperationalError:
+        rows = []
+    finally:
+        conn.close()
+    attached = []
+    for name, rpm, tpm in rows:
+        current = _LIMITERS.get(name)
+        if current is None or (not current.publish and current.path == path and (current.rpm, current.tpm) != (rpm, tpm)):
+            set_rate_limit(name, RateLimiter(name, rpm=rpm, tpm=tpm, path=path, publish=False))
+        attached.append(name)
+    for name, current in list(_LIMITERS.items()):
+        if not current.publish and current.path == path and name not in attached:
+            set_rate_limit(name, None)
+    return attached
+
+
+def queue_waits(path: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+    """Queue wait per class over every process and provider: requests, seconds, longest."""
+    path = path or default_limit_path()
+    if not os.path.exists(path):
+        return {}
+    conn = sqlite3.connect(path, timeout=60)
+    try:
+        rows = conn.execute(
+            "SELECT class, SUM(requests), SUM(seconds), MAX(longest) FROM waits GROUP BY class ORDER BY class"
+        ).fetchall()
+    except sqlite3.OperationalError:
+        rows = []
+    finally:
+        conn.close()
+    return {cls: {"requests": n, "seconds": seconds, "longest": longest} for cls, n, seconds, longest in rows}
+
+
+def format_waits(waits: Dict[str, Dict[str, float]]) -> List[str]:
+    lines = []
+    for cls, w in sorted(waits.items(), key=lambda item: -class_weight(item[0])):
+        if not w.get("requests"):
+            continue
+        line = f"[큐] {cls}: 요청 {int(w['requests'])}건, 평균 대기 {w['seconds'] / w['requests']:.2f}초"
+        if "longest" in w:
+            line += f", 최장 {w['longest']:.2f}초"
+        lines.append(line)
+    return lines
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="공유 속도 제한 대기열의 클래스별 대기 시간")
+    parser.add_argument("--path", default=None, help="속도 제한 DB (기본: 캐시 폴더의 rate_limits.sqlite)")
+    args = parser.parse_args()
+    lines = format_waits(queue_waits(args.path))
+    print("\n".join(lines) if lines else "[큐] 기록된 대기 없음")
+
+
+if __name__ == "__main__":
+    main()
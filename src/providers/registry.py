@@ -0,0 +1,50 @@
+"""Provider registry.
+
+Providers are registered by name as ``"module:Class"`` strings and imported
+on first use, so listing them (argparse choices, the GUI) costs nothing and
+runs only import the client they select. Relative module names resolve
+against this package.
+"""
+import importlib
+from typing import TYPE_CHECKING, Any, Dict, List, Type, Union
+
+if TYPE_CHECKING:
+    from .base import Capabilities, Provider
+
+_PROVIDERS: Dict[str, Union[str, type]] = {
+    "anthropic": ".anthropic_client:AnthropicClient",
+    "openai": ".openai_client:OpenAIClient",
+    "local": ".local_client:LocalClient",
+}
+
+
+def register_provider(name: str, spec: Union[str, type]) -> None:
+    """Register a Provider subclass, or a lazy ``"module:Class"`` spec, under ``name``."""
+    _PROVIDERS[name] = spec
+
+
+def provider_names() -> List[str]:
+    return list(_PROVIDERS)
+
+
+def provider_class(name: str) -> Type["Provider"]:
+    spec = _PROVIDERS.get(name)
+    if spec is None:
+        raise ValueError(f"알 수 없는 provider: {name} (사용 가능: {', '.join(_PROVIDERS)})")
+    if isinstance(spec, str):
+        module_name, _, class_name = spec.partition(":")
+        module = importlib.import_module(module_name, __package__)
+        spec = _PROVIDERS[name] = getattr(module, class_name)
+    return spec
+
+
+def create_provider(name: str, **kwargs: Any) -> "Provider":
+    return provider_class(name)(**kwargs)
+
+
+def default_model(name: str) -> str:
+    return provider_class(name).default_model()
+
+
+def capabilities(name: str) -> "Capabilities":
+    return provider_class(name).get_capabilities()
@@ -0,0 +1,164 @@
+"""Single-flight: concurrent identical chat requests share one network call.
+
+Jobs of a batch that share attachments all start Step 1 at the same
+moment, before any cache has a result to offer. Provider.chat keys every
+request on its canonical body (provider, endpoint, API key and the
+serialized payload). The first caller of a key is the leader and sends the
+request. Callers arriving while it is in flight wait for the leader's
+result or error instead of sending their own. Nothing is kept once the
+request finishes; results that outlive a call belong in the caches
+(util.style_cache, util.disk_cache).
+
+Waiters get the text in one piece (one ``on_delta`` call) and no token
+usage, since they spent none. A leader stopped by its own CancelToken does
+not fail the waiters; they start over and one of them leads. Set
+``NB_COALESCE=0`` to send every request.
+"""
+import copy
+import hashlib
+import os
+import threading
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ..util.cancel import CancelToken, Cancelled
+
+# Seconds between CancelToken checks while waiting on a leader
+WAIT_POLL = 0.05
+
+
+def enabled() -> bool:
+    return os.getenv("NB_COALESCE", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def request_key(provider: str, base_url: str, api_key: str, body: bytes) -> str:
+    h = hashlib.blake2b(digest_size=20)
+    for part in (provider, base_url, hashlib.sha256(api_key.encode("utf-8")).hexdigest()):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    h.update(body)
+    return h.hexdigest()
+
+
+class Flight:
+    """One request in flight and the callers waiting on it."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.text: Optional[str] = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def add_done_callback(self, fn: Callable[[], None]) -> None:
+        with self._lock:
+            if not self.done.is_set():
+                self._callbacks.append(fn)
+                return
+        fn()
+
+    def _finish(self, text: Optional[str], error: Optional[BaseException]) -> None:
+        with self._lock:
+            self.text, self.error = text, error
+            self.done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            fn()
+
+    def wait(self, cancel: Optional[CancelToken] = None) -> None:
+        """Block until the leader is done; the waiter's own ``cancel`` still applies."""
+        if cancel is None:
+            self.done.wait()
+            return
+        while not self.done.wait(WAIT_POLL):
+            cancel.check()
+
+    def outcome(self, on_delta: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """The shared text for a waiter; None if the leader was cancelled (start over)."""
+        if isinstance(self.error, Cancelled):
+            return None
+        if self.error is not None:
+            # A copy per waiter: one exception object raised in several threads would share its traceback
+            try:
+                error = copy.copy(self.error)
+            except Exception:
+                error = RuntimeError(str(self.error))
+            raise error from self.error
+        if on_delta is not None and self.text:
+            on_delta(self.text)
+        return self.text
+
+
+class FlightGroup:
+    """Flights in progress by request key, with per-provider counts of coalesced calls."""
+
+    def __init__(self) -> None:
+        self.coalesced: Counter = Counter()
+        self._flights: Dict[str, Flight] = {}
+        self._lock = threading.Lock()
+
+    def join(self, key: str, provider: str) -> Tuple[Flight, bool]:
+        """``(flight, leader)``: the leader sends the request and must call ``finish``."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.waiters += 1
+                self.coalesced[provider] += 1
+                return flight, False
+            flight = self._flights[key] = Flight()
+            return flight, True
+
+    def finish(self, key: str, flight: Flight, text: Optional[str], error: Optional[BaseException]) -> None:
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight._finish(text, error)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights)
+
+
+FLIGHTS = FlightGroup()
+
+
+def coalesced_requests() -> Dict[str, int]:
+    """Calls per provider that waited on an identical request instead of sending one."""
+    with FLIGHTS._lock:
+        return dict(FLIGHTS.coalesced)
+
+
+def lead(flights: FlightGroup, key: str, flight: Flight, send: Callable[[], str]) -> str:
+    """Run ``send`` as the flight's leader and hand its outcome to the waiters."""
+    try:
+        text = send()
+    except BaseException as e:
+        flights.finish(key, flight, None, e)
+        raise
+    flights.finish(key, flight, text, None)
+    return text
+
+
+def follow(flight: Flight, on_delta: Optional[Callable[[str], None]], cancel: Optional[CancelToken]) -> Optional[str]:
+    """Wait on another caller's request; None means start over."""
+    flight.wait(cancel)
+    return flight.outcome(on_delta)
+
+
+async def afollow(flight: Flight, on_delta: Optional[Callable[[str], None]], cancel: Optional[CancelToken]) -> Optional[str]:
+    """``follow`` for asyncio: the waiter holds no thread."""
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+
+    def wake() -> None:
+        loop.call_soon_threadsafe(lambda: done.done() or done.set_result(None))
+
+    flight.add_done_callback(wake)
+    while not done.done():
+        await asyncio.wait({done}, timeout=WAIT_POLL if cancel is not None else None)
+        if cancel is not None:
+            cancel.check()
+    return flight.outcome(on_delta)
@@ -0,0 +1,77 @@
+import json
+import socket
+from typing import Any, Dict, Iterator, Optional
+
+
+def _iter_raw(resp: Any) -> Iterator[bytes]:
+    """Yield body bytes as soon as they arrive.
+
+    ``iter_lines()`` reads fixed 512-byte chunks and would hold small SSE
+    events back until enough data accumulates; ``read1`` returns whatever is
+    available instead.
+    """
+    raw = resp.raw
+    read1 = getattr(raw, "read1", None)
+    if read1 is None:
+        yield from resp.iter_content(chunk_size=1)
+        return
+    while True:
+        chunk = read1(8192)
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_sse(resp: Any) -> Iterator[Dict[str, Any]]:
+    """Yield the JSON payload of each ``data:`` line of a server-sent event stream.
+
+    Lines are decoded as UTF-8 explicitly: ``text/event-stream`` responses
+    often come without a charset and requests would fall back to Latin-1.
+    """
+    pending = b""
+    for chunk in _iter_raw(resp):
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for raw in lines:
+            raw = raw.rstrip(b"\r")
+            if not raw.startswith(b"data:"):
+                continue
+            data = raw[5:].strip()
+            if data == b"[DONE]":
+                return
+            try:
+                yield json.loads(data.decode("utf-8"))
+            except ValueError:
+                continue
+
+
+def abort_response(resp: Any) -> None:
+    """Close a streaming response from another thread.
+
+    ``resp.close()`` alone doesn't wake a thread blocked in ``recv``; shutting
+    the socket down does, and the reader then sees EOF or an error.
+    """
+    conn = getattr(resp.raw, "_connection", None) or getattr(resp.raw, "connection", None)
+    sock = getattr(conn, "sock", None)
+    if sock is None:
+        # Connection already detached (e.g. "Connection: close"): reach the
+        # socket through http.client's buffered reader instead
+        fp = getattr(getattr(resp.raw, "_fp", None), "fp", None)
+        sock = getattr(getattr(fp, "raw", None), "_sock", None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    try:
+        resp.close()
+    except Exception:
+        pass
+
+
+def add_usage(usage: Optional[Dict[str, int]], input_tokens: Any = 0, output_tokens: Any = 0) -> None:
+    """Accumulate token counts into a caller-provided usage dict."""
+    if usage is None:
+        return
+    usage["input_tokens"] = usage.get("input_tokens", 0) + int(input_tokens or 0)
+    usage["output_tokens"] = usage.get("output_tokens", 0) + int(output_tokens or 0)
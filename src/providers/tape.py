@@ -0,0 +1,128 @@
+"""Record and replay provider responses (used by the comparison harness, src.compare).
+
+While a Tape is installed with ``use_tape``, every Provider request goes
+through it. Recording sends the request (streamed, to time the first
+token) and keeps the text, token usage, time to first token and total
+seconds under a key of the request body: provider plus canonical payload,
+no credentials or endpoint. Replaying answers from those entries without
+touching the network. The text reaches ``on_delta`` in one piece, usage is
+added as the original call added it, and the timings are the recorded ones,
+so an analysis reruns offline with the same numbers. An identical request
+sent several times (the same Step 1 for two models) replays its recordings
+in the order they were made, then keeps answering with the last one. A
+request that failed while recording fails again with the same message.
+"""
+import contextlib
+import hashlib
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional
+
+from .streaming import add_usage
+
+RECORD = "record"
+REPLAY = "replay"
+
+# send(on_delta, call_usage) -> text: the real request
+Send = Callable[[Callable[[str], None], Dict[str, int]], str]
+
+
+def request_key(provider: str, body: bytes) -> str:
+    h = hashlib.blake2b(digest_size=20)
+    h.update(provider.encode("utf-8"))
+    h.update(b"\0")
+    h.update(body)
+    return h.hexdigest()
+
+
+class Tape:
+    """Calls made (or replayed) while installed, in order; ``sink`` sees each new entry."""
+
+    def __init__(self, mode: str = RECORD, entries: Iterable[Dict[str, Any]] = (), sink: Optional[Callable[[Dict[str, Any]], None]] = None) -> None:
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"mode는 {RECORD} 또는 {REPLAY} 여야 합니다: {mode}")
+        self.mode = mode
+        self.sink = sink
+        self.calls: List[Dict[str, Any]] = []
+        self._recorded: Dict[str, Deque[Dict[str, Any]]] = {}
+        for entry in entries:
+            self._recorded.setdefault(entry["key"], deque()).append(entry)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._recorded.values())
+
+    def call(
+        self, provider: str, model: str, body: bytes, on_delta: Optional[Callable[[str], None]],
+        usage: Optional[Dict[str, int]], send: Send,
+    ) -> str:
+        key = request_key(provider, body)
+        if self.mode == REPLAY:
+            return self._replay(key, provider, model, on_delta, usage)
+        call_usage: Dict[str, int] = {}
+        first: List[float] = []
+
+        def delta(text: str) -> None:
+            if not first:
+                first.append(time.monotonic())
+            if on_delta is not None:
+                on_delta(text)
+
+        entry: Dict[str, Any] = {"key": key, "provider": provider, "model": model}
+        t0 = time.monotonic()
+        try:
+            text = send(delta, call_usage)
+        except Exception as e:
+            entry.update(text="", usage=call_usage, error=f"{type(e).__name__}: {e}")
+            raise
+        else:
+            entry.update(text=text, usage=call_usage)
+        finally:
+            seconds = time.monotonic() - t0
+            entry.update(ttft=round((first[0] - t0) if first else seconds, 4), seconds=round(seconds, 4))
+            add_usage(usage, call_usage.get("input_tokens"), call_usage.get("output_tokens"))
+            self._keep(key, entry)
+        return text
+
+    def _replay(
+        self, key: str, provider: str, model: str, on_delta: Optional[Callable[[str], None]], usage: Optional[Dict[str, int]],
+    ) -> str:
+        with self._lock:
+            entries = self._recorded.get(key)
+            if not entries:
+                raise RuntimeError(f"녹화된 응답이 없습니다: {provider} {model} (요청 내용이 녹화 때와 다릅니다)")
+            entry = entries.popleft() if len(entries) > 1 else entries[0]
+            self.calls.append(entry)
+        usage_of = entry.get("usage") or {}
+        add_usage(usage, usage_of.get("input_tokens"), usage_of.get("output_tokens"))
+        if entry.get("error"):
+            raise RuntimeError(entry["error"])
+        if on_delta is not None and entry["text"]:
+            on_delta(entry["text"])
+        return entry["text"]
+
+    def _keep(self, key: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._recorded.setdefault(key, deque()).append(entry)
+            self.calls.append(entry)
+        if self.sink is not None:
+            self.sink(entry)
+
+
+_ACTIVE: Optional[Tape] = None
+
+
+def active() -> Optional[Tape]:
+    return _ACTIVE
+
+
+@contextlib.contextmanager
+def use_tape(tape: Tape) -> Iterator[Tape]:
+    """Route every provider request of this process through ``tape`` for the block."""
+    global _ACTIVE
+    previous, _ACTIVE = _ACTIVE, tape
+    try:
+        yield tape
+    finally:
+        _ACTIVE = previous
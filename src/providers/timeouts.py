@@ -0,0 +1,101 @@
+"""Request deadlines derived from ``max_tokens`` and observed throughput.
+
+A fixed read timeout is either too short for a long draft on a slow model or
+keeps a stuck connection (and its worker) around for minutes. Each completed
+call records output tokens per second for its model; the next call's
+deadline is ``BASE_LATENCY + SAFETY_FACTOR * max_tokens / tokens_per_sec``,
+clamped to [MIN_TIMEOUT, MAX_TIMEOUT] and to the job's remaining time.
+
+Streaming calls use a short idle timeout per read plus a Watchdog that
+aborts the response once the whole-request deadline passes.
+"""
+import statistics
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+CONNECT_TIMEOUT = 15.0
+# Longest silence tolerated between stream events; providers send pings well within this
+STREAM_IDLE_TIMEOUT = 60.0
+DEFAULT_TOKENS_PER_SEC = 30.0
+SAFETY_FACTOR = 2.0
+BASE_LATENCY = 20.0
+MIN_TIMEOUT = 30.0
+MAX_TIMEOUT = 900.0
+# Calls shorter than this are dominated by latency and say little about throughput
+MIN_SAMPLE_TOKENS = 50
+
+
+class ThroughputTracker:
+    """Rolling output tokens/sec per model (median of the last ``window`` calls)."""
+
+    def __init__(self, window: int = 20) -> None:
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, output_tokens: int, seconds: float) -> None:
+        if output_tokens < MIN_SAMPLE_TOKENS or seconds <= 0:
+            return
+        with self._lock:
+            samples = self._samples.setdefault(model, deque(maxlen=self.window))
+            samples.append(output_tokens / seconds)
+
+    def tokens_per_sec(self, model: str) -> Optional[float]:
+        with self._lock:
+            samples = self._samples.get(model)
+            if not samples:
+                return None
+            return statistics.median(samples)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+
+TRACKER = ThroughputTracker()
+
+
+def request_deadline(model: str, max_tokens: int, remaining: Optional[float] = None) -> float:
+    """Seconds a call generating up to ``max_tokens`` may take in total."""
+    tps = TRACKER.tokens_per_sec(model) or DEFAULT_TOKENS_PER_SEC
+    seconds = BASE_LATENCY + SAFETY_FACTOR * max_tokens / tps
+    seconds = min(max(seconds, MIN_TIMEOUT), MAX_TIMEOUT)
+    if remaining is not None:
+        seconds = min(seconds, remaining)
+    return seconds
+
+
+def request_timeouts(
+    model: str, max_tokens: int, stream: bool, remaining: Optional[float] = None
+) -> Tuple[Tuple[float, float], float]:
+    """``((connect, read), total)`` for a requests call.
+
+    Without streaming nothing arrives until the answer is complete, so the
+    read timeout is the whole deadline; with streaming it is the idle limit.
+    """
+    total = request_deadline(model, max_tokens, remaining)
+    read = min(STREAM_IDLE_TIMEOUT, total) if stream else total
+    return (min(CONNECT_TIMEOUT, total), read), total
+
+
+class Watchdog:
+    """Calls ``abort`` if the request is still running after ``seconds``."""
+
+    def __init__(self, seconds: float, abort: Callable[[], None]) -> None:
+        self.seconds = seconds
+        self.expired = False
+        self._abort = abort
+        self._timer = threading.Timer(seconds, self._fire)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _fire(self) -> None:
+        self.expired = True
+        try:
+            self._abort()
+        except Exception:
+            pass
+
+    def stop(self) -> None:
+        self._timer.cancel()
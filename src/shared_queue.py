@@ -0,0 +1,441 @@
+"""Job queue shared by several hosts (``python -m src.shared_queue``).
+
+Requests from a JSONL file are enqueued into one SQLite database that every
+host can reach (a shared volume; for tests any local path). Each host runs
+``work``: it claims pending jobs under a lease, runs them through its own
+JobQueue (one ``run()`` per job) and renews the leases with heartbeats while
+they run. A job whose host stopped heartbeating is requeued when its lease
+expires, up to ``max_attempts`` claims. A host that loses a lease cancels
+its copy of the job; only the lease owner can complete it.
+
+Results are stored by content key (job inputs plus a digest of every
+attachment's bytes, never host paths or patterns), so identical requests and reruns are
+answered from the results table instead of being generated again. The same
+database holds the DiskCache used for Step 1 style prompts, whose keys are
+already content-based (util.style_cache.style_cache_key).
+
+SQLite locking over network filesystems is only as good as the filesystem's
+own locking; this is the stand-in for a queue service, not a replacement.
+
+    python -m src.shared_queue enqueue queue.sqlite requests.jsonl
+    python -m src.shared_queue work queue.sqlite --concurrency 4      # on every host
+    python -m src.shared_queue status queue.sqlite
+    python -m src.shared_queue export queue.sqlite results.jsonl.gz
+"""
+import argparse
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+if not __package__:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import src  # noqa: F401
+    __package__ = "src"
+
+from .batch import INPUT_FIELDS, job_from_request, load_requests, request_id, result_record
+from .jobs import DONE, Job, JobQueue
+from .main import DEFAULT_COMPRESS_TOKENS, STYLE_MODES
+from .util.env_util import load_env
+from .util.logs import emit
+
+PENDING = "pending"
+RUNNING = "running"
+FINISHED = "done"
+FAILED = "failed"
+
+DEFAULT_LEASE = 60.0
+DEFAULT_MAX_ATTEMPTS = 3
+# Seconds between claim attempts while the queue is empty but jobs still run elsewhere
+POLL_SECONDS = 1.0
+# Inputs left out of result keys: files, input_dir and ref_dir are keyed by the digests
+# of the attachments they resolve to instead, and a timeout or scheduling class doesn't
+# change the result
+_UNKEYED_FIELDS = ("files", "input_dir", "ref_dir", "timeout", "priority")
+
+
+def default_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    except OSError:
+        # A missing file fails the job anyway; key it by name so the failure isn't shared
+        return "missing:" + os.path.basename(path)
+    return h.hexdigest()
+
+
+def attachment_paths(job: Job) -> List[str]:
+    """Files ``run()`` attaches for ``job``: glob matches, input_dir and selected references."""
+    from .util.file_loader import collect_files
+
+    files = list(job.files)
+    if job.ref_dir and job.ref_top_k > 0:
+        from .util.ref_index import select_references
+        query = "\n".join(part for part in (job.keyword, job.writing_guide) if part)
+        files += select_references(job.ref_dir, query, job.ref_top_k, exclude=job.files)
+    # As in run(), input_dir is only walked when there is something to attach
+    return collect_files(job.input_dir, files, **(job.walk_options or {})) if files else []
+
+
+def result_key(job: Job) -> str:
+    """Content key of a job's result: the same on every host for the same inputs and attachment bytes."""
+    inputs = {f: getattr(job, f) for f in INPUT_FIELDS if f not in _UNKEYED_FIELDS}
+    inputs["files"] = sorted(_file_digest(p) for p in attachment_paths(job))
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class SharedQueue:
+    """Jobs, leases and content-keyed results in one SQLite database."""
+
+    def __init__(self, path: str, lease_seconds: float = DEFAULT_LEASE, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> None:
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(os.path.abspath(path)) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=60, check_same_thread=False, isolation_level=None)
+        self.conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                seq INTEGER NOT NULL,
+                request TEXT NOT NULL,
+                status TEXT NOT NULL,
+                owner TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result_key TEXT,
+                error TEXT,
+                updated REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, seq);
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                record TEXT NOT NULL,
+                host TEXT,
+                created REAL NOT NULL
+            );
+            """
+        )
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+    def __enter__(self) -> "SharedQueue":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def _transaction(self, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                value = fn()
+                self.conn.execute("COMMIT")
+                return value
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def enqueue(self, requests: List[Dict[str, Any]]) -> int:
+        """Add requests not already queued (by request id); returns how many were added."""
+        def insert() -> int:
+            seq = self.conn.execute("SELECT COALESCE(MAX(seq), -1) + 1 FROM jobs").fetchone()[0]
+            added = 0
+            for index, req in enumerate(requests):
+                cur = self.conn.execute(
+                    "INSERT OR IGNORE INTO jobs (id, seq, request, status, updated) VALUES (?, ?, ?, ?, ?)",
+                    (request_id(req, index), seq + index, json.dumps(req, ensure_ascii=False), PENDING, time.time()),
+                )
+                added += cur.rowcount
+            return added
+        return self._transaction(insert)
+
+    def _requeue_expired(self, now: float) -> None:
+        """Jobs whose owner stopped heartbeating go back to pending (caller holds the transaction)."""
+        self.conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, owner = NULL, updated = ? "
+            "WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+            (FAILED, "작업 임대 만료 (재시도 횟수 초과)", now, RUNNING, now, self.max_attempts),
+        )
+        self.conn.execute(
+            "UPDATE jobs SET status = ?, owner = NULL, updated = ? WHERE status = ? AND lease_expires < ?",
+            (PENDING, now, RUNNING, now),
+        )
+
+    def claim(self, owner: str) -> Optional[Tuple[str, int, Dict[str, Any]]]:
+        """Lease the oldest pending job to ``owner``: ``(request id, seq, request)`` or None."""
+        def take() -> Optional[Tuple[str, int, Dict[str, Any]]]:
+            now = time.time()
+            self._requeue_expired(now)
+            row = self.conn.execute(
+                "SELECT id, seq, request FROM jobs WHERE status = ? ORDER BY seq LIMIT 1", (PENDING,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, owner = ?, lease_expires = ?, attempts = attempts + 1, updated = ? WHERE id = ?",
+                (RUNNING, owner, now + self.lease_seconds, now, row[0]),
+            )
+            return row[0], row[1], json.loads(row[2])
+        return self._transaction(take)
+
+    def heartbeat(self, owner: str, ids: List[str]) -> List[str]:
+        """Extend ``owner``'s leases on ``ids``; returns the ids whose lease it no longer holds."""
+        if not ids:
+            return []
+        def renew() -> List[str]:
+            expires = time.time() + self.lease_seconds
+            lost = []
+            for jid in ids:
+                cur = self.conn.execute(
+                    "UPDATE jobs SET lease_expires = ? WHERE id = ? AND owner = ? AND status = ?",
+                    (expires, jid, owner, RUNNING),
+                )
+                if cur.rowcount == 0:
+                    lost.append(jid)
+            return lost
+        return self._transaction(renew)
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self.conn.execute("SELECT record FROM results WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def complete(self, owner: str, jid: str, record: Dict[str, Any], key: Optional[str] = None) -> bool:
+        """Record a finished job; False if ``owner`` lost the lease meanwhile (the result is not applied)."""
+        def finish() -> bool:
+            now = time.time()
+            done = record.get("status") == DONE
+            if done and key:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO results (key, record, host, created) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(record, ensure_ascii=False), owner, now),
+                )
+            cur = self.conn.execute(
+                "UPDATE jobs SET status = ?, result_key = ?, error = ?, lease_expires = NULL, updated = ? "
+                "WHERE id = ? AND owner = ? AND status = ?",
+                (FINISHED if done else FAILED, key if done else None, record.get("error"), now, jid, owner, RUNNING),
+            )
+            return cur.rowcount == 1
+        return self._transaction(finish)
+
+    def requeue_failed(self) -> int:
+        """Put failed jobs back as pending with a fresh attempt count."""
+        def reset() -> int:
+            return self.conn.execute(
+                "UPDATE jobs SET status = ?, attempts = 0, error = NULL, owner = NULL, updated = ? WHERE status = ?",
+                (PENDING, time.time(), FAILED),
+            ).rowcount
+        return self._transaction(reset)
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: n for status, n in rows}
+
+    def active(self) -> bool:
+        """True while any job is pending or running on some host."""
+        counts = self.counts()
+        return bool(counts.get(PENDING) or counts.get(RUNNING))
+
+    def records(self) -> Iterator[Dict[str, Any]]:
+        """One record per job in request order: the stored result, or the failure."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT j.id, j.status, j.error, j.attempts, r.record FROM jobs j "
+                "LEFT JOIN results r ON r.key = j.result_key ORDER BY j.seq"
+            ).fetchall()
+        for jid, status, error, attempts, record in rows:
+            if record is not None:
+                out = json.loads(record)
+                out["request_id"] = jid
+            else:
+                out = {"request_id": jid, "status": status, "error": error}
+            out["attempts"] = attempts
+            yield out
+
+
+def work(
+    path: str,
+    concurrency: int = 2,
+    owner: Optional[str] = None,
+    defaults: Optional[Dict[str, Any]] = None,
+    job_timeout: Optional[float] = None,
+    lease_seconds: float = DEFAULT_LEASE,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    out_dir: Optional[str] = None,
+    until_empty: bool = True,
+    log: Callable[[str], None] = emit,
+) -> Dict[str, Any]:
+    """Claim and run jobs from the queue at ``path`` on this host until it is drained.
+
+    With ``until_empty=False`` the host keeps polling for new requests.
+    Returns this host's counts (``done``, ``failed``, ``cached``, ``lost``).
+    """
+    from .util.disk_cache import DiskCache
+    from .util.style_cache import StyleCache
+
+    owner = owner or default_owner()
+    store = SharedQueue(path, lease_seconds=lease_seconds, max_attempts=max_attempts)
+    cache = DiskCache(path)
+    queue = JobQueue(concurrency=concurrency, style_cache=StyleCache(disk=cache), job_timeout=job_timeout)
+    stats = {"done": 0, "failed": 0, "cached": 0, "lost": 0}
+    running: Dict[int, Tuple[str, str]] = {}  # local job id -> (queue id, result key)
+    lock = threading.Lock()
+    slot_free = threading.Event()
+    stop = threading.Event()
+
+    def on_event(job: Job, event: str) -> None:
+        if event != "finished":
+            return
+        with lock:
+            jid, key = running.pop(job.id)
+        if store.complete(owner, jid, result_record(jid, job), key):
+            stats["done" if job.status == DONE else "failed"] += 1
+            log(f"[큐] {job.status}: {jid} ({job.elapsed:.1f}s)")
+        else:
+            stats["lost"] += 1
+            log(f"[경고] 작업 임대를 잃어 결과를 버립니다: {jid}")
+        slot_free.set()
+
+    def heartbeats() -> None:
+        while not stop.wait(lease_seconds / 3):
+            with lock:
+                held = {jid: local for local, (jid, _) in running.items()}
+            for jid in store.heartbeat(owner, list(held)):
+                # Another host owns it now (we stalled past the lease); stop our copy
+                queue.cancel(held[jid])
+
+    queue.add_listener(on_event)
+    beat = threading.Thread(target=heartbeats, daemon=True, name="queue-heartbeat")
+    beat.start()
+    log(f"[큐] 작업자 시작: {owner} (동시 실행 {concurrency})")
+    try:
+        while True:
+            with lock:
+                busy = len(running)
+            if busy >= concurrency:
+                slot_free.wait(POLL_SECONDS)
+                slot_free.clear()
+                continue
+            claimed = store.claim(owner)
+            if claimed is None:
+                if busy == 0 and until_empty and not store.active():
+                    break
+                slot_free.wait(POLL_SECONDS)
+                slot_free.clear()
+                continue
+            jid, seq, req = claimed
+            try:
+                job = job_from_request(req, seq, defaults, out_dir)
+            except ValueError as e:
+                store.complete(owner, jid, {"request_id": jid, "status": "invalid", "error": str(e)})
+                stats["failed"] += 1
+                log(f"[큐] 건너뜀: {e}")
+                continue
+            key = result_key(job)
+            cached = store.lookup(key)
+            if cached is not None:
+                store.complete(owner, jid, cached, key)
+                stats["cached"] += 1
+                log(f"[큐] 저장된 결과 재사용: {jid}")
+                continue
+            with lock:
+                running[job.id] = (jid, key)
+            queue.submit(job)
+        queue.wait()
+    finally:
+        stop.set()
+        beat.join()
+        store.close()
+        cache.close()
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="여러 호스트가 함께 쓰는 작업 큐 (SQLite)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("enqueue", help="JSONL 요청을 큐에 추가 (이미 있는 request_id는 건너뜀)")
+    p.add_argument("queue")
+    p.add_argument("requests")
+    p = sub.add_parser("work", help="이 호스트에서 큐의 작업 실행")
+    p.add_argument("queue")
+    p.add_argument("--concurrency", type=int, default=2, help="동시 실행 작업 수 (기본값: 2)")
+    p.add_argument("--provider", default="anthropic", help="요청에 없을 때 쓸 제공자 (기본값: anthropic)")
+    p.add_argument("--model", default=None, help="요청에 없을 때 쓸 모델")
+    p.add_argument("--max-tokens", type=int, default=10000)
+    p.add_argument("--job-timeout", type=float, default=None, help="작업별 시간 제한(초)")
+    p.add_argument("--lease", type=float, default=DEFAULT_LEASE, help=f"작업 임대 시간(초, 기본값: {DEFAULT_LEASE:g})")
+    p.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS, help="임대 만료 시 재시도 횟수 한도")
+    p.add_argument("--compress", nargs="?", type=int, const=DEFAULT_COMPRESS_TOKENS, default=None, metavar="TOKENS", help="요청에 없을 때 첨부자료를 문서당 TOKENS 토큰 이내로 요약")
+    p.add_argument("--style-mode", choices=STYLE_MODES, default="llm", help="요청에 없을 때 쓸 Step 1 문체 분석 방식 (기본값: llm)")
+    p.add_argument("--sections", nargs="?", type=int, const=0, default=None, metavar="N", help="요청에 없을 때 긴 글을 개요 + 섹션 N개 동시 작성")
+    p.add_argument("--out-dir", default=None, help="이 호스트에 건별 파일도 쓸 폴더")
+    p.add_argument("--follow", action="store_true", help="큐가 비어도 끝내지 않고 새 요청을 기다림")
+    p.add_argument("--watch", action="append", default=[], metavar="DIR", help="첨부자료 폴더를 감시해 미리 읽어 둠 (반복 가능)")
+    p.add_argument("--watch-ref", action="append", default=[], metavar="DIR", help="참고자료 폴더를 감시해 인덱스까지 미리 갱신 (반복 가능)")
+    p = sub.add_parser("status", help="상태별 작업 수")
+    p.add_argument("queue")
+    p = sub.add_parser("requeue-failed", help="실패한 작업을 다시 대기 상태로")
+    p.add_argument("queue")
+    p = sub.add_parser("export", help="결과를 JSONL 아카이브로 내보내기 (.gz면 압축)")
+    p.add_argument("queue")
+    p.add_argument("archive")
+    args = parser.parse_args()
+
+    if args.command == "work":
+        load_env()
+        defaults = {
+            "provider": args.provider, "model": args.model, "max_tokens": args.max_tokens, "compress_tokens": args.compress,
+            "style_mode": args.style_mode, "sections": args.sections,
+        }
+        watch = None
+        if args.watch or args.watch_ref:
+            from .util.watch import CorpusWatch
+            watch = CorpusWatch(args.watch, args.watch_ref).start()
+        try:
+            stats = work(
+                args.queue, concurrency=args.concurrency, defaults=defaults, job_timeout=args.job_timeout,
+                lease_seconds=args.lease, max_attempts=args.max_attempts, out_dir=args.out_dir, until_empty=not args.follow,
+            )
+        finally:
+            if watch is not None:
+                watch.stop()
+        emit(f"[큐] 이 호스트: 완료 {stats['done']}, 실패 {stats['failed']}, 재사용 {stats['cached']}, 임대 상실 {stats['lost']}")
+        return
+    with SharedQueue(args.queue) as store:
+        if args.command == "enqueue":
+            requests = load_requests(args.requests)
+            print(f"[큐] {store.enqueue(requests)}/{len(requests)}건 추가")
+        elif args.command == "requeue-failed":
+            print(f"[큐] {store.requeue_failed()}건 다시 대기")
+        elif args.command == "export":
+            from .util.output_writer import ResultArchive
+            with ResultArchive(args.archive) as archive:
+                n = 0
+                for record in store.records():
+                    archive.add(record)
+                    n += 1
+            print(f"[큐] {n}건 내보냄: {args.archive}")
+        for status, n in sorted(store.counts().items()):
+            print(f"  {status}: {n}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+
+class Cancelled(RuntimeError):
+    """Raised inside a job when its CancelToken was triggered."""
+
+
+class DeadlineExceeded(Cancelled):
+    """Raised when a job ran past the deadline set on its CancelToken."""
+
+
+class CancelToken:
+    """Cooperative cancellation shared by every step of one job.
+
+    Code doing blocking work registers a closer (e.g. ``resp.close``) while
+    the work is in flight, so ``cancel()`` from another thread can abort it
+    instead of waiting for the next checkpoint. ``set_deadline()`` cancels the
+    token by itself once the job has run for too long.
+    """
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._closers: Dict[int, Callable[[], None]] = {}
+        self._next_id = 0
+        self.reason = "작업이 취소되었습니다"
+        self.deadline: Optional[float] = None
+        # Scheduling class of this job's rate-limited requests (providers.ratelimit); None: process default
+        self.priority: Optional[str] = None
+        self._expired = False
+        self._timer: Optional[threading.Timer] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str | None = None) -> None:
+        if reason:
+            self.reason = reason
+        self._event.set()
+        with self._lock:
+            closers = list(self._closers.values())
+            self._closers.clear()
+        for close in closers:
+            try:
+                close()
+            except Exception:
+                pass
+
+    def set_deadline(self, seconds: float) -> None:
+        """Cancel with DeadlineExceeded ``seconds`` from now (monotonic clock)."""
+        self.clear_deadline()
+        self.deadline = time.monotonic() + seconds
+        self._timer = threading.Timer(max(0.0, seconds), self._expire, args=(seconds,))
+        self._timer.daemon = True
+        self._timer.start()
+
+    def clear_deadline(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self.deadline = None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline, or None without one."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def _expire(self, seconds: float) -> None:
+        if not self._event.is_set():
+            self._expired = True
+            self.cancel(f"작업 시간 제한({seconds:g}초)을 넘겨 중단했습니다")
+
+    def error(self) -> Cancelled:
+        """The exception matching why the token was cancelled."""
+        return DeadlineExceeded(self.reason) if self._expired else Cancelled(self.reason)
+
+    def check(self) -> None:
+        if self._event.is_set():
+            raise self.error()
+
+    def wait(self, timeout: float) -> bool:
+        return self._event.wait(timeout)
+
+    def register(self, closer: Callable[[], None]) -> Callable[[], None]:
+        """Register ``closer`` to run on cancel; returns an unregister function."""
+        with self._lock:
+            key = self._next_id
+            self._next_id += 1
+            self._closers[key] = closer
+        if self._event.is_set():
+            closer()
+
+        def unregister() -> None:
+            with self._lock:
+                self._closers.pop(key, None)
+
+        return unregister
@@ -0,0 +1,182 @@
+"""Text cache in one SQLite file, shared by threads and worker processes.
+
+Batch workers (``src.batch --workers N``) point their extraction and Step 1
+caches at the same database. SQLite's WAL mode lets them read concurrently
+and serializes writes, so no process ever sees a half-written entry.
+``get_or_compute`` adds a lease per key: while one process extracts a PDF
+or runs a Step 1 request, the others wait for its result instead of
+repeating the work. A lease whose holder died expires after
+``lease_seconds`` (by default the caller's remaining deadline, at most the
+longest request a provider allows, plus LEASE_MARGIN), and a waiter whose
+own job is cancelled stops waiting.
+"""
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .env_util import cache_dir
+
+DEFAULT_MAX_MB = 1024
+# Seconds between checks while another process holds a key's lease
+LEASE_POLL = 0.2
+# Added to the expected compute time so a slow but live holder keeps its lease
+LEASE_MARGIN = 60.0
+# Entries are pruned to max size every this many puts
+PRUNE_EVERY = 200
+
+
+def default_cache_path() -> str:
+    return str(cache_dir() / "shared_cache.sqlite")
+
+
+def default_lease(cancel: Any = None) -> float:
+    """Lease for one computation: a request can't outlast MAX_TIMEOUT nor its job's deadline."""
+    from ..providers.timeouts import MAX_TIMEOUT
+    remaining = cancel.remaining() if cancel is not None else None
+    return (MAX_TIMEOUT if remaining is None else min(remaining, MAX_TIMEOUT)) + LEASE_MARGIN
+
+
+class DiskCache:
+    def __init__(self, path: Optional[str] = None, max_mb: float = DEFAULT_MAX_MB) -> None:
+        self.path = path or default_cache_path()
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False, isolation_level=None)
+        self.conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS entries (
+                ns TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                accessed REAL NOT NULL,
+                PRIMARY KEY (ns, key)
+            );
+            CREATE TABLE IF NOT EXISTS leases (
+                ns TEXT NOT NULL,
+                key TEXT NOT NULL,
+                owner TEXT NOT NULL,
+                expires REAL NOT NULL,
+                PRIMARY KEY (ns, key)
+            );
+            """
+        )
+        self.stats: Counter = Counter()
+        self._lock = threading.Lock()
+        self._puts = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+    def __enter__(self) -> "DiskCache":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def get(self, ns: str, key: str) -> Optional[str]:
+        value = self._get(ns, key)
+        self.stats[f"{ns}_hits" if value is not None else f"{ns}_misses"] += 1
+        return value
+
+    def _get(self, ns: str, key: str) -> Optional[str]:
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM entries WHERE ns = ? AND key = ?", (ns, key)).fetchone()
+            if row is not None:
+                self.conn.execute("UPDATE entries SET accessed = ? WHERE ns = ? AND key = ?", (time.time(), ns, key))
+        return row[0] if row is not None else None
+
+    def put(self, ns: str, key: str, value: str) -> None:
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO entries (ns, key, value, size, accessed) VALUES (?, ?, ?, ?, ?)",
+                (ns, key, value, len(value.encode("utf-8")), time.time()),
+            )
+            self._puts += 1
+            if self._puts % PRUNE_EVERY == 0:
+                self._prune()
+
+    def _prune(self) -> None:
+        """Drop least recently used entries beyond ``max_bytes`` (caller holds the lock)."""
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            for ns, key, size in self.conn.execute("SELECT ns, key, size FROM entries ORDER BY accessed").fetchall():
+                if total <= self.max_bytes:
+                    break
+                self.conn.execute("DELETE FROM entries WHERE ns = ? AND key = ?", (ns, key))
+                total -= size
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    # Leases
+    def _take_lease(self, ns: str, key: str, owner: str, seconds: float) -> bool:
+        now = time.time()
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute("SELECT owner, expires FROM leases WHERE ns = ? AND key = ?", (ns, key)).fetchone()
+                if row is not None and row[0] != owner and row[1] > now:
+                    self.conn.execute("COMMIT")
+                    return False
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO leases (ns, key, owner, expires) VALUES (?, ?, ?, ?)", (ns, key, owner, now + seconds)
+                )
+                self.conn.execute("COMMIT")
+                return True
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def _release_lease(self, ns: str, key: str, owner: str) -> None:
+        with self._lock:
+            self.conn.execute("DELETE FROM leases WHERE ns = ? AND key = ? AND owner = ?", (ns, key, owner))
+
+    def get_or_compute(
+        self, ns: str, key: str, compute: Callable[[], str], lease_seconds: Optional[float] = None, cancel: Any = None
+    ) -> Tuple[str, bool]:
+        """Return ``(value, cache_hit)``; only one process computes a missing key at a time.
+
+        ``cancel`` (util.cancel.CancelToken) ends the wait for another holder's lease.
+        """
+        value = self.get(ns, key)
+        if value is not None:
+            return value, True
+        if lease_seconds is None:
+            lease_seconds = default_lease(cancel)
+        owner = f"{os.getpid()}:{threading.get_ident()}:{uuid.uuid4().hex}"
+        while not self._take_lease(ns, key, owner, lease_seconds):
+            if cancel is not None:
+                cancel.wait(LEASE_POLL)
+                cancel.check()
+            else:
+                time.sleep(LEASE_POLL)
+            value = self._get(ns, key)
+            if value is not None:
+                # Computed by the lease holder meanwhile
+                self.stats[f"{ns}_waited"] += 1
+                return value, True
+        try:
+            value = self._get(ns, key)
+            if value is not None:
+                self.stats[f"{ns}_waited"] += 1
+                return value, True
+            value = compute()
+            self.put(ns, key, value)
+            return value, False
+        finally:
+            self._release_lease(ns, key, owner)
+
+    def summary(self) -> Dict[str, int]:
+        return dict(self.stats)
@@ -0,0 +1,116 @@
+"""Step 2 drafts kept per section, for partial regeneration.
+
+A rerun with the same attachments, keyword and settings usually differs
+only in a few lines of the writing guide. DraftCache stores each draft in
+the shared DiskCache (namespace "draft") with its guide split into items,
+its outline and its sections. Every outline entry also records the guide
+items it covers. On the next run ``plan_update`` diffs the new guide
+against the stored one. It returns only the sections touched by changed,
+removed or inserted items. The rest are reused as they are. Items no
+section claims apply to the whole post, so changing one rewrites every
+section, but the outline is still reused. Hashtag items belong to the last
+section.
+"""
+import difflib
+import hashlib
+import json
+import re
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+NAMESPACE = "draft"
+
+_HASHTAG_ITEM_RE = re.compile(r"해시태그|#[^\s#]+")
+
+
+def guide_items(writing_guide: Optional[str]) -> List[str]:
+    """The writing guide as non-empty stripped lines."""
+    return [line.strip() for line in (writing_guide or "").splitlines() if line.strip()]
+
+
+def draft_key(
+    provider: str, model: str, style_prompt: str, attachments_block: str, keyword: str, keyword_repeat: int,
+    word_count: Optional[int], sections: Optional[int], language: str,
+) -> str:
+    """Key for everything a draft depends on except the writing guide."""
+    h = hashlib.sha256()
+    settings = [provider, model, keyword, keyword_repeat, word_count, sections, language]
+    h.update(json.dumps(settings, ensure_ascii=False).encode("utf-8"))
+    for text in (style_prompt, attachments_block):
+        h.update(b"\0")
+        h.update(hashlib.sha256(text.encode("utf-8", errors="replace")).digest())
+    return h.hexdigest()
+
+
+def is_hashtag_item(item: str) -> bool:
+    return bool(_HASHTAG_ITEM_RE.search(item))
+
+
+def plan_update(record: Dict[str, Any], items: List[str]) -> Tuple[List[int], List[List[int]]]:
+    """``(sections to rewrite, guide item indices per section)`` for the new guide ``items``.
+
+    ``record`` is a stored long-form draft: its ``guide`` items and its
+    ``outline`` entries ``[title, points, item indices]``.
+    """
+    old = record["guide"]
+    count = len(record["outline"])
+    everything = set(range(count))
+    owners_old: List[Set[int]] = [set() for _ in old]
+    for s, (_, _, indices) in enumerate(record["outline"]):
+        for i in indices:
+            if 0 <= i < len(old):
+                owners_old[i].add(s)
+
+    owners_new: List[Set[int]] = [set() for _ in items]
+    affected: Set[int] = set()
+    matcher = difflib.SequenceMatcher(None, old, items, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            for k in range(i2 - i1):
+                owners_new[j1 + k] = owners_old[i1 + k]
+            continue
+        # Sections of the removed/replaced items; an item no section claims applies to all
+        removed = owners_old[i1:i2]
+        owners = everything if any(not o for o in removed) else set().union(*removed)
+        affected |= owners
+        for j in range(j1, j2):
+            if is_hashtag_item(items[j]):
+                target = {count - 1}
+            elif owners:
+                target = owners
+            else:
+                # Inserted next to an unchanged item: goes where its neighbour went
+                neighbour = owners_old[i1 - 1] if i1 > 0 else owners_old[i1] if i1 < len(old) else set()
+                target = neighbour or everything
+            affected |= target
+            owners_new[j] = set() if target == everything else set(target)
+
+    per_section = [[j for j, o in enumerate(owners_new) if s in o] for s in range(count)]
+    return sorted(affected), per_section
+
+
+class DraftCache:
+    """Drafts by ``draft_key`` in a DiskCache, with reuse counters."""
+
+    def __init__(self, disk: Any) -> None:
+        self.disk = disk
+        self.reused = 0
+        self.rewritten = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.disk.get(NAMESPACE, key)
+        if value is None:
+            return None
+        try:
+            return json.loads(value)
+        except ValueError:
+            return None
+
+    def put(self, key: str, record: Dict[str, Any]) -> None:
+        self.disk.put(NAMESPACE, key, json.dumps(record, ensure_ascii=False))
+
+    def count(self, reused: int, rewritten: int) -> None:
+        with self._lock:
+            self.reused += reused
+            self.rewritten += rewritten
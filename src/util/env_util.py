@@ -2,8 +2,6 @@ import os
 from pathlib import Path
 from typing import Optional, Dict, Any
 
-from dotenv import load_dotenv
-
 
 def project_root() -> Path:
     # src/util/env_util.py -> src -> project root
@@ -15,6 +13,8 @@ def load_env(verbose: bool = False) -> Dict[str, Any]:
 
     Returns diagnostic info: loaded paths, key presence, base URLs, cwd.
     """
+    from dotenv import load_dotenv
+
     info: Dict[str, Any] = {}
     cwd = Path.cwd()
     root = project_root()
@@ -61,3 +61,11 @@ def load_env(verbose: bool = False) -> Dict[str, Any]:
 
     return info
 
+
+
+def cache_dir() -> Path:
+    """Directory for local caches (signatures, indexes). Override with NB_CACHE_DIR."""
+    override = os.getenv("NB_CACHE_DIR")
+    path = Path(override) if override else project_root() / ".cache"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
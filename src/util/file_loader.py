@@ -1,6 +1,21 @@
 import os
 import glob
-from typing import List, Tuple
+import json
+import re
+import codecs
+import fnmatch
+import hashlib
+import io
+import mmap
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from html.parser import HTMLParser
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .profiling import NULL_PROFILER
+from .tokens import estimate_tokens
 
 TEXT_EXTENSIONS = {
     ".txt",
@@ -14,85 +29,676 @@ TEXT_EXTENSIONS = {
     ".yaml",
     ".yml",
     ".xml",
+    ".xhtml",
 }
 
 DOCX_EXTENSIONS = {
     ".docx",
+}
+
+# Word 97-2003 binaries: python-docx can't open them, antiword can
+DOC_EXTENSIONS = {
     ".doc",
 }
 
+PDF_EXTENSIONS = {
+    ".pdf",
+}
+
+# Markup read through the HTML-to-text extractor instead of as raw text
+HTML_EXTENSIONS = {
+    ".html",
+    ".htm",
+    ".xhtml",
+    ".xml",
+}
+
+
+# Known binary formats are rejected by extension, without opening the file
+BINARY_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".gif", ".bmp", ".webp", ".ico", ".tif", ".tiff", ".heic", ".psd",
+    ".mp3", ".wav", ".flac", ".ogg", ".m4a", ".mp4", ".mov", ".avi", ".mkv", ".webm",
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar", ".tar",
+    ".exe", ".dll", ".so", ".dylib", ".bin", ".o", ".a", ".lib", ".class", ".jar", ".pyc", ".pyd",
+    ".woff", ".woff2", ".ttf", ".otf", ".eot",
+    ".sqlite", ".db", ".pkl", ".npy", ".npz", ".parquet",
+    ".xls", ".xlsx", ".ppt", ".pptx", ".hwp",
+}
+
+# Directories that never contain attachments
+DEFAULT_EXCLUDES = [
+    ".git/", ".hg/", ".svn/", "node_modules/", "__pycache__/", ".venv/", "venv/",
+    ".tox/", ".nox/", ".mypy_cache/", ".pytest_cache/", ".ruff_cache/", ".idea/", ".vscode/", ".cache/",
+]
+
+IGNORE_FILES = (".gitignore", ".nbignore")
+MAX_FILE_SIZE = 50 * 1024 * 1024
+
 
 def is_text_file(path: str) -> bool:
     _, ext = os.path.splitext(path)
-    # Support both text and docx files
-    if ext.lower() in TEXT_EXTENSIONS or ext.lower() in DOCX_EXTENSIONS:
+    ext = ext.lower()
+    # Plain text plus every format an extractor is registered for
+    if ext in TEXT_EXTENSIONS or ext in EXTRACTORS:
         return True
+    if ext in BINARY_EXTENSIONS:
+        return False
     try:
         with open(path, "rb") as f:
             chunk = f.read(2048)
         if b"\x00" in chunk:
             return False
-        # Heuristic: treat as text if decodable
-        chunk.decode("utf-8", errors="strict")
+        # Heuristic: treat as text if decodable (a multi-byte char may be cut at the end)
+        codecs.getincrementaldecoder("utf-8")().decode(chunk, final=False)
         return True
     except Exception:
         return False
 
 
+# Extractor registry: extension -> (name, fn(path) -> text). Files without a
+# registered extractor are read as plain UTF-8 text.
+Extractor = Callable[[str], str]
+EXTRACTORS: Dict[str, Tuple[str, Extractor]] = {}
+
+
+def register_extractor(name: str, extensions: Iterable[str]) -> Callable[[Extractor], Extractor]:
+    """Register ``fn`` as the extractor for ``extensions`` (later registrations win)."""
+    def decorate(fn: Extractor) -> Extractor:
+        for ext in extensions:
+            EXTRACTORS[ext.lower()] = (name, fn)
+        return fn
+    return decorate
+
+
+# Plain text at or above this size is decoded straight from an mmap instead of
+# going through a buffered file object and an intermediate bytes copy.
+MMAP_MIN_SIZE = 1024 * 1024
+
+
+def read_text_file(path: str) -> str:
+    if os.path.getsize(path) < MMAP_MIN_SIZE:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return f.read()
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        with memoryview(mm) as view:
+            text = str(view, "utf-8", "replace")
+        has_cr = mm.find(b"\r") != -1
+    # Same newlines as text mode
+    if has_cr:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+@register_extractor("docx", DOCX_EXTENSIONS)
 def read_docx_file(path: str) -> str:
-    """Read .docx file and extract text content"""
+    """Read .docx paragraphs and tables in document order."""
     try:
         from docx import Document
+        from docx.oxml.ns import qn
+        from docx.table import Table
+        from docx.text.paragraph import Paragraph
+    except ImportError as e:
+        raise RuntimeError("DOCX 첨부를 읽으려면 python-docx 패키지가 필요합니다: pip install python-docx") from e
+    try:
         doc = Document(path)
-        paragraphs = [para.text for para in doc.paragraphs]
-        return "\n".join(paragraphs)
+        out = io.StringIO()
+        for child in doc.element.body.iterchildren():
+            if child.tag == qn("w:p"):
+                out.write(Paragraph(child, doc).text)
+                out.write("\n")
+            elif child.tag == qn("w:tbl"):
+                for row in Table(child, doc).rows:
+                    cells: List[str] = []
+                    for cell in row.cells:
+                        text = " ".join(cell.text.split())
+                        # Merged cells are reported once per grid column
+                        if not cells or cells[-1] != text:
+                            cells.append(text)
+                    out.write(" | ".join(cells))
+                    out.write("\n")
+        return out.getvalue()
     except Exception as e:
         raise RuntimeError(f"Failed to read .docx file: {e}")
 
 
-def read_text_file(path: str) -> str:
-    with open(path, "r", encoding="utf-8", errors="replace") as f:
-        return f.read()
+@register_extractor("doc", DOC_EXTENSIONS)
+def read_doc_file(path: str) -> str:
+    """Read a Word 97-2003 .doc through ``antiword`` when it is installed."""
+    import shutil
+    import subprocess
+
+    exe = shutil.which("antiword")
+    if exe is None:
+        raise RuntimeError(".doc 파일은 antiword가 있어야 읽을 수 있습니다. antiword를 설치하거나 .docx로 변환해 주세요.")
+    proc = subprocess.run([exe, "-m", "UTF-8.txt", "-w", "0", path], capture_output=True, timeout=60)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Failed to read .doc file: {proc.stderr.decode('utf-8', 'replace').strip()}")
+    return proc.stdout.decode("utf-8", "replace")
+
+
+@register_extractor("pdf", PDF_EXTENSIONS)
+def read_pdf_file(path: str) -> str:
+    """Extract PDF text page by page (PyMuPDF if installed, else pypdf)."""
+    out = io.StringIO()
+    try:
+        import fitz
+    except ImportError:
+        fitz = None
+    if fitz is not None:
+        with fitz.open(path) as doc:
+            for page in doc:
+                out.write(page.get_text().strip())
+                out.write("\n\n")
+        return out.getvalue().strip()
+    try:
+        from pypdf import PdfReader
+    except ImportError as e:
+        raise RuntimeError("PDF 첨부를 읽으려면 pypdf 패키지가 필요합니다: pip install pypdf") from e
+    for page in PdfReader(path).pages:
+        out.write((page.extract_text() or "").strip())
+        out.write("\n\n")
+    return out.getvalue().strip()
+
+
+HTML_VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr",
+}
+HTML_BLOCK_TAGS = {
+    "address", "article", "blockquote", "br", "caption", "dd", "div", "dl", "dt", "figcaption", "figure",
+    "h1", "h2", "h3", "h4", "h5", "h6", "hr", "li", "main", "ol", "p", "pre", "section", "table", "title",
+    "tr", "ul",
+}
+# Never content, wherever they appear
+HTML_SKIP_TAGS = {
+    "script", "style", "noscript", "template", "svg", "canvas", "iframe", "object", "form", "button",
+    "select", "textarea", "nav", "aside",
+}
+# Site chrome unless nested in the article itself (where they hold its title/byline)
+HTML_CHROME_TAGS = {"header", "footer"}
+HTML_CONTENT_TAGS = {"article", "main"}
+# class/id values marking navigation, ads, share bars, comment threads, ...
+_BOILERPLATE_RE = re.compile(
+    r"(?:^|[\s_-])(?:nav|navbar|gnb|lnb|menu|breadcrumbs?|sidebar|footer|banner|cookie|share|sns|social"
+    r"|comments?|reply|related|advert|ads?|popup|subscribe)(?:$|[\s_-])",
+    re.I,
+)
+_CHARSET_RE = re.compile(rb"""charset\s*=\s*["']?([A-Za-z0-9_.:-]+)""", re.I)
+_SPACES_RE = re.compile(r"[ \t\f\v\u00a0]+")
+HTML_CHUNK_CHARS = 64 * 1024
+
+
+class _HTMLTextExtractor(HTMLParser):
+    """Collects visible text, dropping script/style and page chrome.
+
+    Open elements are tracked on a stack so that a skipped subtree ends at its
+    own closing tag even when inner tags are left unclosed.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.out = io.StringIO()
+        self._stack: List[Tuple[str, bool]] = []
+        self._skip = 0
+        self._content = 0
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag in HTML_VOID_TAGS:
+            if tag in ("br", "hr") and not self._skip:
+                self.out.write("\n")
+            return
+        skip = tag in HTML_SKIP_TAGS or (tag in HTML_CHROME_TAGS and not self._content)
+        if not skip:
+            for name, value in attrs:
+                if name in ("class", "id", "role") and value and _BOILERPLATE_RE.search(value):
+                    skip = True
+                    break
+        self._stack.append((tag, skip))
+        self._skip += skip
+        self._content += tag in HTML_CONTENT_TAGS
+        if tag in HTML_BLOCK_TAGS and not self._skip:
+            self.out.write("\n")
+        elif tag in ("td", "th") and not self._skip:
+            self.out.write(" | ")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in HTML_VOID_TAGS:
+            return
+        for i in range(len(self._stack) - 1, -1, -1):
+            if self._stack[i][0] == tag:
+                break
+        else:
+            return
+        for open_tag, skip in self._stack[i:]:
+            self._skip -= skip
+            self._content -= open_tag in HTML_CONTENT_TAGS
+        del self._stack[i:]
+        if tag in HTML_BLOCK_TAGS and not self._skip:
+            self.out.write("\n")
+
+    def handle_data(self, data: str) -> None:
+        if not self._skip:
+            self.out.write(data)
+
+    def text(self) -> str:
+        lines = (_SPACES_RE.sub(" ", line).strip(" |") for line in self.out.getvalue().splitlines())
+        return "\n".join(line for line in lines if line)
+
+
+def _html_encoding(head: bytes) -> str:
+    """Encoding from a BOM or ``<meta charset>``; UTF-8 otherwise."""
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    m = _CHARSET_RE.search(head)
+    if m:
+        try:
+            return codecs.lookup(m.group(1).decode("ascii")).name
+        except LookupError:
+            pass
+    return "utf-8"
+
+
+@register_extractor("html", HTML_EXTENSIONS)
+def read_html_file(path: str) -> str:
+    """Visible text of an HTML/XML document, fed to the parser in chunks."""
+    with open(path, "rb") as f:
+        encoding = _html_encoding(f.read(4096))
+    parser = _HTMLTextExtractor()
+    with open(path, "r", encoding=encoding, errors="replace") as f:
+        while True:
+            chunk = f.read(HTML_CHUNK_CHARS)
+            if not chunk:
+                break
+            parser.feed(chunk)
+    parser.close()
+    return parser.text()
+
+
+def extract_text(path: str, stats: Optional[List[Dict[str, Any]]] = None) -> str:
+    """Run the extractor registered for ``path``'s extension.
+
+    When ``stats`` is given, one entry per call is appended: extractor name,
+    seconds, input/output bytes and their ratio.
+    """
+    _, ext = os.path.splitext(path)
+    name, extractor = EXTRACTORS.get(ext.lower(), ("text", read_text_file))
+    t0 = time.perf_counter()
+    text = extractor(path)
+    if stats is not None:
+        in_bytes = os.path.getsize(path)
+        out_bytes = len(text.encode("utf-8", "replace"))
+        stats.append({
+            "path": path,
+            "extractor": name,
+            "seconds": time.perf_counter() - t0,
+            "in_bytes": in_bytes,
+            "out_bytes": out_bytes,
+            "ratio": out_bytes / in_bytes if in_bytes else 1.0,
+        })
+    return text
+
+
+def summarize_extract_stats(stats: Sequence[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """Per-extractor totals: files, seconds, in/out bytes and overall ratio."""
+    totals: Dict[str, Dict[str, float]] = {}
+    for s in stats:
+        t = totals.setdefault(s["extractor"], {"files": 0, "seconds": 0.0, "in_bytes": 0, "out_bytes": 0})
+        t["files"] += 1
+        t["seconds"] += s["seconds"]
+        t["in_bytes"] += s["in_bytes"]
+        t["out_bytes"] += s["out_bytes"]
+    for t in totals.values():
+        t["ratio"] = t["out_bytes"] / t["in_bytes"] if t["in_bytes"] else 1.0
+    return totals
+
+
+class IgnoreRules:
+    """.gitignore-style patterns relative to ``base``.
+
+    Supports comments, ``!`` negation, trailing ``/`` (directories only),
+    leading or inner ``/`` (anchored to ``base``) and ``*``/``?``/``**``
+    wildcards. As in git, the last matching pattern wins.
+    """
+
+    def __init__(self, base: str, lines: Iterable[str]):
+        self.base = base
+        self.rules: List[Tuple[re.Pattern, bool, bool]] = []
+        for raw in lines:
+            line = raw.rstrip("\n\r")
+            if not line.strip() or line.startswith("#"):
+                continue
+            line = line.rstrip()
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.strip("/") if dir_only else line
+            anchored = "/" in line
+            line = line.lstrip("/")
+            if line:
+                self.rules.append((self._compile(line, anchored), negate, dir_only))
+
+    @classmethod
+    def from_file(cls, base: str, path: str) -> "IgnoreRules":
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                return cls(base, f.readlines())
+        except OSError:
+            return cls(base, [])
+
+    @staticmethod
+    def _compile(pattern: str, anchored: bool) -> re.Pattern:
+        out = []
+        i = 0
+        while i < len(pattern):
+            if pattern.startswith("**/", i):
+                out.append("(?:.*/)?")
+                i += 3
+            elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+                out.append("/.*")
+                i += 3
+            elif pattern.startswith("**", i):
+                out.append(".*")
+                i += 2
+            elif pattern[i] == "*":
+                out.append("[^/]*")
+                i += 1
+            elif pattern[i] == "?":
+                out.append("[^/]")
+                i += 1
+            elif pattern[i] == "[":
+                j = pattern.find("]", i + 1)
+                if j == -1:
+                    out.append(re.escape(pattern[i]))
+                    i += 1
+                else:
+                    body = pattern[i + 1:j]
+                    if body.startswith("!"):
+                        body = "^" + body[1:]
+                    out.append("[" + body.replace("\\", "\\\\") + "]")
+                    i = j + 1
+            else:
+                out.append(re.escape(pattern[i]))
+                i += 1
+        prefix = "" if anchored else "(?:.*/)?"
+        return re.compile("^" + prefix + "".join(out) + "$")
+
+    def match(self, relpath: str, is_dir: bool) -> Optional[bool]:
+        """True = ignored, False = re-included by ``!``, None = no rule applies."""
+        result = None
+        for regex, negate, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(relpath):
+                result = not negate
+        return result
+
+
+def _is_ignored(path: str, is_dir: bool, rules: Sequence[IgnoreRules]) -> bool:
+    ignored = False
+    for r in rules:
+        rel = os.path.relpath(path, r.base).replace(os.sep, "/")
+        m = r.match(rel, is_dir)
+        if m is not None:
+            ignored = m
+    return ignored
 
 
-def collect_files(input_dir: str | None, patterns: List[str]) -> List[str]:
+def scan_files(
+    roots: Sequence[str],
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+    ignore_files: Sequence[str] = IGNORE_FILES,
+    max_size: Optional[int] = MAX_FILE_SIZE,
+    follow_symlinks: bool = False,
+    skip_binary: bool = True,
+    workers: int = 1,
+    cancel: Optional[threading.Event] = None,
+    progress: Optional[Callable[[int], None]] = None,
+) -> List[Tuple[str, os.stat_result]]:
+    """Walk ``roots`` with ``os.scandir`` and return sorted ``(abs path, stat)`` pairs.
+
+    - ``include``: glob patterns a file must match (basename or root-relative path)
+    - ``exclude``: gitignore-style patterns applied on top of DEFAULT_EXCLUDES
+    - ``ignore_files``: per-directory ignore files, applied to their subtree
+    - ``max_size``: files larger than this many bytes are skipped
+    - ``follow_symlinks``: descend into symlinked directories; loops are cut
+      by remembering each directory's (st_dev, st_ino). Symlinked files are
+      always included
+    - ``skip_binary``: drop files whose extension is in BINARY_EXTENSIONS
+    - ``workers``: >1 scans directories concurrently (helps on network drives)
+    - ``cancel``: set the event to stop early; partial results are returned
+    - ``progress``: called with the running file count after each directory
+    """
+    results: List[Tuple[str, os.stat_result]] = []
+    results_lock = threading.Lock()
+    visited: set = set()
+    visited_lock = threading.Lock()
+
+    def first_visit(st: os.stat_result) -> bool:
+        key = (st.st_dev, st.st_ino)
+        with visited_lock:
+            if key in visited:
+                return False
+            visited.add(key)
+            return True
+
+    def wanted(root: str, path: str, name: str) -> bool:
+        if name in ignore_files:
+            return False
+        if skip_binary and os.path.splitext(name)[1].lower() in BINARY_EXTENSIONS:
+            return False
+        if include:
+            rel = os.path.relpath(path, root).replace(os.sep, "/")
+            return any(fnmatch.fnmatch(name, pat) or fnmatch.fnmatch(rel, pat) for pat in include)
+        return True
+
+    def scan_dir(root: str, directory: str, rules: Tuple[IgnoreRules, ...]) -> List[Tuple[str, Tuple[IgnoreRules, ...]]]:
+        """Scan one directory; returns its subdirectories to visit next."""
+        if cancel is not None and cancel.is_set():
+            return []
+        for name in ignore_files:
+            ignore_path = os.path.join(directory, name)
+            if os.path.isfile(ignore_path):
+                rules = rules + (IgnoreRules.from_file(directory, ignore_path),)
+        subdirs = []
+        found = []
+        try:
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except OSError:
+            return []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=follow_symlinks):
+                    if _is_ignored(entry.path, True, rules):
+                        continue
+                    # Every directory, so a loop is cut the first time it comes back around
+                    if not first_visit(entry.stat(follow_symlinks=True)):
+                        continue
+                    subdirs.append((entry.path, rules))
+                elif entry.is_file():
+                    if not wanted(root, entry.path, entry.name) or _is_ignored(entry.path, False, rules):
+                        continue
+                    st = entry.stat()
+                    if max_size is not None and st.st_size > max_size:
+                        continue
+                    found.append((entry.path, st))
+            except OSError:
+                continue
+        if found:
+            with results_lock:
+                results.extend(found)
+                count = len(results)
+            if progress is not None:
+                progress(count)
+        return subdirs
+
+    base_rules = []
+    for root in roots:
+        root = os.path.abspath(root)
+        try:
+            first_visit(os.stat(root))
+        except OSError:
+            continue
+        rules = (IgnoreRules(root, DEFAULT_EXCLUDES + list(exclude or [])),)
+        base_rules.append((root, rules))
+
+    if workers <= 1:
+        for root, rules in base_rules:
+            stack = [(root, rules)]
+            while stack:
+                directory, dir_rules = stack.pop()
+                stack.extend(scan_dir(root, directory, dir_rules))
+    else:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = [pool.submit(scan_dir, root, root, rules) for root, rules in base_rules]
+            roots_of = {id(f): root for f, (root, _) in zip(pending, base_rules)}
+            while pending:
+                fut = pending.pop()
+                root = roots_of.pop(id(fut))
+                for directory, dir_rules in fut.result():
+                    nxt = pool.submit(scan_dir, root, directory, dir_rules)
+                    roots_of[id(nxt)] = root
+                    pending.append(nxt)
+
+    results.sort(key=lambda item: item[0])
+    return results
+
+
+# Listings kept current by a filesystem watcher (util.watch), so a walk of a
+# watched folder costs nothing: (abs root, scan options) -> sorted paths
+_LIVE_LISTINGS: Dict[Tuple, List[str]] = {}
+_LIVE_LOCK = threading.Lock()
+
+
+def _listing_key(
+    root: str,
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+    ignore_files: Sequence[str] = IGNORE_FILES,
+    max_size: Optional[int] = MAX_FILE_SIZE,
+    follow_symlinks: bool = False,
+    skip_binary: bool = True,
+    **_: Any,
+) -> Tuple:
+    # workers/cancel/progress don't change the result
+    return (
+        os.path.abspath(root), tuple(include or ()), tuple(exclude or ()), tuple(ignore_files), max_size,
+        follow_symlinks, skip_binary,
+    )
+
+
+def set_live_listing(root: str, paths: Optional[List[str]], **options: Any) -> None:
+    """Serve ``walk_files`` for ``root`` (scanned with ``options``) from ``paths``; None stops it."""
+    key = _listing_key(root, **options)
+    with _LIVE_LOCK:
+        if paths is None:
+            _LIVE_LISTINGS.pop(key, None)
+        else:
+            _LIVE_LISTINGS[key] = paths
+
+
+def walk_files(dirs: Sequence[str], **options: Any) -> List[str]:
+    """File paths under ``dirs``; see ``scan_files`` for options."""
+    if _LIVE_LISTINGS:
+        with _LIVE_LOCK:
+            listings = [_LIVE_LISTINGS.get(_listing_key(d, **options)) for d in dirs]
+        if all(listing is not None for listing in listings):
+            return sorted(path for listing in listings for path in listing)
+    return [path for path, _ in scan_files(dirs, **options)]
+
+
+def collect_files(input_dir: str | None, patterns: List[str], **walk_options: Any) -> List[str]:
     files: List[str] = []
     if input_dir:
-        # Collect all files under directory
-        for root, _, filenames in os.walk(input_dir):
-            for name in filenames:
-                files.append(os.path.join(root, name))
+        # Collect all files under directory (already absolute, known to be files)
+        files.extend(walk_files([input_dir], **walk_options))
     for pat in patterns:
-        matched = glob.glob(pat)
-        files.extend(matched)
+        for p in glob.glob(pat):
+            if os.path.isfile(p):
+                files.append(os.path.abspath(p))
     # Deduplicate while preserving order
     seen = set()
     unique_files = []
-    for p in files:
-        ap = os.path.abspath(p)
-        if ap not in seen and os.path.isfile(ap):
+    for ap in files:
+        if ap not in seen:
             seen.add(ap)
             unique_files.append(ap)
     return unique_files
 
 
-def load_attachments(input_dir: str | None, paths: List[str]) -> List[Tuple[str, str]]:
+def read_file(path: str) -> str:
+    return extract_text(path)
+
+
+# Extracted text shared by jobs in the same process, keyed by
+# (abs path, mtime_ns, size) and bounded by total characters (LRU).
+READ_CACHE_MAX_CHARS = 64 * 1024 * 1024
+_READ_CACHE: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+_READ_CACHE_CHARS = 0
+_READ_CACHE_LOCK = threading.Lock()
+# Optional second level shared between processes (util.disk_cache.DiskCache);
+# only formats that need an extractor are worth storing
+_EXTRACT_DISK_CACHE: Any = None
+
+
+def set_extract_cache(cache: Any) -> None:
+    """Share extracted text of PDF/DOCX/HTML/... attachments through ``cache`` (None turns it off)."""
+    global _EXTRACT_DISK_CACHE
+    _EXTRACT_DISK_CACHE = cache
+
+
+def read_file_cached(path: str, stats: Optional[List[Dict[str, Any]]] = None) -> str:
+    """``read_file`` with an in-process cache invalidated by mtime/size.
+
+    ``stats`` only receives an entry when the file is actually extracted.
+    """
+    global _READ_CACHE_CHARS
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    with _READ_CACHE_LOCK:
+        content = _READ_CACHE.get(key)
+        if content is not None:
+            _READ_CACHE.move_to_end(key)
+            return content
+    disk = _EXTRACT_DISK_CACHE
+    if disk is not None and os.path.splitext(path)[1].lower() in EXTRACTORS:
+        content, _ = disk.get_or_compute("extract", "\0".join(map(str, key)), lambda: extract_text(path, stats))
+    else:
+        content = extract_text(path, stats)
+    with _READ_CACHE_LOCK:
+        if key not in _READ_CACHE and len(content) <= READ_CACHE_MAX_CHARS:
+            _READ_CACHE[key] = content
+            _READ_CACHE_CHARS += len(content)
+            while _READ_CACHE_CHARS > READ_CACHE_MAX_CHARS:
+                _, old = _READ_CACHE.popitem(last=False)
+                _READ_CACHE_CHARS -= len(old)
+    return content
+
+
+def load_attachments(
+    input_dir: str | None,
+    paths: List[str],
+    extract_stats: Optional[List[Dict[str, Any]]] = None,
+    profiler: Any = None,
+    **walk_options: Any,
+) -> List[Tuple[str, str]]:
+    prof = profiler or NULL_PROFILER
     attachments: List[Tuple[str, str]] = []
-    files = collect_files(input_dir, paths)
-    for path in files:
-        if not is_text_file(path):
-            continue
-        try:
-            _, ext = os.path.splitext(path)
-            # Read .docx files differently
-            if ext.lower() in DOCX_EXTENSIONS:
-                content = read_docx_file(path)
-            else:
-                content = read_text_file(path)
-            attachments.append((path, content))
-        except Exception:
-            # Skip unreadable files
-            continue
+    with prof.stage("collect_files"):
+        files = collect_files(input_dir, paths, **walk_options)
+    with prof.stage("extract"):
+        for path in files:
+            if not is_text_file(path):
+                continue
+            try:
+                content = read_file_cached(path, extract_stats)
+                attachments.append((path, content))
+            except Exception:
+                # Skip unreadable files
+                continue
     return attachments
 
 
@@ -111,3 +717,174 @@ def chunk_text(text: str, max_chars: int = 8000) -> List[str]:
         start = cut
     return [c for c in chunks if c]
 
+
+def limit_attachments(
+    attachments: List[Tuple[str, str]],
+    max_chars: int = 12000,
+    compress_tokens: Optional[int] = None,
+    model: Optional[str] = None,
+) -> List[Tuple[str, str]]:
+    """What of each attachment goes into the prompt.
+
+    By default the first chunk of up to ``max_chars``; with ``compress_tokens``
+    the best sentences of the whole document within that many tokens
+    (util.summarize).
+    """
+    if compress_tokens:
+        from .summarize import compress
+        return [(path, compress(content, compress_tokens, model)) for path, content in attachments]
+    # take only the first chunk to avoid token overflow in a single call
+    return [(path, chunk_text(content, max_chars=max_chars)[0]) for path, content in attachments]
+
+
+
+# ---------------------------------------------------------------------------
+# Content-level deduplication
+# ---------------------------------------------------------------------------
+
+_WS_RE = re.compile(r"\s+")
+SIMHASH_BITS = 64
+SHINGLE_SIZE = 4
+
+# (abs path, mtime_ns, size) -> (exact hash, simhash)
+_SIGNATURE_CACHE: Dict[Tuple[str, int, int], Tuple[str, int]] = {}
+
+
+def normalize_text(text: str) -> str:
+    """NFKC + lowercase + collapsed whitespace, used for near-duplicate checks."""
+    text = unicodedata.normalize("NFKC", text).lower()
+    return _WS_RE.sub(" ", text).strip()
+
+
+def simhash(text: str, shingle_size: int = SHINGLE_SIZE) -> int:
+    """64-bit SimHash over character shingles of already-normalized text.
+
+    Character shingles work for Korean without a morphological analyzer.
+    Bit weights are accumulated per byte position through 256-entry tables,
+    so the cost is ~8 additions per shingle instead of 64.
+    """
+    if len(text) < shingle_size:
+        shingles = {text: 1} if text else {}
+    else:
+        shingles = {}
+        for i in range(len(text) - shingle_size + 1):
+            sh = text[i:i + shingle_size]
+            shingles[sh] = shingles.get(sh, 0) + 1
+    if not shingles:
+        return 0
+    tables = [[0] * 256 for _ in range(SIMHASH_BITS // 8)]
+    total = 0
+    for sh, weight in shingles.items():
+        digest = hashlib.blake2b(sh.encode("utf-8"), digest_size=SIMHASH_BITS // 8).digest()
+        for pos, byte in enumerate(digest):
+            tables[pos][byte] += weight
+        total += weight
+    value = 0
+    for pos, table in enumerate(tables):
+        for bit in range(8):
+            ones = sum(w for byte, w in enumerate(table) if w and byte >> bit & 1)
+            if ones * 2 > total:
+                value |= 1 << (pos * 8 + bit)
+    return value
+
+
+def content_signature(path: str, content: str) -> Tuple[str, int]:
+    """Return (exact sha256, simhash) for a file's content, cached per file."""
+    key = None
+    try:
+        st = os.stat(path)
+        key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+        cached = _SIGNATURE_CACHE.get(key)
+        if cached is not None:
+            return cached
+    except OSError:
+        pass
+    exact = hashlib.sha256(content.encode("utf-8", errors="replace")).hexdigest()
+    sig = (exact, simhash(normalize_text(content)))
+    if key is not None:
+        _SIGNATURE_CACHE[key] = sig
+    return sig
+
+
+def load_signature_cache(path: str) -> int:
+    """Merge a persisted signature cache into memory. Returns entries loaded."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return 0
+    for item in data.get("entries", []):
+        try:
+            fpath, mtime_ns, size, exact, sh = item
+            _SIGNATURE_CACHE[(fpath, int(mtime_ns), int(size))] = (exact, int(sh))
+        except (TypeError, ValueError):
+            continue
+    return len(_SIGNATURE_CACHE)
+
+
+def save_signature_cache(path: str) -> None:
+    """Persist the in-memory signature cache (stale entries for deleted files are dropped)."""
+    entries = []
+    for (fpath, mtime_ns, size), (exact, sh) in list(_SIGNATURE_CACHE.items()):
+        if os.path.exists(fpath):
+            entries.append([fpath, mtime_ns, size, exact, sh])
+    os.makedirs(os.path.dirname(os.path.abspath(path)) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": 1, "entries": entries}, f)
+    os.replace(tmp, path)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def dedup_attachments(
+    attachments: List[Tuple[str, str]],
+    max_distance: int = 3,
+    billed_chars: Optional[int] = None,
+) -> Tuple[List[Tuple[str, str]], Dict[str, Any]]:
+    """Drop exact and near-duplicate attachments, keeping the first occurrence.
+
+    Near duplicates are SimHash signatures within ``max_distance`` bits.
+    Candidates are found through 4 x 16-bit bands, which by pigeonhole
+    catches every pair within 3 bits without comparing all pairs.
+    ``billed_chars`` limits the token-savings estimate to the part of each
+    document that would actually be sent.
+    """
+    bands = 4
+    band_bits = SIMHASH_BITS // bands
+    band_mask = (1 << band_bits) - 1
+
+    kept: List[Tuple[str, str]] = []
+    by_exact: Dict[str, str] = {}
+    buckets: Dict[Tuple[int, int], List[Tuple[int, str]]] = {}
+    stats: Dict[str, Any] = {"exact": 0, "near": 0, "dropped": [], "tokens_saved": 0}
+
+    for path, content in attachments:
+        exact, sh = content_signature(path, content)
+        match: Optional[Tuple[str, str]] = None
+        if exact in by_exact:
+            match = (by_exact[exact], "exact")
+        elif content and not content.isspace():
+            # Same as normalize_text(content) being non-empty, without normalizing the whole text
+            keys = [(b, (sh >> (b * band_bits)) & band_mask) for b in range(bands)]
+            for key in keys:
+                for other_sh, other_path in buckets.get(key, []):
+                    if hamming(sh, other_sh) <= max_distance:
+                        match = (other_path, "near")
+                        break
+                if match:
+                    break
+        if match:
+            kept_path, kind = match
+            stats[kind] += 1
+            stats["dropped"].append((path, kept_path, kind))
+            billed = content if billed_chars is None else content[:billed_chars]
+            stats["tokens_saved"] += estimate_tokens(billed)
+            continue
+        by_exact[exact] = path
+        for b in range(bands):
+            buckets.setdefault((b, (sh >> (b * band_bits)) & band_mask), []).append((sh, path))
+        kept.append((path, content))
+    return kept, stats
@@ -0,0 +1,101 @@
+"""Request bodies assembled from JSON fragments encoded once.
+
+Prompts repeat the same large pieces (the Step 1 system prompt, the
+attachments block) across both passes and across jobs sharing attachments.
+A Segment keeps the JSON-escaped UTF-8 form of its text, and a Prompt — a ``str``
+so everything else can keep treating message contents as text — remembers
+the segments it was joined from. ``dumps_payload`` serializes the small rest
+of a payload with ``json.dumps`` and splices each Prompt in from its
+segments' cached fragments instead of escaping megabytes of text again.
+
+Bodies are UTF-8 (``ensure_ascii=False``); ``requests``' ``json=`` would
+escape every Hangul syllable to a 6-byte ``\\uXXXX`` sequence.
+"""
+import json
+import uuid
+from typing import Any, Dict, List, Sequence, Tuple, Union
+
+
+def _encode(text: str) -> bytes:
+    """UTF-8 JSON string body of ``text``, without the quotes."""
+    return json.dumps(text, ensure_ascii=False)[1:-1].encode("utf-8")
+
+
+class Segment:
+    """Text plus its UTF-8 JSON string body (without quotes), encoded on first use."""
+
+    __slots__ = ("text", "_json")
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self._json: Union[bytes, None] = None
+
+    @property
+    def json(self) -> bytes:
+        if self._json is None:
+            self._json = _encode(self.text)
+        return self._json
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+
+Part = Union[str, Segment]
+
+
+class Prompt(str):
+    """A message content string that remembers the parts it was joined from.
+
+    ``cached_parts`` leading parts form a prefix repeated verbatim across
+    requests; providers with prompt caching mark it cacheable.
+    """
+
+    parts: Tuple[Part, ...]
+    cached_parts: int
+
+    def __new__(cls, parts: Sequence[Part], cached_parts: int = 0) -> "Prompt":
+        self = super().__new__(cls, "".join(p.text if isinstance(p, Segment) else p for p in parts))
+        self.parts = tuple(parts)
+        self.cached_parts = cached_parts
+        return self
+
+    def split_cached(self) -> Tuple["Prompt", "Prompt"]:
+        """(cacheable prefix, rest)."""
+        return Prompt(self.parts[:self.cached_parts]), Prompt(self.parts[self.cached_parts:])
+
+    def json_fragments(self) -> List[bytes]:
+        return [p.json if isinstance(p, Segment) else _encode(p) for p in self.parts]
+
+
+_MARK = "\x00prompt-{}-{}\x00"
+
+
+def dumps_payload(payload: Dict[str, Any]) -> bytes:
+    """UTF-8 JSON body for ``payload``; equal to ``json.dumps(payload, ensure_ascii=False)``."""
+    prompts: List[Prompt] = []
+    nonce = uuid.uuid4().hex
+
+    def strip(value: Any) -> Any:
+        if isinstance(value, Prompt):
+            prompts.append(value)
+            return _MARK.format(nonce, len(prompts) - 1)
+        if isinstance(value, dict):
+            return {k: strip(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [strip(v) for v in value]
+        return value
+
+    skeleton = json.dumps(strip(payload), ensure_ascii=False).encode("utf-8")
+    if not prompts:
+        return skeleton
+    # One copy of the large fragments, into the final body
+    pieces: List[bytes] = []
+    rest = skeleton
+    for i, prompt in enumerate(prompts):
+        # Markers are unique per call and appear in the skeleton in the order they were made
+        mark = json.dumps(_MARK.format(nonce, i)).encode("ascii")[1:-1]
+        head, rest = rest.split(mark, 1)
+        pieces.append(head)
+        pieces.extend(prompt.json_fragments())
+    pieces.append(rest)
+    return b"".join(pieces)
@@ -0,0 +1,307 @@
+"""Structured logging off the hot path.
+
+Every log line becomes a ``logging`` record on the ``nb`` logger with a
+level taken from its prefix ("[경고]" WARNING, "[디버그]"/"[debug]" DEBUG,
+"[오류]" ERROR, otherwise INFO) and the caller's context (job id, keyword,
+worker, ...). A QueueHandler puts records on a bounded queue and never
+blocks: when the queue is full the record is dropped and counted. One
+listener thread hands them to the outputs:
+
+- the console (plain message, as ``print`` did)
+- an optional JSONL file rotated by size (``NB_LOG_FILE`` or ``--log-file``)
+- ring-buffer views such as the GUI log, which keep the last N lines and
+  hand them over in batches
+
+The console and views show top-level lines plus WARNING and above from
+jobs; the JSONL file gets everything. ``NB_LOG_LEVEL`` sets the threshold
+(default DEBUG, which keeps every line previously printed).
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+LOGGER_NAME = "nb"
+# Records waiting for the listener; beyond this they are dropped, not waited on
+QUEUE_SIZE = 10000
+# JSONL file rotation
+MAX_BYTES = 10 * 1024 * 1024
+BACKUPS = 3
+# Lines a ring-buffer view keeps
+RING_LINES = 5000
+
+_PREFIX_LEVELS = (
+    ("[경고]", logging.WARNING),
+    ("[오류]", logging.ERROR),
+    ("[디버그]", logging.DEBUG),
+    ("[debug]", logging.DEBUG),
+)
+
+
+def level_of(msg: str) -> int:
+    for prefix, level in _PREFIX_LEVELS:
+        if msg.startswith(prefix):
+            return level
+    return logging.INFO
+
+
+def parse_level(value: Any) -> int:
+    if isinstance(value, int):
+        return value
+    level = logging.getLevelName(str(value).strip().upper())
+    if not isinstance(level, int):
+        raise ValueError(f"알 수 없는 로그 레벨: {value}")
+    return level
+
+
+def context_of(record: logging.LogRecord) -> Dict[str, Any]:
+    return getattr(record, "ctx", None) or {}
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full."""
+
+    def __init__(self, q: "queue.Queue[Any]") -> None:
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting happens on the listener thread; only resolve the message here
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class MainViewFilter(logging.Filter):
+    """Top-level lines, and only warnings and errors from inside jobs."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or "job" not in context_of(record)
+
+
+class JsonlFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "msg": record.getMessage(),
+            "thread": record.threadName,
+        }
+        entry.update(context_of(record))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the last ``capacity`` lines; ``drain()`` returns those not yet taken.
+
+    A UI polls ``drain()`` on its own thread and inserts the lines in one
+    widget update; lines that scrolled out of the ring before a poll are
+    counted in ``skipped``.
+    """
+
+    def __init__(self, capacity: int = RING_LINES, level: int = logging.NOTSET) -> None:
+        super().__init__(level)
+        self.capacity = capacity
+        self.lines: Deque[str] = deque(maxlen=capacity)
+        self._new: Deque[str] = deque(maxlen=capacity)
+        self.skipped = 0
+        self.addFilter(MainViewFilter())
+
+    def emit(self, record: logging.LogRecord) -> None:
+        line = self.format(record)
+        with self.lock:
+            if len(self._new) == self.capacity:
+                self.skipped += 1
+            self.lines.append(line)
+            self._new.append(line)
+
+    def drain(self) -> List[str]:
+        with self.lock:
+            lines = list(self._new)
+            self._new.clear()
+        return lines
+
+
+class _Stdout(logging.StreamHandler):
+    """Writes to whatever ``sys.stdout`` is at the time (test runners and GUIs swap it)."""
+
+    @property
+    def stream(self) -> Any:
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value: Any) -> None:
+        pass
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Blocking: a full queue must still get its stop marker
+        self.queue.put(self._sentinel)
+
+
+class _Fanout(logging.Handler):
+    """The listener's single target; outputs can be added and removed while it runs."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.targets: List[logging.Handler] = []
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        for target in list(self.targets):
+            if record.levelno >= target.level:
+                target.handle(record)
+        return True
+
+
+class LogSystem:
+    """The queue, its listener thread and the outputs behind it."""
+
+    def __init__(
+        self,
+        level: Any = "DEBUG",
+        console: bool = True,
+        jsonl_path: Optional[str] = None,
+        max_bytes: int = MAX_BYTES,
+        backups: int = BACKUPS,
+        queue_size: int = QUEUE_SIZE,
+    ) -> None:
+        self.level = parse_level(level)
+        self.queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self.handler = DroppingQueueHandler(self.queue)
+        self.fanout = _Fanout()
+        if console:
+            stream = _Stdout()
+            stream.setFormatter(logging.Formatter("%(message)s"))
+            stream.addFilter(MainViewFilter())
+            self.fanout.targets.append(stream)
+        self.jsonl_path = jsonl_path
+        if jsonl_path:
+            os.makedirs(os.path.dirname(os.path.abspath(jsonl_path)) or ".", exist_ok=True)
+            rotating = logging.handlers.RotatingFileHandler(
+                jsonl_path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True
+            )
+            rotating.setFormatter(JsonlFormatter())
+            self.fanout.targets.append(rotating)
+        self.listener = _Listener(self.queue, self.fanout)
+        self.listener.start()
+
+    @property
+    def dropped(self) -> int:
+        return self.handler.dropped
+
+    def add_view(self, handler: logging.Handler) -> logging.Handler:
+        self.fanout.targets.append(handler)
+        return handler
+
+    def remove_view(self, handler: logging.Handler) -> None:
+        if handler in self.fanout.targets:
+            self.fanout.targets.remove(handler)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until the listener has written everything queued so far."""
+        end = time.monotonic() + timeout
+        while self.queue.unfinished_tasks:
+            if time.monotonic() > end:
+                return False
+            time.sleep(0.005)
+        for target in list(self.fanout.targets):
+            target.flush()
+        return True
+
+    def stop(self) -> None:
+        self.listener.stop()
+        for target in self.fanout.targets:
+            target.close()
+
+
+_SYSTEM: Optional[LogSystem] = None
+_LOCK = threading.Lock()
+
+
+def _install(system: LogSystem) -> LogSystem:
+    global _SYSTEM
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(system.level)
+    logger.propagate = False
+    previous = _SYSTEM
+    if previous is not None:
+        logger.removeHandler(previous.handler)
+    logger.addHandler(system.handler)
+    _SYSTEM = system
+    if previous is not None:
+        previous.stop()
+    return system
+
+
+def configure(
+    level: Any = None,
+    console: bool = True,
+    jsonl_path: Optional[str] = None,
+    max_bytes: int = MAX_BYTES,
+    backups: int = BACKUPS,
+) -> LogSystem:
+    """Replace the process's outputs; ``level``/``jsonl_path`` default to NB_LOG_LEVEL / NB_LOG_FILE."""
+    with _LOCK:
+        return _install(LogSystem(
+            level=level or os.getenv("NB_LOG_LEVEL") or "DEBUG", console=console,
+            jsonl_path=jsonl_path or os.getenv("NB_LOG_FILE") or None, max_bytes=max_bytes, backups=backups,
+        ))
+
+
+def system() -> LogSystem:
+    """The process's LogSystem, configured from the environment on first use."""
+    if _SYSTEM is None:
+        with _LOCK:
+            if _SYSTEM is None:
+                _install(LogSystem(level=os.getenv("NB_LOG_LEVEL") or "DEBUG", jsonl_path=os.getenv("NB_LOG_FILE") or None))
+    return _SYSTEM
+
+
+def worker_log_path(path: str, worker: int) -> str:
+    """``logs/run.jsonl`` -> ``logs/run.w3.jsonl``: one rotating file per process."""
+    root, ext = os.path.splitext(path)
+    return f"{root}.w{worker}{ext or '.jsonl'}"
+
+
+def flush(timeout: float = 5.0) -> bool:
+    return _SYSTEM.flush(timeout) if _SYSTEM is not None else True
+
+
+def emit(msg: str, **context: Any) -> None:
+    """Log one line; the level comes from its prefix."""
+    if _SYSTEM is None:
+        system()
+    logger = logging.getLogger(LOGGER_NAME)
+    level = level_of(msg)
+    if logger.isEnabledFor(level):
+        logger.log(level, msg, extra={"ctx": context})
+
+
+def get_log(**context: Any) -> Callable[[str], None]:
+    """A ``log(msg)`` callable (the ``log_callback`` shape) that tags each line with ``context``."""
+
+    def log(msg: str) -> None:
+        emit(msg, **context)
+
+    return log
+
+
+@atexit.register
+def _shutdown() -> None:
+    if _SYSTEM is not None:
+        _SYSTEM.stop()
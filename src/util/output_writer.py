@@ -0,0 +1,289 @@
+"""Crash-safe output files.
+
+AtomicWriter streams text into a temp file next to the target and only
+``os.replace``s it into place after an fsync, so readers see either the old
+file or the complete new one. Creating a writer claims the path — in this
+process through a registry, across processes through a ``<path>.lock``
+file — so two jobs pointed at the same output fail fast with
+OutputCollision instead of clobbering each other.
+
+ResultArchive collects many batch results as JSON lines in one file
+(gzip-compressed when the name ends in ``.gz``) instead of one small file
+per result.
+"""
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import zlib
+from typing import Any, Dict, IO, Iterator, List, Optional, Set
+
+# A lock file whose process is gone, or older than this, is taken over
+STALE_LOCK_SECONDS = 6 * 3600
+
+_CLAIMS: Set[str] = set()
+_CLAIMS_LOCK = threading.Lock()
+
+
+class OutputCollision(RuntimeError):
+    """Another job (in this or another process) is writing the same output path."""
+
+
+def _claim_key(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # os.kill(pid, 0) would terminate the process on Windows; rely on age instead
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class OutputClaim:
+    """Exclusive right to write ``path`` until ``release()``."""
+
+    def __init__(self, path: str) -> None:
+        self.path = os.path.abspath(path)
+        self.key = _claim_key(path)
+        self.lock_path = self.path + ".lock"
+        self._released = False
+        with _CLAIMS_LOCK:
+            if self.key in _CLAIMS:
+                raise OutputCollision(f"다른 작업이 같은 출력 파일에 쓰는 중입니다: {self.path}")
+            _CLAIMS.add(self.key)
+        try:
+            self._acquire_lock_file()
+        except BaseException:
+            with _CLAIMS_LOCK:
+                _CLAIMS.discard(self.key)
+            raise
+
+    def _acquire_lock_file(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        for _ in range(2):
+            try:
+                fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                if self._lock_is_stale():
+                    try:
+                        os.unlink(self.lock_path)
+                    except FileNotFoundError:
+                        pass
+                    continue
+                raise OutputCollision(f"다른 프로세스가 같은 출력 파일에 쓰는 중입니다: {self.path} ({self.lock_path})")
+            with os.fdopen(fd, "w") as f:
+                f.write(f"{os.getpid()}\n")
+            return
+        raise OutputCollision(f"출력 파일 잠금을 얻지 못했습니다: {self.lock_path}")
+
+    def _lock_is_stale(self) -> bool:
+        try:
+            with open(self.lock_path, encoding="utf-8") as f:
+                pid = int(f.read().strip() or 0)
+            age = time.time() - os.path.getmtime(self.lock_path)
+        except (OSError, ValueError):
+            return True
+        return age > STALE_LOCK_SECONDS or not pid or not _pid_alive(pid)
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        try:
+            os.unlink(self.lock_path)
+        except FileNotFoundError:
+            pass
+        with _CLAIMS_LOCK:
+            _CLAIMS.discard(self.key)
+
+    def __enter__(self) -> "OutputClaim":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.release()
+
+
+def claim_output(path: str) -> OutputClaim:
+    return OutputClaim(path)
+
+
+def _fsync_dir(path: str) -> None:
+    """Persist a rename on POSIX (directories can't be opened on Windows)."""
+    if os.name == "nt":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class AtomicWriter:
+    """Write ``path`` through a temp file; ``commit()`` publishes it, ``abort()`` discards it.
+
+    With ``claim=False`` the caller is responsible for collision checks (e.g.
+    side files of an output it already claimed).
+    """
+
+    def __init__(self, path: str, claim: bool = True, encoding: str = "utf-8") -> None:
+        self.path = os.path.abspath(path)
+        self._claim = OutputClaim(path) if claim else None
+        directory = os.path.dirname(self.path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, self.tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(self.path)}.", suffix=".tmp")
+        except BaseException:
+            if self._claim:
+                self._claim.release()
+            raise
+        self._file: Optional[IO[str]] = io.open(fd, "w", encoding=encoding)
+        self._pieces: List[str] = []
+
+    @property
+    def closed(self) -> bool:
+        return self._file is None
+
+    def write(self, text: str) -> None:
+        """Append ``text`` (e.g. a streamed delta) to the temp file."""
+        assert self._file is not None, "writer already closed"
+        self._file.write(text)
+        self._pieces.append(text)
+
+    def flush(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+
+    def commit(self, text: Optional[str] = None) -> str:
+        """Publish the file; ``text`` replaces what was streamed if it differs (e.g. stripped)."""
+        assert self._file is not None, "writer already closed"
+        f = self._file
+        try:
+            if text is not None and text != "".join(self._pieces):
+                f.seek(0)
+                f.truncate()
+                f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+            f.close()
+            self._file = None
+            # mkstemp creates 0600; keep the mode an existing file had
+            try:
+                mode = os.stat(self.path).st_mode & 0o777
+            except FileNotFoundError:
+                mode = 0o644
+            os.chmod(self.tmp_path, mode)
+            os.replace(self.tmp_path, self.path)
+            _fsync_dir(os.path.dirname(self.path))
+        except BaseException:
+            self.abort()
+            raise
+        finally:
+            self._pieces = []
+        if self._claim:
+            self._claim.release()
+        return self.path
+
+    def abort(self) -> None:
+        """Drop the temp file; the previous contents of ``path`` stay untouched."""
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+        try:
+            os.unlink(self.tmp_path)
+        except FileNotFoundError:
+            pass
+        if self._claim:
+            self._claim.release()
+
+    def __enter__(self) -> "AtomicWriter":
+        return self
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        if self._file is None:
+            return
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+
+def write_text_atomic(path: str, text: str, claim: bool = True) -> str:
+    with AtomicWriter(path, claim=claim) as w:
+        w.write(text)
+    return w.path
+
+
+class ResultArchive:
+    """Append-only JSONL of results, one record per line, safe to share between threads.
+
+    Each record is flushed as it is added (a gzip sync flush for ``.gz``,
+    which keeps one compression stream across records), so an interrupted
+    batch keeps everything written so far.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = os.path.abspath(path)
+        self._claim = OutputClaim(path)
+        self.compressed = self.path.endswith(".gz")
+        self._lock = threading.Lock()
+        self.count = 0
+        try:
+            self._raw = open(self.path, "ab")
+        except BaseException:
+            self._claim.release()
+            raise
+        self._gz = gzip.GzipFile(fileobj=self._raw, mode="ab") if self.compressed else None
+
+    def add(self, record: Dict[str, Any]) -> None:
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            if self._gz is not None:
+                self._gz.write(line)
+                self._gz.flush(zlib.Z_SYNC_FLUSH)
+            else:
+                self._raw.write(line)
+            self._raw.flush()
+            self.count += 1
+
+    def close(self) -> None:
+        with self._lock:
+            if self._raw.closed:
+                return
+            if self._gz is not None:
+                self._gz.close()
+            self._raw.flush()
+            os.fsync(self._raw.fileno())
+            self._raw.close()
+        self._claim.release()
+
+    def __enter__(self) -> "ResultArchive":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def read_archive(path: str) -> Iterator[Dict[str, Any]]:
+    """Records of a ResultArchive; a truncated last record is skipped."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                if not line.endswith("\n"):
+                    return
+                yield json.loads(line)
+        except EOFError:
+            return
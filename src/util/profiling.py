@@ -0,0 +1,239 @@
+"""Per-stage profiling for run().
+
+run() wraps each pipeline stage (collect_files, extract, format_attachments,
+step1_style, ...) in ``profiler.stage(name)``. Without a profiler it uses
+NULL_PROFILER, whose ``stage()`` returns one shared no-op context manager,
+so disabled profiling costs a method call per stage and nothing else.
+
+Profiler forwards stage boundaries to pluggable StageHook objects:
+
+- StageTimer: wall-clock vs CPU time per stage; the difference is time spent
+  waiting on disk or the network
+- CProfileHook: deterministic cProfile stats for the whole run (``.prof``,
+  open with ``python -m pstats`` or snakeviz)
+- StackSampler: samples the profiled thread's stack every few milliseconds
+  and writes collapsed stacks (``.collapsed``, one ``stage;frame;... count``
+  line per stack) for flamegraph.pl or speedscope
+
+CPU time is that of the thread running the stage (``time.thread_time``);
+work handed to other threads (e.g. ``--walk-workers``) shows up as waiting.
+"""
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, ContextManager, Dict, Iterator, List, Optional
+
+from .output_writer import write_text_atomic
+
+# Default StackSampler period (seconds)
+SAMPLE_INTERVAL = 0.005
+
+
+class StageHook:
+    """Receives profiler events; override only what you need."""
+
+    def start(self, profiler: "Profiler") -> None:
+        pass
+
+    def enter(self, stage: str) -> None:
+        pass
+
+    def exit(self, stage: str, wall: float, cpu: float) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def save(self, prefix: str) -> List[str]:
+        """Write this hook's output next to ``prefix``; return the paths written."""
+        return []
+
+
+class StageTimer(StageHook):
+    def __init__(self) -> None:
+        self.stages: Dict[str, Dict[str, float]] = {}
+
+    def exit(self, stage: str, wall: float, cpu: float) -> None:
+        entry = self.stages.setdefault(stage, {"calls": 0, "wall": 0.0, "cpu": 0.0})
+        entry["calls"] += 1
+        entry["wall"] += wall
+        entry["cpu"] += cpu
+
+    def save(self, prefix: str) -> List[str]:
+        path = prefix + ".stages.json"
+        write_text_atomic(path, json.dumps(self.stages, ensure_ascii=False, indent=2), claim=False)
+        return [path]
+
+
+class CProfileHook(StageHook):
+    def __init__(self) -> None:
+        import cProfile
+        self.profile = cProfile.Profile()
+
+    def start(self, profiler: "Profiler") -> None:
+        self.profile.enable()
+
+    def stop(self) -> None:
+        self.profile.disable()
+
+    def save(self, prefix: str) -> List[str]:
+        path = prefix + ".prof"
+        self.profile.dump_stats(path)
+        return [path]
+
+
+class StackSampler(StageHook):
+    """Statistical sampler of the thread that started the profiler.
+
+    Each sample is the current stage path followed by the call stack from the
+    outermost frame, so a flamegraph groups time by stage first.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL, max_depth: int = 128) -> None:
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples: Counter = Counter()
+        self._profiler: Optional[Profiler] = None
+        self._tid = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, profiler: "Profiler") -> None:
+        self._profiler = profiler
+        self._tid = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="stack-sampler")
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._tid)
+            if frame is None:
+                continue
+            names: List[str] = []
+            while frame is not None and len(names) < self.max_depth:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            del frame
+            stages = self._profiler.current_stages() if self._profiler else []
+            self.samples[";".join((stages or ["(기타)"]) + names[::-1])] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def save(self, prefix: str) -> List[str]:
+        path = prefix + ".collapsed"
+        write_text_atomic(path, self.collapsed(), claim=False)
+        return [path]
+
+
+class NullProfiler:
+    """Stand-in used when profiling is off."""
+
+    enabled = False
+    _NULL_STAGE = contextlib.nullcontext()
+
+    def stage(self, name: str) -> ContextManager[None]:
+        return self._NULL_STAGE
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class Profiler:
+    """Collects stage timings plus the given hooks; use as ``with Profiler() as prof``."""
+
+    enabled = True
+
+    def __init__(
+        self, hooks: Optional[List[StageHook]] = None, cprofile: bool = True, sample_interval: Optional[float] = SAMPLE_INTERVAL
+    ) -> None:
+        self.timer = StageTimer()
+        self.hooks: List[StageHook] = [self.timer]
+        if cprofile:
+            self.hooks.append(CProfileHook())
+        if sample_interval:
+            self.hooks.append(StackSampler(sample_interval))
+        self.hooks.extend(hooks or [])
+        self.wall = 0.0
+        self.cpu = 0.0
+        self._stages: List[str] = []
+        self._t0 = (0.0, 0.0)
+        self._running = False
+
+    def add_hook(self, hook: StageHook) -> None:
+        self.hooks.append(hook)
+        if self._running:
+            hook.start(self)
+
+    def current_stages(self) -> List[str]:
+        return list(self._stages)
+
+    def start(self) -> "Profiler":
+        self._running = True
+        self._t0 = (time.perf_counter(), time.thread_time())
+        for hook in self.hooks:
+            hook.start(self)
+        return self
+
+    def stop(self) -> None:
+        if not self._running:
+            return
+        self._running = False
+        for hook in reversed(self.hooks):
+            hook.stop()
+        self.wall = time.perf_counter() - self._t0[0]
+        self.cpu = time.thread_time() - self._t0[1]
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        self._stages.append(name)
+        for hook in self.hooks:
+            hook.enter(name)
+        wall0, cpu0 = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall0, time.thread_time() - cpu0
+            self._stages.pop()
+            for hook in reversed(self.hooks):
+                hook.exit(name, wall, cpu)
+
+    def report(self) -> List[str]:
+        """Korean log lines: wall / CPU / waiting time per stage, in run order."""
+        lines = ["[프로파일] 단계별 시간 (벽시계 / CPU / 대기=I/O·네트워크)"]
+
+        def row(label: str, wall: float, cpu: float, suffix: str = "") -> str:
+            return f"  {label:<20} {wall:8.3f}s / {cpu:8.3f}s / {max(wall - cpu, 0.0):8.3f}s{suffix}"
+
+        for name, t in self.timer.stages.items():
+            share = f" ({t['wall'] / self.wall:.0%})" if self.wall else ""
+            calls = f" {int(t['calls'])}회" if t["calls"] > 1 else ""
+            lines.append(row(name, t["wall"], t["cpu"], share + calls))
+        lines.append(row("전체", self.wall, self.cpu))
+        return lines
+
+    def save(self, prefix: str) -> List[str]:
+        """Write every hook's output as ``<prefix>.<ext>``; return the paths."""
+        os.makedirs(os.path.dirname(os.path.abspath(prefix)), exist_ok=True)
+        paths: List[str] = []
+        for hook in self.hooks:
+            paths.extend(hook.save(prefix))
+        return paths
+
+    def __enter__(self) -> "Profiler":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
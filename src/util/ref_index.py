@@ -0,0 +1,322 @@
+"""Persistent retrieval index over a reference library of past posts.
+
+Documents are tokenized into Korean character bigrams (Latin words and
+numbers stay whole) and stored in an SQLite FTS5 table, so ranking is BM25
+and a query only touches the postings of its own terms. The index lives in
+the cache directory and is updated incrementally by comparing each file's
+mtime/size with what was indexed.
+
+Embeddings are optional: ``build_embeddings`` computes them offline with any
+``embed_fn(texts) -> vectors`` and ``search`` then reranks the BM25
+candidates by cosine similarity.
+"""
+import argparse
+import hashlib
+import math
+import os
+import re
+import sqlite3
+import time
+from array import array
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .env_util import cache_dir
+from .file_loader import is_text_file, normalize_text, read_file, read_file_cached, scan_files
+
+EmbedFn = Callable[[List[str]], List[List[float]]]
+
+_TERM_RE = re.compile(r"[가-힣]+|[a-z0-9]+")
+_HANGUL_WORD_RE = re.compile(r"[가-힣]+")
+
+# Only the head of each document is indexed; that is also the part that
+# ends up in the prompt (see chunk_text in run()).
+INDEX_MAX_CHARS = 20000
+MAX_QUERY_TERMS = 64
+
+
+def ngram_terms(text: str, n: int = 2) -> List[str]:
+    """Korean words -> character n-grams, other words kept whole."""
+    terms: List[str] = []
+    for m in _TERM_RE.finditer(normalize_text(text)):
+        word = m.group()
+        if _HANGUL_WORD_RE.fullmatch(word) and len(word) > n:
+            terms.extend(word[i:i + n] for i in range(len(word) - n + 1))
+        else:
+            terms.append(word)
+    return terms
+
+
+def default_index_path(root: str) -> str:
+    digest = hashlib.sha1(os.path.abspath(root).encode("utf-8")).hexdigest()[:12]
+    return str(cache_dir() / f"ref_index_{digest}.sqlite")
+
+
+class ReferenceIndex:
+    def __init__(self, root: str, index_path: Optional[str] = None):
+        self.root = os.path.abspath(root)
+        self.index_path = index_path or default_index_path(self.root)
+        os.makedirs(os.path.dirname(os.path.abspath(self.index_path)) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(self.index_path, check_same_thread=False)
+        try:
+            self.conn.executescript(
+                """
+                PRAGMA journal_mode=WAL;
+                CREATE TABLE IF NOT EXISTS files (
+                    id INTEGER PRIMARY KEY,
+                    path TEXT UNIQUE NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    size INTEGER NOT NULL
+                );
+                CREATE VIRTUAL TABLE IF NOT EXISTS terms USING fts5(body, tokenize='unicode61 remove_diacritics 0');
+                CREATE TABLE IF NOT EXISTS embeddings (id INTEGER PRIMARY KEY, vec BLOB NOT NULL);
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+                """
+            )
+        except sqlite3.OperationalError as e:
+            raise RuntimeError(f"참고자료 인덱스를 만들 수 없습니다 (SQLite FTS5 필요): {e}") from e
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "ReferenceIndex":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    # Indexing
+    def update(self, log: Optional[Callable[[str], None]] = None) -> Dict[str, int]:
+        """Sync the index with the files currently under ``root``."""
+        t0 = time.perf_counter()
+        stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0, "failed": 0}
+        known: Dict[str, Tuple[int, int, int]] = {
+            path: (fid, mtime_ns, size)
+            for fid, path, mtime_ns, size in self.conn.execute("SELECT id, path, mtime_ns, size FROM files")
+        }
+        seen = set()
+        with self.conn:
+            for path, st in scan_files([self.root]):
+                seen.add(path)
+                prev = known.get(path)
+                if prev and prev[1] == st.st_mtime_ns and prev[2] == st.st_size:
+                    stats["unchanged"] += 1
+                    continue
+                if prev:
+                    # Old terms go even if the new content no longer qualifies
+                    self._delete(prev[0])
+                if not is_text_file(path):
+                    if prev:
+                        stats["removed"] += 1
+                    continue
+                try:
+                    text = read_file_cached(path)[:INDEX_MAX_CHARS]
+                except Exception:
+                    stats["failed"] += 1
+                    continue
+                body = " ".join(ngram_terms(text))
+                if prev:
+                    stats["updated"] += 1
+                else:
+                    stats["added"] += 1
+                cur = self.conn.execute(
+                    "INSERT INTO files (path, mtime_ns, size) VALUES (?, ?, ?)",
+                    (path, st.st_mtime_ns, st.st_size),
+                )
+                self.conn.execute("INSERT INTO terms (rowid, body) VALUES (?, ?)", (cur.lastrowid, body))
+            for path, (fid, _, _) in known.items():
+                if path not in seen:
+                    self._delete(fid)
+                    stats["removed"] += 1
+        if log:
+            log(
+                f"[참고자료] 인덱스 갱신 {time.perf_counter() - t0:.2f}s: "
+                f"추가 {stats['added']}, 변경 {stats['updated']}, 삭제 {stats['removed']}, 유지 {stats['unchanged']}"
+            )
+        return stats
+
+    def update_paths(self, paths: Iterable[str]) -> Dict[str, int]:
+        """Re-index (or drop) specific files, e.g. from a filesystem watcher."""
+        stats = {"added": 0, "updated": 0, "removed": 0}
+        with self.conn:
+            for path in paths:
+                path = os.path.abspath(path)
+                row = self.conn.execute("SELECT id FROM files WHERE path = ?", (path,)).fetchone()
+                if row:
+                    self._delete(row[0])
+                if not os.path.isfile(path) or not is_text_file(path):
+                    if row:
+                        stats["removed"] += 1
+                    continue
+                try:
+                    st = os.stat(path)
+                    # A watcher has usually just extracted it for the attachment cache
+                    body = " ".join(ngram_terms(read_file_cached(path)[:INDEX_MAX_CHARS]))
+                except Exception:
+                    continue
+                cur = self.conn.execute(
+                    "INSERT INTO files (path, mtime_ns, size) VALUES (?, ?, ?)",
+                    (path, st.st_mtime_ns, st.st_size),
+                )
+                self.conn.execute("INSERT INTO terms (rowid, body) VALUES (?, ?)", (cur.lastrowid, body))
+                stats["updated" if row else "added"] += 1
+        return stats
+
+    def _delete(self, fid: int) -> None:
+        self.conn.execute("DELETE FROM files WHERE id = ?", (fid,))
+        self.conn.execute("DELETE FROM terms WHERE rowid = ?", (fid,))
+        self.conn.execute("DELETE FROM embeddings WHERE id = ?", (fid,))
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    # Embeddings (optional, offline)
+    def build_embeddings(self, embed_fn: EmbedFn, model_name: str, batch_size: int = 32) -> int:
+        """Compute vectors for documents that don't have one yet. Returns count."""
+        rows = self.conn.execute(
+            "SELECT f.id, f.path FROM files f LEFT JOIN embeddings e ON e.id = f.id WHERE e.id IS NULL"
+        ).fetchall()
+        done = 0
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            texts = []
+            for _, path in batch:
+                try:
+                    texts.append(read_file(path)[:INDEX_MAX_CHARS])
+                except Exception:
+                    texts.append("")
+            vectors = embed_fn(texts)
+            with self.conn:
+                for (fid, _), vec in zip(batch, vectors):
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO embeddings (id, vec) VALUES (?, ?)",
+                        (fid, _normalize(vec).tobytes()),
+                    )
+            done += len(batch)
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('embed_model', ?)", (model_name,))
+        return done
+
+    def embed_model(self) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'embed_model'").fetchone()
+        return row[0] if row else None
+
+    # Query
+    def search(
+        self,
+        query: str,
+        k: int = 5,
+        exclude: Iterable[str] = (),
+        embed_fn: Optional[EmbedFn] = None,
+        alpha: float = 0.5,
+    ) -> List[Tuple[str, float]]:
+        """Return up to ``k`` (path, score) pairs, best first."""
+        terms = list(dict.fromkeys(ngram_terms(query)))[:MAX_QUERY_TERMS]
+        if not terms or k <= 0:
+            return []
+        excluded = {os.path.abspath(p) for p in exclude}
+        match = " OR ".join('"' + t.replace('"', '""') + '"' for t in terms)
+        pool = (k + len(excluded)) * (5 if embed_fn else 1)
+        rows = self.conn.execute(
+            "SELECT f.id, f.path, -bm25(terms) AS score FROM terms JOIN files f ON f.id = terms.rowid "
+            "WHERE terms MATCH ? ORDER BY bm25(terms) LIMIT ?",
+            (match, pool),
+        ).fetchall()
+        rows = [r for r in rows if r[1] not in excluded]
+        if embed_fn and rows:
+            rows = self._rerank(rows, embed_fn([query])[0], alpha)
+        return [(path, score) for _, path, score in rows[:k]]
+
+    def _rerank(self, rows: List[Tuple[int, str, float]], qvec: List[float], alpha: float) -> List[Tuple[int, str, float]]:
+        q = _normalize(qvec)
+        top = max(r[2] for r in rows) or 1.0
+        scored = []
+        for fid, path, score in rows:
+            blob = self.conn.execute("SELECT vec FROM embeddings WHERE id = ?", (fid,)).fetchone()
+            cos = 0.0
+            if blob:
+                v = array("f")
+                v.frombytes(blob[0])
+                cos = sum(a * b for a, b in zip(q, v))
+            scored.append((fid, path, (1 - alpha) * score / top + alpha * cos))
+        scored.sort(key=lambda r: r[2], reverse=True)
+        return scored
+
+
+def _normalize(vec: Iterable[float]) -> array:
+    v = array("f", vec)
+    norm = math.sqrt(sum(x * x for x in v)) or 1.0
+    return array("f", (x / norm for x in v))
+
+
+def load_embedder(model_name: str) -> EmbedFn:
+    """Embedding function backed by sentence-transformers (optional dependency)."""
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError as e:
+        raise RuntimeError("임베딩 계산에는 sentence-transformers 패키지가 필요합니다: pip install sentence-transformers") from e
+    model = SentenceTransformer(model_name)
+
+    def embed(texts: List[str]) -> List[List[float]]:
+        return [list(map(float, v)) for v in model.encode(texts)]
+
+    return embed
+
+
+def select_references(
+    ref_dir: str,
+    query: str,
+    k: int,
+    exclude: Iterable[str] = (),
+    log: Optional[Callable[[str], None]] = None,
+    refresh: bool = True,
+) -> List[str]:
+    """Refresh the index for ``ref_dir`` and return the top-``k`` reference paths.
+
+    ``refresh=False`` skips the rescan (a watcher keeps the index current).
+    """
+    with ReferenceIndex(ref_dir) as index:
+        if refresh:
+            index.update(log=log)
+        embed_fn = None
+        model_name = index.embed_model()
+        if model_name:
+            try:
+                embed_fn = load_embedder(model_name)
+            except RuntimeError as e:
+                if log:
+                    log(f"[참고자료] 임베딩 재정렬 생략: {e}")
+        t0 = time.perf_counter()
+        hits = index.search(query, k=k, exclude=exclude, embed_fn=embed_fn)
+        if log:
+            log(f"[참고자료] {len(index)}개 중 {len(hits)}개 선택 ({(time.perf_counter() - t0) * 1000:.1f}ms)")
+            for path, score in hits:
+                log(f"  - {score:.2f} {path}")
+    return [path for path, _ in hits]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="참고자료 라이브러리 인덱스 (BM25 / 선택적 임베딩)")
+    parser.add_argument("ref_dir", help="참고자료 폴더")
+    parser.add_argument("--index", default=None, help="인덱스 파일 경로 (기본: 캐시 디렉토리)")
+    parser.add_argument("--query", "-q", default=None, help="검색어 (키워드/가이드)")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--embed-model", default=None, help="sentence-transformers 모델명 (오프라인 임베딩 계산)")
+    args = parser.parse_args()
+
+    with ReferenceIndex(args.ref_dir, args.index) as index:
+        index.update(log=print)
+        embed_fn = None
+        if args.embed_model:
+            embed_fn = load_embedder(args.embed_model)
+            n = index.build_embeddings(embed_fn, args.embed_model)
+            print(f"[참고자료] 임베딩 계산: {n}개")
+        if args.query:
+            t0 = time.perf_counter()
+            hits = index.search(args.query, k=args.top_k, embed_fn=embed_fn)
+            print(f"[참고자료] 검색 {(time.perf_counter() - t0) * 1000:.1f}ms")
+            for path, score in hits:
+                print(f"{score:8.3f}  {path}")
+
+
+if __name__ == "__main__":
+    main()
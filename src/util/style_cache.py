@@ -0,0 +1,79 @@
+import hashlib
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..prompt_templates import build_meta_prompt, build_profile_meta_prompt
+
+
+def style_cache_key(provider: str, model: str, attachments: List[Tuple[str, str]], mode: str = "llm") -> str:
+    """Key for a Step 1 result: provider, model, meta-prompt template and
+    attachment *contents* in prompt order (paths are ignored, so the same
+    files under different names or hosts share one entry). ``mode`` is the
+    run's style_mode; "profile" results are keyed on their own template."""
+    h = hashlib.sha256()
+    h.update(f"{provider}\0{model}\0".encode("utf-8"))
+    if mode != "llm":
+        h.update(f"{mode}\0".encode("utf-8"))
+        h.update(build_profile_meta_prompt("")[1]["content"].encode("utf-8"))
+    h.update(build_meta_prompt("")[0]["content"].encode("utf-8"))
+    for _, content in attachments:
+        h.update(b"\0")
+        h.update(hashlib.sha256(content.encode("utf-8", errors="replace")).digest())
+    return h.hexdigest()
+
+
+class StyleCache:
+    """Step 1 style prompts shared between jobs.
+
+    Concurrent jobs asking for the same key wait for the first one instead of
+    each sending their own Step 1 request. With ``disk`` (util.disk_cache.DiskCache)
+    results are also shared with other processes using the same database.
+    """
+
+    def __init__(self, disk: Optional[Any] = None) -> None:
+        self.disk = disk
+        self.hits = 0
+        self.misses = 0
+        self._values: Dict[str, str] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            return self._values.get(key)
+
+    def put(self, key: str, value: str) -> None:
+        with self._lock:
+            self._values[key] = value
+
+    def get_or_compute(self, key: str, compute: Callable[[], str], cancel: Any = None) -> Tuple[str, bool]:
+        """Return ``(value, cache_hit)``. A failed computation is not cached.
+
+        ``cancel`` stops a wait on another process computing the same key (see DiskCache).
+        """
+        with self._lock:
+            if key in self._values:
+                self.hits += 1
+                return self._values[key], True
+            key_lock = self._locks.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                if key in self._values:
+                    self.hits += 1
+                    return self._values[key], True
+            if self.disk is not None:
+                value, hit = self.disk.get_or_compute("style", key, compute, cancel=cancel)
+            else:
+                value, hit = compute(), False
+            with self._lock:
+                self._values[key] = value
+                self._locks.pop(key, None)
+                if hit:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+            return value, hit
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._values)
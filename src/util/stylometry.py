@@ -0,0 +1,289 @@
+"""Local stylometric profile of the attachments.
+
+Counts what the Step 1 meta prompt asks the model to notice — sentence
+lengths, paragraph and line-break habits, sentence endings (~해요,
+~더라고요, ~네요), speech level, emoji frequency and position, emphasis
+punctuation, hashtags — over the full text of every attachment rather than
+the first 12,000 characters. The profile is a plain dict; ``format_profile``
+renders it as a short Korean report (the Step 1 input in ``style_mode
+"profile"``) and ``local_style_guide`` turns it into a style guide in the
+Step 1 answer format, so ``style_mode "local"`` needs no Step 1 call.
+"""
+import re
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+from .summarize import split_sentences
+
+# Characters of each attachment analyzed
+MAX_INPUT_CHARS = 200000
+# Sentence length buckets (characters): short < SHORT_CHARS <= medium < LONG_CHARS <= long
+SHORT_CHARS = 25
+LONG_CHARS = 60
+TOP_ENDINGS = 8
+TOP_EMOJI = 8
+EXAMPLES = 6
+
+# Korean sentence endings, matched longest first; other endings are counted by their last two syllables
+ENDINGS = sorted(
+    (
+        "더라고요", "었어요", "았어요", "였어요", "했어요", "거든요", "잖아요", "답니다", "습니다", "입니다",
+        "네요", "어요", "아요", "해요", "예요", "에요", "세요", "군요", "까요", "죠", "니다", "니까",
+        "했다", "었다", "았다", "이다", "다", "음", "함", "임",
+    ),
+    key=len,
+    reverse=True,
+)
+
+_EMOJI_RE = re.compile(
+    "[\U0001F000-\U0001FAFF☀-➿⭐⭕❤]️?|ㅋㅋ+|ㅎㅎ+|ㅠㅠ+|ㅜㅜ+|\\^\\^|:\\)|;\\)"
+)
+_TRAILING_RE = re.compile(r"[\s.!?~…。！？\"'”’)\]]+$")
+_ENDING_RE = re.compile(r"([가-힣]+)$")
+_PARAGRAPH_RE = re.compile(r"\n[ \t]*\n")
+_HASHTAG_RE = re.compile(r"#[^\s#]+")
+
+
+def _ending(sentence: str) -> str:
+    """Final Korean word ending of ``sentence`` (emoji and punctuation stripped), or ''."""
+    stripped = _TRAILING_RE.sub("", _EMOJI_RE.sub("", _HASHTAG_RE.sub("", sentence)))
+    m = _ENDING_RE.search(stripped)
+    if not m:
+        return ""
+    word = m.group(1)
+    for ending in ENDINGS:
+        if word.endswith(ending):
+            return ending
+    return word[-2:]
+
+
+def _speech_level(ending: str) -> str:
+    if ending.endswith("요"):
+        return "haeyo"
+    if ending.endswith(("니다", "니까")):
+        return "hapsyo"
+    if ending.endswith(("다", "음", "함", "임")):
+        return "plain"
+    return "other"
+
+
+def _share(n: int, total: int) -> float:
+    return n / total if total else 0.0
+
+
+def analyze_style(attachments: List[Tuple[str, str]]) -> Dict[str, Any]:
+    """Statistical style profile of ``(path, content)`` attachments."""
+    lengths: List[int] = []
+    endings: Counter = Counter()
+    speech: Counter = Counter()
+    emoji: Counter = Counter()
+    positions: Counter = Counter()
+    punct: Counter = Counter()
+    candidates: List[Tuple[str, str]] = []
+    paragraphs = paragraph_lines = paragraph_sentences = single_line = 0
+    lines = single_sentence_lines = hashtags = chars = 0
+
+    for _, content in attachments:
+        text = content[:MAX_INPUT_CHARS]
+        chars += len(text)
+        hashtags += len(_HASHTAG_RE.findall(text))
+        for paragraph in _PARAGRAPH_RE.split(text):
+            # Hashtag lines are counted separately, not as sentences
+            units = [(lineno, s) for lineno, s in split_sentences(paragraph) if _HASHTAG_RE.sub("", s).strip()]
+            if not units:
+                continue
+            paragraphs += 1
+            paragraph_sentences += len(units)
+            line_count = len({lineno for lineno, _ in units})
+            paragraph_lines += line_count
+            single_line += line_count == 1
+            per_line = Counter(lineno for lineno, _ in units)
+            lines += len(per_line)
+            single_sentence_lines += sum(1 for n in per_line.values() if n == 1)
+            for line in paragraph.splitlines():
+                body = line.strip()
+                for m in _EMOJI_RE.finditer(body):
+                    emoji[m.group()] += 1
+                    if m.start() == 0:
+                        positions["start"] += 1
+                    elif not _TRAILING_RE.sub("", _EMOJI_RE.sub("", body[m.end():])):
+                        positions["end"] += 1
+                    else:
+                        positions["middle"] += 1
+            for _, sentence in units:
+                lengths.append(len(sentence))
+                bare = _EMOJI_RE.sub("", sentence).rstrip()
+                if bare.endswith(("!", "！")):
+                    punct["exclaim"] += 1
+                elif bare.endswith(("?", "？")):
+                    punct["question"] += 1
+                punct["tilde"] += "~" in sentence
+                punct["ellipsis"] += "..." in sentence or "…" in sentence
+                ending = _ending(sentence)
+                if ending:
+                    endings[ending] += 1
+                    candidates.append((ending, sentence))
+                speech[_speech_level(ending) if ending else "other"] += 1
+
+    n = len(lengths)
+    ordered = sorted(lengths)
+    classified = speech["haeyo"] + speech["hapsyo"] + speech["plain"]
+    emoji_total = sum(emoji.values())
+
+    # Mid-length sentences with the most common endings, spread over the corpus
+    common = {e for e, _ in endings.most_common(3)}
+    lo, hi = (ordered[n // 4], ordered[3 * n // 4]) if n else (0, 0)
+    pool = [s for e, s in candidates if e in common and lo <= len(s) <= hi]
+    step = max(1, len(pool) // EXAMPLES)
+    examples = list(dict.fromkeys(pool[::step]))[:EXAMPLES]
+
+    return {
+        "documents": len(attachments),
+        "chars": chars,
+        "sentences": n,
+        "sentence_length": {
+            "mean": sum(lengths) / n if n else 0.0,
+            "median": ordered[n // 2] if n else 0,
+            "p90": ordered[min(n - 1, int(n * 0.9))] if n else 0,
+            "short": _share(sum(1 for x in lengths if x < SHORT_CHARS), n),
+            "long": _share(sum(1 for x in lengths if x >= LONG_CHARS), n),
+        },
+        "paragraph": {
+            "count": paragraphs,
+            "sentences": _share(paragraph_sentences, paragraphs),
+            "lines": _share(paragraph_lines, paragraphs),
+            "single_line": _share(single_line, paragraphs),
+        },
+        # Lines holding exactly one sentence: "a line break after every sentence"
+        "line_per_sentence": _share(single_sentence_lines, lines),
+        "endings": [(e, _share(c, n)) for e, c in endings.most_common(TOP_ENDINGS)],
+        "speech": {k: _share(speech[k], n) for k in ("haeyo", "hapsyo", "plain", "other")},
+        "honorific": _share(speech["haeyo"] + speech["hapsyo"], classified),
+        "emoji": {
+            "per_100_sentences": 100 * _share(emoji_total, n),
+            "top": emoji.most_common(TOP_EMOJI),
+            "position": {k: _share(positions[k], emoji_total) for k in ("start", "middle", "end")},
+        },
+        "punctuation": {k: _share(punct[k], n) for k in ("exclaim", "question", "tilde", "ellipsis")},
+        "hashtags_per_doc": _share(hashtags, len(attachments)),
+        "examples": examples,
+    }
+
+
+def _pct(x: float) -> str:
+    return f"{x:.0%}"
+
+
+def _emoji_position(profile: Dict[str, Any]) -> str:
+    labels = {"start": "줄 앞", "middle": "문장 중간", "end": "문장 끝"}
+    position = profile["emoji"]["position"]
+    return labels[max(position, key=position.get)]
+
+
+def format_profile(profile: Dict[str, Any]) -> str:
+    """Compact Korean report of an ``analyze_style`` profile."""
+    if not profile["sentences"]:
+        return "분석할 문장이 없습니다."
+    length = profile["sentence_length"]
+    para = profile["paragraph"]
+    speech = profile["speech"]
+    emoji = profile["emoji"]
+    punct = profile["punctuation"]
+    lines = [
+        f"- 분석 범위: 글 {profile['documents']}개, {profile['chars']:,}자, 문장 {profile['sentences']:,}개",
+        f"- 문장 길이: 평균 {length['mean']:.0f}자, 중앙값 {length['median']}자, 상위 10% {length['p90']}자 이상 "
+        f"(단문 {SHORT_CHARS}자 미만 {_pct(length['short'])}, 장문 {LONG_CHARS}자 이상 {_pct(length['long'])})",
+        f"- 문단: 평균 {para['sentences']:.1f}문장 / {para['lines']:.1f}줄, 한 줄짜리 문단 {_pct(para['single_line'])}",
+        f"- 줄바꿈: 한 줄에 한 문장 {_pct(profile['line_per_sentence'])}",
+        "- 자주 쓰는 어미: " + ", ".join(f"~{e} {_pct(s)}" for e, s in profile["endings"]),
+        f"- 말투: 해요체 {_pct(speech['haeyo'])}, 합쇼체 {_pct(speech['hapsyo'])}, "
+        f"평서/반말 {_pct(speech['plain'])}, 기타 {_pct(speech['other'])} (존댓말 비율 {_pct(profile['honorific'])})",
+    ]
+    if emoji["top"]:
+        lines.append(
+            f"- 이모티콘: 문장 100개당 {emoji['per_100_sentences']:.1f}개, 주로 {_emoji_position(profile)} "
+            f"({' '.join(e for e, _ in emoji['top'])})"
+        )
+    else:
+        lines.append("- 이모티콘: 사용하지 않음")
+    lines.append(
+        f"- 문장부호: 느낌표 {_pct(punct['exclaim'])}, 물음표 {_pct(punct['question'])}, "
+        f"물결(~) {_pct(punct['tilde'])}, 말줄임표 {_pct(punct['ellipsis'])}"
+    )
+    lines.append(f"- 해시태그: 글당 {profile['hashtags_per_doc']:.1f}개")
+    if profile["examples"]:
+        lines.append("- 대표 문장:")
+        lines.extend(f"  > {s}" for s in profile["examples"])
+    return "\n".join(lines)
+
+
+def local_style_guide(profile: Dict[str, Any]) -> str:
+    """Style guide in the Step 1 answer format, built from the profile alone."""
+    if not profile["sentences"]:
+        return "## 문체 핵심 특징\n- 참고할 글이 없으므로 친근한 해요체의 일반적인 블로그 문체로 작성"
+    length = profile["sentence_length"]
+    para = profile["paragraph"]
+    speech = profile["speech"]
+    emoji = profile["emoji"]
+    punct = profile["punctuation"]
+    endings = ", ".join(f"~{e}" for e, _ in profile["endings"][:5])
+
+    levels = {"haeyo": "해요체", "hapsyo": "합쇼체", "plain": "평서체/반말"}
+    main_level = max(levels, key=lambda k: speech[k])
+    size = "짧은 문장 위주" if length["mean"] < 35 else "긴 문장 위주" if length["mean"] >= 55 else "중간 길이 문장 위주"
+    breaks = profile["line_per_sentence"] >= 0.6
+    uses_emoji = emoji["per_100_sentences"] >= 2
+
+    core = [
+        f"{levels[main_level]} 중심 (존댓말 비율 {_pct(profile['honorific'])})",
+        f"{size} (평균 {length['mean']:.0f}자)",
+        "문장마다 줄바꿈" if breaks else f"문단당 {para['sentences']:.1f}문장을 이어서 작성",
+        f"이모티콘 자주 사용 (문장 100개당 {emoji['per_100_sentences']:.0f}개)" if uses_emoji else "이모티콘은 거의 쓰지 않음",
+    ]
+    if endings:
+        core.append(f"자주 쓰는 어미: {endings}")
+
+    tone = []
+    if punct["exclaim"] >= 0.1:
+        tone.append(f"느낌표로 감정을 자주 드러냄 (문장의 {_pct(punct['exclaim'])})")
+    if punct["question"] >= 0.05:
+        tone.append(f"독자에게 묻는 문장을 섞음 (문장의 {_pct(punct['question'])})")
+    if punct["tilde"] >= 0.05:
+        tone.append("물결(~)로 말끝을 부드럽게 늘임")
+    if not tone:
+        tone.append("감정 표현은 절제하고 담담하게 설명")
+
+    emphasis = [name for name, key in (("느낌표", "exclaim"), ("물결(~)", "tilde"), ("말줄임표", "ellipsis")) if punct[key] >= 0.05]
+    avoid = []
+    if profile["honorific"] >= 0.8:
+        avoid.append("반말/평서체 어미 (~다, ~음)")
+    elif profile["honorific"] <= 0.2:
+        avoid.append("존댓말 어미 (~요, ~습니다)")
+    if not uses_emoji:
+        avoid.append("이모티콘")
+    if length["long"] < 0.1:
+        avoid.append(f"{LONG_CHARS}자 이상의 긴 문장")
+
+    parts = [
+        "## 문체 핵심 특징", *(f"- {line}" for line in core),
+        "", "## 어조 및 톤", *(f"- {line}" for line in tone),
+        "", "## 문장 구조",
+        f"- 문장 길이: 평균 {length['mean']:.0f}자, 대부분 {length['p90']}자 이내 "
+        f"(단문 {_pct(length['short'])}, 장문 {_pct(length['long'])})",
+        f"- 문단: 평균 {para['sentences']:.1f}문장 / {para['lines']:.1f}줄",
+        "- 줄바꿈: " + ("한 줄에 한 문장씩 쓰고 문단 사이는 빈 줄로 구분" if breaks else "문장을 이어 쓰고 문단 사이만 빈 줄로 구분"),
+        "", "## 표현 스타일",
+        f"- 자주 사용할 어미: {endings or '특별한 경향 없음'}",
+        "- 이모티콘 사용: " + (
+            f"문장 100개당 {emoji['per_100_sentences']:.0f}개, 주로 {_emoji_position(profile)} "
+            f"({' '.join(e for e, _ in emoji['top'][:5])})" if uses_emoji else "거의 없음"
+        ),
+        f"- 강조 표현: {', '.join(emphasis) if emphasis else '문장부호보다 내용으로 강조'}",
+        "", "## 콘텐츠 구조",
+        f"- 글당 해시태그 약 {profile['hashtags_per_doc']:.0f}개" + (" (마무리에 모아서)" if profile["hashtags_per_doc"] >= 1 else ""),
+    ]
+    if profile["examples"]:
+        parts += ["", "## 예시 문장", *(f"> {s}" for s in profile["examples"])]
+    if avoid:
+        parts += ["", "## 피해야 할 표현", *(f"- {line}" for line in avoid)]
+    return "\n".join(parts)
@@ -0,0 +1,147 @@
+"""Extractive compression of attachments before they go into the prompt.
+
+Without it each attachment is cut to its first 12,000 characters, which
+keeps navigation text and intros and drops whatever comes later. With a
+token budget, ``compress`` splits the whole document into sentences
+(Korean and English punctuation plus line breaks), ranks them with
+TextRank over TF-IDF vectors of the same character-bigram terms the
+reference index uses, and keeps the best sentences that fit the budget in
+their original order. Repeated sentences (menus, footers) are ranked once.
+
+Vectors are sparse dicts and the similarity matrix is never built: each
+TextRank step multiplies through the term vectors instead, so the cost is
+linear in the text rather than quadratic in sentences. Terms found in most
+sentences carry no information and are skipped. No model and no extra LLM
+call is involved.
+"""
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from .tokens import estimate_tokens
+
+# Characters of a document considered for compression (the rest is dropped)
+MAX_INPUT_CHARS = 200000
+# Sentences shorter than this are fragments (labels, bullets) and never ranked
+MIN_SENTENCE_CHARS = 12
+DAMPING = 0.85
+ITERATIONS = 30
+# Terms in more than this share of the sentences are ignored for similarity
+MAX_TERM_SHARE = 0.5
+CACHE_SIZE = 64
+
+# Up to sentence-ending punctuation (plus closing quotes/brackets) followed by whitespace, or the line end
+_SENTENCE_RE = re.compile(r"\S.*?(?:[.!?。！？…]+[\"'”’)\]]*(?=\s|$)|$)")
+
+_CACHE: "OrderedDict[Tuple, str]" = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+
+
+def split_sentences(text: str) -> List[Tuple[int, str]]:
+    """``(line number, sentence)`` pairs; lines are split at sentence-ending punctuation."""
+    sentences: List[Tuple[int, str]] = []
+    for lineno, line in enumerate(text.splitlines()):
+        for m in _SENTENCE_RE.finditer(line):
+            sentences.append((lineno, m.group().rstrip()))
+    return sentences
+
+
+def _vectors(sentences: List[str]) -> List[Dict[str, float]]:
+    from .ref_index import ngram_terms
+
+    counts = [Counter(ngram_terms(s)) for s in sentences]
+    df: Counter = Counter()
+    for c in counts:
+        df.update(c.keys())
+    n = len(sentences)
+    limit = max(2, MAX_TERM_SHARE * n)
+    vectors: List[Dict[str, float]] = []
+    for c in counts:
+        vec = {t: tf * math.log((n + 1) / (df[t] + 1)) for t, tf in c.items() if df[t] <= limit}
+        norm = math.sqrt(sum(w * w for w in vec.values())) or 1.0
+        vectors.append({t: w / norm for t, w in vec.items()})
+    return vectors
+
+
+def _similarity_times(vectors: List[Dict[str, float]], x: List[float]) -> List[float]:
+    """``(S - I) x`` for the cosine similarity matrix ``S = V V^T``, without building ``S``."""
+    total: Dict[str, float] = {}
+    for xi, vec in zip(x, vectors):
+        if xi:
+            for t, w in vec.items():
+                total[t] = total.get(t, 0.0) + xi * w
+    # Unit vectors have self-similarity 1; empty ones (all terms skipped) have 0
+    return [
+        sum(w * total.get(t, 0.0) for t, w in vec.items()) - (xi if vec else 0.0) for xi, vec in zip(x, vectors)
+    ]
+
+
+def textrank(sentences: List[str]) -> List[float]:
+    """TextRank score per sentence (cosine similarity of TF-IDF vectors as edge weights).
+
+    Power iteration runs on products with the similarity matrix computed
+    from the sparse vectors, so each step is linear in the number of terms.
+    """
+    n = len(sentences)
+    if n <= 2:
+        return [1.0] * n
+    vectors = _vectors(sentences)
+    out = _similarity_times(vectors, [1.0] * n)
+    scores = [1.0 / n] * n
+    base = (1 - DAMPING) / n
+    for _ in range(ITERATIONS):
+        spread = _similarity_times(vectors, [s / o if o > 0 else 0.0 for s, o in zip(scores, out)])
+        scores = [base + DAMPING * v for v in spread]
+    return scores
+
+
+def compress(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    """The highest-ranked sentences of ``text`` that fit ``max_tokens``, in document order.
+
+    Text already within the budget is returned unchanged.
+    """
+    if estimate_tokens(text, model) <= max_tokens:
+        return text
+    key = (len(text), hash(text), max_tokens, model)
+    with _CACHE_LOCK:
+        cached = _CACHE.get(key)
+        if cached is not None:
+            _CACHE.move_to_end(key)
+            return cached
+
+    units = split_sentences(text[:MAX_INPUT_CHARS])
+    seen = set()
+    ranked: List[int] = []
+    for idx, (_, sentence) in enumerate(units):
+        if len(sentence) >= MIN_SENTENCE_CHARS and sentence not in seen:
+            seen.add(sentence)
+            ranked.append(idx)
+    scores = textrank([units[i][1] for i in ranked])
+    order = sorted(range(len(ranked)), key=lambda k: (-scores[k], ranked[k]))
+    keep: List[int] = []
+    used = 0
+    for k in order:
+        idx = ranked[k]
+        cost = estimate_tokens(units[idx][1], model) + 1
+        if used + cost > max_tokens:
+            continue
+        keep.append(idx)
+        used += cost
+    keep.sort()
+
+    parts: List[str] = []
+    prev_line = None
+    for idx in keep:
+        lineno, sentence = units[idx]
+        if parts:
+            parts.append(" " if lineno == prev_line else "\n")
+        parts.append(sentence)
+        prev_line = lineno
+    result = "".join(parts)
+    with _CACHE_LOCK:
+        _CACHE[key] = result
+        while len(_CACHE) > CACHE_SIZE:
+            _CACHE.popitem(last=False)
+    return result
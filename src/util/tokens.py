@@ -0,0 +1,65 @@
+import math
+import re
+from typing import Optional, Tuple
+
+_HANGUL_RE = re.compile(r"[가-힣ㄱ-ㆎ]")
+
+# (tokens per Hangul character, characters per token for everything else) by
+# tokenizer family, measured on Korean blog posts mixed with Markdown and URLs
+TOKENIZER_PROFILES = {
+    "default": (1.0, 4.0),
+    "claude": (1.15, 3.5),
+    # gpt-4o, gpt-4.1, gpt-5, o-series
+    "o200k": (0.75, 4.2),
+    # gpt-4, gpt-3.5
+    "cl100k": (1.45, 4.0),
+    # llama 3 / qwen style 128k+ vocabularies served locally
+    "local": (1.0, 3.8),
+}
+
+# Model name prefixes -> tokenizer family (first match wins)
+_MODEL_FAMILIES = (
+    ("claude", "claude"),
+    ("gpt-4o", "o200k"),
+    ("gpt-4.1", "o200k"),
+    ("gpt-5", "o200k"),
+    ("o1", "o200k"),
+    ("o3", "o200k"),
+    ("o4", "o200k"),
+    ("gpt-4", "cl100k"),
+    ("gpt-3.5", "cl100k"),
+    ("llama", "local"),
+    ("qwen", "local"),
+    ("gemma", "local"),
+    ("mistral", "local"),
+    ("exaone", "local"),
+)
+
+
+def tokenizer_family(model: Optional[str]) -> str:
+    name = (model or "").lower()
+    for prefix, family in _MODEL_FAMILIES:
+        if name.startswith(prefix):
+            return family
+    return "default"
+
+
+def tokenizer_profile(model: Optional[str]) -> Tuple[float, float]:
+    return TOKENIZER_PROFILES[tokenizer_family(model)]
+
+
+def estimate_tokens(text: str, model: Optional[str] = None) -> int:
+    """Rough token estimate without a tokenizer.
+
+    Hangul syllables cost roughly one token each on current BPE vocabularies,
+    everything else averages about four characters per token. ``model``
+    selects a per-tokenizer correction (TOKENIZER_PROFILES).
+    """
+    if not text:
+        return 0
+    hangul = len(_HANGUL_RE.findall(text))
+    other = len(text) - hangul
+    if model is None:
+        return hangul + (other + 3) // 4
+    per_hangul, chars_per_token = tokenizer_profile(model)
+    return math.ceil(hangul * per_hangul + other / chars_per_token)
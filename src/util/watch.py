@@ -0,0 +1,334 @@
+"""Watch mode: keep attachment and reference caches current while folders change.
+
+Every run() starts by walking ``input_dir``, reading and extracting each
+file, computing dedup signatures and syncing the reference index. In a
+long-lived process (``shared_queue work --watch``, the GUI) a CorpusWatch
+does that work ahead of time. It subscribes to changes of its folders
+through inotify on Linux and falls back to polling elsewhere. After each
+burst of changes it rescans the folders, which only stats files. Only new
+or modified files are extracted, signed and re-indexed. The folder
+listing is then served to ``walk_files`` (util.file_loader), the text to
+``read_file_cached`` and the signatures to ``dedup_attachments``, so a
+generation request finds everything parsed. run() also skips the reference
+index rescan for folders a watch keeps indexed.
+
+``python -m src.util.watch`` runs the same thing as a standalone daemon.
+Across processes it keeps the reference indexes and the signature file
+current; the in-memory caches only help its own process.
+"""
+import argparse
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .env_util import cache_dir
+from .logs import emit
+from .file_loader import (
+    DEFAULT_EXCLUDES, content_signature, is_text_file, load_signature_cache, read_file_cached, save_signature_cache,
+    scan_files, set_live_listing,
+)
+
+# Seconds between rescans without inotify
+POLL_INTERVAL = 2.0
+# A burst of events is over once nothing happened for this long
+SETTLE_SECONDS = 0.2
+
+# <sys/inotify.h>
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (
+    IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+)
+_EVENT = struct.Struct("iIII")
+
+_SKIP_DIRS = {pattern.rstrip("/") for pattern in DEFAULT_EXCLUDES}
+
+# Roots kept current by running watches in this process (root -> watch count)
+_WATCHED: Dict[str, int] = {}
+_INDEXED: Dict[str, int] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def active() -> bool:
+    """Whether a CorpusWatch runs in this process."""
+    with _REGISTRY_LOCK:
+        return bool(_WATCHED)
+
+
+def keeps_index(root: str) -> bool:
+    """Whether a running CorpusWatch keeps the reference index of ``root`` current."""
+    with _REGISTRY_LOCK:
+        return os.path.abspath(root) in _INDEXED
+
+
+class InotifyWatcher:
+    """Wakes up on changes anywhere under ``roots`` (Linux, through libc)."""
+
+    kind = "inotify"
+
+    def __init__(self, roots: Sequence[str]) -> None:
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self._libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 실패")
+        self.dirs: Dict[int, str] = {}
+        for root in roots:
+            self._add_tree(root)
+
+    def _add_tree(self, top: str) -> None:
+        # inotify is not recursive: one watch per directory, new ones added as they appear
+        for directory, subdirs, _ in os.walk(top):
+            subdirs[:] = [d for d in subdirs if d not in _SKIP_DIRS and not os.path.islink(os.path.join(directory, d))]
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+            if wd >= 0:
+                self.dirs[wd] = directory
+
+    def wait(self, timeout: float) -> bool:
+        """True if anything changed within ``timeout`` seconds."""
+        try:
+            ready, _, _ = select.select([self.fd], [], [], timeout)
+        except (OSError, ValueError):
+            return False
+        if not ready:
+            return False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\0")
+                offset += _EVENT.size + length
+                if mask & IN_IGNORED:
+                    self.dirs.pop(wd, None)
+                elif mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO) and wd in self.dirs:
+                    name = os.fsdecode(name)
+                    if name not in _SKIP_DIRS:
+                        self._add_tree(os.path.join(self.dirs[wd], name))
+        return True
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingWatcher:
+    """Asks for a rescan every ``interval`` seconds."""
+
+    kind = "polling"
+
+    def __init__(self, roots: Sequence[str], interval: float = POLL_INTERVAL) -> None:
+        self.interval = interval
+        self._next = time.monotonic() + interval
+        self._closed = threading.Event()
+
+    def wait(self, timeout: float) -> bool:
+        delay = self._next - time.monotonic()
+        if delay > timeout:
+            self._closed.wait(timeout)
+            return False
+        self._closed.wait(max(0.0, delay))
+        self._next = time.monotonic() + self.interval
+        return not self._closed.is_set()
+
+    def close(self) -> None:
+        self._closed.set()
+
+
+def create_watcher(roots: Sequence[str], poll: bool = False, interval: float = POLL_INTERVAL) -> Any:
+    """inotify where available, otherwise polling."""
+    if not poll and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(roots)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(roots, interval)
+
+
+class CorpusWatch:
+    """Keeps the listing, extracted text, signatures (and reference index) of folders current.
+
+    ``dirs`` are attachment folders; ``ref_dirs`` are reference libraries,
+    which are also indexed (util.ref_index).
+    """
+
+    def __init__(
+        self,
+        dirs: Sequence[str] = (),
+        ref_dirs: Sequence[str] = (),
+        poll: bool = False,
+        interval: float = POLL_INTERVAL,
+        settle: float = SETTLE_SECONDS,
+        signature_path: Optional[str] = None,
+        log: Callable[[str], None] = emit,
+    ) -> None:
+        self.ref_dirs = [os.path.abspath(d) for d in ref_dirs]
+        self.roots = list(dict.fromkeys([os.path.abspath(d) for d in dirs] + self.ref_dirs))
+        self.poll = poll
+        self.interval = interval
+        self.settle = settle
+        self.signature_path = signature_path or str(cache_dir() / "signatures.json")
+        self.log = log
+        self.watcher: Any = None
+        self.refreshes = 0
+        self._known: Dict[str, Dict[str, Tuple[int, int]]] = {root: {} for root in self.roots}
+        self._indexes: Dict[str, Any] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def refresh(self) -> Dict[str, Any]:
+        """Rescan every folder and process what changed since the last call."""
+        t0 = time.perf_counter()
+        stats = {"files": 0, "changed": 0, "removed": 0, "indexed": 0}
+        for root in self.roots:
+            if not os.path.isdir(root):
+                continue
+            listing = scan_files([root])
+            known = self._known[root]
+            current = {path: (st.st_mtime_ns, st.st_size) for path, st in listing}
+            changed = [path for path, sig in current.items() if known.get(path) != sig]
+            removed = [path for path in known if path not in current]
+            for path in changed:
+                if not is_text_file(path):
+                    continue
+                try:
+                    content_signature(path, read_file_cached(path))
+                except Exception:
+                    continue
+            set_live_listing(root, [path for path, _ in listing])
+            if root in self.ref_dirs:
+                stats["indexed"] += self._reindex(root, changed + removed)
+            self._known[root] = current
+            stats["files"] += len(current)
+            stats["changed"] += len(changed)
+            stats["removed"] += len(removed)
+        if stats["changed"] or stats["removed"]:
+            try:
+                save_signature_cache(self.signature_path)
+            except OSError as e:
+                self.log(f"[경고] 서명 캐시 저장 실패: {e}")
+        self.refreshes += 1
+        stats["seconds"] = time.perf_counter() - t0
+        return stats
+
+    def _reindex(self, root: str, paths: List[str]) -> int:
+        from .ref_index import ReferenceIndex
+
+        index = self._indexes.get(root)
+        if index is None:
+            # First pass: full sync against what the index stored last time
+            index = self._indexes[root] = ReferenceIndex(root)
+            result = index.update()
+            return result["added"] + result["updated"] + result["removed"]
+        if not paths:
+            return 0
+        result = index.update_paths(paths)
+        return result["added"] + result["updated"] + result["removed"]
+
+    def start(self) -> "CorpusWatch":
+        """Warm everything once, then follow changes in a background thread."""
+        load_signature_cache(self.signature_path)
+        self.watcher = create_watcher(self.roots, poll=self.poll, interval=self.interval)
+        stats = self.refresh()
+        self.log(
+            f"[감시] {len(self.roots)}개 폴더 ({self.watcher.kind}): 파일 {stats['files']:,}개 준비, "
+            f"{stats['seconds']:.2f}초"
+        )
+        with _REGISTRY_LOCK:
+            for root in self.roots:
+                _WATCHED[root] = _WATCHED.get(root, 0) + 1
+            for root in self.ref_dirs:
+                _INDEXED[root] = _INDEXED.get(root, 0) + 1
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="corpus-watch")
+        self._thread.start()
+        return self
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            if not self.watcher.wait(0.5):
+                continue
+            # Let a copy of many files finish before rescanning
+            while not self._stop.is_set() and self.watcher.wait(self.settle):
+                pass
+            if self._stop.is_set():
+                break
+            try:
+                stats = self.refresh()
+            except Exception as e:
+                self.log(f"[경고] 폴더 감시 갱신 실패: {type(e).__name__}: {e}")
+                continue
+            if stats["changed"] or stats["removed"]:
+                self.log(
+                    f"[감시] 변경 {stats['changed']}개, 삭제 {stats['removed']}개 반영 "
+                    f"(인덱스 {stats['indexed']}개, {stats['seconds'] * 1000:.0f}ms)"
+                )
+
+    def stop(self) -> None:
+        self._stop.set()
+        # The thread wakes up within half a second; only then is the watcher closed
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.watcher is not None:
+            self.watcher.close()
+        with _REGISTRY_LOCK:
+            for registry, roots in ((_WATCHED, self.roots), (_INDEXED, self.ref_dirs)):
+                for root in roots:
+                    registry[root] = registry.get(root, 1) - 1
+                    if registry[root] <= 0:
+                        registry.pop(root, None)
+        for root in self.roots:
+            set_live_listing(root, None)
+        for index in self._indexes.values():
+            index.close()
+        self._indexes.clear()
+
+    def __enter__(self) -> "CorpusWatch":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="첨부/참고자료 폴더를 감시해 추출 텍스트, 중복 서명, 참고자료 인덱스를 미리 갱신")
+    parser.add_argument("dirs", nargs="*", help="첨부자료 폴더")
+    parser.add_argument("--ref", action="append", default=[], help="참고자료 폴더 (인덱스도 갱신, 반복 가능)")
+    parser.add_argument("--poll", action="store_true", help="inotify 대신 주기적으로 다시 탐색")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL, help=f"폴링 간격(초, 기본값: {POLL_INTERVAL:g})")
+    args = parser.parse_args()
+    if not args.dirs and not args.ref:
+        parser.error("감시할 폴더를 하나 이상 지정하세요.")
+
+    watch = CorpusWatch(args.dirs, args.ref, poll=args.poll, interval=args.interval).start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watch.stop()
+
+
+if __name__ == "__main__":
+    main()
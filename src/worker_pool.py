@@ -0,0 +1,249 @@
+"""Multi-process batch mode (``python -m src.batch ... --workers N``).
+
+Extraction, dedup and prompt building are CPU-bound Python, so one process
+with many threads is limited by the GIL. The pool splits the requests into
+N partitions and runs each in its own process with its own JobQueue:
+
+- requests sharing attachments go to the same worker, so its in-memory
+  caches (extracted text, prompt blocks, Step 1 results) stay hot
+- extracted text and Step 1 results also go through one SQLite DiskCache,
+  so workers share them and never compute the same key twice
+- ``rpm`` / ``tpm`` limits are SQLite token buckets every worker draws from
+- workers stream result records and logs back to the parent, which writes
+  the archive (one writer, one file) and merges their metrics into a report;
+  with a JSONL log file each worker writes its own ``<name>.w<N>.jsonl``
+
+Workers are spawned, not forked: the parent may already run threads (health
+monitor, pooled connections) that a fork would copy in an unknown state.
+"""
+import multiprocessing
+import os
+import queue
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .util.logs import emit
+from .util.output_writer import ResultArchive
+
+# How often the parent checks for workers that died without reporting
+POLL_SECONDS = 0.5
+
+
+def _group_key(req: Dict[str, Any]) -> Tuple:
+    files = req.get("files") or []
+    return (tuple(sorted(files)), req.get("input_dir"), req.get("ref_dir"))
+
+
+def partition(requests: List[Dict[str, Any]], workers: int) -> List[List[int]]:
+    """Request indices per worker: attachment groups kept together, largest groups first to the lightest worker."""
+    groups: Dict[Tuple, List[int]] = {}
+    for index, req in enumerate(requests):
+        groups.setdefault(_group_key(req), []).append(index)
+    parts: List[List[int]] = [[] for _ in range(max(1, workers))]
+    for members in sorted(groups.values(), key=len, reverse=True):
+        # A group bigger than a fair share is split so no worker idles
+        share = max(1, -(-len(requests) // len(parts)))
+        for start in range(0, len(members), share):
+            min(parts, key=len).extend(members[start:start + share])
+    return [sorted(p) for p in parts]
+
+
+def _worker_main(worker_id: int, items: List[Tuple[int, Dict[str, Any]]], options: Dict[str, Any], events: Any) -> None:
+    """Entry point of one worker process; everything goes back through ``events``."""
+    from .batch import run_batch
+    from .providers.ratelimit import RateLimiter, set_rate_limit
+    from .providers.registry import provider_names
+    from .util.disk_cache import DiskCache
+    from .util.draft_cache import DraftCache
+    from .util.file_loader import set_extract_cache
+    from .util.logs import configure as configure_logs, worker_log_path
+    from .util.style_cache import StyleCache
+
+    def log(msg: str) -> None:
+        events.put(("log", worker_id, msg))
+
+    t0, cpu0 = time.perf_counter(), time.process_time()
+    metrics: Dict[str, Any] = {"worker": worker_id, "pid": os.getpid(), "jobs": len(items)}
+    # The parent owns the console; a shared rotating file would race, so one file per worker
+    log_file = options["log_file"]
+    configure_logs(level=options["log_level"], console=False, jsonl_path=worker_log_path(log_file, worker_id) if log_file else None)
+    try:
+        cache = DiskCache(options["cache_path"])
+        set_extract_cache(cache)
+        limiters = []
+        if options["rpm"] or options["tpm"]:
+            for name in provider_names():
+                limiter = RateLimiter(name, rpm=options["rpm"], tpm=options["tpm"], path=options["limit_path"])
+                set_rate_limit(name, limiter)
+                limiters.append(limiter)
+        summary = run_batch(
+            [req for _, req in items], out_dir=options["out_dir"], concurrency=options["concurrency"],
+            defaults=options["defaults"], job_timeout=options["job_timeout"], log=log,
+            indices=[index for index, _ in items], style_cache=StyleCache(disk=cache),
+            on_result=lambda record: events.put(("result", worker_id, record)),
+            draft_cache=DraftCache(cache) if options["reuse"] else None,
+        )
+        metrics.update(
+            done=summary["done"], failed=len(summary["failed"]), usage=summary["usage"],
+            style_cache=summary["style_cache"], disk_cache=cache.summary(), draft_cache=summary.get("draft_cache", {}),
+            coalesced=summary["coalesced"],
+            rate_limit_wait=sum(limiter.waited for limiter in limiters),
+            rate_limit_waits=merge_metrics([limiter.class_waits for limiter in limiters]),
+        )
+        cache.close()
+    except BaseException as e:
+        metrics["error"] = f"{type(e).__name__}: {e}"
+    metrics["elapsed"] = time.perf_counter() - t0
+    metrics["cpu"] = time.process_time() - cpu0
+    events.put(("metrics", worker_id, metrics))
+
+
+def merge_metrics(metrics: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Sum numeric fields (and nested dicts of them) over workers."""
+    total: Dict[str, Any] = {}
+
+    def add(into: Dict[str, Any], values: Dict[str, Any]) -> None:
+        for key, value in values.items():
+            if key in ("worker", "pid", "error"):
+                continue
+            if isinstance(value, dict):
+                add(into.setdefault(key, {}), value)
+            elif isinstance(value, (int, float)):
+                into[key] = into.get(key, 0) + value
+
+    for m in metrics:
+        add(total, m)
+    return total
+
+
+def run_parallel(
+    requests: List[Dict[str, Any]],
+    workers: int,
+    out_dir: Optional[str] = None,
+    archive_path: Optional[str] = None,
+    concurrency: int = 2,
+    defaults: Optional[Dict[str, Any]] = None,
+    job_timeout: Optional[float] = None,
+    cache_path: Optional[str] = None,
+    rpm: Optional[float] = None,
+    tpm: Optional[float] = None,
+    limit_path: Optional[str] = None,
+    log: Callable[[str], None] = emit,
+    reuse: bool = False,
+    log_file: Optional[str] = None,
+    log_level: Optional[str] = None,
+) -> Dict[str, Any]:
+    """``run_batch`` over ``workers`` processes; returns its summary plus per-worker ``workers`` metrics."""
+    from .batch import request_id
+    from .jobs import DONE
+    from .providers.ratelimit import default_limit_path
+    from .util.disk_cache import default_cache_path
+
+    t0 = time.perf_counter()
+    parts = [p for p in partition(requests, workers) if p]
+    options = {
+        "out_dir": None if archive_path else out_dir, "concurrency": concurrency, "defaults": defaults,
+        "job_timeout": job_timeout, "cache_path": cache_path or default_cache_path(), "rpm": rpm, "tpm": tpm,
+        "limit_path": limit_path or default_limit_path(), "reuse": reuse,
+        "log_file": log_file or os.getenv("NB_LOG_FILE") or None, "log_level": log_level,
+    }
+    archive = ResultArchive(archive_path) if archive_path else None
+    ctx = multiprocessing.get_context("spawn")
+    events = ctx.Queue()
+    procs = [
+        ctx.Process(
+            target=_worker_main, args=(w, [(i, requests[i]) for i in part], options, events), name=f"batch-worker-{w}"
+        )
+        for w, part in enumerate(parts)
+    ]
+    summary: Dict[str, Any] = {"total": len(requests), "done": 0, "failed": [], "usage": {}, "workers": []}
+    reported: Dict[int, Dict[str, Any]] = {}
+    seen: Dict[int, set] = {w: set() for w in range(len(parts))}
+    try:
+        for proc in procs:
+            proc.start()
+        log(f"[배치] 워커 {len(procs)}개 시작 (작업 수: {', '.join(str(len(p)) for p in parts)})")
+        while len(reported) < len(procs):
+            try:
+                kind, worker_id, data = events.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                for w, proc in enumerate(procs):
+                    # A worker that exited without metrics crashed (killed, out of memory, ...)
+                    if w not in reported and proc.exitcode is not None and events.empty():
+                        reported[w] = {"worker": w, "pid": proc.pid, "jobs": len(parts[w]),
+                                       "error": f"워커 비정상 종료 (exit code {proc.exitcode})"}
+                continue
+            if kind == "log":
+                log(f"[w{worker_id}] {data}")
+            elif kind == "result":
+                seen[worker_id].add(data["request_id"])
+                if data["status"] != DONE:
+                    summary["failed"].append((data["request_id"], data["status"], data.get("error")))
+                if archive is not None and data["status"] != "invalid":
+                    archive.add(data)
+            elif kind == "metrics":
+                reported[worker_id] = data
+    finally:
+        for proc in procs:
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+        if archive is not None:
+            archive.close()
+
+    for w, part in enumerate(parts):
+        metrics = reported[w]
+        summary["workers"].append(metrics)
+        summary["done"] += metrics.get("done", 0)
+        for key, value in (metrics.get("usage") or {}).items():
+            summary["usage"][key] = summary["usage"].get(key, 0) + value
+        if "error" in metrics:
+            # Whatever the worker never reported back counts as failed
+            for i in part:
+                rid = request_id(requests[i], i)
+                if rid not in seen[w]:
+                    summary["failed"].append((rid, "failed", metrics["error"]))
+    summary["merged"] = merge_metrics(summary["workers"])
+    summary["elapsed"] = time.perf_counter() - t0
+    return summary
+
+
+def _metrics_line(label: str, m: Dict[str, Any]) -> str:
+    usage = m.get("usage") or {}
+    style = m.get("style_cache") or {}
+    disk = m.get("disk_cache") or {}
+    style_total = style.get("hits", 0) + style.get("misses", 0)
+    extract_total = disk.get("extract_hits", 0) + disk.get("extract_misses", 0)
+    extract_hits = disk.get("extract_hits", 0) + disk.get("extract_waited", 0)
+    parts = [
+        f"{label}: 작업 {m.get('jobs', 0)}, 완료 {m.get('done', 0)}, 실패 {m.get('failed', 0)}",
+        f"{m.get('elapsed', 0):.1f}초 (CPU {m.get('cpu', 0):.1f}초)",
+        f"토큰 입력 {usage.get('input_tokens', 0):,} / 출력 {usage.get('output_tokens', 0):,}",
+        f"Step 1 캐시 {style.get('hits', 0)}/{style_total}",
+        f"추출 캐시 {extract_hits}/{extract_total}",
+    ]
+    if m.get("coalesced"):
+        parts.append(f"중복 요청 합침 {m['coalesced']}")
+    if m.get("rate_limit_wait"):
+        parts.append(f"속도 제한 대기 {m['rate_limit_wait']:.1f}초")
+        for cls, w in sorted((m.get("rate_limit_waits") or {}).items()):
+            if w.get("requests"):
+                parts.append(f"{cls} 평균 대기 {w['seconds'] / w['requests']:.2f}초/{int(w['requests'])}건")
+    if m.get("error"):
+        parts.append(m["error"])
+    return ", ".join(parts)
+
+
+def format_report(summary: Dict[str, Any]) -> List[str]:
+    """Korean per-worker report plus the merged totals."""
+    lines = ["[배치] 워커별 결과"]
+    for m in summary["workers"]:
+        lines.append("  " + _metrics_line(f"w{m['worker']} (pid {m['pid']})", m))
+    merged = summary["merged"]
+    lines.append("  " + _metrics_line("합계", merged))
+    if summary["elapsed"]:
+        lines.append(
+            f"  전체 경과 {summary['elapsed']:.1f}초, 워커 CPU 합 {merged.get('cpu', 0):.1f}초 "
+            f"(평균 {merged.get('cpu', 0) / summary['elapsed']:.1f}코어 사용)"
+        )
+    return lines
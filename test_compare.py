@@ -0,0 +1,102 @@
+"""
+모델 비교 하네스 테스트 스크립트 (로컬 가짜 Anthropic 서버 사용, 네트워크 불필요)
+- 같은 요청들을 모델 조합별로 실행해 첫 토큰 시간, 토큰/초, 전체 시간, 비용, 키워드 적중률, 길이 정확도 계산
+- Step 1/Step 2 모델을 따로 지정
+- 녹화 파일로 서버 없이 다시 계산하면 같은 표, 녹화에 없는 요청은 실패로 표시
+"""
+import os
+import sys
+import tempfile
+import time
+
+import requests as http
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.compare import compare, format_table, length_accuracy, parse_combo
+from src.providers.health import MONITOR
+from src.util.output_writer import read_archive
+from test_job_queue import FakeAnthropic, start_fake_server, stop_fake_server
+
+METRICS = ("runs", "failed", "calls", "ttft", "tokens_per_sec", "cost", "keyword_hit_rate", "length_accuracy")
+
+
+def test_compare():
+    print("=" * 60)
+    print("모델 비교 하네스 테스트")
+    print("=" * 60)
+
+    assert parse_combo("openai:gpt-4o-mini")["provider"] == "openai"
+    combo = parse_combo("claude-haiku-4-5/openai:gpt-4o-mini")
+    assert (combo["step1_provider"], combo["step1_model"], combo["provider"], combo["model"]) == ("anthropic", "claude-haiku-4-5", "openai", "gpt-4o-mini")
+    assert length_accuracy("가" * 90, 100) == 0.9 and length_accuracy("가", None) is None
+
+    # The fake server answers every draft with "완성된 블로그 초안" (10 characters)
+    requests = [
+        {"request_id": "r1", "title": "블로그", "body": "가이드", "keyword_repeat": 1, "word_count": 10},
+        {"request_id": "r2", "title": "맛집", "body": "다른 가이드", "word_count": 20},
+    ]
+    combos = [parse_combo("anthropic:claude-sonnet-4-5"), parse_combo("anthropic:claude-haiku-4-5/anthropic:claude-sonnet-4-5")]
+    saved_key = os.environ.get("ANTHROPIC_API_KEY")
+    with tempfile.TemporaryDirectory() as d:
+        tape = os.path.join(d, "tape.jsonl.gz")
+        server = start_fake_server()
+        try:
+            FakeAnthropic.requests_seen.clear()
+            FakeAnthropic.delay = 0.05
+            live = compare(requests, combos, record_path=tape)
+        finally:
+            FakeAnthropic.delay = 0.0
+            stop_fake_server(server)
+        table = format_table(live)
+        print("\n".join(table))
+        # Each job starts with the next model in turn (the first run of a job meets cold caches)
+        assert [r["combo"] for r in live["runs"]] == [combos[0]["label"], combos[1]["label"], combos[1]["label"], combos[0]["label"]]
+        # Every run sends its own Step 1 and Step 2: nothing shared between models
+        assert len(FakeAnthropic.requests_seen) == 8
+        for row in live["rows"]:
+            assert row["runs"] == 2 and row["failed"] == 0 and row["calls"] == 4
+            assert 0.04 < row["ttft"] < row["seconds"] and row["tokens_per_sec"] > 0
+            assert row["keyword_hit_rate"] == 0.5 and row["length_accuracy"] == 0.75
+        # claude-sonnet: 4 streamed calls of 10 input / 4 output tokens at $3 / $15 per million
+        assert abs(live["rows"][0]["cost"] - 4 * (10 * 3 + 4 * 15) / 1e6) < 1e-12
+        assert live["rows"][1]["cost"] < live["rows"][0]["cost"]
+        assert table[0].startswith("모델") and "claude-haiku-4-5/" in table[3] and "50%" in table[2]
+        records = list(read_archive(tape))
+        assert [r["kind"] for r in records].count("call") == 8 and [r["kind"] for r in records].count("run") == 4
+        try:
+            compare(requests, combos, record_path=tape)
+            raise AssertionError("recording overwrote an existing tape")
+        except ValueError:
+            pass
+
+        # Offline: no server, no API key, not a single HTTP request (health probes included), same numbers
+        MONITOR._warm_at.clear()  # as in a fresh process: recording just warmed the connection
+        sent = []
+        original_request = http.Session.request
+        http.Session.request = lambda self, method, url, *args, **kwargs: sent.append(url) or original_request(self, method, url, *args, **kwargs)
+        os.environ.pop("ANTHROPIC_API_KEY", None)
+        try:
+            replayed = compare(requests, combos, replay_path=tape)
+            missing = compare(requests[:1], [parse_combo("anthropic:claude-opus-4-5")], replay_path=tape)
+            time.sleep(0.3)
+        finally:
+            http.Session.request = original_request
+            if saved_key is None:
+                os.environ.pop("ANTHROPIC_API_KEY", None)
+            else:
+                os.environ["ANTHROPIC_API_KEY"] = saved_key
+        assert sent == [], sent
+        for before, after in zip(live["rows"], replayed["rows"]):
+            assert {k: before[k] for k in METRICS} == {k: after[k] for k in METRICS}
+            assert abs(before["seconds"] - after["seconds"]) < 1e-3
+        assert format_table(replayed)[0] == table[0]
+        run = missing["runs"][0]
+        print(f"녹화에 없는 모델: {run['status']} {run['error']}")
+        assert missing["rows"][0]["failed"] == 1 and "녹화된 응답이 없습니다" in run["error"]
+
+    print("\n✅ 모델 비교 하네스 테스트 완료!")
+
+
+if __name__ == "__main__":
+    test_compare()
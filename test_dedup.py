@@ -0,0 +1,66 @@
+"""
+첨부자료 중복 제거 테스트 스크립트
+- 내용이 같은 파일(다른 이름) 제거
+- 공백/대소문자만 다른 유사 문서 제거
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.util.file_loader import dedup_attachments, hamming, normalize_text, simhash
+
+
+POST = """안녕하세요! 오늘은 맛집 탐방기를 준비했어요.
+신발원은 정말 유명한 곳이죠. 포장도 가능하답니다.
+직접 방문해서 먹어본 후기를 공유할게요.
+
+맛은 정말 환상적이었어요. 특히 양념이 일품이었습니다.
+가격도 합리적이고, 직원분들도 친절하셨어요.
+다음에 또 방문하고 싶은 곳이에요.
+"""
+
+OTHER = """주말에 다녀온 캠핑장 후기입니다.
+사이트 간격이 넓고 화장실이 깨끗해서 아이들과 가기 좋았어요.
+밤에는 별이 정말 많이 보였고, 장작도 관리동에서 판매하고 있었어요.
+"""
+
+
+def test_dedup():
+    print("=" * 60)
+    print("첨부자료 중복 제거 테스트")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as d:
+        paths = []
+        long_post = POST + "".join(f"\n{i}번째 메뉴는 {i * 1000}원이었고 양이 넉넉했어요." for i in range(1, 30))
+        contents = [
+            long_post,
+            OTHER,
+            long_post,
+            long_post.replace("\n", "\n\n  ") + "  ",
+            long_post + "\n감사합니다. 다음에 또 만나요!",
+        ]
+        for i, content in enumerate(contents):
+            p = os.path.join(d, f"post_{i}.txt")
+            with open(p, "w", encoding="utf-8") as f:
+                f.write(content)
+            paths.append((p, content))
+
+        kept, stats = dedup_attachments(paths)
+        print(f"유지: {[os.path.basename(p) for p, _ in kept]}")
+        print(f"제거: 동일 {stats['exact']}개, 유사 {stats['near']}개, 절약 토큰 {stats['tokens_saved']}")
+
+        assert [p for p, _ in kept] == [paths[0][0], paths[1][0]]
+        assert stats["exact"] == 1
+        assert stats["near"] == 2
+        assert stats["tokens_saved"] > 0
+
+    assert hamming(simhash(normalize_text(POST)), simhash(normalize_text(OTHER))) > 3
+
+    print("\n✅ 중복 제거 테스트 완료!")
+
+
+if __name__ == "__main__":
+    test_dedup()
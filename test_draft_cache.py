@@ -0,0 +1,175 @@
+"""
+초안 섹션 캐시 테스트 스크립트 (로컬 가짜 Anthropic 서버 사용, 네트워크 불필요)
+- 같은 입력으로 다시 실행하면 API 호출 없이 이전 초안 재사용 (Step 1도 생략)
+- 가이드 한 줄을 바꾸면 그 항목을 맡은 섹션만 다시 작성, 개요와 나머지 섹션은 재사용
+- 새 항목은 이웃 항목의 섹션으로, 해시태그 항목은 마지막 섹션으로
+- 어느 섹션에도 속하지 않는 항목이 바뀌면 모든 섹션을 다시 작성 (개요는 재사용)
+"""
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.main import run
+from src.util.disk_cache import DiskCache
+from src.util.draft_cache import DraftCache, guide_items, plan_update
+
+GUIDE = """금오산을 처음 소개하는 글
+케이블카 요금은 성인 기준으로
+등산로는 초보자 코스 위주
+#금오산 #구미 해시태그 넣기
+존댓말로 친근하게"""
+
+
+class FakeSections(BaseHTTPRequestHandler):
+    kinds = []
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        content = body["messages"][-1]["content"]
+        text = content if isinstance(content, str) else "".join(block["text"] for block in content)
+        section = re.search(r"(\d+)번 섹션", text)
+        if "스타일 가이드" in (body.get("system") or ""):
+            kind, answer = "step1", "문체 분석 결과"
+        elif "개요를 잡아줘" in text:
+            kind, answer = "outline", "1. 도입 | 소개 | 1\n2. 케이블카 | 요금 | 2\n3. 등산로 | 코스 | 3\n4. 마무리 | 총평 | 4"
+        elif section:
+            # The section echoes the guide items it was asked to cover
+            n = section.group(1)
+            kind = f"section{n}"
+            own = re.findall(r"^- (.+)$", text.split("특히 반영할 가이드 항목:")[-1], re.M) if "특히 반영할" in text else []
+            answer = f"## 섹션 {n}\n" + "\n".join(f"반영: {item}" for item in own)
+        else:
+            kind, answer = "single", "한 번에 쓴 초안: " + " / ".join(guide_items(text.split("[주제 및 가이드]")[-1])[:1])
+        with FakeSections.lock:
+            FakeSections.kinds.append(kind)
+        usage = {"input_tokens": 10, "output_tokens": 5}
+        if not body.get("stream"):
+            raw = json.dumps({"content": [{"type": "text", "text": answer}], "usage": usage}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for event in (
+            {"type": "message_start", "message": {"usage": dict(usage, output_tokens=0)}},
+            {"type": "content_block_delta", "delta": {"type": "text_delta", "text": answer}},
+            {"type": "message_delta", "usage": {"output_tokens": 5}},
+            {"type": "message_stop"},
+        ):
+            self.wfile.write(b"data: " + json.dumps(event, ensure_ascii=False).encode("utf-8") + b"\n\n")
+
+
+def test_draft_cache():
+    print("=" * 60)
+    print("초안 섹션 캐시 테스트")
+    print("=" * 60)
+
+    # Diff planning without a server
+    record = {"guide": ["a", "b", "c", "d", "전체"], "outline": [["1", "", [0]], ["2", "", [1]], ["3", "", [2, 3]]]}
+    assert plan_update(record, ["a", "b", "c", "d", "전체"]) == ([], [[0], [1], [2, 3]])
+    assert plan_update(record, ["a", "B", "c", "d", "전체"]) == ([1], [[0], [1], [2, 3]])
+    assert plan_update(record, ["a", "b", "d", "전체"]) == ([2], [[0], [1], [2]])
+    assert plan_update(record, ["a", "b", "b2", "c", "d", "전체"]) == ([1], [[0], [1, 2], [3, 4]])
+    assert plan_update(record, ["a", "b", "c", "d", "전체", "#태그 추가"]) == ([2], [[0], [1], [2, 3, 5]])
+    assert plan_update(record, ["a", "b", "c", "d", "모두"]) == ([0, 1, 2], [[0], [1], [2, 3]])
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeSections)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    saved = {k: os.environ.get(k) for k in ("ANTHROPIC_BASE_URL", "ANTHROPIC_API_KEY")}
+    os.environ["ANTHROPIC_BASE_URL"] = f"http://127.0.0.1:{server.server_port}"
+    os.environ["ANTHROPIC_API_KEY"] = "test-key"
+    try:
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "post.md")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("금오산 케이블카 후기입니다. " * 200)
+            db = os.path.join(d, "cache.sqlite")
+
+            def generate(guide, **kwargs):
+                # A fresh cache object per run, as in separate invocations
+                FakeSections.kinds = []
+                logs, streamed = [], []
+                with DiskCache(db) as disk:
+                    cache = DraftCache(disk)
+                    draft = run(
+                        provider="anthropic", model="claude-sonnet-4-5", keyword="금오산", keyword_repeat=4,
+                        input_dir=None, files=[path], out_path=os.path.join(d, "out.txt"), language="ko",
+                        max_tokens=4000, temperature=0.7, log_callback=logs.append, writing_guide=guide,
+                        word_count=2800, draft_cache=cache,
+                        on_delta=lambda step, text: streamed.append(text) if step == 2 else None, **kwargs,
+                    )
+                assert "".join(streamed) == draft
+                with open(os.path.join(d, "out.txt"), encoding="utf-8") as f:
+                    assert f.read() == draft
+                return draft, sorted(FakeSections.kinds), logs, (cache.reused, cache.rewritten)
+
+            def sections_of(draft):
+                return re.split(r"\n\n(?=## 섹션)", draft)
+
+            first, kinds, _, counts = generate(GUIDE, sections=4)
+            print(first)
+            assert kinds == ["outline", "section1", "section2", "section3", "section4", "step1"] and counts == (0, 4)
+            # Hashtag item with the closing section, the global item with none
+            assert "반영: #금오산" in sections_of(first)[3] and "존댓말" not in first
+
+            # Same inputs: nothing is sent, Step 1 included
+            again, kinds, logs, counts = generate(GUIDE, sections=4)
+            assert again == first and kinds == [] and counts == (4, 0)
+            assert any("Step 1 결과 재사용" in line for line in logs) and any("Step 2 결과 재사용" in line for line in logs)
+
+            # One line changed: only its section is rewritten
+            changed = GUIDE.replace("성인 기준으로", "어린이 요금도 함께")
+            draft, kinds, logs, counts = generate(changed, sections=4)
+            print([line for line in logs if "가이드 변경" in line][0])
+            assert kinds == ["section2"] and counts == (3, 1)
+            old, new = sections_of(first), sections_of(draft)
+            assert new[0] == old[0] and new[2:] == old[2:] and "어린이 요금도 함께" in new[1]
+
+            # A line inserted after "등산로": goes to that section
+            inserted = changed.replace("위주\n", "위주\n주차장 정보 추가\n")
+            draft, kinds, _, _ = generate(inserted, sections=4)
+            assert kinds == ["section3"] and "반영: 주차장 정보 추가" in sections_of(draft)[2]
+
+            # The line no section claims applies to all of them; the outline is still reused
+            draft, kinds, _, counts = generate(inserted.replace("친근하게", "차분하게"), sections=4)
+            assert kinds == ["section1", "section2", "section3", "section4"] and counts == (0, 4)
+            assert "주차장 정보 추가" in draft
+
+            # Single-shot drafts: reused whole or rewritten whole
+            generate(GUIDE)
+            _, kinds, _, counts = generate(GUIDE)
+            assert kinds == [] and counts == (1, 0)
+            _, kinds, _, _ = generate(changed)
+            assert kinds == ["single"]
+    finally:
+        server.shutdown()
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+    print("\n✅ 초안 섹션 캐시 테스트 완료!")
+
+
+if __name__ == "__main__":
+    test_draft_cache()
@@ -0,0 +1,107 @@
+"""
+첨부 텍스트 추출기 테스트 스크립트
+- HTML: 스크립트/메뉴/푸터 제거, meta charset(euc-kr) 인식
+- 큰 텍스트 파일: mmap 경로 결과가 일반 읽기와 동일한지
+- 추출 통계(시간, 입력/출력 바이트 비율)와 추출기 등록
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import src.util.file_loader as fl
+from src.util.file_loader import extract_text, load_attachments, register_extractor, summarize_extract_stats
+
+PAGE = """<!DOCTYPE html>
+<html><head><meta charset="{charset}"><title>신발원 후기</title>
+<style>body {{ font-family: sans-serif; }} .x {{ color: red; }}</style>
+<script>window.dataLayer = window.dataLayer || []; function gtag(){{dataLayer.push(arguments);}}</script>
+</head><body>
+<header><ul class="gnb"><li><a href="/">홈</a></li><li><a href="/blog">블로그</a></li></ul></header>
+<nav>카테고리 전체보기 맛집 여행 일상</nav>
+<article>
+  <header><h1>부산 신발원 방문기</h1></header>
+  <p>안녕하세요! 오늘은 <b>맛집 탐방기</b>를 준비했어요.<br>포장도 가능하답니다.</p>
+  <table><tr><th>메뉴</th><th>가격</th></tr><tr><td>고기만두</td><td>7,000원</td></tr></table>
+  <div class="share-buttons">카카오톡 공유 페이스북 공유</div>
+</article>
+<div id="comments"><p>댓글 1: 잘 보고 갑니다</p></div>
+<footer>Copyright &copy; 2024 블로그. All rights reserved.</footer>
+<script src="/static/app.js"></script>
+</body></html>
+"""
+
+
+def test_extractors():
+    print("=" * 60)
+    print("텍스트 추출기 테스트")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as d:
+        html = os.path.join(d, "post.html")
+        with open(html, "w", encoding="utf-8") as f:
+            f.write(PAGE.format(charset="utf-8"))
+        stats = []
+        text = extract_text(html, stats)
+        print(text)
+        for kept in ("신발원 후기", "부산 신발원 방문기", "맛집 탐방기", "포장도 가능하답니다", "고기만두 | 7,000원"):
+            assert kept in text, kept
+        for dropped in ("dataLayer", "font-family", "카테고리", "블로그</a>", "홈", "공유", "댓글", "Copyright"):
+            assert dropped not in text, dropped
+        s = stats[0]
+        print(f"html: {s['in_bytes']}B -> {s['out_bytes']}B ({s['ratio']:.0%}), {s['seconds'] * 1000:.2f}ms")
+        assert s["extractor"] == "html" and s["ratio"] < 0.5
+
+        # Korean sites still serve EUC-KR pages
+        legacy = os.path.join(d, "legacy.htm")
+        with open(legacy, "wb") as f:
+            f.write(PAGE.format(charset="euc-kr").encode("euc-kr"))
+        assert extract_text(legacy) == text
+
+        # Large plain text goes through mmap; same result as text-mode reading
+        big = os.path.join(d, "big.txt")
+        with open(big, "wb") as f:
+            f.write("첫 줄\r\n둘째 줄\r셋째 줄\n".encode("utf-8") * 1000 + b"\xff")
+        with open(big, "r", encoding="utf-8", errors="replace") as f:
+            expected = f.read()
+        saved = fl.MMAP_MIN_SIZE
+        try:
+            fl.MMAP_MIN_SIZE = 1
+            assert extract_text(big) == expected
+        finally:
+            fl.MMAP_MIN_SIZE = saved
+
+        # Registry: a custom extractor is picked up by is_text_file and load_attachments
+        @register_extractor("upper", [".shout"])
+        def read_shout(path):
+            with open(path, encoding="utf-8") as f:
+                return f.read().upper()
+
+        try:
+            shout = os.path.join(d, "a.shout")
+            with open(shout, "w", encoding="utf-8") as f:
+                f.write("hello")
+            stats = []
+            attachments = load_attachments(None, [shout, html, big], extract_stats=stats)
+            assert dict(attachments)[os.path.abspath(shout)] == "HELLO"
+            totals = summarize_extract_stats(stats)
+            print({name: (t["files"], f"{t['ratio']:.0%}") for name, t in totals.items()})
+            assert set(totals) == {"upper", "html", "text"}
+        finally:
+            del fl.EXTRACTORS[".shout"]
+
+        # Optional parsers fail with a readable error instead of returning markup
+        doc = os.path.join(d, "old.doc")
+        with open(doc, "wb") as f:
+            f.write(b"\xd0\xcf\x11\xe0" + b"\x00" * 64)
+        try:
+            extract_text(doc)
+        except RuntimeError as e:
+            print(f"doc: {e}")
+
+    print("\n✅ 텍스트 추출기 테스트 완료!")
+
+
+if __name__ == "__main__":
+    test_extractors()
@@ -0,0 +1,81 @@
+"""
+첨부 파일 탐색 테스트 스크립트
+- .gitignore 형식 제외 규칙 / include·exclude glob
+- 바이너리 확장자·최대 크기 필터
+- 심볼릭 링크 순환 방지, 병렬 탐색 결과 일치
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.util.file_loader import IgnoreRules, is_text_file, walk_files
+
+
+def _touch(path: str, data: str = "내용") -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(data)
+
+
+def test_file_discovery():
+    print("=" * 60)
+    print("첨부 파일 탐색 테스트")
+    print("=" * 60)
+
+    rules = IgnoreRules("/base", ["*.log", "!keep.log", "build/", "/top.txt", "docs/**/*.md"])
+    assert rules.match("a/b.log", False) is True
+    assert rules.match("keep.log", False) is False
+    assert rules.match("x/build", True) is True
+    assert rules.match("x/build", False) is None
+    assert rules.match("top.txt", False) is True
+    assert rules.match("a/top.txt", False) is None
+    assert rules.match("docs/a/b/c.md", False) is True
+
+    with tempfile.TemporaryDirectory() as d:
+        _touch(os.path.join(d, "post.md"))
+        _touch(os.path.join(d, "notes.txt"))
+        _touch(os.path.join(d, "photo.jpg"))
+        _touch(os.path.join(d, "debug.log"))
+        _touch(os.path.join(d, "big.txt"), "x" * 5000)
+        _touch(os.path.join(d, "node_modules", "pkg", "README.md"))
+        _touch(os.path.join(d, "sub", "draft.md"))
+        _touch(os.path.join(d, "sub", "old", "a.md"))
+        _touch(os.path.join(d, "sub", ".gitignore"), "old/\n")
+        _touch(os.path.join(d, ".gitignore"), "*.log\n")
+        if hasattr(os, "symlink"):
+            os.symlink(d, os.path.join(d, "sub", "loop"))
+
+        names = lambda paths: sorted(os.path.relpath(p, d).replace(os.sep, "/") for p in paths)
+
+        found = walk_files([d], max_size=1000, follow_symlinks=True)
+        print(f"탐색 결과: {names(found)}")
+        assert names(found) == ["notes.txt", "post.md", "sub/draft.md"]
+
+        assert names(walk_files([d], include=["*.md"])) == ["post.md", "sub/draft.md"]
+        assert names(walk_files([d], include=["*.md"], exclude=["sub/"])) == ["post.md"]
+        assert walk_files([d], workers=4) == walk_files([d])
+
+        if hasattr(os, "symlink"):
+            # A link back to a directory already being walked is cut on its first visit
+            os.symlink(os.path.join(d, "sub"), os.path.join(d, "sub", "again"))
+            found = walk_files([d], max_size=1000, follow_symlinks=True)
+            assert names(found) == ["notes.txt", "post.md", "sub/draft.md"], names(found)
+            # Default mode: linked directories are not entered, linked files are kept
+            with tempfile.TemporaryDirectory() as outside:
+                _touch(os.path.join(outside, "shared.md"), "공유 메모")
+                os.symlink(os.path.join(outside, "shared.md"), os.path.join(d, "sub", "shared.md"))
+                os.symlink(outside, os.path.join(d, "linked_dir"))
+                found = walk_files([d], max_size=1000)
+                print(f"기본 모드 탐색 결과: {names(found)}")
+                assert names(found) == ["notes.txt", "post.md", "sub/draft.md", "sub/shared.md"]
+
+        assert not is_text_file(os.path.join(d, "photo.jpg"))
+        assert is_text_file(os.path.join(d, "debug.log"))
+
+    print("\n✅ 첨부 파일 탐색 테스트 완료!")
+
+
+if __name__ == "__main__":
+    test_file_discovery()
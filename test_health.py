@@ -0,0 +1,120 @@
+"""
+연결 상태 모니터 테스트 스크립트 (로컬 가짜 서버 사용, 네트워크 불필요)
+- 클라이언트 인스턴스가 달라도 같은 keep-alive 연결을 재사용하는지
+- 주기적 점검 + 실제 요청 결과로 지연시간/오류율 집계, 캐시된 상태 즉시 조회
+- API 키가 없는 provider는 '설정 안 됨'
+"""
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.providers.health import DEGRADED, DOWN, OK, UNCONFIGURED, UNKNOWN, HealthMonitor
+from src.providers.registry import create_provider
+
+
+class KeepAliveServer(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    client_ports = set()
+    fail = False
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        KeepAliveServer.client_ports.add(self.client_address[1])
+        if KeepAliveServer.fail:
+            self._json({"error": "overloaded"}, status=503)
+        else:
+            self._json({"data": [{"id": "local-model"}]})
+
+    def do_POST(self):
+        KeepAliveServer.client_ports.add(self.client_address[1])
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self._json({"choices": [{"message": {"content": "OK"}}],
+                    "usage": {"prompt_tokens": 5, "completion_tokens": 1}})
+
+    def _json(self, data, status=200):
+        raw = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+
+def test_health():
+    print("=" * 60)
+    print("연결 상태 모니터 테스트")
+    print("=" * 60)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveServer)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    saved = {k: os.environ.get(k) for k in ("LOCAL_LLM_BASE_URL", "OPENAI_API_KEY")}
+    os.environ["LOCAL_LLM_BASE_URL"] = f"http://127.0.0.1:{server.server_port}"
+    os.environ.pop("OPENAI_API_KEY", None)
+    try:
+        # Separate client instances share one pooled connection
+        messages = [{"role": "user", "content": "hi"}]
+        for _ in range(3):
+            assert create_provider("local").chat("local-model", messages) == "OK"
+        print(f"요청 4회, 클라이언트 연결 수: {len(KeepAliveServer.client_ports)}")
+        assert create_provider("local").ping() == "OK: reachable"
+        assert len(KeepAliveServer.client_ports) == 1
+
+        monitor = HealthMonitor(providers=["local", "openai"], interval=0.05, window=10)
+        assert monitor.status("local")["state"] == UNKNOWN
+        monitor.start()
+        deadline = time.time() + 5
+        while monitor.status("local")["state"] == UNKNOWN and time.time() < deadline:
+            time.sleep(0.02)
+        monitor.stop()
+        st = monitor.status("local")
+        print(monitor.summary("local"), st)
+        assert st["state"] == OK and st["latency_ms"] is not None and st["error_rate"] == 0
+        assert monitor.status("openai")["state"] == UNCONFIGURED
+
+        # Failures shift the rolling error rate; status() answers from cache
+        for _ in range(5):
+            monitor.check("local")
+        KeepAliveServer.fail = True
+        monitor.check("local")
+        assert monitor.status("local")["state"] == DEGRADED
+        for _ in range(10):
+            monitor.check("local")
+        t0 = time.perf_counter()
+        st = monitor.status("local")
+        print(f"{monitor.summary('local')} (조회 {(time.perf_counter() - t0) * 1e6:.0f}us)")
+        assert st["state"] == DOWN and st["error_rate"] == 1.0
+        KeepAliveServer.fail = False
+        monitor.check("local")
+        assert monitor.status("local")["state"] == DEGRADED
+
+        # Warm-up is skipped while a recent connection is still fresh
+        warm = HealthMonitor(providers=["local"])
+        warm.warm_up("local")
+        deadline = time.time() + 5
+        while warm.status("local")["state"] == UNKNOWN and time.time() < deadline:
+            time.sleep(0.02)
+        warm.warm_up("local")
+        time.sleep(0.1)
+        assert warm.status("local")["state"] == OK
+        assert len(warm._samples["local"]) == 1
+    finally:
+        KeepAliveServer.fail = False
+        server.shutdown()
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+    print("\n✅ 연결 상태 모니터 테스트 완료!")
+
+
+if __name__ == "__main__":
+    test_health()
@@ -0,0 +1,69 @@
+"""
+시작 시간 테스트 스크립트 (`python -X importtime` 예산 확인)
+- `import src.main`이 예산(IMPORT_BUDGET_MS) 안에 끝나는지
+- 선택하지 않은 provider, requests, 첨부 파서가 미리 로드되지 않는지
+"""
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Generous on purpose: the lazy layout imports in well under 10ms locally,
+# the eager one took >100ms (requests alone is ~90ms).
+IMPORT_BUDGET_MS = 50
+
+EAGER_FORBIDDEN = [
+    "requests",
+    "src.providers.openai_client",
+    "src.providers.anthropic_client",
+    "src.util.file_loader",
+    "src.util.ref_index",
+    "sqlite3",
+    "docx",
+]
+
+
+def _importtime(code: str) -> tuple[dict, set]:
+    env = dict(os.environ, ANTHROPIC_API_KEY="test-key", OPENAI_API_KEY="test-key")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        m = re.match(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)", line)
+        if m:
+            cumulative[m.group(4)] = int(m.group(2))
+    loaded = set(proc.stdout.split())
+    return cumulative, loaded
+
+
+def test_import_time():
+    print("=" * 60)
+    print("시작 시간 테스트")
+    print("=" * 60)
+
+    cumulative, loaded = _importtime(
+        "import sys, src.main; print(' '.join(sys.modules))"
+    )
+    ms = cumulative["src.main"] / 1000
+    print(f"import src.main: {ms:.1f}ms (예산 {IMPORT_BUDGET_MS}ms)")
+    assert ms < IMPORT_BUDGET_MS
+    eager = [m for m in EAGER_FORBIDDEN if m in loaded]
+    assert not eager, f"미리 로드된 모듈: {eager}"
+
+    # Selecting one provider loads only that provider (health-check path)
+    _, loaded = _importtime(
+        "import sys, src.main as m; m.create_client('anthropic'); print(' '.join(sys.modules))"
+    )
+    assert "src.providers.anthropic_client" in loaded
+    assert "src.providers.openai_client" not in loaded
+    assert "src.util.file_loader" not in loaded
+
+    print("\n✅ 시작 시간 테스트 완료!")
+
+
+if __name__ == "__main__":
+    test_import_time()
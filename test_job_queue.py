@@ -0,0 +1,137 @@
+"""
+작업 큐 테스트 스크립트 (로컬 가짜 Anthropic 서버 사용, 네트워크 불필요)
+- 여러 작업 동시 실행 + 스트리밍 출력 + 토큰 집계
+- 동일 첨부자료의 Step 1 결과 공유
+- 실행 중 작업 취소
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.jobs import CANCELLED, DONE, Job, JobQueue
+
+
+class FakeAnthropic(BaseHTTPRequestHandler):
+    requests_seen = []
+    delay = 0.0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._json({"data": []})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        step = 1 if "스타일 가이드" in (body.get("system") or "") else 2
+        FakeAnthropic.requests_seen.append(step)
+        words = ["문체 ", "분석 ", "결과"] if step == 1 else ["완성된 ", "블로그 ", "초안"]
+        if not body.get("stream"):
+            self._json({"content": [{"type": "text", "text": "".join(words)}],
+                        "usage": {"input_tokens": 10, "output_tokens": 3}})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        self._event({"type": "message_start", "message": {"usage": {"input_tokens": 10, "output_tokens": 1}}})
+        for w in words:
+            time.sleep(FakeAnthropic.delay)
+            self._event({"type": "content_block_delta", "delta": {"type": "text_delta", "text": w}})
+        self._event({"type": "message_delta", "usage": {"output_tokens": 3}})
+        self._event({"type": "message_stop"})
+
+    def _json(self, data):
+        raw = json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def _event(self, data):
+        try:
+            self.wfile.write(b"data: " + json.dumps(data, ensure_ascii=False).encode("utf-8") + b"\n\n")
+            self.wfile.flush()
+        except OSError:
+            pass
+
+
+def start_fake_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeAnthropic)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.saved_env = {k: os.environ.get(k) for k in ("ANTHROPIC_BASE_URL", "ANTHROPIC_API_KEY")}
+    os.environ["ANTHROPIC_BASE_URL"] = f"http://127.0.0.1:{server.server_port}"
+    os.environ["ANTHROPIC_API_KEY"] = "test-key"
+    return server
+
+
+def stop_fake_server(server):
+    server.shutdown()
+    for k, v in server.saved_env.items():
+        if v is None:
+            os.environ.pop(k, None)
+        else:
+            os.environ[k] = v
+
+
+def test_job_queue():
+    print("=" * 60)
+    print("작업 큐 테스트")
+    print("=" * 60)
+
+    server = start_fake_server()
+    try:
+        with tempfile.TemporaryDirectory() as d:
+            ref = os.path.join(d, "ref.txt")
+            with open(ref, "w", encoding="utf-8") as f:
+                f.write("안녕하세요! 오늘은 맛집 탐방기를 준비했어요.")
+
+            FakeAnthropic.requests_seen.clear()
+            FakeAnthropic.delay = 0.05
+            queue = JobQueue(concurrency=3)
+            jobs = [
+                queue.submit(Job(keyword=f"키워드{i}", writing_guide="가이드", files=[ref],
+                                 out_path=os.path.join(d, f"out{i}.txt")))
+                for i in range(3)
+            ]
+            assert queue.wait(timeout=30)
+            for job in jobs:
+                print(f"#{job.id} {job.status} {job.elapsed:.2f}s usage={job.usage} output={job.output_text()!r}")
+                assert job.status == DONE, job.error
+                assert job.output_text() == "완성된 블로그 초안"
+                with open(job.out_path, encoding="utf-8") as f:
+                    assert f.read() == "완성된 블로그 초안"
+            # Step 1 ran once for all three jobs
+            assert FakeAnthropic.requests_seen.count(1) == 1
+            assert FakeAnthropic.requests_seen.count(2) == 3
+            assert sum(j.usage["output_tokens"] for j in jobs) == 4 * 4
+
+            FakeAnthropic.delay = 1.0
+            slow = queue.submit(Job(keyword="느린 작업", writing_guide="다른 가이드",
+                                    out_path=os.path.join(d, "slow.txt")))
+            time.sleep(0.5)
+            t0 = time.perf_counter()
+            queue.cancel(slow.id)
+            assert queue.wait(timeout=10)
+            print(f"#{slow.id} {slow.status} ({time.perf_counter() - t0:.2f}s 만에 취소)")
+            assert slow.status == CANCELLED
+            assert not os.path.exists(slow.out_path)
+
+            retried = queue.retry(slow.id)
+            assert retried is not None and retried.id != slow.id
+            queue.cancel(retried.id)
+            queue.wait(timeout=10)
+    finally:
+        stop_fake_server(server)
+
+    print("\n✅ 작업 큐 테스트 완료!")
+
+
+if __name__ == "__main__":
+    test_job_queue()
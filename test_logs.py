@@ -0,0 +1,128 @@
+"""
+구조화 로깅 테스트 스크립트 (로컬 가짜 Anthropic 서버 사용, 네트워크 불필요)
+- 접두어로 레벨 결정, 작업별 맥락(job/keyword)이 JSONL 파일에 기록되고 크기별로 교체
+- 큐가 가득 차도 로그 호출은 막히지 않고 버린 건수만 셈
+- GUI용 링 버퍼는 최근 N줄만 유지하고 한 번에 넘겨줌
+- 콘솔에는 최상위 로그와 작업의 경고만 표시
+"""
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.jobs import Job, JobQueue
+from src.util import logs
+from src.util.logs import LogSystem, RingBufferHandler, configure, emit, get_log, level_of, worker_log_path
+from test_job_queue import start_fake_server, stop_fake_server
+
+
+class SlowView(logging.Handler):
+    def emit(self, record):
+        time.sleep(0.01)
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_logs():
+    print("=" * 60)
+    print("구조화 로깅 테스트")
+    print("=" * 60)
+
+    assert level_of("[경고] 느림") == logging.WARNING and level_of("[디버그] 파일 로딩") == logging.DEBUG
+    assert level_of("[debug] Model=x") == logging.DEBUG and level_of("[배치] 1/2 완료") == logging.INFO
+    assert worker_log_path("logs/run.jsonl", 3) == "logs/run.w3.jsonl"
+
+    with tempfile.TemporaryDirectory() as d:
+        try:
+            # Console: top-level lines and job warnings only; the file gets everything with context
+            path = os.path.join(d, "run.jsonl")
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                system = configure(level="DEBUG", jsonl_path=path)
+                emit("[배치] 시작")
+                job_log = get_log(job=7, keyword="금오산")
+                job_log("[디버그] 파일 로딩 완료")
+                job_log("[경고] 최근 연결 상태 느림")
+                assert system.flush()
+            assert out.getvalue().splitlines() == ["[배치] 시작", "[경고] 최근 연결 상태 느림"]
+            records = read_jsonl(path)
+            assert [r["level"] for r in records] == ["INFO", "DEBUG", "WARNING"]
+            assert records[1]["job"] == 7 and records[1]["keyword"] == "금오산" and "ts" in records[1]
+
+            # Threshold
+            configure(level="INFO", console=False, jsonl_path=path)
+            emit("[디버그] 안 보임")
+            emit("보임")
+            logs.flush()
+            assert read_jsonl(path)[-1]["msg"] == "보임" and all(r["msg"] != "[디버그] 안 보임" for r in read_jsonl(path))
+
+            # Size rotation
+            rotated = os.path.join(d, "rotate.jsonl")
+            configure(console=False, jsonl_path=rotated, max_bytes=2000, backups=2)
+            for i in range(300):
+                emit(f"[배치] {i}/300 완료: 요청-{i:04d}")
+            logs.flush()
+            files = sorted(f for f in os.listdir(d) if f.startswith("rotate.jsonl"))
+            print(f"교체된 로그 파일: {files}")
+            assert files == ["rotate.jsonl", "rotate.jsonl.1", "rotate.jsonl.2"]
+            assert all(os.path.getsize(os.path.join(d, f)) <= 2100 for f in files)
+            assert read_jsonl(rotated)[-1]["msg"] == "[배치] 299/300 완료: 요청-0299"
+
+            # A stalled output never blocks the caller: a full queue drops records
+            stalled = LogSystem(console=False, queue_size=20)
+            stalled.add_view(SlowView())
+            logger = logging.getLogger("test-stalled")
+            logger.addHandler(stalled.handler)
+            logger.setLevel(logging.DEBUG)
+            logger.propagate = False
+            t0 = time.perf_counter()
+            for i in range(2000):
+                logger.info("줄 %d", i)
+            elapsed = time.perf_counter() - t0
+            print(f"느린 출력 뒤 2,000줄: {elapsed * 1000:.0f}ms, 버림 {stalled.dropped}줄")
+            assert elapsed < 0.5 and stalled.dropped >= 1900
+            logger.removeHandler(stalled.handler)
+            stalled.stop()
+
+            # GUI ring buffer: bounded, handed over in batches, job detail filtered out
+            system = configure(console=False)
+            view = system.add_view(RingBufferHandler(capacity=100))
+            for i in range(250):
+                emit(f"줄 {i}")
+            get_log(job=1)("작업 내부 진행")
+            logs.flush()
+            batch = view.drain()
+            assert batch == [f"줄 {i}" for i in range(150, 250)] and view.skipped == 150
+            assert len(view.lines) == 100 and view.drain() == []
+
+            # Job logs carry the job's context into the file, and still reach job.logs
+            jobs_path = os.path.join(d, "jobs.jsonl")
+            configure(console=False, jsonl_path=jobs_path)
+            server = start_fake_server()
+            try:
+                queue = JobQueue(concurrency=1)
+                job = queue.submit(Job(keyword="금오산", writing_guide="가이드", out_path=None, model="claude-sonnet-4-5"))
+                assert queue.wait(30) and job.status == "완료"
+            finally:
+                stop_fake_server(server)
+            logs.flush()
+            records = [r for r in read_jsonl(jobs_path) if r.get("job") == job.id]
+            assert records and len(records) == len(job.logs)
+            assert all(r["keyword"] == "금오산" and r["provider"] == "anthropic" for r in records)
+        finally:
+            configure()
+
+    print("\n✅ 구조화 로깅 테스트 완료!")
+
+
+if __name__ == "__main__":
+    test_logs()
@@ -0,0 +1,161 @@
+"""
+장문 모드 테스트 스크립트 (로컬 가짜 Anthropic 서버 사용, 네트워크 불필요)
+- 개요 1회 후 섹션별 요청을 동시에 보내 전체 시간이 섹션 수만큼 줄어드는지
+- 공유 접두부(스타일 + 가이드 + 첨부)에 cache_control 지정, 섹션마다 동일
+- 키워드 반복 횟수/글자수를 섹션에 나눠 배정, 이어 붙일 때 중간 인사말/해시태그 제거
+- 스트리밍 출력 == 최종 결과, 드라이런 추정
+"""
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.batch import job_from_request
+from src.longform import clean_section, distribute, parse_outline, section_count
+from src.main import run
+from src.planner import plan_batch
+
+# Seconds per section of output; a single-shot draft is four sections long
+SECTION_SECONDS = 0.6
+
+
+class FakeLongForm(BaseHTTPRequestHandler):
+    bodies = []
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with FakeLongForm.lock:
+            FakeLongForm.bodies.append(body)
+        content = body["messages"][-1]["content"]
+        text = content if isinstance(content, str) else "".join(block["text"] for block in content)
+        section = re.search(r"(\d+)번 섹션", text)
+        if "스타일 가이드" in (body.get("system") or ""):
+            answer, seconds = "문체 분석 결과", 0.0
+        elif "개요를 잡아줘" in text:
+            answer, seconds = "개요입니다:\n1. 금오산 소개 | 위치\n2. **케이블카** | 요금\n3. 등산로 - 코스\n4. 마무리 | 총평", 0.1
+        elif section:
+            n = section.group(1)
+            answer = f"## 섹션 {n}\n안녕하세요 여러분!\n섹션 {n} 본문입니다.\n#금오산 #구미"
+            seconds = SECTION_SECONDS
+        else:
+            answer, seconds = "한 번에 작성한 초안", 4 * SECTION_SECONDS
+        time.sleep(seconds)
+        usage = {"input_tokens": 10, "cache_read_input_tokens": 100, "output_tokens": 5}
+        if not body.get("stream"):
+            raw = json.dumps({"content": [{"type": "text", "text": answer}], "usage": usage}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for event in (
+            {"type": "message_start", "message": {"usage": dict(usage, output_tokens=0)}},
+            {"type": "content_block_delta", "delta": {"type": "text_delta", "text": answer}},
+            {"type": "message_delta", "usage": {"output_tokens": 5}},
+            {"type": "message_stop"},
+        ):
+            self.wfile.write(b"data: " + json.dumps(event, ensure_ascii=False).encode("utf-8") + b"\n\n")
+
+
+def test_longform():
+    print("=" * 60)
+    print("장문 모드 테스트")
+    print("=" * 60)
+
+    assert section_count(None) == 4 and section_count(1000) == 2 and section_count(3000) == 5 and section_count(99999) == 8
+    assert distribute(6, 4) == [2, 2, 1, 1] and distribute(0, 3) == [0, 0, 0]
+    assert parse_outline("개요:\n1. 가 | 나 | 1, 3\n2) **다** - 라\n## 3. 마") == [("가", "나", [0, 2]), ("다", "라", []), ("마", "", [])]
+    assert clean_section("안녕하세요!\n본문\n#태그 #태그2", 1, 3) == "본문"
+    assert clean_section("안녕하세요!\n본문\n#태그", 0, 3) == "안녕하세요!\n본문"
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeLongForm)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    saved = {k: os.environ.get(k) for k in ("ANTHROPIC_BASE_URL", "ANTHROPIC_API_KEY")}
+    os.environ["ANTHROPIC_BASE_URL"] = f"http://127.0.0.1:{server.server_port}"
+    os.environ["ANTHROPIC_API_KEY"] = "test-key"
+    try:
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "post.md")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("금오산 케이블카 후기입니다. " * 200)
+
+            def generate(**kwargs):
+                FakeLongForm.bodies = []
+                logs, streamed, usage = [], [], {}
+                t0 = time.perf_counter()
+                draft = run(
+                    provider="anthropic", model="claude-sonnet-4-5", keyword="금오산", keyword_repeat=6, input_dir=None,
+                    files=[path], out_path=os.path.join(d, "out.txt"), language="ko", max_tokens=4000, temperature=0.7,
+                    log_callback=logs.append, writing_guide="금오산 가이드", word_count=2800, usage=usage,
+                    on_delta=lambda step, text: streamed.append(text) if step == 2 else None, **kwargs,
+                )
+                return draft, time.perf_counter() - t0, logs, "".join(streamed), usage, list(FakeLongForm.bodies)
+
+            single, single_seconds, *_ = generate()
+            draft, seconds, logs, streamed, usage, bodies = generate(sections=4)
+            print(draft)
+            print(f"한 번에: {single_seconds:.2f}초, 섹션 4개 병렬: {seconds:.2f}초")
+            assert single == "한 번에 작성한 초안"
+            assert seconds < single_seconds * 0.6
+
+            # Sections in outline order; greetings only in the first, hashtags only in the last
+            assert [int(n) for n in re.findall(r"## 섹션 (\d+)", draft)] == [1, 2, 3, 4]
+            assert draft.count("안녕하세요") == 1 and draft.count("#금오산") == 1 and draft.rstrip().endswith("#금오산 #구미")
+            assert streamed == draft
+            with open(os.path.join(d, "out.txt"), encoding="utf-8") as f:
+                assert f.read() == draft
+            # Step 1 + outline + 4 sections; cached prefix tokens counted as input
+            assert len(bodies) == 6 and usage == {"input_tokens": 6 * 110, "output_tokens": 6 * 5}
+            assert any("개요 4개 섹션" in line and "케이블카" in line for line in logs)
+
+            # One cached prefix block shared by the outline and every section
+            requests = [b for b in bodies if not b.get("system")]
+            prefixes = {b["messages"][0]["content"][0]["text"] for b in requests}
+            assert len(prefixes) == 1 and all(b["messages"][0]["content"][0]["cache_control"] == {"type": "ephemeral"} for b in requests)
+            assert "금오산 가이드" in next(iter(prefixes)) and "문체 분석 결과" in next(iter(prefixes))
+            tails = [b["messages"][0]["content"][1]["text"] for b in requests if "번 섹션" in b["messages"][0]["content"][1]["text"]]
+            repeats = sorted((int(re.search(r"(\d+)번 섹션", t).group(1)), int(re.search(r"이 섹션에서 (\d+)회", t).group(1))) for t in tails)
+            assert repeats == [(1, 2), (2, 2), (3, 1), (4, 1)]
+            assert all("공백 포함 약 700자" in t for t in tails)
+            first = next(t for t in tails if "1번 섹션" in t)
+            assert "다음 섹션 \"케이블카\"" in first and "글의 도입부" in first
+
+            # Dry run: more input (prefix per request), less wall time
+            req = {"title": "금오산", "body": "가이드", "files": [path], "word_count": 2800, "max_tokens": 4000}
+            plain = plan_batch([("a", job_from_request(req, 0))])["jobs"][0]
+            split = plan_batch([("b", job_from_request(dict(req, sections=0), 0))])["jobs"][0]
+            print(f"드라이런: {plain['seconds']:.0f}초 -> {split['seconds']:.0f}초, 입력 {plain['step2']['input_tokens']:,} -> {split['step2']['input_tokens']:,}")
+            assert split["sections"] == 4 and split["seconds"] < plain["seconds"] * 0.6
+            assert split["step2"]["input_tokens"] > 4 * plain["step2"]["input_tokens"]
+    finally:
+        server.shutdown()
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+    print("\n✅ 장문 모드 테스트 완료!")
+
+
+if __name__ == "__main__":
+    test_longform()
@@ -0,0 +1,125 @@
+"""
+출력 파일 안전 저장 테스트 스크립트 (로컬 가짜 Anthropic 서버 사용, 네트워크 불필요)
+- 임시 파일 + fsync + 교체: 중단되면 기존 파일이 그대로 남는지
+- 같은 출력 경로를 쓰는 작업 충돌 감지 (프로세스 내부 / 잠금 파일), 오래된 잠금 회수
+- 결과 아카이브(JSONL.gz): 잘린 마지막 레코드 무시
+- 배치 실행 결과를 아카이브 하나로 모으기
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.batch import job_from_request, run_batch
+from src.jobs import DONE, FAILED, Job, JobQueue
+from src.util.output_writer import AtomicWriter, OutputCollision, ResultArchive, read_archive, write_text_atomic
+from test_job_queue import start_fake_server, stop_fake_server
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_output_writer():
+    print("=" * 60)
+    print("출력 파일 안전 저장 테스트")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as d:
+        out = os.path.join(d, "out.txt")
+        write_text_atomic(out, "이전 초안")
+
+        # Interrupted write: the old file stays, no temp files left behind
+        w = AtomicWriter(out)
+        w.write("새 초안의 절반")
+        w.abort()
+        assert _read(out) == "이전 초안"
+        assert sorted(os.listdir(d)) == ["out.txt"]
+
+        # Streamed text is replaced by the final text on commit
+        with AtomicWriter(out) as w:
+            w.write("스트리밍 ")
+            w.write("조각 ")
+            w.commit("완성된 초안")
+        assert _read(out) == "완성된 초안"
+        assert sorted(os.listdir(d)) == ["out.txt"]
+
+        # Same path twice in this process / through another process's lock file
+        w = AtomicWriter(out)
+        try:
+            AtomicWriter(out)
+            raise AssertionError("collision not detected")
+        except OutputCollision as e:
+            print("충돌 감지:", e)
+        w.abort()
+        with open(out + ".lock", "w") as f:
+            f.write(f"{os.getppid()}\n")
+        try:
+            write_text_atomic(out, "덮어쓰기")
+            raise AssertionError("lock file ignored")
+        except OutputCollision:
+            pass
+        # A lock left by a dead process is taken over
+        with open(out + ".lock", "w") as f:
+            f.write("999999999\n")
+        write_text_atomic(out, "회수 후 저장")
+        assert _read(out) == "회수 후 저장"
+        assert not os.path.exists(out + ".lock")
+
+        # Archive: compressed records survive a truncated tail
+        archive_path = os.path.join(d, "results.jsonl.gz")
+        with ResultArchive(archive_path) as archive:
+            for i in range(50):
+                archive.add({"request_id": f"r{i}", "output": "본문 " * 20})
+        with ResultArchive(archive_path) as archive:
+            archive.add({"request_id": "r50", "output": "추가"})
+        records = list(read_archive(archive_path))
+        assert [r["request_id"] for r in records] == [f"r{i}" for i in range(51)]
+        size = os.path.getsize(archive_path)
+        print(f"아카이브 51건: {size:,} bytes")
+        with open(archive_path, "rb") as f:
+            data = f.read()
+        with open(archive_path, "wb") as f:
+            f.write(data[:-15])
+        partial = list(read_archive(archive_path))
+        assert 0 < len(partial) <= 51 and partial[0]["request_id"] == "r0"
+
+        server = start_fake_server()
+        try:
+            # Two queued jobs aimed at the same file: the second fails, the first is written
+            queue = JobQueue(concurrency=2)
+            shared = os.path.join(d, "shared.txt")
+            jobs = [queue.submit(Job(keyword="키워드", writing_guide=f"가이드{i}", out_path=shared)) for i in range(2)]
+            assert queue.wait(timeout=30)
+            statuses = sorted(job.status for job in jobs)
+            print("같은 경로 작업:", statuses, [job.error for job in jobs if job.error])
+            assert statuses == sorted([DONE, FAILED])
+            assert _read(shared) == "완성된 블로그 초안"
+            assert not os.path.exists(shared + ".lock")
+
+            # Batch into one archive instead of per-request files
+            requests = [{"request_id": f"req-{i}", "title": f"키워드{i}", "body": "가이드"} for i in range(4)]
+            requests.append({"request_id": "bad"})
+            batch_archive = os.path.join(d, "batch.jsonl")
+            summary = run_batch(requests, out_dir=os.path.join(d, "batch_out"), archive_path=batch_archive,
+                                concurrency=3, log=lambda m: None)
+            print(f"배치: 완료 {summary['done']}/{summary['total']}, 실패 {summary['failed']}")
+            assert summary["done"] == 4 and [f[0] for f in summary["failed"]] == ["bad"]
+            records = sorted(read_archive(batch_archive), key=lambda r: r["request_id"])
+            assert [r["request_id"] for r in records] == [f"req-{i}" for i in range(4)]
+            assert all(r["output"] == "완성된 블로그 초안" and r["status"] == DONE for r in records)
+            assert not os.path.exists(os.path.join(d, "batch_out"))
+        finally:
+            stop_fake_server(server)
+
+    job = job_from_request({"request_id": "a/b", "keyword": "k", "writing_guide": "g", "word_count": 800}, 0,
+                           defaults={"provider": "openai"}, out_dir="out")
+    assert job.out_path == os.path.join("out", "a_b.txt") and job.word_count == 800 and job.provider == "openai"
+
+    print("\n✅ 출력 파일 안전 저장 테스트 완료!")
+
+
+if __name__ == "__main__":
+    test_output_writer()
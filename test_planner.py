@@ -0,0 +1,124 @@
+"""
+드라이런 계획 테스트 스크립트 (네트워크 불필요)
+- 모델별 토크나이저 근사 (한국어)
+- 첨부자료 로딩/프롬프트 구성 후 입력 토큰, Step 1 공유, 비용, 소요 시간, 컨텍스트 초과 추정
+- API 요청을 한 번도 보내지 않는지
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import requests
+
+from src.batch import job_from_request
+from src.planner import format_plan, model_price, plan_batch
+from src.prompt_templates import build_meta_prompt, format_attachments
+from src.util.tokens import estimate_tokens, tokenizer_family
+
+
+def test_planner():
+    print("=" * 60)
+    print("드라이런 계획 테스트")
+    print("=" * 60)
+
+    korean = "주말에 금오산 맛집을 다녀왔어요. 분위기가 좋아요! " * 20
+    assert estimate_tokens(korean) == estimate_tokens(korean, "unknown-model")
+    assert estimate_tokens(korean, "gpt-4o-mini") < estimate_tokens(korean, "claude-sonnet-4-5") < estimate_tokens(korean, "gpt-4")
+    assert tokenizer_family("gpt-4.1-mini") == "o200k" and tokenizer_family("Qwen2.5-7B") == "local"
+    assert model_price("anthropic", "claude-sonnet-4-5") == (3.0, 15.0)
+    assert model_price("openai", "gpt-4o-mini-2024-07-18") == (0.15, 0.6)
+    assert model_price("local", "anything") == (0.0, 0.0) and model_price("openai", "mystery") is None
+
+    def no_network(*args, **kwargs):
+        raise AssertionError("드라이런에서 네트워크 요청 발생")
+
+    original_send = requests.Session.send
+    requests.Session.send = no_network
+    try:
+        with tempfile.TemporaryDirectory() as d:
+            paths = []
+            for name, text in (("a.md", korean), ("b.md", "구미 카페 탐방기입니다. " * 300), ("big.md", "긴 자료 " * 20000)):
+                paths.append(os.path.join(d, name))
+                with open(paths[-1], "w", encoding="utf-8") as f:
+                    f.write(text)
+            reqs = [
+                {"request_id": f"same-{i}", "title": f"키워드{i}", "body": "가이드", "files": paths[:2], "word_count": 1500}
+                for i in range(3)
+            ] + [
+                {"request_id": "big", "title": "키워드", "body": "가이드", "files": [paths[2]], "model": "claude-sonnet-4-5"},
+                {"request_id": "overflow", "title": "키워드", "body": "가이드", "files": paths[:1],
+                 "provider": "openai", "model": "gpt-4o", "max_tokens": 127000},
+            ]
+            defaults = {"provider": "anthropic", "model": "claude-sonnet-4-5", "max_tokens": 4000}
+            jobs = [(r["request_id"], job_from_request(r, i, defaults)) for i, r in enumerate(reqs)]
+            summary = plan_batch(jobs, concurrency=2, invalid=[("x", "오류")])
+            print("\n".join(format_plan(summary)))
+
+            plans = {p["request_id"]: p for p in summary["jobs"]}
+            assert summary["total"] == 6 and summary["failed"] == [("x", "오류")]
+            # Step 1 once per attachment set
+            assert summary["step1_calls"] == 3
+            assert [plans[f"same-{i}"]["step1_cached"] for i in range(3)] == [False, True, True]
+            # Step 1 input matches the real meta prompt (per-part rounding aside)
+            block = format_attachments([(p, open(p, encoding="utf-8").read()) for p in paths[:2]])
+            expected = sum(estimate_tokens(m["content"], "claude-sonnet-4-5") + 4 for m in build_meta_prompt(block))
+            assert abs(plans["same-0"]["step1"]["input_tokens"] - expected) <= 3
+            # Only the first chunk (12,000 chars) of a large attachment is sent
+            assert plans["big"]["step1"]["input_tokens"] < 16000
+            same = plans["same-0"]["step2"]
+            assert 1500 < same["output_tokens"] < 4000 and same["input_tokens"] > plans["same-0"]["step1"]["input_tokens"]
+            assert [rid for rid, _ in summary["overflow"]] == ["overflow"]
+            assert summary["unpriced"] == [] and summary["cost"] > 0
+            one = plans["same-1"]
+            expected_cost = (one["step2"]["input_tokens"] * 3 + one["step2"]["output_tokens"] * 15) / 1e6
+            assert abs(one["cost"] - expected_cost) < 1e-9
+            # 2 slots for the anthropic jobs, the openai job runs alongside
+            anthropic = sorted(p["seconds"] for p in summary["jobs"] if p["provider"] == "anthropic")
+            assert max(anthropic) <= summary["wall_seconds"] < sum(anthropic)
+
+            # input_dir walk options (--include/--exclude/--max-file-mb) apply as in run()
+            walked = dict(reqs[0], files=paths[:1], input_dir=d)
+            everything = plan_batch([("all", job_from_request(walked, 0, defaults))])["jobs"][0]
+            filtered = job_from_request(walked, 0, defaults)
+            filtered.walk_options = {"include": ["a.md"]}
+            only_a = plan_batch([("a", filtered)])["jobs"][0]
+            assert only_a["step1"]["input_tokens"] < everything["step1"]["input_tokens"] / 2
+            assert only_a["step1"]["input_tokens"] < plans["same-0"]["step1"]["input_tokens"]
+
+            # Long-form on a prompt-caching provider: section requests read the outline's cached prefix
+            longform = dict(reqs[0], files=[], sections=3, word_count=3000)
+            cached = plan_batch([("lf", job_from_request(longform, 0, defaults))])
+            step2 = cached["jobs"][0]["step2"]
+            assert step2["cache_write_tokens"] > 1000 and step2["cache_read_tokens"] == 3 * step2["cache_write_tokens"]
+            step1 = cached["jobs"][0]["step1"]
+            full = ((step1["input_tokens"] + step2["input_tokens"]) * 3 + (step1["output_tokens"] + step2["output_tokens"]) * 15) / 1e6
+            assert cached["jobs"][0]["cost"] < full and "프롬프트 캐시" in "\n".join(format_plan(cached))
+            uncached = plan_batch([("lf", job_from_request(dict(longform, provider="openai", model="gpt-4o"), 0, defaults))])
+            assert uncached["jobs"][0]["step2"]["cache_read_tokens"] == 0 and uncached["usage"]["cache_read_tokens"] == 0
+
+            # CLI
+            path = os.path.join(d, "requests.jsonl")
+            with open(path, "w", encoding="utf-8") as f:
+                for r in reqs[:3]:
+                    f.write(json.dumps(r, ensure_ascii=False) + "\n")
+            env = dict(os.environ, ANTHROPIC_BASE_URL="http://127.0.0.1:9")
+            out = subprocess.run(
+                [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src", "batch.py"),
+                 path, "--dry-run", "--concurrency", "4"],
+                capture_output=True, text=True, encoding="utf-8", env=env, timeout=60,
+            )
+            print(out.stdout)
+            assert out.returncode == 0, out.stderr
+            assert "작업 3건" in out.stdout and "Step 1 호출 1회" in out.stdout and "예상 비용" in out.stdout
+    finally:
+        requests.Session.send = original_send
+
+    print("\n✅ 드라이런 계획 테스트 완료!")
+
+
+if __name__ == "__main__":
+    test_planner()
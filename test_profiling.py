@@ -0,0 +1,93 @@
+"""
+단계별 프로파일링 테스트 스크립트 (로컬 가짜 Anthropic 서버 사용, 네트워크 불필요)
+- run()의 각 단계(collect_files, extract, format_attachments, step1/step2 ...) 벽시계/CPU 시간
+- cProfile 통계(.prof)와 flamegraph용 collapsed stack 파일 저장
+- 사용자 훅 연결, 비활성화 시 공용 no-op 사용
+"""
+import os
+import pstats
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.main import run
+from src.util.profiling import NULL_PROFILER, Profiler, StageHook
+from test_job_queue import FakeAnthropic, start_fake_server, stop_fake_server
+
+
+class RecordingHook(StageHook):
+    def __init__(self):
+        self.events = []
+
+    def enter(self, stage):
+        self.events.append(("enter", stage))
+
+    def exit(self, stage, wall, cpu):
+        self.events.append(("exit", stage))
+
+
+def test_profiling():
+    print("=" * 60)
+    print("단계별 프로파일링 테스트")
+    print("=" * 60)
+
+    # Disabled: every stage shares one no-op context manager
+    assert NULL_PROFILER.stage("a") is NULL_PROFILER.stage("b")
+    with NULL_PROFILER.stage("a"):
+        pass
+
+    server = start_fake_server()
+    FakeAnthropic.delay = 0.05
+    try:
+        with tempfile.TemporaryDirectory() as d:
+            refs = []
+            for i in range(20):
+                path = os.path.join(d, f"ref{i}.md")
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(f"# 글 {i}\n\n" + "오늘은 맛집 탐방기를 준비했어요. " * 200)
+                refs.append(path)
+
+            hook = RecordingHook()
+            out = os.path.join(d, "out.txt")
+            with Profiler(hooks=[hook], sample_interval=0.002) as prof:
+                draft = run(
+                    provider="anthropic", model="claude-test", keyword="키워드", keyword_repeat=3,
+                    input_dir=None, files=refs, out_path=out, language="ko", max_tokens=1000,
+                    temperature=0.7, writing_guide="가이드", log_callback=lambda m: None, profiler=prof,
+                )
+            assert draft == "완성된 블로그 초안"
+            for line in prof.report():
+                print(line)
+
+            stages = prof.timer.stages
+            for name in ("collect_files", "extract", "dedup", "format_attachments", "create_client",
+                         "step1_style", "save_step1", "step2_draft", "save_output"):
+                assert stages[name]["calls"] == 1, name
+            # Waiting on the (slow) server shows up as wall time without CPU
+            step2 = stages["step2_draft"]
+            assert step2["wall"] >= 0.05 and step2["wall"] > step2["cpu"]
+            assert prof.wall >= sum(t["wall"] for t in stages.values()) * 0.99
+            assert hook.events[0] == ("enter", "collect_files") and hook.events[-1] == ("exit", "save_output")
+            assert len(hook.events) == 2 * len(stages)
+
+            paths = prof.save(os.path.join(d, "prof", "run"))
+            print("저장:", [os.path.basename(p) for p in paths])
+            assert sorted(os.path.basename(p) for p in paths) == ["run.collapsed", "run.prof", "run.stages.json"]
+            stats = pstats.Stats(os.path.join(d, "prof", "run.prof"))
+            assert any(func[2] == "load_attachments" for func in stats.stats)
+            with open(os.path.join(d, "prof", "run.collapsed"), encoding="utf-8") as f:
+                lines = f.read().splitlines()
+            assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+            roots = {line.split(";", 1)[0] for line in lines}
+            print("샘플 수:", sum(int(line.rsplit(" ", 1)[1]) for line in lines), "단계:", sorted(roots))
+            assert "step1_style" in roots or "step2_draft" in roots
+    finally:
+        FakeAnthropic.delay = 0.0
+        stop_fake_server(server)
+
+    print("\n✅ 단계별 프로파일링 테스트 완료!")
+
+
+if __name__ == "__main__":
+    test_profiling()
@@ -0,0 +1,75 @@
+"""
+프롬프트 빌더 테스트 스크립트 (네트워크 불필요)
+- PromptBuilder 메시지가 build_meta_prompt / build_final_prompt 결과와 글자 단위로 같은지
+- 미리 인코딩한 조각으로 만든 요청 본문이 json.dumps(ensure_ascii=False)와 바이트 단위로 같은지
+- 같은 첨부자료는 포맷/인코딩을 한 번만 하고 재사용하는지
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.prompt_builder import prompt_builder
+from src.prompt_templates import build_final_prompt, build_meta_prompt, format_attachments
+from src.providers.anthropic_client import AnthropicClient
+from src.providers.openai_client import OpenAIClient
+from src.util.json_segments import Prompt, Segment, dumps_payload
+
+
+def legacy_format_attachments(attachments, max_chars_per_doc=12000):
+    blocks = []
+    for idx, (path, content) in enumerate(attachments, start=1):
+        snippet = content if len(content) <= max_chars_per_doc else content[:max_chars_per_doc] + "\n...[truncated]"
+        blocks.append(f"[자료 {idx}] {path}\n```\n{snippet}\n```")
+    return "\n\n".join(blocks)
+
+
+def test_prompt_builder():
+    print("=" * 60)
+    print("프롬프트 빌더 테스트")
+    print("=" * 60)
+
+    attachments = [
+        ("refs/a.md", "금오산 맛집 \"후기\"\n\t탭과 \\ 역슬래시, 제어문자 \x01 그리고 이모지 😊 " * 50),
+        ("refs/b 공백.txt", "짧은 글"),
+        ("refs/c.md", "긴 글 " * 5000),
+    ]
+    assert format_attachments(attachments) == legacy_format_attachments(attachments)
+    assert format_attachments(attachments, 100) == legacy_format_attachments(attachments, 100)
+    assert format_attachments([]) == ""
+
+    builder = prompt_builder(attachments)
+    block = format_attachments(attachments)
+    assert builder.attachments_block == block
+    assert builder.meta_messages() == build_meta_prompt(block)
+    for guide, count in (("가이드", 1000), (None, None)):
+        expected = build_final_prompt("스타일", "키워드", 3, block, guide, count)
+        assert builder.final_messages("스타일", "키워드", 3, guide, count) == expected
+
+    # Request bodies: byte-identical to a plain UTF-8 json.dumps of the same payload
+    for client in (AnthropicClient(api_key="k", base_url="http://x"), OpenAIClient(api_key="k", base_url="http://x")):
+        for messages in (builder.meta_messages(), builder.final_messages("스타일", "키워드", 3, "가이드", 800)):
+            payload = client._payload("model", messages, 1000, 0.7, True)
+            body = dumps_payload(payload)
+            assert body == json.dumps(payload, ensure_ascii=False).encode("utf-8"), type(client).__name__
+            assert json.loads(body) == payload
+            assert "금오산".encode("utf-8") in body
+    # Payloads without Prompts and marker-like text pass through unchanged
+    plain = {"a": ["\x00prompt-0\x00", 1.5, None, True], "b": {"c": "한글"}}
+    assert dumps_payload(plain) == json.dumps(plain, ensure_ascii=False).encode("utf-8")
+    mixed = {"x": "\x00prompt-0\x00", "y": Prompt(["앞 ", Segment("세그먼트"), " 뒤"])}
+    assert json.loads(dumps_payload(mixed)) == {"x": "\x00prompt-0\x00", "y": "앞 세그먼트 뒤"}
+
+    # The block is formatted and encoded once and shared by later jobs
+    encoded = builder.block.json
+    again = prompt_builder([(p, c) for p, c in attachments])
+    assert again is builder and again.block.json is encoded
+    assert prompt_builder(attachments[:2]) is not builder
+    print(f"첨부 블록 {len(block):,}자 -> 인코딩 {len(encoded):,} bytes (재사용)")
+
+    print("\n✅ 프롬프트 빌더 테스트 완료!")
+
+
+if __name__ == "__main__":
+    test_prompt_builder()
@@ -0,0 +1,176 @@
+"""
+Provider 레지스트리 테스트 스크립트 (로컬 가짜 서버 사용, 네트워크 불필요)
+- OpenAI 호환 로컬 서버(local provider): 일반/스트리밍 응답, 토큰 집계, 연결 확인
+- Step 1만 로컬 서버로 보내고 Step 2는 Anthropic으로 생성
+- provider의 max_concurrency에 맞춘 작업 큐 동시 실행 제한
+- 사용자 provider 등록
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.jobs import DONE, Job, JobQueue
+from src.main import run
+from src.providers.base import Provider
+from src.providers.registry import capabilities, create_provider, provider_names, register_provider
+from src.providers.openai_client import OpenAIClient
+from test_job_queue import FakeAnthropic, start_fake_server, stop_fake_server
+
+
+class FakeOpenAICompatible(BaseHTTPRequestHandler):
+    requests_seen = []
+    delay = 0.0
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._json({"data": [{"id": "local-model"}]})
+
+    def do_POST(self):
+        cls = FakeOpenAICompatible
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        cls.requests_seen.append((body["model"], self.headers.get("Authorization")))
+        with cls.lock:
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        try:
+            time.sleep(cls.delay)
+            words = ["로컬 ", "문체 ", "분석"]
+            if not body.get("stream"):
+                self._json({"choices": [{"message": {"content": "".join(words)}}],
+                            "usage": {"prompt_tokens": 7, "completion_tokens": 3}})
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for w in words:
+                self._event({"choices": [{"delta": {"content": w}}]})
+            self._event({"choices": [], "usage": {"prompt_tokens": 7, "completion_tokens": 3}})
+            self.wfile.write(b"data: [DONE]\n\n")
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+    def _json(self, data):
+        raw = json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def _event(self, data):
+        self.wfile.write(b"data: " + json.dumps(data, ensure_ascii=False).encode("utf-8") + b"\n\n")
+        self.wfile.flush()
+
+
+def test_providers():
+    print("=" * 60)
+    print("Provider 레지스트리 테스트")
+    print("=" * 60)
+
+    assert {"anthropic", "openai", "local"} <= set(provider_names())
+    assert capabilities("anthropic").prompt_caching
+    assert capabilities("local").max_concurrency == 1
+
+    # A provider missing a wire format hook fails when it's built, not on its first request
+    class Incomplete(Provider):
+        def _payload(self, model, messages, max_tokens, stream):
+            return {}
+    try:
+        Incomplete()
+        raise AssertionError("provider without _parse_response was constructed")
+    except TypeError as e:
+        assert "_parse_response" in str(e)
+
+    local = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAICompatible)
+    threading.Thread(target=local.serve_forever, daemon=True).start()
+    saved = {k: os.environ.get(k) for k in ("LOCAL_LLM_BASE_URL", "LOCAL_LLM_API_KEY")}
+    os.environ["LOCAL_LLM_BASE_URL"] = f"http://127.0.0.1:{local.server_port}"
+    os.environ.pop("LOCAL_LLM_API_KEY", None)
+    anthropic = start_fake_server()
+    try:
+        client = create_provider("local")
+        print("local ping:", client.ping())
+        assert client.health()["ok"]
+        messages = [{"role": "user", "content": "hi"}]
+        assert client.chat("local-model", messages) == "로컬 문체 분석"
+        deltas = []
+        usage = {}
+        assert client.chat("local-model", messages, on_delta=deltas.append, usage=usage) == "로컬 문체 분석"
+        assert deltas == ["로컬 ", "문체 ", "분석"]
+        assert usage == {"input_tokens": 7, "output_tokens": 3}
+        assert list(client.stream("local-model", messages)) == deltas
+        assert client.usage() == {"input_tokens": 21, "output_tokens": 9}
+        # No key configured: no Authorization header sent
+        assert all(auth is None for _, auth in FakeOpenAICompatible.requests_seen)
+
+        with tempfile.TemporaryDirectory() as d:
+            ref = os.path.join(d, "ref.txt")
+            with open(ref, "w", encoding="utf-8") as f:
+                f.write("안녕하세요! 오늘은 맛집 탐방기를 준비했어요.")
+
+            # Step 1 on the local server, Step 2 on Anthropic
+            FakeAnthropic.requests_seen.clear()
+            FakeOpenAICompatible.requests_seen.clear()
+            out = os.path.join(d, "out.txt")
+            draft = run(
+                provider="anthropic", model="claude-test", keyword="키워드", keyword_repeat=3,
+                input_dir=None, files=[ref], out_path=out, language="ko", max_tokens=1000,
+                temperature=0.7, writing_guide="가이드", log_callback=lambda m: None,
+                step1_provider="local", step1_model="qwen-local",
+            )
+            assert draft == "완성된 블로그 초안"
+            assert [m for m, _ in FakeOpenAICompatible.requests_seen] == ["qwen-local"]
+            assert FakeAnthropic.requests_seen == [2]
+            with open(os.path.join(d, "out_step1_style_prompt.txt"), encoding="utf-8") as f:
+                assert f.read() == "로컬 문체 분석"
+
+            # The local provider's max_concurrency=1 serializes its jobs
+            FakeOpenAICompatible.delay = 0.2
+            FakeOpenAICompatible.max_in_flight = 0
+            queue = JobQueue(concurrency=4)
+            jobs = [
+                queue.submit(Job(keyword=f"키워드{i}", writing_guide=f"가이드{i}", provider="local",
+                                 out_path=os.path.join(d, f"local{i}.txt")))
+                for i in range(3)
+            ]
+            assert queue.wait(timeout=30)
+            for job in jobs:
+                assert job.status == DONE, job.error
+            print(f"local 동시 요청 최대: {FakeOpenAICompatible.max_in_flight}")
+            assert FakeOpenAICompatible.max_in_flight == 1
+    finally:
+        FakeOpenAICompatible.delay = 0.0
+        local.shutdown()
+        stop_fake_server(anthropic)
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+    # Custom providers plug in without touching run()
+    class EchoProvider(OpenAIClient):
+        name = "echo"
+
+    register_provider("echo", EchoProvider)
+    assert "echo" in provider_names()
+    register_provider("lazy-local", "src.providers.local_client:LocalClient")
+    assert capabilities("lazy-local").context_tokens > 0
+
+    print("\n✅ Provider 레지스트리 테스트 완료!")
+
+
+if __name__ == "__main__":
+    test_providers()
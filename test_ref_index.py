@@ -0,0 +1,66 @@
+"""
+참고자료 인덱스 테스트 스크립트
+- 한국어 bigram BM25 검색
+- 파일 추가/수정/삭제 시 증분 갱신
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.util.ref_index import ReferenceIndex
+
+
+DOCS = {
+    "gopchang.txt": "구미 금오산 곱창 맛집 후기예요. 곱창이 쫄깃하고 주차장도 넓었어요.",
+    "camping.txt": "주말 캠핑장 후기입니다. 사이트 간격이 넓고 화장실이 깨끗했어요.",
+    "bakery.md": "신상 빵집 방문기! 소금빵이 정말 맛있었고 커피도 괜찮았어요.",
+}
+
+
+def test_ref_index():
+    print("=" * 60)
+    print("참고자료 인덱스 테스트")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as d:
+        for name, text in DOCS.items():
+            with open(os.path.join(d, name), "w", encoding="utf-8") as f:
+                f.write(text)
+
+        with ReferenceIndex(d, os.path.join(d, "index", "refs.sqlite")) as index:
+            stats = index.update(log=print)
+            assert stats["added"] == 3
+
+            hits = index.search("금오산 곱창 맛집", k=2)
+            print(f"검색 결과: {hits}")
+            assert os.path.basename(hits[0][0]) == "gopchang.txt"
+
+            # Unchanged files are not re-read; removed and edited files are synced
+            os.remove(os.path.join(d, "gopchang.txt"))
+            with open(os.path.join(d, "camping.txt"), "w", encoding="utf-8") as f:
+                f.write("금오산 곱창 골목 산책 후기")
+            stats = index.update(log=print)
+            assert (stats["removed"], stats["updated"], stats["unchanged"]) == (1, 1, 1)
+
+            hits = index.search("금오산 곱창", k=1)
+            assert os.path.basename(hits[0][0]) == "camping.txt"
+            assert all(p != hits[0][0] for p, _ in index.search("금오산 곱창", k=3, exclude=[hits[0][0]]))
+
+            # A file rewritten so it no longer qualifies (binary now) leaves the index, and stays out
+            notes = os.path.join(d, "notes")
+            with open(notes, "w", encoding="utf-8") as f:
+                f.write("해운대 돼지국밥 맛집 후기")
+            assert index.update()["added"] == 1 and os.path.basename(index.search("돼지국밥", k=1)[0][0]) == "notes"
+            with open(notes, "wb") as f:
+                f.write(b"\x00\x01binary")
+            stats = index.update()
+            assert stats["removed"] == 1 and index.search("돼지국밥", k=3) == []
+            assert index.update()["removed"] == 0
+
+    print("\n✅ 참고자료 인덱스 테스트 완료!")
+
+
+if __name__ == "__main__":
+    test_ref_index()
@@ -0,0 +1,152 @@
+"""
+우선순위/마감 스케줄러 테스트 스크립트 (로컬 가짜 Anthropic 서버 사용, 네트워크 불필요)
+- 속도 제한 대기열에서 interactive 요청이 쌓인 batch 요청보다 먼저 처리됨
+- 두 클래스가 모두 기다리면 가중치(8:1)대로 나눠 쓰고 batch도 굶지 않음
+- 같은 클래스 안에서는 마감이 빠른 작업 먼저, 죽은 프로세스의 대기 항목은 무시
+- 배치가 공유한 한도를 GUI 프로세스가 가져와 같은 대기열을 씀, 클래스별 대기 시간 보고
+- JobQueue도 interactive 작업을 먼저 시작
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.jobs import Job, JobQueue
+from src.providers import ratelimit
+from src.providers.ratelimit import BATCH, INTERACTIVE, RateLimiter, attach_shared_limits, format_waits, queue_waits
+from src.util.cancel import CancelToken
+from test_job_queue import start_fake_server, stop_fake_server
+
+
+def drain(path, name):
+    """Empty the request bucket so every acquire has to queue."""
+    with sqlite3.connect(path) as conn:
+        conn.execute("INSERT OR REPLACE INTO buckets (name, level, updated) VALUES (?, 0, ?)", (f"{name}:requests", time.time()))
+
+
+def token(priority=None, deadline=None):
+    t = CancelToken()
+    t.priority = priority
+    if deadline is not None:
+        t.set_deadline(deadline)
+    return t
+
+
+def run_waiters(limiter, tokens, served, stagger=0.0):
+    threads = []
+    for label, t in tokens:
+        thread = threading.Thread(target=lambda label=label, t=t: (limiter.acquire(0, t), served.append(label)))
+        thread.start()
+        threads.append(thread)
+        time.sleep(stagger)
+    return threads
+
+
+def test_scheduler():
+    print("=" * 60)
+    print("우선순위/마감 스케줄러 테스트")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "limits.sqlite")
+
+        # A GUI request arriving behind a batch backlog goes next
+        batch, gui = RateLimiter("p", rpm=600, path=path), RateLimiter("p", rpm=600, path=path)
+        drain(path, "p")
+        served = []
+        threads = run_waiters(batch, [(f"b{i}", token(BATCH)) for i in range(15)], served, stagger=0.005)
+        time.sleep(0.25)
+        t0 = time.perf_counter()
+        threads += run_waiters(gui, [(f"i{i}", token(INTERACTIVE)) for i in range(2)], served)
+        threads[-1].join()
+        threads[-2].join()
+        gui_wait = time.perf_counter() - t0
+        for t in threads:
+            t.join()
+        print(f"batch 15건 뒤에 온 interactive 2건: {gui_wait:.2f}초 만에 처리, 순서 {served}")
+        assert served.index("i1") < 6 and gui_wait < 0.6
+        assert sorted(served) == sorted([f"b{i}" for i in range(15)] + ["i0", "i1"])
+        assert gui.class_waits[INTERACTIVE]["requests"] == 2 and batch.class_waits[BATCH]["requests"] == 15
+        assert gui.class_waits[INTERACTIVE]["seconds"] / 2 < batch.class_waits[BATCH]["seconds"] / 15
+
+        # Both backlogged: 8:1 by weight, batch still makes progress
+        drain(path, "p")
+        served = []
+        threads = run_waiters(batch, [("b", token(BATCH)) for _ in range(12)], served)
+        threads += run_waiters(gui, [("i", token(INTERACTIVE)) for _ in range(12)], served)
+        for t in threads:
+            t.join()
+        order = "".join(served)
+        print(f"동시 대기 중 처리 순서: {order}")
+        assert order[:9].count("b") <= 2 and "b" in order[:10]
+
+        # Same class: earliest deadline first, no deadline last
+        drain(path, "p")
+        served = []
+        threads = run_waiters(batch, [("none", token(BATCH)), ("late", token(BATCH, 60)), ("soon", token(BATCH, 20))], served)
+        for t in threads:
+            t.join()
+        assert served == ["soon", "late", "none"], served
+
+        # A waiter left behind by a dead process doesn't block the queue
+        with sqlite3.connect(path) as conn:
+            conn.execute(
+                "INSERT INTO waiters (bucket, class, deadline, enqueued, seen) VALUES ('p', ?, NULL, ?, ?)",
+                (INTERACTIVE, time.time() - 100, time.time() - 100),
+            )
+        assert batch.acquire(0, token(BATCH)) < 1.0
+
+        # Stats across processes, by class
+        waits = queue_waits(path)
+        assert waits[INTERACTIVE]["requests"] == 14 and waits[BATCH]["requests"] == 31
+        lines = format_waits(waits)
+        print("\n".join(lines))
+        assert lines[0].startswith("[큐] interactive: 요청 14건") and "최장" in lines[1]
+        batch.close(), gui.close()
+
+        # The GUI process picks up the limits a batch published on this host
+        RateLimiter("shared-test", rpm=50, tpm=40000, path=path).close()
+        try:
+            assert "shared-test" in attach_shared_limits(path)
+            limiter = ratelimit.rate_limiter("shared-test")
+            assert (limiter.rpm, limiter.tpm) == (50, 40000)
+            assert attach_shared_limits(path) and ratelimit.rate_limiter("shared-test") is limiter
+
+            # Using an adopted limit doesn't keep it alive; once the batch stops refreshing it, it's dropped
+            stale = time.time() - ratelimit.SHARED_LIMIT_TTL - 1
+            with sqlite3.connect(path) as conn:
+                conn.execute("UPDATE limits SET updated = ? WHERE name = 'shared-test'", (stale,))
+            limiter.acquire(0, token(INTERACTIVE))
+            with sqlite3.connect(path) as conn:
+                assert conn.execute("SELECT updated FROM limits WHERE name = 'shared-test'").fetchone()[0] == stale
+            assert "shared-test" not in attach_shared_limits(path)
+            assert ratelimit.rate_limiter("shared-test") is None
+        finally:
+            ratelimit.set_rate_limit("shared-test", None)
+            limiter.close()
+        assert attach_shared_limits(os.path.join(d, "missing.sqlite")) == []
+
+        # Pending jobs: interactive ones start first
+        server = start_fake_server()
+        try:
+            queue = JobQueue(concurrency=1)
+            started = []
+            queue.add_listener(lambda job, event: event == "started" and started.append(job.keyword))
+            for keyword, priority in (("배치1", BATCH), ("배치2", BATCH), ("배치3", None), ("대화형", INTERACTIVE)):
+                queue.submit(Job(keyword=keyword, writing_guide="가이드", out_path=None, model="claude-sonnet-4-5", priority=priority))
+            assert queue.wait(30)
+        finally:
+            stop_fake_server(server)
+        print(f"JobQueue 시작 순서: {started}")
+        assert started == ["배치1", "대화형", "배치2", "배치3"]
+        assert all(job.status == "완료" for job in queue.jobs())
+
+    print("\n✅ 우선순위/마감 스케줄러 테스트 완료!")
+
+
+if __name__ == "__main__":
+    test_scheduler()
@@ -0,0 +1,111 @@
+"""
+여러 호스트 공유 작업 큐 테스트 스크립트 (로컬 가짜 Anthropic 서버 사용, 네트워크 불필요)
+- 두 "호스트"(작업자)가 같은 SQLite 큐에서 작업을 나눠 가져감
+- 멈춘 호스트의 작업은 임대 만료 후 다른 호스트가 다시 실행
+- 내용이 같은 요청은 결과를 한 번만 만들고, Step 1 결과도 호스트끼리 공유
+"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.batch import job_from_request
+from src.shared_queue import FAILED, FINISHED, RUNNING, SharedQueue, result_key, work
+from test_job_queue import FakeAnthropic, start_fake_server, stop_fake_server
+
+
+def test_shared_queue():
+    print("=" * 60)
+    print("공유 작업 큐 테스트")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as d:
+        # Same bytes under another path on "another host" -> same result key
+        src_file = os.path.join(d, "host1", "ref.md")
+        os.makedirs(os.path.dirname(src_file))
+        with open(src_file, "w", encoding="utf-8") as f:
+            f.write("# 금오산 맛집\n주말에 다녀온 후기입니다. " * 40)
+        copy = os.path.join(d, "host2", "자료.md")
+        os.makedirs(os.path.dirname(copy))
+        shutil.copy(src_file, copy)
+        req = {"title": "금오산 맛집", "body": "가이드", "files": [src_file]}
+        key = result_key(job_from_request(req, 0))
+        assert key == result_key(job_from_request(dict(req, files=[copy], timeout=30, priority="interactive"), 5))
+        assert key != result_key(job_from_request(dict(req, body="다른 가이드"), 0))
+
+        # Keys follow what the patterns and input_dir resolve to, not the strings themselves
+        notes = os.path.join(d, "notes")
+        os.makedirs(notes)
+        with open(os.path.join(notes, "a.md"), "w", encoding="utf-8") as f:
+            f.write("첫 번째 메모")
+        globbed = dict(req, files=[os.path.join(notes, "*.md")])
+        walked = dict(req, files=[src_file], input_dir=notes)
+        before = result_key(job_from_request(globbed, 0)), result_key(job_from_request(walked, 0))
+        with open(os.path.join(notes, "a.md"), "w", encoding="utf-8") as f:
+            f.write("고친 메모")
+        edited = result_key(job_from_request(globbed, 0)), result_key(job_from_request(walked, 0))
+        assert edited[0] != before[0] and edited[1] != before[1] and before[1] != key
+        with open(os.path.join(notes, "b.md"), "w", encoding="utf-8") as f:
+            f.write("새 메모")
+        assert result_key(job_from_request(globbed, 0)) != edited[0]
+        assert result_key(job_from_request(walked, 0)) != edited[1]
+
+        requests = [
+            {"request_id": f"r{i}", "title": f"키워드{i}", "body": "가이드", "files": [src_file]} for i in range(4)
+        ] + [
+            {"request_id": "dup", "title": "키워드0", "body": "가이드", "files": [copy]},
+            {"request_id": "bad", "title": "제목만"},
+        ]
+        path = os.path.join(d, "queue.sqlite")
+        with SharedQueue(path, lease_seconds=0.6) as store:
+            assert store.enqueue(requests) == 6
+            assert store.enqueue(requests[:2]) == 0
+            # A host claims r0 and dies without heartbeating
+            assert store.claim("dead-host")[0] == "r0"
+            assert store.counts() == {"pending": 5, RUNNING: 1}
+
+        server = start_fake_server()
+        FakeAnthropic.requests_seen.clear()
+        FakeAnthropic.delay = 0.2
+        stats = {}
+        logs = []
+        try:
+            hosts = [
+                threading.Thread(target=lambda h=h: stats.setdefault(h, work(
+                    path, concurrency=1, owner=h, lease_seconds=0.6, log=lambda m, h=h: logs.append(f"{h} {m}"),
+                )))
+                for h in ("host-a", "host-b")
+            ]
+            for t in hosts:
+                t.start()
+            for t in hosts:
+                t.join(60)
+        finally:
+            FakeAnthropic.delay = 0.0
+            stop_fake_server(server)
+        print("\n".join(logs))
+        print("호스트별:", stats)
+
+        with SharedQueue(path) as store:
+            assert store.counts() == {FINISHED: 5, FAILED: 1}, store.counts()
+            records = {r["request_id"]: r for r in store.records()}
+            # Requeued after the dead host's lease expired
+            assert records["r0"]["status"] == "완료" and records["r0"]["attempts"] == 2
+            assert records["dup"]["output"] == records["r0"]["output"] == "완성된 블로그 초안"
+            assert records["bad"]["status"] == FAILED and "writing_guide" in records["bad"]["error"]
+            assert list(records) == ["r0", "r1", "r2", "r3", "dup", "bad"]
+        # Both hosts worked; dup is answered from the results table unless it ran alongside r0
+        assert all(stats[h]["done"] >= 1 for h in stats)
+        cached = sum(s["cached"] for s in stats.values())
+        assert sum(s["done"] for s in stats.values()) + cached == 5
+        # One Step 1 for all hosts (shared style cache), one Step 2 per generated result
+        assert FakeAnthropic.requests_seen.count(1) == 1 and FakeAnthropic.requests_seen.count(2) == 5 - cached
+
+    print("\n✅ 공유 작업 큐 테스트 완료!")
+
+
+if __name__ == "__main__":
+    test_shared_queue()
@@ -0,0 +1,209 @@
+"""
+동시 중복 요청 합치기(single-flight) 테스트 스크립트 (로컬 가짜 Anthropic 서버 사용, 네트워크 불필요)
+- 같은 요청을 동시에 보내면 네트워크 요청은 1번, 결과(또는 오류)는 모두에게 전달
+- 기다린 쪽은 토큰 사용량 0, 스트리밍 콜백은 완성된 텍스트 한 번
+- 먼저 보낸 쪽이 취소되면 기다리던 쪽이 다시 보냄
+- 스레드 경로와 asyncio 경로(achat)가 서로 합쳐짐, NB_COALESCE=0 이면 끔
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.providers.anthropic_client import AnthropicClient
+from src.providers.singleflight import FLIGHTS, coalesced_requests
+from src.util.cancel import Cancelled, CancelToken
+
+DELAY = 0.4
+
+
+class FakeSlow(BaseHTTPRequestHandler):
+    prompts = []
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = body["messages"][-1]["content"]
+        with FakeSlow.lock:
+            FakeSlow.prompts.append(prompt)
+            n = len(FakeSlow.prompts)
+        time.sleep(DELAY)
+        if "fail" in prompt:
+            raw = b'{"error": "overloaded"}'
+            self.send_response(500)
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+            return
+        answer = f"답변 {n}: {prompt}"
+        usage = {"input_tokens": 10, "output_tokens": 5}
+        if not body.get("stream"):
+            raw = json.dumps({"content": [{"type": "text", "text": answer}], "usage": usage}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for event in (
+            {"type": "message_start", "message": {"usage": dict(usage, output_tokens=0)}},
+            {"type": "content_block_delta", "delta": {"type": "text_delta", "text": answer}},
+            {"type": "message_delta", "usage": {"output_tokens": 5}},
+            {"type": "message_stop"},
+        ):
+            self.wfile.write(b"data: " + json.dumps(event, ensure_ascii=False).encode("utf-8") + b"\n\n")
+
+
+def burst(client, prompt, n, **kwargs):
+    """``n`` identical chats started together; returns (results, usages)."""
+    usages = [{} for _ in range(n)]
+
+    def call(i):
+        try:
+            return client.chat("claude-sonnet-4-5", [{"role": "user", "content": prompt}], max_tokens=100, usage=usages[i], **kwargs)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=n) as pool:
+        results = list(pool.map(call, range(n)))
+    return results, usages
+
+
+def test_singleflight():
+    print("=" * 60)
+    print("동시 중복 요청 합치기 테스트")
+    print("=" * 60)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeSlow)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = AnthropicClient(api_key="test-key", base_url=f"http://127.0.0.1:{server.server_port}")
+    messages = [{"role": "user", "content": "문체 분석"}]
+    try:
+        # Eight identical requests, one network call, one bill
+        FakeSlow.prompts = []
+        before = coalesced_requests().get("anthropic", 0)
+        t0 = time.perf_counter()
+        results, usages = burst(client, "문체 분석", 8)
+        elapsed = time.perf_counter() - t0
+        print(f"동일 요청 8개: 서버 요청 {len(FakeSlow.prompts)}회, {elapsed:.2f}초")
+        assert FakeSlow.prompts == ["문체 분석"] and len(set(results)) == 1 and results[0].startswith("답변 1")
+        assert sorted(u.get("input_tokens", 0) for u in usages) == [0] * 7 + [10]
+        assert coalesced_requests()["anthropic"] - before == 7 and FLIGHTS.in_flight() == 0
+        assert elapsed < DELAY * 3
+
+        # Different payloads (prompt or max_tokens) are separate requests
+        FakeSlow.prompts = []
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            list(pool.map(lambda args: client.chat("claude-sonnet-4-5", [{"role": "user", "content": args[0]}], max_tokens=args[1]), [("가", 100), ("나", 100), ("가", 200)]))
+        assert sorted(FakeSlow.prompts) == ["가", "가", "나"]
+
+        # Finished requests are not cached: the next call goes out again
+        FakeSlow.prompts = []
+        client.chat("claude-sonnet-4-5", messages, max_tokens=100)
+        assert FakeSlow.prompts == ["문체 분석"]
+
+        # One error, raised in every waiter
+        FakeSlow.prompts = []
+        results, _ = burst(client, "fail", 4)
+        assert FakeSlow.prompts == ["fail"]
+        assert all(isinstance(r, RuntimeError) and "500" in str(r) for r in results)
+        assert len({id(r) for r in results}) == 4
+
+        # A streaming leader; waiters with on_delta get the text in one call
+        FakeSlow.prompts = []
+        deltas = [[] for _ in range(3)]
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            futures = [
+                pool.submit(client.chat, "claude-sonnet-4-5", messages, 100, 0.7, deltas[i].append)
+                for i in range(3)
+            ]
+            texts = [f.result() for f in futures]
+        assert len(FakeSlow.prompts) == 1 and len(set(texts)) == 1
+        assert all("".join(d) == texts[0] for d in deltas)
+
+        # The leader's own cancellation doesn't fail the waiters: one of them sends again
+        FakeSlow.prompts = []
+        token = CancelToken()
+        outcome = {}
+
+        def leader():
+            try:
+                client.chat("claude-sonnet-4-5", messages, max_tokens=100, cancel=token)
+            except Cancelled as e:
+                outcome["leader"] = e
+
+        t = threading.Thread(target=leader)
+        t.start()
+        time.sleep(0.1)
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            futures = [pool.submit(client.chat, "claude-sonnet-4-5", messages, 100) for _ in range(3)]
+            time.sleep(0.1)
+            token.cancel("사용자 취소")
+            texts = [f.result() for f in futures]
+        t.join()
+        print(f"선행 요청 취소 후: 서버 요청 {len(FakeSlow.prompts)}회")
+        assert isinstance(outcome["leader"], Cancelled)
+        assert len(FakeSlow.prompts) == 2 and len(set(texts)) == 1 and texts[0].startswith("답변 2")
+
+        # A waiter's own deadline still applies while it waits
+        FakeSlow.prompts = []
+        waiter = CancelToken()
+        waiter.set_deadline(0.15)
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            first = pool.submit(client.chat, "claude-sonnet-4-5", messages, 100)
+            time.sleep(0.05)
+            second = pool.submit(client.chat, "claude-sonnet-4-5", messages, 100, 0.7, None, waiter)
+            assert first.result().startswith("답변 1")
+            try:
+                second.result()
+                raise AssertionError("deadline ignored")
+            except Cancelled:
+                pass
+        assert len(FakeSlow.prompts) == 1
+
+        # asyncio and threads share one flight
+        FakeSlow.prompts = []
+
+        async def mixed():
+            loop = asyncio.get_running_loop()
+            threaded = [loop.run_in_executor(None, client.chat, "claude-sonnet-4-5", messages, 100) for _ in range(2)]
+            coros = [client.achat("claude-sonnet-4-5", messages, max_tokens=100) for _ in range(5)]
+            return await asyncio.gather(*coros, *threaded)
+
+        texts = asyncio.run(mixed())
+        print(f"asyncio 5개 + 스레드 2개: 서버 요청 {len(FakeSlow.prompts)}회")
+        assert len(FakeSlow.prompts) == 1 and len(set(texts)) == 1 and len(texts) == 7
+
+        # Switched off: every call goes out
+        os.environ["NB_COALESCE"] = "0"
+        try:
+            FakeSlow.prompts = []
+            burst(client, "문체 분석", 3)
+            assert len(FakeSlow.prompts) == 3
+        finally:
+            os.environ.pop("NB_COALESCE", None)
+    finally:
+        server.shutdown()
+
+    print("\n✅ 동시 중복 요청 합치기 테스트 완료!")
+
+
+if __name__ == "__main__":
+    test_singleflight()
@@ -0,0 +1,137 @@
+"""
+로컬 문체 프로필 테스트 스크립트 (로컬 가짜 Anthropic 서버 사용, 네트워크 불필요)
+- 문장 길이, 줄바꿈, 어미(~해요/~더라고요/~네요), 존댓말 비율, 이모티콘 빈도/위치를 첨부 전체에서 계산
+- style_mode "profile": Step 1에 원문 대신 프로필만 전송
+- style_mode "local": Step 1 호출 없이 스타일 가이드 작성
+- 드라이런 토큰 추정
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import requests
+
+from src.batch import job_from_request
+from src.main import run
+from src.planner import plan_batch
+from src.util.style_cache import StyleCache, style_cache_key
+from src.util.stylometry import analyze_style, format_profile, local_style_guide
+from test_job_queue import FakeAnthropic, start_fake_server, stop_fake_server
+
+POST = """오늘은 금오산에 다녀왔어요 😊
+날씨가 정말 좋더라고요!
+케이블카 타고 올라가니 풍경이 끝내주네요 ㅎㅎ
+
+주차장은 넓어서 편했어요.
+다음에 또 가고 싶어요~ 여러분도 꼭 가보세요!
+
+#금오산 #구미여행
+"""
+
+
+def test_stylometry():
+    print("=" * 60)
+    print("로컬 문체 프로필 테스트")
+    print("=" * 60)
+
+    # A tail past the first 12,000 characters in a different register still counts
+    tail = "\n\n" + "이 글은 반말로 쓴 기록이다. 문장을 길게 이어서 쓰는 습관은 없었다.\n" * 20
+    doc = POST * 120 + tail
+    assert len(POST * 120) > 12000
+    t0 = time.perf_counter()
+    profile = analyze_style([("a.md", doc)])
+    elapsed = time.perf_counter() - t0
+    print(format_profile(profile))
+    print(f"({elapsed * 1000:.1f}ms)")
+
+    assert profile["chars"] == len(doc) and profile["sentences"] == 120 * 5 + 40
+    endings = dict(profile["endings"])
+    assert {"더라고요", "네요", "했어요", "세요", "었다"} <= set(endings)
+    assert abs(endings["더라고요"] - 120 / 640) < 1e-9
+    assert profile["speech"]["plain"] == 40 / 640 and abs(profile["honorific"] - 600 / 640) < 1e-9
+    # 😊 and ㅎㅎ close their lines once per post, no emoji in the tail
+    assert dict(profile["emoji"]["top"]) == {"😊": 120, "ㅎㅎ": 120}
+    assert profile["emoji"]["position"]["end"] == 1.0
+    assert profile["line_per_sentence"] > 0.8 and profile["hashtags_per_doc"] == 240
+    assert profile["sentence_length"]["long"] == 0
+    assert profile["examples"] and all(s in doc for s in profile["examples"])
+
+    guide = local_style_guide(profile)
+    print(guide)
+    for heading in ("## 문체 핵심 특징", "## 문장 구조", "## 표현 스타일", "## 피해야 할 표현"):
+        assert heading in guide
+    assert "해요체 중심" in guide and "~더라고요" in guide and "문장마다 줄바꿈" in guide
+    assert "참고할 글이 없으므로" in local_style_guide(analyze_style([]))
+
+    # Cache keys: "llm" unchanged, "profile" separate
+    atts = [("a.md", doc)]
+    assert style_cache_key("anthropic", "m", atts) == style_cache_key("anthropic", "m", atts, mode="llm")
+    assert style_cache_key("anthropic", "m", atts) != style_cache_key("anthropic", "m", atts, mode="profile")
+
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "post.md")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(doc)
+
+        # Dry run: "profile" sends far fewer Step 1 tokens, "local" has no Step 1 call
+        req = {"title": "금오산", "body": "가이드", "files": [path], "model": "claude-sonnet-4-5"}
+        plans = {}
+        for mode in ("llm", "profile", "local"):
+            summary = plan_batch([(mode, job_from_request(dict(req, style_mode=mode), 0))])
+            plans[mode] = (summary["jobs"][0], summary["step1_calls"])
+        print({m: (p["step1"]["input_tokens"], calls) for m, (p, calls) in plans.items()})
+        assert plans["profile"][0]["step1"]["input_tokens"] * 5 < plans["llm"][0]["step1"]["input_tokens"]
+        assert plans["local"][1] == 0 and plans["local"][0]["step1"]["input_tokens"] == 0
+        assert plans["local"][0]["cost"] < plans["llm"][0]["cost"]
+
+        bodies = []
+        original_send = requests.Session.send
+
+        def recording_send(self, request, **kwargs):
+            if request.method == "POST":
+                bodies.append(json.loads(request.body))
+            return original_send(self, request, **kwargs)
+
+        server = start_fake_server()
+        requests.Session.send = recording_send
+        try:
+            results = {}
+            for mode in ("profile", "local"):
+                FakeAnthropic.requests_seen = []
+                bodies.clear()
+                logs = []
+                out = os.path.join(d, f"{mode}.txt")
+                draft = run(
+                    provider="anthropic", model="claude-sonnet-4-5", keyword="금오산", keyword_repeat=3, input_dir=None,
+                    files=[path], out_path=out, language="ko", max_tokens=1000, temperature=0.7,
+                    log_callback=logs.append, writing_guide="가이드", style_mode=mode, style_cache=StyleCache(),
+                )
+                assert draft == "완성된 블로그 초안"
+                results[mode] = (list(FakeAnthropic.requests_seen), [b["messages"][-1]["content"] for b in bodies], logs)
+                with open(os.path.join(d, f"{mode}_step1_style_prompt.txt"), encoding="utf-8") as f:
+                    results[mode] += (f.read(),)
+        finally:
+            requests.Session.send = original_send
+            stop_fake_server(server)
+
+        seen, contents, logs, step1 = results["profile"]
+        assert seen == [1, 2]
+        step1_user = contents[0] if isinstance(contents[0], str) else json.dumps(contents[0], ensure_ascii=False)
+        assert "문체 프로필" in step1_user and "자주 쓰는 어미" in step1_user and "이 글은 반말로" not in step1_user
+        assert step1 == "문체 분석 결과"
+
+        seen, contents, logs, step1 = results["local"]
+        assert seen == [2] and len(contents) == 1
+        assert any("Step 1 생략" in line for line in logs)
+        assert step1 == guide
+        print([line for line in logs if "문체 프로필" in line][0])
+
+    print("\n✅ 로컬 문체 프로필 테스트 완료!")
+
+
+if __name__ == "__main__":
+    test_stylometry()
@@ -0,0 +1,108 @@
+"""
+첨부자료 요약(추출 요약) 테스트 스크립트 (로컬 가짜 Anthropic 서버 사용, 네트워크 불필요)
+- 한국어/영어 문장 분리
+- TextRank 점수가 유사도 행렬로 직접 계산한 값과 같은지
+- 토큰 예산 안에서 핵심 문장만 원래 순서대로 남기는지 (반복되는 메뉴/푸터 제외, 12,000자 뒤의 내용 포함)
+- 입력 토큰 3~5배 감소, run()에 연결
+"""
+import math
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.batch import job_from_request
+from src.main import run
+from src.planner import plan_job
+from src.util.summarize import _vectors, compress, split_sentences, textrank
+from src.util.tokens import estimate_tokens
+from test_job_queue import start_fake_server, stop_fake_server
+
+
+def make_document(seed=7):
+    """Long post: repeated menu lines, filler, and a topic that runs through the whole text."""
+    rng = random.Random(seed)
+    topic = ["금오산", "케이블카", "등산로", "단풍", "정상", "전망대", "약수터", "주차장"]
+    # Unrelated chatter: words from a large vocabulary, so no two asides say the same thing
+    syllables = [chr(0xAC00 + i * 37) for i in range(300)]
+    filler = ["".join(rng.choices(syllables, k=2)) for _ in range(600)]
+    lines = []
+    for i in range(400):
+        lines.append("홈 | 카테고리 | 태그 | 방명록")
+        words = rng.choices(topic, k=6) + rng.choices(filler, k=2)
+        rng.shuffle(words)
+        lines.append(f"{i}번째 문단에서 {' '.join(words)} 이야기를 자세히 정리했어요. "
+                     f"여담으로 {' '.join(rng.choices(filler, k=6))} 였어요.")
+    return "\n".join(lines)
+
+
+def test_summarize():
+    print("=" * 60)
+    print("첨부자료 요약 테스트")
+    print("=" * 60)
+
+    units = split_sentences("첫 문장입니다. 두 번째 문장이에요! Is it 3.5 km? Yes.\n\n다음 줄 \"인용.\" 끝")
+    assert [s for _, s in units] == ["첫 문장입니다.", "두 번째 문장이에요!", "Is it 3.5 km?", "Yes.", "다음 줄 \"인용.\"", "끝"]
+    assert [line for line, _ in units] == [0, 0, 0, 0, 2, 2]
+
+    # Matrix-free power iteration == TextRank on the explicit similarity matrix
+    sentences = [s for _, s in split_sentences(make_document())][:40]
+    vecs = _vectors(sentences)
+    n = len(vecs)
+    sim = [[0.0 if i == j else sum(w * vecs[j].get(t, 0.0) for t, w in vecs[i].items()) for j in range(n)] for i in range(n)]
+    out = [sum(row) for row in sim]
+    expected = [1.0 / n] * n
+    for _ in range(30):
+        expected = [0.15 / n + 0.85 * sum(expected[j] * sim[j][i] / out[j] for j in range(n) if out[j]) for i in range(n)]
+    assert max(abs(a - b) for a, b in zip(expected, textrank(sentences))) < 1e-12
+    assert math.isclose(sum(expected), 1.0, rel_tol=1e-6)
+
+    doc = make_document()
+    assert compress("짧은 글입니다.", 100) == "짧은 글입니다."
+    summary = compress(doc, 2500)
+    kept = summary.split("\n")
+    print(f"원문 {len(doc):,}자 / 약 {estimate_tokens(doc):,} 토큰 -> 요약 {len(summary):,}자 / 약 {estimate_tokens(summary):,} 토큰")
+    assert estimate_tokens(summary) <= 2500
+    # Topic sentences, not menus or filler; document order; content past the first 12,000 chars
+    assert "홈 | 카테고리" not in summary and summary.count("여담으로") * 20 < summary.count("번째")
+    numbers = [int(line.split("번째")[0]) for line in kept if "번째" in line]
+    assert numbers == sorted(numbers) and max(numbers) * len(doc) / 400 > 12000
+    assert all(line in doc for line in kept)
+    ratio = estimate_tokens(doc[:12000]) / estimate_tokens(compress(doc, 800))
+    print(f"앞부분 12,000자 대비 {ratio:.1f}배 감소 (문서당 800 토큰)")
+    assert 3 <= ratio
+
+    with tempfile.TemporaryDirectory() as d:
+        paths = []
+        for i in range(2):
+            paths.append(os.path.join(d, f"post{i}.md"))
+            with open(paths[-1], "w", encoding="utf-8") as f:
+                f.write(make_document(seed=i))
+        req = {"title": "금오산", "body": "가이드", "files": paths, "model": "claude-sonnet-4-5"}
+        plain = plan_job(job_from_request(req, 0))
+        squeezed = plan_job(job_from_request(dict(req, compress_tokens=2000), 0))
+        ratio = plain["step1"]["input_tokens"] / squeezed["step1"]["input_tokens"]
+        print(f"Step 1 입력: 약 {plain['step1']['input_tokens']:,} -> {squeezed['step1']['input_tokens']:,} 토큰 ({ratio:.1f}배)")
+        assert 3 <= ratio <= 5.5
+
+        logs = []
+        server = start_fake_server()
+        try:
+            draft = run(
+                provider="anthropic", model="claude-sonnet-4-5", keyword="금오산", keyword_repeat=3, input_dir=None,
+                files=paths, out_path=None, language="ko", max_tokens=1000, temperature=0.7,
+                log_callback=logs.append, writing_guide="가이드", compress_tokens=2000,
+            )
+        finally:
+            stop_fake_server(server)
+        assert draft == "완성된 블로그 초안"
+        assert any(line.startswith("[디버그] 첨부 요약") for line in logs), logs
+        print([line for line in logs if "첨부 요약" in line][0])
+
+    print("\n✅ 첨부자료 요약 테스트 완료!")
+
+
+if __name__ == "__main__":
+    test_summarize()
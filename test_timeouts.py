@@ -0,0 +1,85 @@
+"""
+요청 시간 제한 테스트 스크립트 (로컬 가짜 Anthropic 서버 사용, 네트워크 불필요)
+- max_tokens와 관측 처리량(tokens/sec)으로 계산되는 요청별 제한 시간
+- 요청별 제한 시간 초과 시 스트림 중단
+- 작업 전체 제한 시간(Step 1 + Step 2) 초과 시 진행 중 요청 취소
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.jobs import FAILED, Job, JobQueue
+from src.providers import timeouts
+from src.providers.anthropic_client import AnthropicClient
+from src.util.cancel import CancelToken
+from test_job_queue import FakeAnthropic, start_fake_server, stop_fake_server
+
+
+def test_timeouts():
+    print("=" * 60)
+    print("요청 시간 제한 테스트")
+    print("=" * 60)
+
+    # Deadline follows max_tokens and the model's measured speed
+    tracker = timeouts.TRACKER
+    tracker.clear()
+    cold = timeouts.request_deadline("m", 10000)
+    for _ in range(5):
+        tracker.record("m", 2000, 20.0)  # 100 tok/s
+    tracker.record("m", 10, 5.0)  # too short to count
+    assert tracker.tokens_per_sec("m") == 100.0
+    warm = timeouts.request_deadline("m", 10000)
+    print(f"10000 tokens: 측정 전 {cold:.0f}s, 100 tok/s 측정 후 {warm:.0f}s")
+    assert warm == timeouts.BASE_LATENCY + timeouts.SAFETY_FACTOR * 100
+    assert warm < cold
+    assert timeouts.request_deadline("m", 10) == timeouts.MIN_TIMEOUT
+    assert timeouts.request_deadline("m", 10000, remaining=12.0) == 12.0
+    (connect, read), total = timeouts.request_timeouts("m", 10000, stream=True)
+    assert read == timeouts.STREAM_IDLE_TIMEOUT and total == warm
+    tracker.clear()
+
+    server = start_fake_server()
+    saved = timeouts.MIN_TIMEOUT, timeouts.MAX_TIMEOUT
+    try:
+        # A request running past its own deadline is aborted mid-stream
+        FakeAnthropic.delay = 1.0
+        timeouts.MIN_TIMEOUT = timeouts.MAX_TIMEOUT = 0.5
+        client = AnthropicClient()
+        t0 = time.perf_counter()
+        try:
+            client.chat("m", [{"role": "user", "content": "hi"}], max_tokens=100, on_delta=lambda t: None)
+            raise AssertionError("timeout expected")
+        except RuntimeError as e:
+            elapsed = time.perf_counter() - t0
+            print(f"요청 제한 초과: {e} ({elapsed:.2f}s)")
+            assert "응답 시간 초과" in str(e)
+            assert elapsed < 1.5
+        timeouts.MIN_TIMEOUT, timeouts.MAX_TIMEOUT = saved
+
+        # The job deadline covers both steps and cancels the request in flight
+        token = CancelToken()
+        token.set_deadline(0.3)
+        assert 0 < token.remaining() <= 0.3
+        with tempfile.TemporaryDirectory() as d:
+            queue = JobQueue(concurrency=1, job_timeout=1.5)
+            job = queue.submit(Job(keyword="키워드", writing_guide="가이드", out_path=os.path.join(d, "out.txt")))
+            assert queue.wait(timeout=10)
+            print(f"#{job.id} {job.status} {job.elapsed:.2f}s: {job.error}")
+            assert job.status == FAILED
+            assert "시간 제한" in job.error
+            assert job.elapsed < 2.5
+            assert not os.path.exists(job.out_path)
+        assert token.cancelled
+    finally:
+        timeouts.MIN_TIMEOUT, timeouts.MAX_TIMEOUT = saved
+        FakeAnthropic.delay = 0.0
+        stop_fake_server(server)
+
+    print("\n✅ 요청 시간 제한 테스트 완료!")
+
+
+if __name__ == "__main__":
+    test_timeouts()
@@ -0,0 +1,129 @@
+"""
+폴더 감시 모드 테스트 스크립트 (로컬 가짜 Anthropic 서버 사용, 네트워크 불필요)
+- 시작 시 한 번 읽어 둔 뒤 추가/수정/삭제/새 하위 폴더를 inotify(또는 폴링)로 반영
+- 감시 중인 폴더는 디렉토리 탐색 없이 목록을 돌려주고, 추출 텍스트와 중복 서명은 캐시에 있음
+- 참고자료 인덱스도 바뀐 파일만 갱신, run()은 인덱스 재탐색을 건너뜀
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.main import run
+from src.util import file_loader
+from src.util.ref_index import ReferenceIndex
+from src.util.watch import CorpusWatch, active, keeps_index
+from test_job_queue import FakeAnthropic, start_fake_server, stop_fake_server
+
+
+def wait_until(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def cached(path):
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    return key in file_loader._READ_CACHE and key in file_loader._SIGNATURE_CACHE
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def check_watch(root, poll):
+    """Changes under ``root`` show up in the listing, caches and index."""
+    refs = os.path.join(root, "refs")
+    for i in range(30):
+        write(os.path.join(refs, f"post{i:02d}.md"), f"금오산 케이블카 후기 {i}번째 글입니다. " * 20)
+    write(os.path.join(refs, ".git", "HEAD"), "ref: main")
+    sig_path = os.path.join(root, "signatures.json")
+
+    with CorpusWatch(ref_dirs=[refs], poll=poll, interval=0.2, settle=0.05, signature_path=sig_path, log=print) as watch:
+        print(f"감시 방식: {watch.watcher.kind}")
+        assert active() and keeps_index(refs)
+        listing = file_loader.walk_files([refs])
+        assert len(listing) == 30 and all(cached(p) for p in listing)
+        assert os.path.exists(sig_path)
+
+        # Served from the watch: no directory walk at all
+        original_scan = file_loader.scan_files
+        file_loader.scan_files = lambda *a, **k: (_ for _ in ()).throw(AssertionError("scan_files called"))
+        try:
+            assert file_loader.walk_files([refs]) == listing
+        finally:
+            file_loader.scan_files = original_scan
+        # Different scan options are not what the watch keeps
+        assert file_loader.walk_files([refs], include=["post0*.md"]) == listing[:10]
+
+        added = os.path.join(refs, "new.md")
+        write(added, "새로 추가한 해운대 맛집 글입니다. " * 20)
+        assert wait_until(lambda: added in file_loader.walk_files([refs]) and cached(added))
+
+        nested = os.path.join(refs, "2024", "07", "trip.md")
+        write(nested, "새 폴더 안의 제주도 여행 글입니다. " * 20)
+        assert wait_until(lambda: nested in file_loader.walk_files([refs]) and cached(nested))
+
+        modified = os.path.join(refs, "post00.md")
+        time.sleep(0.01)
+        write(modified, "고친 내용: 부산 광안리 야경 글입니다. " * 20)
+        assert wait_until(lambda: cached(modified))
+
+        removed = os.path.join(refs, "post01.md")
+        os.remove(removed)
+        shutil.rmtree(os.path.join(refs, "2024"))
+        assert wait_until(lambda: removed not in file_loader.walk_files([refs]) and nested not in file_loader.walk_files([refs]))
+
+        with ReferenceIndex(refs) as index:
+            assert wait_until(lambda: len(index) == 30)
+            assert index.search("해운대 맛집", k=1)[0][0] == added
+            assert index.search("광안리 야경", k=1)[0][0] == modified
+            assert not index.search("제주도", k=5) or all(p != nested for p, _ in index.search("제주도", k=5))
+        assert watch.refreshes >= 3
+    assert not active() and not keeps_index(refs)
+    assert file_loader._listing_key(refs) not in file_loader._LIVE_LISTINGS
+    return refs
+
+
+def test_watch():
+    print("=" * 60)
+    print("폴더 감시 모드 테스트")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as d:
+        check_watch(os.path.join(d, "inotify"), poll=False)
+        refs = check_watch(os.path.join(d, "polling"), poll=True)
+
+        # run() against a watched library: no index rescan, attachments already extracted
+        server = start_fake_server()
+        try:
+            with CorpusWatch(dirs=[refs], ref_dirs=[refs], signature_path=os.path.join(d, "sig.json"), log=print):
+                FakeAnthropic.requests_seen = []
+                logs = []
+                t0 = time.perf_counter()
+                draft = run(
+                    provider="anthropic", model="claude-sonnet-4-5", keyword="금오산", keyword_repeat=3,
+                    input_dir=refs, files=[], out_path=None, language="ko", max_tokens=1000, temperature=0.7,
+                    log_callback=logs.append, writing_guide="금오산 케이블카", ref_dir=refs, ref_top_k=3,
+                )
+                print(f"감시 중 run(): {time.perf_counter() - t0:.3f}초")
+                assert draft == "완성된 블로그 초안" and FakeAnthropic.requests_seen == [1, 2]
+                assert not any("인덱스 갱신" in line for line in logs)
+                assert any("파일 로딩 완료: 30개" in line for line in logs)
+        finally:
+            stop_fake_server(server)
+
+    print("\n✅ 폴더 감시 모드 테스트 완료!")
+
+
+if __name__ == "__main__":
+    test_watch()
@@ -0,0 +1,145 @@
+"""
+멀티 프로세스 배치 테스트 스크립트 (로컬 가짜 Anthropic 서버 사용, 네트워크 불필요)
+- 같은 첨부자료를 쓰는 요청은 같은 워커로 분배
+- 디스크 공유 캐시: 여러 프로세스/스레드가 같은 키를 한 번만 계산 (추출 결과, Step 1)
+- 프로세스 간 공유 속도 제한 (SQLite 토큰 버킷)
+- 워커별 지표를 합친 보고서와 결과 아카이브
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.providers.ratelimit import RateLimiter
+from src.providers.timeouts import MAX_TIMEOUT
+from src.util.cancel import Cancelled, CancelToken
+from src.util.disk_cache import LEASE_MARGIN, DiskCache, default_lease
+from src.util.output_writer import read_archive
+from src.worker_pool import format_report, merge_metrics, partition, run_parallel
+from test_job_queue import FakeAnthropic, start_fake_server, stop_fake_server
+
+
+def test_worker_pool():
+    print("=" * 60)
+    print("멀티 프로세스 배치 테스트")
+    print("=" * 60)
+
+    reqs = [{"files": ["a.html"]}] * 4 + [{"files": ["b.html"]}] * 2 + [{"files": []}] * 2
+    parts = partition(reqs, 2)
+    print("분배:", parts)
+    assert sorted(i for p in parts for i in p) == list(range(8))
+    assert sorted(len(p) for p in parts) == [4, 4]
+    assert any(set(p) >= {0, 1, 2, 3} for p in parts)
+    assert merge_metrics([{"worker": 0, "done": 2, "usage": {"input_tokens": 5}},
+                          {"worker": 1, "done": 3, "usage": {"input_tokens": 7}}]) == {"done": 5, "usage": {"input_tokens": 12}}
+
+    with tempfile.TemporaryDirectory() as d:
+        # Two cache handles (as in two processes) compute a missing key once
+        db = os.path.join(d, "cache.sqlite")
+        calls = []
+
+        def slow_compute():
+            calls.append(1)
+            time.sleep(0.3)
+            return "추출된 본문"
+
+        results = []
+        caches = [DiskCache(db), DiskCache(db)]
+        threads = [threading.Thread(target=lambda c=c: results.append(c.get_or_compute("extract", "k", slow_compute)))
+                   for c in caches]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(calls) == 1 and sorted(results) == [("추출된 본문", False), ("추출된 본문", True)]
+        assert caches[1].get("extract", "k") == "추출된 본문"
+
+        # The lease outlives the slowest request; a cancelled waiter stops waiting on another holder
+        assert default_lease() > MAX_TIMEOUT
+        deadline = CancelToken()
+        deadline.set_deadline(5)
+        assert default_lease(deadline) < 5 + LEASE_MARGIN + 0.01
+        holder = threading.Event()
+        release = threading.Event()
+        threading.Thread(
+            target=lambda: caches[0].get_or_compute("style", "slow", lambda: (holder.set(), release.wait(10), "가이드")[2]),
+        ).start()
+        assert holder.wait(5)
+        waiter = CancelToken()
+        threading.Timer(0.2, waiter.cancel).start()
+        t0 = time.perf_counter()
+        try:
+            caches[1].get_or_compute("style", "slow", lambda: "중복 계산", cancel=waiter)
+            raise AssertionError("waited past cancellation")
+        except Cancelled:
+            pass
+        assert time.perf_counter() - t0 < 1.0
+        release.set()
+        deadline.clear_deadline()
+        time.sleep(0.1)
+        assert caches[1].get("style", "slow") == "가이드"
+        for c in caches:
+            c.close()
+
+        # Two limiters on one database share a single budget
+        limits = os.path.join(d, "limits.sqlite")
+        a, b = RateLimiter("p", rpm=120, path=limits), RateLimiter("p", rpm=120, path=limits)
+        t0 = time.perf_counter()
+        for _ in range(60):
+            a.acquire()
+            b.acquire()
+        assert time.perf_counter() - t0 < 0.5
+        waited = a.acquire()
+        print(f"버킷 소진 후 대기: {waited:.2f}s")
+        assert 0.3 < waited < 1.0
+        tokens = RateLimiter("t", tpm=60000, path=limits)
+        assert tokens.acquire(59500) < 0.1
+        assert 0.3 < tokens.acquire(1000) < 1.0
+        a.close(), b.close(), tokens.close()
+
+        # Full run: 2 workers, 2 attachment sets, results merged into one archive
+        html = "<html><body><nav>메뉴</nav><article><p>{}</p></article></body></html>"
+        for name, text in (("a.html", "금오산 맛집 후기예요! " * 50), ("b.html", "구미 카페 탐방기입니다. " * 50)):
+            with open(os.path.join(d, name), "w", encoding="utf-8") as f:
+                f.write(html.format(text))
+        requests = [
+            {"request_id": f"{group}-{i}", "title": f"키워드{i}", "body": "가이드", "files": [os.path.join(d, group + ".html")]}
+            for group in ("a", "b") for i in range(3)
+        ]
+        server = start_fake_server()
+        FakeAnthropic.requests_seen.clear()
+        try:
+            archive = os.path.join(d, "results.jsonl.gz")
+            logs = []
+            summary = run_parallel(
+                requests, workers=2, archive_path=archive, concurrency=2, cache_path=os.path.join(d, "shared.sqlite"),
+                rpm=6000, limit_path=limits, log=logs.append,
+            )
+        finally:
+            stop_fake_server(server)
+        report = format_report(summary)
+        print("\n".join(logs[:1] + report))
+        assert summary["done"] == 6 and not summary["failed"], summary["failed"]
+        assert sorted(r["request_id"] for r in read_archive(archive)) == sorted(r["request_id"] for r in requests)
+        assert all(r["output"] == "완성된 블로그 초안" for r in read_archive(archive))
+        # One Step 1 request per attachment set, across both workers
+        assert FakeAnthropic.requests_seen.count(1) == 2 and FakeAnthropic.requests_seen.count(2) == 6
+        pids = {m["pid"] for m in summary["workers"]}
+        assert len(pids) == 2 and os.getpid() not in pids
+        merged = summary["merged"]
+        assert merged["done"] == 6 and merged["usage"]["output_tokens"] == (6 + 2) * 4
+        assert merged["style_cache"] == {"hits": 4, "misses": 2}
+        with sqlite3.connect(os.path.join(d, "shared.sqlite")) as conn:
+            namespaces = dict(conn.execute("SELECT ns, COUNT(*) FROM entries GROUP BY ns").fetchall())
+        assert namespaces == {"extract": 2, "style": 2}, namespaces
+        assert any("[w0]" in line for line in logs) and any("[w1]" in line for line in logs)
+
+    print("\n✅ 멀티 프로세스 배치 테스트 완료!")
+
+
+if __name__ == "__main__":
+    test_worker_pool()